@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la persistance des messages: avant / après utils/database.py
+Les deux variantes exécutent la même charge (add_message: INSERT + UPDATE de
+updated_at, depuis plusieurs sessions concurrentes) sur une base temporaire:
+- legacy: connect()/commit()/close() par appel, dans la boucle asyncio (ancien main.py)
+- pool: Database (exécuteur dédié, connexions réutilisées, WAL)
+- write_behind: MessageWriter comme add_message (mise en file sans attendre le commit,
+  messages des sessions regroupés en une transaction par lot); mesure jusqu'au flush()
+
+Une sonde mesure pendant ce temps le retard de la boucle asyncio (sleep de 1 ms
+réveillé en retard = boucle bloquée): c'est la latence ajoutée aux websockets.
+
+Usage:
+    python bench_db.py
+    python bench_db.py --sessions 16 --messages 200
+    python bench_db.py --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from utils.database import Database
+from utils.write_behind import MessageWriter
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY,
+        title TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        first_message TEXT,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        last_model TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT,
+        role TEXT,
+        content TEXT,
+        model_used TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+)
+INSERT_MESSAGE = """INSERT INTO messages (conversation_id, role, content, model_used)
+                 VALUES (?, ?, ?, ?)"""
+TOUCH_CONVERSATION = "UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+PROBE_INTERVAL = 0.001
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _probe(lags: list[float], stop: asyncio.Event):
+    """Retard de réveil d'un sleep de 1 ms (ms)"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, (time.perf_counter() - start - PROBE_INTERVAL) * 1000))
+
+
+def _legacy_add_message(path: str, conv_id: str, content: str):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute(INSERT_MESSAGE, (conv_id, "user", content, None))
+    c.execute(TOUCH_CONVERSATION, (conv_id,))
+    conn.commit()
+    conn.close()
+
+
+async def _legacy_session(path: str, conv_id: str, messages: int, content: str):
+    for _ in range(messages):
+        _legacy_add_message(path, conv_id, content)
+        await asyncio.sleep(0)  # Les autres sessions s'intercalent, comme sur /ws/chat
+
+
+def _add_message(conn, conv_id: str, content: str):
+    conn.execute(INSERT_MESSAGE, (conv_id, "user", content, None))
+    conn.execute(TOUCH_CONVERSATION, (conv_id,))
+
+
+async def _pool_session(db: Database, conv_id: str, messages: int, content: str):
+    for _ in range(messages):
+        await db.transaction(lambda conn: _add_message(conn, conv_id, content))
+
+
+async def _write_behind_session(writer: MessageWriter, conv_id: str, messages: int, content: str):
+    for _ in range(messages):
+        await writer.submit(conv_id, "user", content)
+        await asyncio.sleep(0)
+
+
+async def run(variant: str, sessions: int, messages: int, size: int) -> dict:
+    """Une variante sur une base neuve: inserts/s et retard de la boucle"""
+    content = "x" * size
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(path)
+        for sql in SCHEMA:
+            conn.execute(sql)
+        conn.executemany(
+            "INSERT INTO conversations (id, title) VALUES (?, ?)",
+            [(f"conv-{i}", "bench") for i in range(sessions)],
+        )
+        conn.commit()
+        conn.close()
+
+        db = Database(path) if variant != "legacy" else None
+        writer = MessageWriter(db) if variant == "write_behind" else None
+        if db:
+            await db.fetchall("SELECT 1")  # Ouverture hors mesure
+        lags: list[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(lags, stop))
+        start = time.perf_counter()
+        if writer:
+            tasks = [
+                _write_behind_session(writer, f"conv-{i}", messages, content)
+                for i in range(sessions)
+            ]
+        elif db:
+            tasks = [_pool_session(db, f"conv-{i}", messages, content) for i in range(sessions)]
+        else:
+            tasks = [_legacy_session(path, f"conv-{i}", messages, content) for i in range(sessions)]
+        await asyncio.gather(*tasks)
+        if writer:
+            await writer.flush()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+        if writer:
+            await writer.close()
+        if db:
+            await db.close()
+
+    total = sessions * messages
+    return {
+        "variant": variant,
+        "messages": total,
+        "seconds": round(elapsed, 3),
+        "inserts_per_s": round(total / elapsed, 1),
+        "avg_batch": writer.stats["avg_batch"] if writer else 1.0,
+        "loop_lag_p50_ms": round(_percentile(lags, 50), 2),
+        "loop_lag_p99_ms": round(_percentile(lags, 99), 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0), 2),
+        "loop_lag_mean_ms": round(statistics.fmean(lags), 2) if lags else 0.0,
+    }
+
+
+async def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark persistance SQLite avant/après")
+    parser.add_argument("--sessions", type=int, default=8, help="Sessions concurrentes")
+    parser.add_argument("--messages", type=int, default=100, help="Messages par session")
+    parser.add_argument("--size", type=int, default=500, help="Taille d'un message (octets)")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    results = [
+        await run(variant, args.sessions, args.messages, args.size)
+        for variant in ("legacy", "pool", "write_behind")
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(
+        f"{'variante':<12} {'inserts/s':>10} {'lot':>6} "
+        f"{'lag p50':>9} {'lag p99':>9} {'lag max':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['variant']:<12} {r['inserts_per_s']:>10.0f} {r['avg_batch']:>6.1f} "
+            f"{r['loop_lag_p50_ms']:>7.2f}ms "
+            f"{r['loop_lag_p99_ms']:>7.2f}ms {r['loop_lag_max_ms']:>7.2f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
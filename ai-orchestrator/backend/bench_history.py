@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la source pré-vol "history": avant / après filtrage des termes
+Corpus synthétique réaliste: messages de 8 à 30 mots tirés d'un vocabulaire Zipf
+(--vocab mots) mêlé de mots vides français, les mots des questions placés
+à des rangs de fréquence plausibles ("serveur" très courant, "nginx" plus rare).
+- all_terms: OR de tous les termes de la question, mots vides compris (ancienne requête)
+- rarest: HistorySearch.context_for (mots vides retirés, termes les plus rares seuls)
+
+Usage:
+    python bench_history.py
+    python bench_history.py --messages 300000 --vocab 20000
+    python bench_history.py --json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from utils.database import Database
+from utils.history_search import (
+    RELATED_SQL,
+    HistorySearch,
+    create_messages_fts,
+    create_messages_fts_vocab,
+    match_query,
+)
+
+QUESTIONS = (
+    "Comment redémarrer le conteneur docker nginx ?",
+    "quelle est la mémoire du serveur",
+    "pourquoi le certificat nginx a expiré",
+    "espace disque plein sur le serveur de sauvegarde",
+)
+# Mots des questions et rang de fréquence dans le vocabulaire (0 = le plus courant)
+PLACED = {
+    "serveur": 3,
+    "docker": 15,
+    "disque": 40,
+    "memoire": 60,
+    "nginx": 80,
+    "conteneur": 150,
+    "redemarrer": 250,
+    "plein": 400,
+    "certificat": 600,
+    "sauvegarde": 900,
+    "pourquoi": 1200,
+    "espace": 1500,
+    "expire": 3000,
+}
+STOPWORDS = "le la les de du des un une est et en que qui pour sur dans pas ce il je".split()
+REPEAT = 20
+
+
+def _vocabulary(size: int) -> list[str]:
+    words = [f"mot{i}" for i in range(size)]
+    for word, rank in PLACED.items():
+        words[rank] = word
+    return words
+
+
+def build_corpus(path: str, messages: int, vocab: int, seed: int = 42):
+    """Base neuve: conversations de 10 messages alternés user/assistant, index FTS"""
+    rng = random.Random(seed)  # noqa: S311 - corpus reproductible, pas de cryptographie
+    words = _vocabulary(vocab)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocab)))
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, title TEXT)")
+    conn.execute("""CREATE TABLE messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT,
+        role TEXT,
+        content TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    rows = []
+    for i in range(messages):
+        size = rng.randint(8, 30)
+        content = rng.choices(words, cum_weights=cum_weights, k=size)
+        for _ in range(size * 2 // 5):  # ~40 % de mots vides
+            content.insert(rng.randrange(len(content) + 1), rng.choice(STOPWORDS))
+        rows.append((f"conv-{i // 10}", "user" if i % 2 == 0 else "assistant", " ".join(content)))
+    conn.executemany(
+        "INSERT INTO conversations (id, title) VALUES (?, 'bench')",
+        [(f"conv-{i}",) for i in range((messages + 9) // 10)],
+    )
+    conn.executemany(
+        "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)", rows
+    )
+    conn.commit()
+    for migration in (create_messages_fts, create_messages_fts_vocab):
+        migration(conn)
+    conn.commit()
+    conn.close()
+
+
+async def _all_terms(history: HistorySearch, question: str):
+    """Ancienne requête de related_exchanges: OR de tous les termes"""
+    match = match_query(question, any_terms=True)
+    await history.db.fetchall(RELATED_SQL, (match, None, history.context_limit * 5))
+
+
+async def _rarest(history: HistorySearch, question: str):
+    await history.context_for(question)
+
+
+async def run(messages: int, vocab: int) -> list[dict]:
+    """Latence par question et par variante (ms) sur un même corpus"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        start = time.perf_counter()
+        build_corpus(path, messages, vocab)
+        print(f"corpus: {messages} messages en {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        db = Database(path)
+        history = HistorySearch(db)
+        history.ready = True
+        for question in QUESTIONS:
+            for variant, fn in (("all_terms", _all_terms), ("rarest", _rarest)):
+                await fn(history, question)  # Cache de pages chaud hors mesure
+                timings = []
+                for _ in range(REPEAT):
+                    start = time.perf_counter()
+                    await fn(history, question)
+                    timings.append((time.perf_counter() - start) * 1000)
+                results.append(
+                    {
+                        "question": question,
+                        "variant": variant,
+                        "p50_ms": round(statistics.median(timings), 2),
+                        "max_ms": round(max(timings), 2),
+                    }
+                )
+        await db.close()
+    return results
+
+
+async def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark source pré-vol history avant/après")
+    parser.add_argument("--messages", type=int, default=300_000, help="Messages du corpus")
+    parser.add_argument("--vocab", type=int, default=20_000, help="Taille du vocabulaire Zipf")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    results = await run(args.messages, args.vocab)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'question':<52} {'variante':<10} {'p50':>10} {'max':>10}")
+    for r in results:
+        print(
+            f"{r['question']:<52} {r['variant']:<10} "
+            f"{r['p50_ms']:>8.2f}ms {r['max_ms']:>8.2f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -25,15 +25,97 @@ class Settings(BaseSettings):
     # === BASE DE DONNÉES ===
     db_path: str = "data/orchestrator.db"
     auth_db_path: str = "data/auth.db"
+    # Accès SQLite (utils/database.py)
+    db_pool_size: int = 4  # Threads de l'exécuteur = connexions réutilisées
+    db_synchronous: str = "NORMAL"  # NORMAL: sûr en WAL, sans fsync par transaction
+    db_cache_size_kb: int = 16384  # Cache de pages par connexion
+    db_busy_timeout_ms: int = 5000  # Attente du verrou d'écriture
+    db_cached_statements: int = 128  # Instructions préparées gardées par connexion
+    # Écriture différée des messages (utils/write_behind.py)
+    write_behind_enabled: bool = True  # False: add_message attend le commit de son lot
+    write_behind_interval_ms: float = 5.0  # Fenêtre de regroupement d'un lot
+    write_behind_max_batch: int = 200  # Messages par transaction au plus
+    write_behind_max_queued: int = 5000  # File pleine: add_message attend (backpressure)
 
     # === UPLOADS ===
     upload_dir: str = "data/uploads"
     max_upload_size: int = 50 * 1024 * 1024  # 50MB
+    upload_chunk_size_kb: int = 64  # Bloc lu, haché, écrit (utils/upload_store.py)
 
     # === OLLAMA ===
     ollama_url: str = "http://10.10.10.46:11434"
     default_model: str = "qwen3-coder:480b-cloud"
     llm_timeout: int = 300  # 5 minutes pour questions complexes
+    llm_streaming: bool = True  # Streaming token par token vers /ws/chat
+    llm_abort_on_action: bool = True  # Couper la génération dès qu'une ACTION est complète
+    llm_keep_alive: str = "30m"  # Durée de résidence du modèle après une requête
+    llm_num_ctx: int = 32768  # Fenêtre de contexte fixe (changer = rechargement du modèle)
+    llm_hedge_enabled: bool = False  # Doubler sur un modèle local un cloud sans premier token
+    llm_hedge_delay: float = 8.0  # secondes sans premier token avant la requête doublée
+    # Appels d'outils: text (ACTION: en texte libre), native (`tools` Ollama), json (`format`)
+    llm_tool_calling: str = "text"
+    # Pool HTTP partagé (utils/ollama_client.py)
+    ollama_max_connections: int = 20
+    ollama_max_keepalive: int = 10
+    ollama_keepalive_expiry: float = 120.0  # secondes
+    ollama_max_concurrency: int = 16  # requêtes simultanées par hôte
+
+    # === ROUTEUR MODÈLES (model_router.py) ===
+    router_ewma_alpha: float = 0.3  # Poids de la dernière mesure dans les moyennes
+    router_failure_threshold: int = 3  # Échecs consécutifs avant ouverture du disjoncteur
+    router_cooldown: float = 30.0  # secondes d'ouverture (doublées à chaque récidive)
+    router_max_cooldown: float = 300.0
+    router_switch_ratio: float = 1.5  # Quitter le modèle préféré si X fois plus lent
+
+    # === RÉSIDENCE DES MODÈLES (model_residency.py) ===
+    residency_enabled: bool = True  # Sondage de /api/ps et préchargement des modèles locaux
+    residency_poll_interval: float = 30.0  # secondes
+    residency_max_warm: int = 2  # Modèles locaux maintenus résidents (VRAM)
+    residency_recent_window: float = 1800.0  # secondes: usage récent d'un modèle "auto"
+    residency_pin_error_rate: float = 0.3  # Taux d'erreur cloud déclenchant l'épinglage
+    residency_pin_keep_alive: str = "-1"  # keep_alive du modèle épinglé (-1: sans expiration)
+    residency_fallback_model: str = ""  # Vide: meilleur modèle local du routeur
+    residency_cold_start_ms: float = 1000.0  # load_duration au-delà: démarrage à froid
+
+    # === QUESTIONS FACTUELLES: chemin rapide et cache sémantique (utils/answer_cache.py) ===
+    factual_fast_path: bool = True  # Un seul appel streamé, sans outils ni boucle
+    answer_cache_enabled: bool = True
+    answer_cache_threshold: float = 0.92  # Similarité cosinus minimale (bge-m3)
+    answer_cache_ttl: float = 86400.0  # secondes
+    answer_cache_max_entries: int = 256  # par modèle
+
+    # === TRACES (utils/trace.py, rejeu: replay.py) ===
+    trace_dir: str = ""  # ex. data/traces: une trace JSONL par session react_loop
+
+    # === PRÉ-VOL (preflight.py) ===
+    preflight_budget: float = 2.5  # secondes max de collecte de contexte avant le 1er appel LLM
+    preflight_stale_ttl: float = 300.0  # âge max d'un état système servi périmé
+    # Échanges passés similaires (utils/history_search.py, FTS5), source pré-vol "history"
+    history_context_enabled: bool = True
+    history_context_limit: int = 2  # Échanges injectés au plus
+    history_context_min_overlap: float = 0.6  # Part des termes de la question retrouvés
+
+    # === ORDONNANCEUR LLM (utils/llm_scheduler.py) ===
+    llm_scheduler_enabled: bool = True
+    scheduler_local_slots: int = 1  # Gros modèles locaux: un appel à la fois
+    scheduler_cloud_slots: int = 4
+    scheduler_embedding_slots: int = 4
+    scheduler_aging: float = 30.0  # secondes avant promotion d'une requête de fond
+
+    # === JOBS DE CHAT ASYNCHRONES (utils/chat_jobs.py, /api/chat/jobs) ===
+    chat_jobs_workers: int = 2  # Boucles ReAct exécutées en parallèle
+    chat_jobs_max_queued: int = 100  # Jobs en attente au-delà desquels la soumission est refusée
+    chat_jobs_ttl: float = 3600.0  # secondes de conservation du résultat après la fin
+    chat_jobs_max_events: int = 5000  # Événements conservés par job (reprise SSE)
+
+    # === SÉLECTION DES OUTILS (utils/tool_selector.py) ===
+    tool_select_enabled: bool = True  # Prompt: outils proches de la question, pas le catalogue
+    tool_select_top_k: int = 10  # Outils retenus par similarité, en plus du noyau
+    # Noyau toujours proposé (séparé par des virgules)
+    tool_select_core: str = (
+        "final_answer,execute_command,read_file,write_file,list_directory,search_files,"
+        "system_info,memory_recall,list_my_tools"
+    )
 
     # === CHROMADB ===
     chromadb_host: str = "localhost"
@@ -77,6 +159,17 @@ class Settings(BaseSettings):
 
     # === REACT LOOP ===
     max_iterations: int = 30  # Augmenté pour questions multi-outils
+    max_actions_per_turn: int = 5  # ACTIONs indépendantes acceptées par itération
+    max_parallel_tools: int = 4  # Outils exécutés simultanément dans une itération
+    # Budget de contexte (context_budget.py)
+    context_token_budget: int = 16000  # Tokens estimés envoyés au LLM par itération
+    context_keep_turns: int = 3  # Derniers tours conservés tels quels
+    context_summary_chars: int = 300  # Taille des résumés d'observations anciennes
+
+    # === CACHE OUTILS (lecture seule) ===
+    tool_cache_enabled: bool = True
+    tool_cache_ttl: float = 10.0  # secondes (surchargé par register_tool(cache_ttl=...))
+    tool_cache_max_entries: int = 512
 
     # === LOGGING ===
     log_level: str = "INFO"
@@ -125,11 +218,14 @@ MODELS = {
         "name": "AUTO (Sélection automatique)",
         "description": "L'agent choisit le meilleur modèle selon la tâche",
         "model": None,
+        "category": "auto",
     },
     "qwen-coder": {
         "name": "💻 Qwen 2.5 Coder 32B",
         "description": "Code, scripts, debug, analyse technique",
         "model": "qwen2.5-coder:32b-instruct-q4_K_M",
+        "category": "code",
+        "local": True,
         "keywords": [
             "code",
             "script",
@@ -149,12 +245,16 @@ MODELS = {
         "name": "🧠 DeepSeek Coder 33B",
         "description": "Code alternatif, algorithmes complexes",
         "model": "deepseek-coder:33b",
+        "category": "code",
+        "local": True,
         "keywords": ["algorithme", "optimis", "complex", "performance", "refactor"],
     },
     "llama-vision": {
         "name": "👁️ Llama 3.2 Vision 11B",
         "description": "Analyse d'images, OCR, vision",
         "model": "llama3.2-vision:11b-instruct-q8_0",
+        "category": "vision",
+        "local": True,
         "keywords": [
             "image",
             "photo",
@@ -170,30 +270,40 @@ MODELS = {
         "name": "🎨 Qwen3 VL 32B",
         "description": "Vision multimodale avancée",
         "model": "qwen3-vl:32b",
+        "category": "vision",
+        "local": True,
         "keywords": ["image", "multimodal", "vision", "graphique", "diagramme", "schéma"],
     },
     "kimi-k2": {
         "name": "☁️ Kimi K2 1T",
         "description": "Modèle cloud Kimi (Moonshot AI)",
         "model": "kimi-k2:1t-cloud",
+        "category": "cloud",
+        "local": False,
         "keywords": ["kimi", "moonshot", "cloud", "chinois"],
     },
     "qwen3-coder-cloud": {
         "name": "☁️ Qwen3 Coder 480B",
         "description": "Qwen3 Coder géant via cloud",
         "model": "qwen3-coder:480b-cloud",
+        "category": "cloud",
+        "local": False,
         "keywords": ["qwen", "cloud", "coder", "gros"],
     },
     "gemini-pro": {
         "name": "☁️ Gemini 3 Pro",
         "description": "Google Gemini Pro via cloud",
         "model": "gemini-3-pro-preview:latest",
+        "category": "cloud",
+        "local": False,
         "keywords": ["gemini", "google", "cloud"],
     },
     "gpt-safeguard": {
         "name": "🛡️ GPT Safeguard 13B",
         "description": "GPT Open Source local (sécurité)",
         "model": "gpt-oss-safeguard:latest",
+        "category": "security",
+        "local": True,
         "keywords": ["gpt", "safeguard", "sécurité", "modération"],
     },
 }
@@ -0,0 +1,132 @@
+"""
+Budget de tokens pour la boucle ReAct
+L'historique complet est renvoyé au LLM à chaque itération: sans compaction,
+le coût du prompt processing croît de façon quadratique avec les itérations.
+
+- Prompt système + question initiale: conservés tels quels
+- N derniers tours (réponse assistant + OBSERVE): conservés tels quels
+- Tours plus anciens, seulement si le budget est dépassé: réduits aux lignes
+  ACTION et à un résumé court de l'observation, du plus ancien au plus récent
+
+Un tour compacté le reste: le début de l'historique ne change plus d'une
+itération à l'autre.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+
+from config import get_settings
+
+logger = logging.getLogger("context_budget")
+
+CHARS_PER_TOKEN = 4  # Estimation sans tokenizer (texte FR/EN + code)
+MESSAGE_OVERHEAD = 4  # Tokens de structure par message (rôle, séparateurs)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens d'un texte"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_message_tokens(messages: list[dict]) -> int:
+    """Estimation du nombre de tokens d'une liste de messages /api/chat"""
+    return sum(estimate_tokens(m.get("content", "")) + MESSAGE_OVERHEAD for m in messages)
+
+
+@dataclass
+class BudgetStats:
+    """Suivi des tokens envoyés par itération"""
+
+    tokens_per_iteration: list[int] = field(default_factory=list)
+    compacted_turns: int = 0
+    saved_tokens: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "tokens_per_iteration": self.tokens_per_iteration,
+            "total_tokens_sent": sum(self.tokens_per_iteration),
+            "compacted_turns": self.compacted_turns,
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+class ContextBudget:
+    """Compaction de l'historique d'une boucle ReAct sous un budget de tokens"""
+
+    def __init__(
+        self,
+        budget: int = None,
+        keep_turns: int = None,
+        summary_chars: int = None,
+        head: int = 2,
+    ):
+        settings = get_settings()
+        self.budget = budget or settings.context_token_budget
+        self.keep_turns = settings.context_keep_turns if keep_turns is None else keep_turns
+        self.summary_chars = summary_chars or settings.context_summary_chars
+        self.head = head  # Messages jamais compactés (système + question)
+        self.stats = BudgetStats()
+        self._compacted: set[int] = set()  # Index de début des tours déjà compactés
+
+    def _turns(self, messages: list[dict]) -> list[tuple[int, int]]:
+        """Découpe l'historique en tours: un message assistant et les messages qui suivent"""
+        turns = []
+        start = None
+        for i in range(self.head, len(messages)):
+            if messages[i]["role"] == "assistant":
+                if start is not None:
+                    turns.append((start, i))
+                start = i
+        if start is not None:
+            turns.append((start, len(messages)))
+        return turns
+
+    def _shorten(self, text: str) -> str:
+        text = re.sub(r"\s+", " ", text).strip()
+        if len(text) <= self.summary_chars:
+            return text
+        return text[: self.summary_chars].rstrip() + "…"
+
+    def summarize(self, message: dict) -> str:
+        """Version compacte d'un message (lignes ACTION ou résumé d'observation)"""
+        content = message.get("content", "")
+        if message["role"] == "assistant":
+            actions = [line.strip() for line in content.split("\n") if "ACTION:" in line]
+            return "\n".join(actions) if actions else self._shorten(content)
+        if content.startswith("OBSERVE:"):
+            return f"OBSERVE (résumé): {self._shorten(content[len('OBSERVE:'):])}"
+        return self._shorten(content)
+
+    def compact(self, messages: list[dict]) -> int:
+        """
+        Compacte `messages` en place si le budget est dépassé.
+        Retourne le nombre de tokens (estimé) qui sera envoyé.
+        """
+        tokens = count_message_tokens(messages)
+        if tokens > self.budget:
+            turns = self._turns(messages)
+            old = turns[: -self.keep_turns] if self.keep_turns else turns
+            for start, end in old:
+                if start in self._compacted:
+                    continue
+                before = count_message_tokens(messages[start:end])
+                for i in range(start, end):
+                    summary = self.summarize(messages[i])
+                    if len(summary) < len(messages[i]["content"]):
+                        messages[i] = {"role": messages[i]["role"], "content": summary}
+                self._compacted.add(start)
+                saved = before - count_message_tokens(messages[start:end])
+                tokens -= saved
+                self.stats.compacted_turns += 1
+                self.stats.saved_tokens += saved
+                if tokens <= self.budget:
+                    break
+
+            if tokens > self.budget:
+                logger.warning(
+                    f"📏 Budget dépassé malgré la compaction: {tokens}/{self.budget} tokens"
+                )
+
+        self.stats.tokens_per_iteration.append(tokens)
+        return tokens
@@ -47,32 +47,37 @@ async def get_active_services() -> str:
     services = ["ollama", "docker", "nginx"]
     status_lines = []
 
-    for svc in services:
+    async def check(svc: str) -> str | None:
         try:
             # Commande directe sans shell
             cmd = ["systemctl", "is-active", svc]
             output, code = await run_command_async(cmd, timeout=2)
             status = "✅ Actif" if code == 0 else "❌ Inactif"
-            status_lines.append(f"- {svc}: {status}")
-        except:
-            pass
+            return f"- {svc}: {status}"
+        except Exception:
+            return None
+
+    # Les sondes systemctl sont indépendantes: en parallèle
+    for line in await asyncio.gather(*(check(svc) for svc in services)):
+        if line:
+            status_lines.append(line)
 
     if status_lines:
         return "## ⚙️ Services Système\n" + "\n".join(status_lines)
     return ""
 
 
-async def get_dynamic_context() -> str:
-    """Assemble tout le contexte dynamique (Async)"""
-    # Exécuter les tâches async en parallèle
-    docker_task = get_docker_context()
-    services_task = get_active_services()
+async def get_system_resources_async() -> str:
+    """get_system_resources hors boucle asyncio (cpu_percent bloque 100ms)"""
+    return await asyncio.to_thread(get_system_resources)
 
-    # psutil est synchrone, on l'appelle directement
-    resources = get_system_resources()
 
-    # Attendre les résultats async
-    docker, services = await asyncio.gather(docker_task, services_task)
+async def get_dynamic_context() -> str:
+    """Assemble tout le contexte dynamique (Async)"""
+    # Exécuter les trois sondes en parallèle
+    resources, services, docker = await asyncio.gather(
+        get_system_resources_async(), get_active_services(), get_docker_context()
+    )
 
     sections = [resources, services, docker]
     return "\n\n".join(sections)
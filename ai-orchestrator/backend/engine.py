@@ -4,16 +4,60 @@ Moteur ReAct v5.5 - FULL FONCTIONNEL
 - Support multi-paramètres robuste
 - Intégration prompt manager v4.0
 - Gestion des erreurs et retries
+- Streaming token par token avec détection incrémentale ACTION/final_answer
+- Budget de tokens: compaction des anciens tours (context_budget.py)
+- Pré-vol concurrent: sondes système, RAG et historique en parallèle sous budget (preflight.py)
+- Cache sémantique des réponses factuelles (utils/answer_cache.py)
+- Chemin rapide factuel: un seul appel streamé, sans catalogue d'outils
+- Traces JSONL des sessions (AI_TRACE_DIR) rejouables par replay.py
+- Histogrammes Prometheus (GET /metrics): prefill/génération LLM, outils, itérations,
+  envois websocket; labels modèle et classe de requête
+- Requêtes doublées (opt-in): cloud sans premier token -> modèle local en parallèle
+- Appels d'outils structurés (AI_LLM_TOOL_CALLING): `tools` natifs ou `format` JSON,
+  parsing regex en secours (tool_calling.py)
+- Sélection des outils par similarité: top-K + noyau dans le prompt, extension à la
+  demande (utils/tool_selector.py)
 """
 
 import asyncio
+import contextlib
+import json
 import logging
 import re
+import time
+from dataclasses import asdict, dataclass
 
 import httpx
 from fastapi import WebSocket
 
 from config import get_settings
+from context_budget import ContextBudget, count_message_tokens
+from model_residency import get_model_residency
+from model_router import get_model_router
+from preflight import PreflightSource, get_preflight
+from tool_calling import (
+    REPLY_SCHEMA,
+    format_reply,
+    is_unsupported_error,
+    mark_unsupported,
+    normalize_mode,
+    parse_json_reply,
+    parse_tool_calls,
+    record_outcome,
+    supports_tools,
+)
+from utils.answer_cache import get_answer_cache
+from utils.history_search import get_history_search
+from utils.llm_scheduler import current_priority, last_queue_wait_ms, llm_context
+from utils.metrics import FAST_BUCKETS, current_query_class, histogram, query_class_context
+from utils.ollama_client import get_ollama_pool
+from utils.tool_selector import (
+    current_tool_selection,
+    get_tool_selector,
+    tool_selection_context,
+    tools_prompt,
+)
+from utils.trace import messages_digest, record, trace_session
 
 # RAG Apogée v2.0
 try:
@@ -30,12 +74,669 @@ settings = get_settings()
 MAX_ITERATIONS = settings.max_iterations or 30
 LLM_TIMEOUT = settings.llm_timeout or 300
 DEFAULT_MODEL = settings.default_model or "qwen3-coder:480b-cloud"
+LLM_STREAMING = settings.llm_streaming
+LLM_ABORT_ON_ACTION = settings.llm_abort_on_action
+MAX_ACTIONS_PER_TURN = settings.max_actions_per_turn
+MAX_PARALLEL_TOOLS = settings.max_parallel_tools
+# Fixés explicitement: un num_ctx différent entre deux requêtes force Ollama à
+# recharger le modèle et perdre son cache KV
+LLM_KEEP_ALIVE = settings.llm_keep_alive
+LLM_NUM_CTX = settings.llm_num_ctx
+# Requêtes doublées: borne la latence des blocages cloud (sans 429) sur les tours interactifs
+LLM_HEDGE_ENABLED = settings.llm_hedge_enabled
+LLM_HEDGE_DELAY = settings.llm_hedge_delay
+ANSWER_CACHE_ENABLED = settings.answer_cache_enabled
+FACTUAL_FAST_PATH = settings.factual_fast_path
+LLM_TOOL_CALLING = normalize_mode(settings.llm_tool_calling)
+
+# Latence de bout en bout par chemin: cache, fast (factuel en un appel), react
+ANSWER_LATENCY = histogram(
+    "answer_latency_seconds",
+    "Latence de bout en bout d'une réponse",
+    labels=("path", "query_class"),
+)
+LLM_PROMPT_EVAL = histogram(
+    "llm_prompt_eval_seconds",
+    "Évaluation du prompt (prefill) par appel LLM",
+    labels=("model", "query_class"),
+)
+LLM_GENERATION = histogram(
+    "llm_generation_seconds",
+    "Génération des tokens par appel LLM",
+    labels=("model", "query_class"),
+)
+TOOL_LATENCY = histogram(
+    "tool_latency_seconds",
+    "Exécution d'un outil (ACTION)",
+    labels=("tool", "query_class"),
+)
+REACT_ITERATIONS = histogram(
+    "react_iterations",
+    "Appels LLM (itérations) par requête; 0 = cache",
+    labels=("model", "query_class"),
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50),
+)
+SYSTEM_PROMPT_TOKENS = histogram(
+    "react_system_prompt_tokens",
+    "Taille du prompt système (tokens estimés); tools = catalogue complet ou sélection",
+    labels=("query_class", "tools"),
+    buckets=(500, 1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 32000),
+)
+WS_SEND_LATENCY = histogram(
+    "websocket_send_seconds",
+    "Envoi d'un événement websocket",
+    labels=("event",),
+    buckets=FAST_BUCKETS,
+)
 
 logger.info(
-    f"ReAct Engine v5.5: max_iter={MAX_ITERATIONS}, timeout={LLM_TIMEOUT}s, model={DEFAULT_MODEL}"
+    f"ReAct Engine v5.5: max_iter={MAX_ITERATIONS}, timeout={LLM_TIMEOUT}s, "
+    f"model={DEFAULT_MODEL}, streaming={LLM_STREAMING}"
 )
 
 
+@dataclass
+class LLMTimings:
+    """Temps d'un appel LLM: évaluation du prompt (prefill) vs génération"""
+
+    model: str
+    source: str = "ollama"  # "ollama" (compteurs serveur) ou "client" (flux coupé: estimation)
+    prompt_tokens: int | None = None  # Tokens réellement évalués (hors cache KV)
+    prompt_eval_ms: float = 0.0
+    eval_tokens: int = 0
+    eval_ms: float = 0.0
+    load_ms: float = 0.0
+    total_ms: float = 0.0
+    first_token_ms: float | None = None  # Mesuré côté client (réseau + prefill, hors file)
+    queue_ms: float = 0.0  # Attente d'un slot de l'ordonnanceur LLM
+
+    @classmethod
+    def from_ollama(cls, model: str, data: dict) -> "LLMTimings":
+        """Depuis les compteurs de la réponse finale Ollama (durées en ns)"""
+        return cls(
+            model=model,
+            prompt_tokens=data.get("prompt_eval_count"),
+            prompt_eval_ms=data.get("prompt_eval_duration", 0) / 1e6,
+            eval_tokens=data.get("eval_count", 0),
+            eval_ms=data.get("eval_duration", 0) / 1e6,
+            load_ms=data.get("load_duration", 0) / 1e6,
+            total_ms=data.get("total_duration", 0) / 1e6,
+        )
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.eval_tokens / (self.eval_ms / 1000) if self.eval_ms > 0 else 0.0
+
+    def __str__(self) -> str:
+        prompt = f"{self.prompt_tokens} tok" if self.prompt_tokens is not None else "? tok"
+        return (
+            f"prompt_eval {self.prompt_eval_ms:.0f}ms ({prompt}) | "
+            f"eval {self.eval_ms:.0f}ms ({self.eval_tokens} tok, "
+            f"{self.tokens_per_second:.1f} tok/s) | load {self.load_ms:.0f}ms [{self.source}]"
+        )
+
+
+def summarize_timings(timings: list[LLMTimings]) -> dict:
+    """Cumul des temps LLM d'une boucle ReAct (événement `complete`)"""
+    return {
+        "calls": len(timings),
+        "prompt_eval_ms": round(sum(t.prompt_eval_ms for t in timings)),
+        "eval_ms": round(sum(t.eval_ms for t in timings)),
+        "load_ms": round(sum(t.load_ms for t in timings)),
+        "queue_ms": round(sum(t.queue_ms for t in timings)),
+        "prompt_tokens": sum(t.prompt_tokens or 0 for t in timings),
+        "eval_tokens": sum(t.eval_tokens for t in timings),
+        "per_call": [asdict(t) for t in timings],
+    }
+
+
+class LLMStreamError(RuntimeError):
+    """Erreur renvoyée par Ollama au milieu d'un flux"""
+
+
+class LLMUnavailableError(RuntimeError):
+    """Aucun modèle disponible après bascule"""
+
+
+class StreamingActionParser:
+    """
+    Parser incrémental pour la sortie ReAct en streaming.
+
+    Accumule les tokens reçus et détecte, dès qu'ils sont syntaxiquement complets,
+    les appels `ACTION: outil(...)` ou `final_answer(answer=...)`.
+    Plusieurs lignes ACTION consécutives forment un lot (exécuté en parallèle);
+    le lot est clos dès que le texte qui suit un appel n'est pas une nouvelle ACTION,
+    après un final_answer, ou quand max_calls est atteint.
+    Les parenthèses sont comptées hors des chaînes (simples, doubles ou triples quotes).
+    """
+
+    _CALL_START = re.compile(r"ACTION:\s*(\w+)\s*\(|\b(final_answer)\s*\(\s*answer\s*=")
+    _NEXT_ACTION = "ACTION:"
+    _LOOKBEHIND = 64  # Marge pour détecter un marqueur coupé entre deux tokens
+
+    def __init__(self, max_calls: int = 1):
+        self.text = ""
+        self.aborted = False  # Génération coupée côté client après le lot d'appels
+        self.max_calls = max(1, max_calls)
+        self.tool_names: list[str] = []
+        self.call_end: int | None = None  # Fin du dernier appel complet
+        self.finished = False  # Lot d'appels clos: la suite peut être ignorée
+        self.timings: LLMTimings | None = None  # Renseigné par _chat_completion
+        self.tool_mode = "text"  # Mode d'appel d'outils effectivement utilisé
+        self.tool_calls: list[tuple[str, dict]] | None = None  # Appels structurés reçus
+        self.thought: str | None = None  # Réflexion d'une réponse json (hors appels)
+        self._current: str | None = None
+        self._call_open: int | None = None
+        self._search_from = 0
+        self._pos = 0
+        self._depth = 0
+        self._quote: str | None = None
+
+    @property
+    def tool_name(self) -> str | None:
+        """Premier outil appelé (ou en cours d'appel)"""
+        return self.tool_names[0] if self.tool_names else self._current
+
+    @property
+    def complete(self) -> bool:
+        """True si au moins un appel complet (parenthèses équilibrées) a été reçu"""
+        return self.call_end is not None
+
+    @property
+    def is_final(self) -> bool:
+        return "final_answer" in self.tool_names
+
+    @property
+    def call_text(self) -> str:
+        """Texte jusqu'à la fin du dernier appel détecté (ou tout le texte)"""
+        if self.call_end is None:
+            return self.text
+        return self.text[: self.call_end]
+
+    def feed(self, chunk: str) -> bool:
+        """Ajoute un fragment; retourne True si le lot d'appels vient d'être clos"""
+        if not chunk:
+            return False
+        self.text += chunk
+        if self.finished:
+            return False
+
+        while True:
+            if self._call_open is None:
+                if self.call_end is not None:
+                    # Après un appel: attendre de savoir si une autre ACTION suit
+                    rest = self.text[self.call_end :].lstrip()
+                    if rest.startswith(self._NEXT_ACTION):
+                        self._search_from = self.call_end
+                    elif self._NEXT_ACTION.startswith(rest):
+                        return False  # Rien ou début de marqueur: attendre la suite
+                    else:
+                        self.finished = True
+                        return True
+
+                m = self._CALL_START.search(self.text, self._search_from)
+                if not m:
+                    self._search_from = max(
+                        self.call_end or 0, len(self.text) - self._LOOKBEHIND
+                    )
+                    return False
+                self._current = m.group(1) or m.group(2)
+                self._call_open = self.text.index("(", m.start())
+                self._pos = self._call_open
+                self._depth = 0
+
+            if not self._scan():
+                return False
+
+            self.tool_names.append(self._current)
+            self._current = None
+            self._call_open = None
+            if self.is_final or len(self.tool_names) >= self.max_calls:
+                self.finished = True
+                return True
+
+    def _scan(self) -> bool:
+        text = self.text
+        end = len(text)
+        # Ne pas trancher sur des guillemets en fin de buffer (triple quote incomplet)
+        held = 0
+        while held < 2 and end - 1 >= self._pos and text[end - 1] in "'\"":
+            end -= 1
+            held += 1
+
+        i = self._pos
+        while i < end:
+            if self._quote:
+                if text.startswith(self._quote, i):
+                    i += len(self._quote)
+                    self._quote = None
+                    continue
+                i += 2 if text[i] == "\\" else 1
+                continue
+
+            ch = text[i]
+            if text.startswith('"""', i) or text.startswith("'''", i):
+                self._quote = text[i : i + 3]
+                i += 3
+                continue
+            if ch in "'\"":
+                self._quote = ch
+            elif ch == "(":
+                self._depth += 1
+            elif ch == ")":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.call_end = i + 1
+                    self._pos = i + 1
+                    return True
+            i += 1
+
+        self._pos = min(i, end)
+        return False
+
+
+async def _chat_completion(
+    model: str,
+    messages: list,
+    websocket: WebSocket = None,
+    tool_mode: str = "text",
+) -> tuple[httpx.Response, StreamingActionParser]:
+    """
+    Appel /api/chat. En mode streaming, chaque token est relayé au websocket
+    (événement `token`) et analysé au fil de l'eau par StreamingActionParser.
+
+    Si LLM_ABORT_ON_ACTION est actif, la connexion est fermée dès que le lot
+    d'ACTIONs (ou le final_answer) est complet: Ollama annule alors la génération
+    et la suite (ignorée par extract_actions de toute façon) n'est ni attendue ni calculée.
+
+    parser.timings sépare évaluation du prompt et génération (compteurs Ollama; si le
+    flux a été coupé avant la réponse finale: estimation côté client).
+
+    tool_mode (tool_calling.py): "native" envoie les définitions des outils (`tools`) et
+    lit message.tool_calls; "json" impose REPLY_SCHEMA (`format`, texte non relayé).
+    Les appels reconnus sont dans parser.tool_calls; le texte brut reste dans parser.text.
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": LLM_STREAMING,
+        # Modèle épinglé (secours du cloud) ou "always": keep_alive de la résidence
+        "keep_alive": get_model_residency().keep_alive(model),
+        "options": {"temperature": 0.7, "num_predict": 4000, "num_ctx": LLM_NUM_CTX},
+    }
+    if tool_mode == "native" and not supports_tools(model):
+        tool_mode = "text"
+    if tool_mode == "native":
+        from tools import get_tools_schema
+
+        selection = current_tool_selection()
+        payload["tools"] = get_tools_schema(selection.names if selection else None)
+    elif tool_mode == "json":
+        payload["format"] = REPLY_SCHEMA
+    parser = StreamingActionParser(max_calls=MAX_ACTIONS_PER_TURN)
+    parser.tool_mode = tool_mode
+    pool = get_ollama_pool()
+    timeout = httpx.Timeout(LLM_TIMEOUT, connect=10.0)
+
+    start = time.monotonic()
+    if not LLM_STREAMING:
+        r = await pool.post(f"{settings.ollama_url}/api/chat", json=payload, timeout=timeout)
+        if r.status_code == 200:
+            data = r.json()
+            parser.feed(data.get("message", {}).get("content", ""))
+            _collect_tool_calls(parser, data.get("message", {}))
+            _finish_structured(parser)
+            parser.timings = LLMTimings.from_ollama(model, data)
+            parser.timings.queue_ms = last_queue_wait_ms()
+            parser.timings.first_token_ms = (
+                time.monotonic() - start
+            ) * 1000 - parser.timings.queue_ms
+            logger.info(f"⏱️ {model}: {parser.timings}")
+        return r, parser
+
+    first_token_ms = None
+    token_chunks = 0
+    async with pool.stream(
+        "POST", f"{settings.ollama_url}/api/chat", json=payload, timeout=timeout
+    ) as r:
+        # Le temps passé en file d'attente n'est pas de la latence du modèle
+        queue_ms = last_queue_wait_ms()
+        start += queue_ms / 1000
+        if r.status_code != 200:
+            await r.aread()
+            return r, parser
+
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise LLMStreamError(chunk["error"])
+
+            _collect_tool_calls(parser, chunk.get("message", {}))
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                token_chunks += 1
+                if first_token_ms is None:
+                    first_token_ms = (time.monotonic() - start) * 1000
+                    logger.info(f"⚡ Premier token {model}: {first_token_ms:.0f}ms")
+                offset = len(parser.text)
+                completed = parser.feed(token)
+                if completed and LLM_ABORT_ON_ACTION:
+                    # Ne pas relayer le texte qui suit le dernier appel
+                    token = token[: max(0, parser.call_end - offset)]
+                if websocket and token and tool_mode != "json":  # JSON brut: non relayé
+                    await websocket.send_json({"type": "token", "content": token})
+                if completed:
+                    logger.info(
+                        f"⚡ {len(parser.tool_names)} appel(s) {', '.join(parser.tool_names)} "
+                        f"complet(s) après {(time.monotonic() - start) * 1000:.0f}ms"
+                    )
+                    if LLM_ABORT_ON_ACTION:
+                        # Quitter le contexte stream ferme la connexion -> Ollama stoppe
+                        parser.aborted = True
+                        break
+
+            if chunk.get("done"):
+                parser.timings = LLMTimings.from_ollama(model, chunk)
+                break
+
+    _finish_structured(parser)
+    if parser.timings is None:
+        # Flux coupé: le premier token borne le prefill, la suite est la génération
+        total_ms = (time.monotonic() - start) * 1000
+        prefill_ms = first_token_ms if first_token_ms is not None else total_ms
+        parser.timings = LLMTimings(
+            model=model,
+            source="client",
+            prompt_eval_ms=prefill_ms,
+            eval_tokens=token_chunks,
+            eval_ms=total_ms - prefill_ms,
+            total_ms=total_ms,
+        )
+    parser.timings.first_token_ms = first_token_ms
+    parser.timings.queue_ms = queue_ms
+    logger.info(f"⏱️ {model}: {parser.timings}")
+    return r, parser
+
+
+def _collect_tool_calls(parser: StreamingActionParser, message: dict):
+    """Appels natifs (message.tool_calls) d'un morceau de réponse"""
+    calls = parse_tool_calls(message.get("tool_calls"))
+    if calls:
+        parser.tool_calls = (parser.tool_calls or []) + calls
+
+
+def _finish_structured(parser: StreamingActionParser):
+    """Mode json: appels et réflexion extraits de la réponse complète (si conforme)"""
+    if parser.tool_mode == "json" and not parser.tool_calls:
+        reply = parse_json_reply(parser.text)
+        if reply is not None:
+            parser.thought, parser.tool_calls = reply
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def _attempt(
+    model: str, messages: list, websocket=None, tool_mode: str = "text"
+) -> tuple[httpx.Response | None, StreamingActionParser | None, str]:
+    """
+    _chat_completion sans exception réseau/flux: (réponse, parser, erreur).
+    Modèle refusant les outils natifs (HTTP 400): nouvel essai en mode texte.
+    """
+    try:
+        r, parser = await _chat_completion(model, messages, websocket, tool_mode)
+        if parser.tool_mode == "native" and r.status_code == 400 and is_unsupported_error(r.text):
+            mark_unsupported(model)
+            r, parser = await _chat_completion(model, messages, websocket)
+        error = ""
+    except (httpx.RequestError, LLMStreamError) as e:
+        r, parser, error = None, None, str(e) or type(e).__name__
+        logger.error(f"Erreur LLM {model}: {error}")
+    record(
+        "llm",
+        model=model,
+        messages_digest=messages_digest(messages),
+        messages_count=len(messages),
+        prompt_tokens_estimate=count_message_tokens(messages),
+        last_message=messages[-1]["content"] if messages else "",
+        status=r.status_code if r is not None else None,
+        error=error,
+        text=parser.text if parser else "",
+        aborted=parser.aborted if parser else False,
+        tool_mode=parser.tool_mode if parser else tool_mode,
+        tool_calls=parser.tool_calls if parser else None,
+        timings=asdict(parser.timings) if parser and parser.timings else None,
+    )
+    if parser and parser.timings:
+        get_model_residency().record_call(model, load_ms=parser.timings.load_ms)
+        query_class = current_query_class()
+        LLM_PROMPT_EVAL.observe(
+            parser.timings.prompt_eval_ms / 1000, model=model, query_class=query_class
+        )
+        LLM_GENERATION.observe(parser.timings.eval_ms / 1000, model=model, query_class=query_class)
+    return r, parser, error
+
+
+def _record_failure(router, model: str, r: httpx.Response | None, error: str) -> str:
+    """Signale un échec au routeur; retourne la raison lisible"""
+    status_code = r.status_code if r is not None else None
+    retry_after = _parse_retry_after(r.headers.get("retry-after")) if r is not None else None
+    router.record_failure(model, status_code=status_code, error=error, retry_after=retry_after)
+    return f"HTTP {status_code}" if status_code else error
+
+
+@dataclass
+class HedgeStats:
+    """Compteurs des requêtes doublées"""
+
+    hedged: int = 0  # Requêtes doublées sur le modèle local
+    primary_won: int = 0
+    hedge_won: int = 0
+
+
+hedge_stats = HedgeStats()
+
+
+class _HedgeRace:
+    """Course entre deux modèles: le premier token désigne le gagnant"""
+
+    def __init__(self, websocket: WebSocket = None):
+        self.websocket = websocket
+        self.winner: str | None = None
+        self.decided = asyncio.Event()
+
+    def claim(self, model: str):
+        if self.winner is None:
+            self.winner = model
+            self.decided.set()
+
+
+class _HedgeRelay:
+    """Websocket intermédiaire: seuls les événements du gagnant sont relayés"""
+
+    def __init__(self, race: _HedgeRace, model: str):
+        self.race = race
+        self.model = model
+
+    async def send_json(self, event: dict):
+        self.race.claim(self.model)
+        if self.race.winner == self.model and self.race.websocket:
+            await self.race.websocket.send_json(event)
+
+
+def _hedge_candidate(router, model: str, query_class: str, tried: set[str]) -> str | None:
+    """Modèle local de secours pour doubler une requête cloud (tours interactifs seulement)"""
+    if not LLM_HEDGE_ENABLED or current_priority() != "interactive":
+        return None
+    if router.health(model).local:
+        return None
+    return router.select(query_class, exclude=tried | {model}, local=True)
+
+
+async def _hedged_completion(
+    primary: str,
+    hedge: str,
+    query_class: str,
+    messages: list,
+    tried: set[str],
+    websocket: WebSocket = None,
+    tool_mode: str = "text",
+) -> tuple[str, httpx.Response | None, StreamingActionParser | None, str]:
+    """
+    Appel sur `primary` (cloud). Sans premier token après LLM_HEDGE_DELAY, la même
+    requête part en parallèle sur `hedge` (local): le premier modèle à produire un token
+    (ou une réponse complète) gagne, l'autre est annulé (connexion fermée, slot rendu).
+    Retourne (modèle, réponse, parser, erreur) du gagnant, ou du dernier échec.
+    """
+    router = get_model_router()
+    race = _HedgeRace(websocket)
+    start = time.monotonic()
+    tasks = {
+        asyncio.create_task(
+            _attempt(primary, messages, _HedgeRelay(race, primary), tool_mode)
+        ): primary
+    }
+    decided = asyncio.create_task(race.decided.wait())
+    outcome = None
+
+    try:
+        done, _ = await asyncio.wait(
+            [*tasks, decided], timeout=LLM_HEDGE_DELAY, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            hedge_stats.hedged += 1
+            tried.add(hedge)
+            logger.warning(
+                f"🏁 {primary}: aucun token après {LLM_HEDGE_DELAY:.0f}s, "
+                f"requête doublée sur {hedge}"
+            )
+            if websocket:
+                await websocket.send_json(
+                    {
+                        "type": "thinking",
+                        "message": f"⏱️ {primary} lent, requête doublée sur {hedge}",
+                    }
+                )
+            hedge_task = asyncio.create_task(
+                _attempt(hedge, messages, _HedgeRelay(race, hedge), tool_mode)
+            )
+            tasks[hedge_task] = hedge
+
+        pending = set(tasks)
+        while race.winner is None and pending:
+            done, pending = await asyncio.wait(
+                pending | {decided}, return_when=asyncio.FIRST_COMPLETED
+            )
+            pending.discard(decided)
+            for task in done - {decided}:
+                model = tasks[task]
+                r, parser, error = task.result()
+                if r is not None and r.status_code == 200:
+                    race.claim(model)  # Réponse complète sans token relayé (non-streaming)
+                elif model == race.winner:
+                    continue  # Échec du gagnant: remonté à l'appelant
+                elif pending or race.winner:
+                    # Échec d'un des deux: l'autre continue seul
+                    reason = _record_failure(router, model, r, error)
+                    logger.warning(f"🏁 {model} en échec ({reason}) pendant la course")
+                else:
+                    if outcome is not None:  # Deux échecs simultanés: signaler le premier
+                        _record_failure(router, outcome[0], outcome[1], outcome[3])
+                    outcome = (model, r, parser, error)
+
+        if race.winner is None:
+            return outcome
+
+        winner_task = next(t for t, m in tasks.items() if m == race.winner)
+        for task, model in tasks.items():
+            if task is not winner_task and not task.done():
+                task.cancel()
+                if model == primary:
+                    router.record_stall(primary, query_class, (time.monotonic() - start) * 1000)
+        if len(tasks) > 1:
+            if race.winner == primary:
+                hedge_stats.primary_won += 1
+            else:
+                hedge_stats.hedge_won += 1
+            logger.info(f"🏁 Course gagnée par {race.winner}")
+        r, parser, error = await winner_task
+        return race.winner, r, parser, error
+    finally:
+        decided.cancel()
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, decided, return_exceptions=True)
+
+
+async def _chat_with_failover(
+    model: str,
+    query_class: str,
+    messages: list,
+    websocket: WebSocket = None,
+    tool_mode: str = "text",
+) -> tuple[str, StreamingActionParser]:
+    """
+    Appel LLM avec bascule pilotée par le routeur de modèles.
+
+    Chaque succès alimente les EWMA du modèle (premier token, tokens/s). En cas d'échec
+    (HTTP non 200, erreur réseau ou de flux), le modèle est signalé au routeur et la
+    requête repart immédiatement sur le meilleur candidat disponible de la même classe.
+    Tour interactif sur un modèle cloud avec LLM_HEDGE_ENABLED: requête doublée sur
+    le meilleur modèle local si le premier token tarde (_hedged_completion).
+    tool_mode: protocole d'appel d'outils (tool_calling.py); "text" hors boucle ReAct.
+    Retourne (modèle utilisé, parser); LLMUnavailableError si plus aucun candidat.
+    """
+    router = get_model_router()
+    if router.health(model).category == "vision":
+        query_class = "vision"  # Une image ne peut basculer que vers un modèle vision
+    current = router.select(query_class, preferred=model) or model
+    if current != model:
+        logger.info(f"🧭 {model} indisponible, routage direct vers {current}")
+    tried: set[str] = set()
+
+    while True:
+        tried.add(current)
+        hedge = _hedge_candidate(router, current, query_class, tried)
+        if hedge:
+            current, r, parser, error = await _hedged_completion(
+                current, hedge, query_class, messages, tried, websocket, tool_mode
+            )
+        else:
+            r, parser, error = await _attempt(current, messages, websocket, tool_mode)
+
+        if r is not None and r.status_code == 200:
+            timings = parser.timings
+            router.record_success(
+                current,
+                query_class,
+                first_token_ms=timings.first_token_ms if timings else None,
+                tokens_per_second=timings.tokens_per_second if timings else None,
+            )
+            return current, parser
+
+        reason = _record_failure(router, current, r, error)
+        fallback = router.select(query_class, exclude=tried)
+        if fallback is None:
+            raise LLMUnavailableError(f"aucun modèle disponible ({current}: {reason})")
+
+        logger.warning(f"⚠️ {current} en échec ({reason}). Bascule sur {fallback}")
+        if websocket:
+            await websocket.send_json(
+                {
+                    "type": "thinking",
+                    "message": f"⚠️ {current} indisponible ({reason}). Bascule: {fallback}",
+                }
+            )
+        current = fallback
+
+
 def extract_final_answer(text: str) -> str | None:
     """Extraire final_answer - ROBUSTE v5.5"""
 
@@ -72,30 +773,52 @@ def extract_final_answer(text: str) -> str | None:
     return None
 
 
-def extract_action(text: str) -> tuple:
-    """Extraire action tool(params) - Support multi-params v5.5"""
-
-    # Chercher la ligne ACTION:
+def _action_lines(text: str) -> list[str]:
+    """Lignes ACTION: (contenu après le marqueur), avec fallback sur un appel nu"""
     lines = text.split("\n")
-    action_line = ""
-    for line in lines:
-        if "ACTION:" in line.upper():
-            action_line = line.split("ACTION:", 1)[1].strip()
-            break
+    action_lines = [
+        line.split("ACTION:", 1)[1].strip() for line in lines if "ACTION:" in line.upper()
+    ]
 
-    if not action_line:
+    if not action_lines:
         # Fallback: chercher n'importe quelle ligne qui ressemble à un appel de fonction
         for line in reversed(lines):
             line = line.strip()
             if re.match(r"^\w+\(.*\)$", line) and not any(
                 x in line for x in ["THINK:", "PLAN:", "OBSERVE:"]
             ):
-                action_line = line
+                action_lines.append(line)
                 break
 
-    if not action_line:
+    return action_lines
+
+
+def extract_action(text: str) -> tuple:
+    """Extraire action tool(params) - Support multi-params v5.5"""
+    action_lines = _action_lines(text)
+    if not action_lines:
         return None, {}
+    return _parse_action_line(action_lines[0])
+
+
+def extract_actions(text: str, limit: int = None) -> list[tuple[str, dict]]:
+    """
+    Extraire toutes les ACTIONs d'un tour (une par ligne ACTION:).
+    Les doublons exacts et final_answer sont ignorés; au plus `limit` actions.
+    """
+    limit = limit or MAX_ACTIONS_PER_TURN
+    actions = []
+    for action_line in _action_lines(text):
+        tool_name, params = _parse_action_line(action_line)
+        if tool_name and (tool_name, params) not in actions:
+            actions.append((tool_name, params))
+        if len(actions) >= limit:
+            break
+    return actions
+
 
+def _parse_action_line(action_line: str) -> tuple:
+    """Parser `outil(param="valeur", ...)` en (nom, params)"""
     # Extraction du nom de l'outil
     m_tool = re.match(r"^(\w+)\s*\(", action_line)
     if not m_tool:
@@ -139,6 +862,230 @@ def extract_action(text: str) -> tuple:
     return tool_name, params
 
 
+def interpret_reply(
+    parser: StreamingActionParser,
+) -> tuple[str | None, list[tuple[str, dict]], str, str]:
+    """
+    (final_answer, actions, format reconnu, texte d'historique) d'une réponse LLM.
+    Appels structurés d'abord (tool_calls natifs ou réponse json), regex en secours.
+    Format: "structured", "regex" ou "failure" (ni final_answer ni action).
+    """
+    # Ne garder que le texte jusqu'à la fin de l'appel si la génération a été coupée
+    text = parser.call_text if parser.aborted else parser.text
+    if parser.tool_calls:
+        final, actions = None, []
+        for tool_name, params in parser.tool_calls:
+            if tool_name == "final_answer":
+                final = str(params.get("answer") or "").strip() or final
+            elif (tool_name, params) not in actions and len(actions) < MAX_ACTIONS_PER_TURN:
+                actions.append((tool_name, params))
+        if final or actions:
+            thought = parser.thought if parser.thought is not None else text
+            return final, actions, "structured", format_reply(thought, parser.tool_calls)
+
+    final = extract_final_answer(text)
+    actions = [] if final else extract_actions(text)
+    return final, actions, "regex" if final or actions else "failure", text
+
+
+_tool_locks: dict[str, asyncio.Lock] = {}  # Exclusion mutuelle des outils mutating
+
+
+async def execute_actions(
+    actions: list[tuple[str, dict]],
+    execute_tool_func,
+    uploaded_files: list = None,
+    websocket: WebSocket = None,
+) -> list[str]:
+    """
+    Exécuter les ACTIONs d'un tour en parallèle (au plus MAX_PARALLEL_TOOLS à la fois).
+
+    Un outil déclaré mutating=True ne s'exécute jamais en parallèle avec lui-même
+    (verrou par outil, partagé entre conversations). Les résultats sont retournés
+    dans l'ordre des actions; une exception devient un message d'erreur.
+    """
+    from tools import is_mutating_tool
+
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_TOOLS)
+
+    async def run(tool_name: str, params: dict) -> str:
+        lock = None
+        if is_mutating_tool(tool_name):
+            lock = _tool_locks.setdefault(tool_name, asyncio.Lock())
+        # Verrou avant le sémaphore: une action en attente n'occupe pas de slot
+        async with lock or contextlib.nullcontext():
+            async with semaphore:
+                start = time.monotonic()
+                try:
+                    result = await execute_tool_func(tool_name, params, uploaded_files)
+                except Exception as e:
+                    logger.error(f"Erreur exécution {tool_name}: {e}")
+                    result = f"❌ Erreur {tool_name}: {str(e)}"
+        result = result if isinstance(result, str) else str(result)
+        elapsed_ms = (time.monotonic() - start) * 1000
+        logger.info(
+            f"👁️ OBSERVE: {tool_name} ({elapsed_ms:.0f}ms) -> {result[:150] or 'EMPTY'}..."
+        )
+        record("tool", name=tool_name, params=params, result=result, ms=round(elapsed_ms, 1))
+        TOOL_LATENCY.observe(elapsed_ms / 1000, tool=tool_name, query_class=current_query_class())
+        if websocket:
+            await websocket.send_json(
+                {"type": "result", "tool": tool_name, "result": result[:2000]}
+            )
+        return result
+
+    return list(await asyncio.gather(*(run(name, params) for name, params in actions)))
+
+
+# Sondes système, dans l'ordre d'assemblage du contexte dynamique
+SYSTEM_SOURCES = ("resources", "services", "docker")
+
+
+def _preflight_sources(
+    query_type: str,
+    user_message: str,
+    execute_tool_func,
+    uploaded_files: list = None,
+    conversation_id: str = None,
+) -> list[PreflightSource]:
+    """
+    Sources pré-vol: état système (requêtes opérationnelles), auto-contexte RAG/mémoire
+    et échanges passés similaires (historique, hors conversation courante)
+    """
+    from dynamic_context import (
+        get_active_services,
+        get_docker_context,
+        get_system_resources_async,
+    )
+
+    # === AUTO-CONTEXT: RAG Apogée v2.0 ===
+    async def fetch_rag() -> str:
+        _, rag_result = await inject_rag_context("", user_message)
+        if rag_result.injected and rag_result.context:
+            logger.info(
+                f"RAG contexte injecté: {len(rag_result.sources)} sources, "
+                f"score={rag_result.relevance_score:.2f}"
+            )
+            return f"\n\n{rag_result.context}"
+        logger.info("RAG: Pas de contexte pertinent trouvé")
+        return ""
+
+    # Fallback: ancienne méthode memory_recall
+    async def fetch_memory() -> str:
+        context_query = f"{user_message[:200]} infrastructure projets utilisateur"
+        context_result = await execute_tool_func(
+            "memory_recall", {"query": context_query, "limit": 5}, uploaded_files
+        )
+        if (
+            context_result
+            and "Aucun souvenir" not in context_result
+            and "Erreur" not in context_result
+        ):
+            logger.info(f"Memory contexte injecté: {len(context_result)} chars")
+            return f"\n\n## CONTEXTE MEMORISE:\n{context_result}\n"
+        return ""
+
+    sources = []
+    if query_type == "operational":
+        # État global du système: une valeur récente périmée vaut mieux qu'une attente
+        probes = (get_system_resources_async, get_active_services, get_docker_context)
+        sources += [
+            PreflightSource(name, probe, keep_stale=True)
+            for name, probe in zip(SYSTEM_SOURCES, probes, strict=True)
+        ]
+    if RAG_AVAILABLE and inject_rag_context:
+        sources.append(PreflightSource("rag", fetch_rag))
+    else:
+        sources.append(PreflightSource("memory", fetch_memory))
+    history = get_history_search()
+    if history.ready and history.context_enabled:
+        sources.append(
+            PreflightSource(
+                "history",
+                lambda: history.context_for(user_message, exclude_conversation=conversation_id),
+            )
+        )
+    return sources
+
+
+async def _gather_preflight(
+    query_type: str,
+    user_message: str,
+    execute_tool_func,
+    uploaded_files: list = None,
+    websocket: WebSocket = None,
+    conversation_id: str = None,
+) -> tuple[str, str]:
+    """
+    Étape pré-vol concurrente. Retourne (contexte dynamique pour le prompt système,
+    auto-contexte RAG/mémoire ajouté à sa fin). Temps par source relayés au websocket.
+    """
+    sources = _preflight_sources(
+        query_type, user_message, execute_tool_func, uploaded_files, conversation_id
+    )
+    results = await get_preflight().gather(sources)
+    for name, r in results.items():
+        record("preflight", name=name, content=r.content, **r.to_dict())
+
+    dynamic_ctx = "\n\n".join(
+        results[name].content for name in SYSTEM_SOURCES if results.get(name)
+    )
+    auto_ctx = "".join(r.content for name, r in results.items() if name not in SYSTEM_SOURCES)
+
+    if websocket:
+        await websocket.send_json(
+            {
+                "type": "thinking",
+                "message": "Contexte: " + ", ".join(str(r) for r in results.values()),
+                "preflight": {name: r.to_dict() for name, r in results.items()},
+            }
+        )
+    return dynamic_ctx, auto_ctx
+
+
+def _observe_answer(path: str, model: str, query_class: str, iterations: int, start: float):
+    ANSWER_LATENCY.observe(time.monotonic() - start, path=path, query_class=query_class)
+    REACT_ITERATIONS.observe(iterations, model=model, query_class=query_class)
+
+
+class _TimedWebSocket:
+    """Websocket intermédiaire: mesure la durée de chaque envoi (WS_SEND_LATENCY)"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+
+    async def send_json(self, event: dict):
+        start = time.monotonic()
+        try:
+            await self.websocket.send_json(event)
+        finally:
+            WS_SEND_LATENCY.observe(time.monotonic() - start, event=event.get("type", "unknown"))
+
+
+async def _factual_fast_path(
+    user_message: str,
+    model: str,
+    conversation_id: str,
+    websocket: WebSocket = None,
+) -> tuple[str | None, str, list[LLMTimings]]:
+    """
+    Question factuelle: un seul appel streamé avec get_factual_prompt(), sans catalogue
+    d'outils ni RAG ni boucle. Retourne (réponse ou None si vide, modèle utilisé, timings).
+    LLMUnavailableError remonte à l'appelant.
+    """
+    from prompts import get_factual_prompt
+
+    messages = [
+        {"role": "system", "content": get_factual_prompt()},
+        {"role": "user", "content": user_message},
+    ]
+    with llm_context(flow=conversation_id):
+        model_used, parser = await _chat_with_failover(model, "factual", messages, websocket)
+    text = parser.call_text if parser.aborted else parser.text
+    answer = extract_final_answer(text) or text.strip() or None
+    return answer, model_used, [parser.timings] if parser.timings else []
+
+
 async def react_loop(
     user_message: str,
     model: str,
@@ -147,15 +1094,117 @@ async def react_loop(
     uploaded_files: list = None,
     websocket: WebSocket = None,
 ):
-    """Boucle ReAct v5.5 - THINK -> PLAN -> ACTION -> OBSERVE"""
-
-    from dynamic_context import get_dynamic_context
-    from prompts import build_system_prompt, classify_query, get_urgency_message
-    from tools import get_tools_description
+    """Boucle ReAct v5.5 - THINK -> PLAN -> ACTION -> OBSERVE (tracée si AI_TRACE_DIR)"""
+    from prompts import classify_query
 
-    # P1-2 FIX: Classification de la requête
+    # P1-2 FIX: Classification de la requête (label query_class de toutes les métriques)
     query_type = classify_query(user_message)
+    if websocket:
+        websocket = _TimedWebSocket(websocket)
+    with (
+        trace_session(
+            conversation_id,
+            user_message=user_message,
+            model=model,
+            uploaded_files=uploaded_files or [],
+            tool_calling=LLM_TOOL_CALLING,
+        ),
+        query_class_context(query_type),
+    ):
+        start = time.monotonic()
+        try:
+            answer = await _react_loop(
+                user_message,
+                model,
+                conversation_id,
+                execute_tool_func,
+                query_type,
+                uploaded_files,
+                websocket,
+            )
+        except asyncio.CancelledError:
+            # Client déconnecté (utils/chat_connection.py): LLM et outils déjà interrompus
+            record("cancelled", ms=round((time.monotonic() - start) * 1000, 1))
+            raise
+        record("answer", answer=answer, ms=round((time.monotonic() - start) * 1000, 1))
+        return answer
+
+
+async def _react_loop(
+    user_message: str,
+    model: str,
+    conversation_id: str,
+    execute_tool_func,
+    query_type: str,
+    uploaded_files: list = None,
+    websocket: WebSocket = None,
+):
+    from prompts import build_system_prompt, get_urgency_message
+
+    start = time.monotonic()
     logger.info(f"📋 P1-2: Requête classifiée comme '{query_type}'")
+    record("classify", query_class=query_type)
+
+    # Cache sémantique: question factuelle proche déjà répondue par ce modèle
+    answer_cacheable = ANSWER_CACHE_ENABLED and query_type == "factual" and not uploaded_files
+    if answer_cacheable:
+        hit = await get_answer_cache().lookup(user_message, model)
+        if hit:
+            if websocket:
+                await websocket.send_json(
+                    {
+                        "type": "thinking",
+                        "message": f"💾 Réponse en cache (similarité {hit.similarity:.2f})",
+                    }
+                )
+                await websocket.send_json(
+                    {
+                        "type": "complete",
+                        "answer": hit.answer,
+                        "iterations": 0,
+                        "model": model,
+                        "model_used": model,
+                        "cached": True,
+                        "timings": summarize_timings([]),
+                    }
+                )
+            _observe_answer("cache", model, query_type, 0, start)
+            return hit.answer
+    tools_used = False  # Seules les réponses sans outil sont mises en cache
+
+    # Chemin rapide: question factuelle sans fichier -> un seul appel, sans outils
+    if FACTUAL_FAST_PATH and query_type == "factual" and not uploaded_files:
+        if websocket:
+            await websocket.send_json(
+                {"type": "thinking", "message": "⚡ Question factuelle: réponse directe..."}
+            )
+        try:
+            answer, model_used, timings = await _factual_fast_path(
+                user_message, model, conversation_id, websocket
+            )
+        except LLMUnavailableError as e:
+            error = f"⚠️ Le serveur LLM est surchargé: {e}"
+            if websocket:
+                await websocket.send_json({"type": "error", "message": error})
+            return error
+        if answer:
+            if answer_cacheable and model_used == model:
+                await get_answer_cache().store(user_message, model, answer)
+            if websocket:
+                await websocket.send_json(
+                    {
+                        "type": "complete",
+                        "answer": answer,
+                        "iterations": 1,
+                        "model": model,
+                        "model_used": model_used,
+                        "fast_path": True,
+                        "timings": summarize_timings(timings),
+                    }
+                )
+            _observe_answer("fast", model, query_type, 1, start)
+            return answer
+        logger.warning("⚡ Chemin rapide sans réponse exploitable, bascule en boucle ReAct")
 
     # Contextes
     files_info = ""
@@ -164,53 +1213,44 @@ async def react_loop(
         for f in uploaded_files:
             files_info += f"- {f['filename']} (ID: {f['id']}, type: {f['filetype']})\n"
 
-    # Prompt initial
-    tools_desc = get_tools_description()
-    # Récupérer contexte dynamique pour les requêtes opérationnelles
-    dynamic_ctx = ""
-    if query_type == "operational":
-        try:
-            dynamic_ctx = await get_dynamic_context()
-        except Exception as e:
-            logger.warning(f"⚠️ Impossible de récupérer dynamic_context: {e}")
+    # Pré-vol: sondes système et RAG/mémoire en parallèle, sous budget de temps,
+    # pendant la sélection des outils pertinents
+    if websocket:
+        await websocket.send_json(
+            {"type": "thinking", "message": "Recherche de contexte pertinent..."}
+        )
+    (dynamic_ctx, auto_ctx), selection = await asyncio.gather(
+        _gather_preflight(
+            query_type, user_message, execute_tool_func, uploaded_files, websocket, conversation_id
+        ),
+        get_tool_selector().select(user_message),
+    )
 
-    system_prompt = build_system_prompt(tools_desc, files_info, dynamic_context=dynamic_ctx)
+    # Prompt initial: noyau d'outils dans le préfixe statique (cache KV), outils
+    # sélectionnés pour la question dans la partie volatile; sinon tout le catalogue
+    tools_desc, extra_tools = tools_prompt(selection)
+    system_prompt = build_system_prompt(
+        tools_desc, files_info, dynamic_context=dynamic_ctx, extra_tools=extra_tools
+    )
 
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": system_prompt + auto_ctx},
         {"role": "user", "content": user_message},
     ]
+    system_prompt_tokens = count_message_tokens(messages[:1])
+    SYSTEM_PROMPT_TOKENS.observe(
+        system_prompt_tokens, query_class=query_type, tools="selected" if selection else "all"
+    )
+    record(
+        "tools",
+        selection=selection.to_dict() if selection else None,
+        system_prompt_tokens=system_prompt_tokens,
+    )
 
     successful_tool_results = []  # P0-2 FIX: Collecter les résultats pour synthèse
-
-    # === AUTO-CONTEXT: RAG Apogée v2.0 ===
-    try:
-        if websocket:
-            await websocket.send_json(
-                {"type": "thinking", "message": "Recherche de contexte pertinent..."}
-            )
-
-        # Utiliser RAG Apogée si disponible, sinon fallback sur memory_recall
-        if RAG_AVAILABLE and inject_rag_context:
-            enriched_prompt, rag_result = await inject_rag_context(system_prompt, user_message)
-            if rag_result.injected:
-                messages[0]["content"] = enriched_prompt
-                logger.info(f"RAG contexte injecté: {len(rag_result.sources)} sources, score={rag_result.relevance_score:.2f}")
-            else:
-                logger.info("RAG: Pas de contexte pertinent trouvé")
-        else:
-            # Fallback: ancienne méthode memory_recall
-            context_query = f"{user_message[:200]} infrastructure projets utilisateur"
-            context_result = await execute_tool_func(
-                "memory_recall", {"query": context_query, "limit": 5}, uploaded_files
-            )
-            if context_result and "Aucun souvenir" not in context_result and "Erreur" not in context_result:
-                context_injection = f"\n\n## CONTEXTE MEMORISE:\n{context_result}\n"
-                messages[0]["content"] = system_prompt + context_injection
-                logger.info(f"Memory contexte injecté: {len(context_result)} chars")
-    except Exception as e:
-        logger.warning(f"Auto-context failed: {e}")
-    # === FIN AUTO-CONTEXT ===
+    budget = ContextBudget()  # Compaction des anciens tours au-delà du budget de tokens
+    llm_timings: list[LLMTimings] = []  # prompt_eval vs eval par appel LLM
+    current_model = model  # Modèle effectivement utilisé (après routage/bascule)
 
     for iteration in range(1, MAX_ITERATIONS + 1):
         # P0-2 FIX: À mi-parcours, forcer une conclusion si on a des résultats
@@ -226,98 +1266,36 @@ Résultats obtenus: {", ".join([r[:100] for r in successful_tool_results[-3:]])}
                     {"type": "thinking", "message": "⚠️ Mi-parcours - encouragement à conclure..."}
                 )
             messages.append({"role": "user", "content": force_conclude_msg})
+
+        context_tokens = budget.compact(messages)
+        logger.info(f"📏 Itération {iteration}: ~{context_tokens} tokens de contexte")
         if websocket:
             await websocket.send_json(
                 {
                     "type": "thinking",
                     "iteration": iteration,
                     "message": f"Réflexion {iteration}/{MAX_ITERATIONS}...",
+                    "context_tokens": context_tokens,
                 }
             )
 
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(LLM_TIMEOUT)) as client:
-                # Retry logic ROBUSTE pour les erreurs 429
-                max_retries = 10
-                current_model = model
-
-                for retry in range(max_retries):
-                    try:
-                        r = await client.post(
-                            f"{settings.ollama_url}/api/chat",
-                            json={
-                                "model": current_model,
-                                "messages": messages,
-                                "stream": False,
-                                "options": {"temperature": 0.7, "num_predict": 4000},
-                            },
-                        )
-
-                        if r.status_code == 429:
-                            # STRATÉGIE AGRESSIVE: Si Cloud 429 -> Passage immédiat en Local
-                            if (
-                                "cloud" in current_model
-                                or "gemini" in current_model
-                                or "kimi" in current_model
-                            ):
-                                logger.warning(
-                                    "⚠️ Cloud saturé (429). Bascule IMMÉDIATE sur modèle local."
-                                )
-                                if websocket:
-                                    await websocket.send_json(
-                                        {
-                                            "type": "thinking",
-                                            "message": "⚠️ Cloud saturé. Passage sur modèle local...",
-                                        }
-                                    )
-                                current_model = "qwen2.5-coder:32b-instruct-q4_K_M"
-                                await asyncio.sleep(1)  # Petite pause technique
-                                continue
-
-                            # Si on est déjà en local ou autre, on attend
-                            wait_time = 5 * (2**retry)
-                            msg = f"⚠️ Serveur occupé. Attente {wait_time}s... (Essai {retry + 1}/{max_retries})"
-                            logger.warning(msg)
-                            if websocket:
-                                await websocket.send_json({"type": "thinking", "message": msg})
-                            await asyncio.sleep(wait_time)
-                            continue
-
-                        # Si le modèle cloud échoue (500/404), fallback sur local
-                        if r.status_code >= 500 or r.status_code == 404:
-                            if (
-                                "cloud" in current_model
-                                and current_model != "qwen2.5-coder:32b-instruct-q4_K_M"
-                            ):
-                                logger.warning(
-                                    f"Erreur {r.status_code} sur {current_model}. Fallback sur local."
-                                )
-                                current_model = "qwen2.5-coder:32b-instruct-q4_K_M"
-                                continue
-
-                        r.raise_for_status()
-                        break
-                    except httpx.RequestError as e:
-                        logger.error(f"Network error: {e}")
-                        if retry < max_retries - 1:
-                            await asyncio.sleep(5)
-                            continue
-                        raise e
-
-                if r.status_code == 429:
-                    # Ultime tentative en local si le cloud est mort
-                    if "cloud" in current_model:
-                        logger.warning("Cloud HS, tentative locale forcée")
-                        current_model = "qwen2.5-coder:32b-instruct-q4_K_M"
-                        # ... relancer un appel simple ici ou retourner erreur
-
-                    error = "⚠️ Le serveur LLM est surchargé malgré plusieurs tentatives."
-                    if websocket:
-                        await websocket.send_json({"type": "error", "message": error})
-                    return error
-
-                data = r.json()
-                assistant_text = data.get("message", {}).get("content", "")
+            # Bascule pilotée par le routeur (santé/latence par modèle), sans pause aveugle.
+            # Flux = conversation: partage équitable des slots de l'ordonnanceur LLM
+            with llm_context(flow=conversation_id), tool_selection_context(selection):
+                current_model, parser = await _chat_with_failover(
+                    model, query_type, messages, websocket, LLM_TOOL_CALLING
+                )
+
+            final, actions, reply_format, assistant_text = interpret_reply(parser)
+            record_outcome(current_model, parser.tool_mode, reply_format)
+            if parser.timings:
+                llm_timings.append(parser.timings)
+        except LLMUnavailableError as e:
+            error = f"⚠️ Le serveur LLM est surchargé: {e}"
+            if websocket:
+                await websocket.send_json({"type": "error", "message": error})
+            return error
         except Exception as e:
             error = f"❌ Erreur LLM: {str(e)}"
             if websocket:
@@ -339,42 +1317,68 @@ Résultats obtenus: {", ".join([r[:100] for r in successful_tool_results[-3:]])}
             logger.info(f"📋 PLAN: {plan_content[:100]}...")
 
         # 1. Vérifier final_answer
-        final = extract_final_answer(assistant_text)
         if final:
+            logger.info(f"📏 Contexte: {budget.stats.to_dict()}")
+            if answer_cacheable and not tools_used and current_model == model:
+                await get_answer_cache().store(user_message, model, final)
+            _observe_answer("react", model, query_type, iteration, start)
             if websocket:
                 await websocket.send_json(
-                    {"type": "complete", "answer": final, "iterations": iteration, "model": model}
+                    {
+                        "type": "complete",
+                        "answer": final,
+                        "iterations": iteration,
+                        "model": model,
+                        "model_used": current_model,
+                        "timings": summarize_timings(llm_timings),
+                        "system_prompt_tokens": system_prompt_tokens,
+                        "tool_selection": selection.to_dict() if selection else None,
+                    }
                 )
             return final
 
-        # 2. Chercher une ACTION
-        tool_name, params = extract_action(assistant_text)
+        # 2. ACTIONs (plusieurs lignes ACTION ou tool_calls = exécution parallèle)
+        if actions:
+            # Outil hors sélection demandé: l'ajouter au prompt des itérations suivantes
+            requested = [name for name, _ in actions]
+            added = await get_tool_selector().expand(selection, requested)
+            if added:
+                record("tools_expanded", requested=requested, added=added)
+                # Seule la partie volatile change: le préfixe statique reste en cache
+                tools_desc, extra_tools = tools_prompt(selection)
+                system_prompt = build_system_prompt(
+                    tools_desc, files_info, dynamic_context=dynamic_ctx, extra_tools=extra_tools
+                )
+                messages[0] = {"role": "system", "content": system_prompt + auto_ctx}
 
-        if tool_name:
-            # P0-3 FIX: Log détaillé de l'action
-            logger.info(f"🔧 ACTION: {tool_name}({params})")
-
-            if websocket:
-                await websocket.send_json({"type": "tool", "tool": tool_name, "params": params})
+            for tool_name, params in actions:
+                # P0-3 FIX: Log détaillé de l'action
+                logger.info(f"🔧 ACTION: {tool_name}({params})")
+                if websocket:
+                    await websocket.send_json({"type": "tool", "tool": tool_name, "params": params})
 
             # EXÉCUTION
-            result = await execute_tool_func(tool_name, params, uploaded_files)
-
-            # Formatage ReAct OBSERVE
-            observe_msg = get_urgency_message(iteration, MAX_ITERATIONS, result)
+            tools_used = True
+            results = await execute_actions(actions, execute_tool_func, uploaded_files, websocket)
 
-            if websocket:
-                await websocket.send_json(
-                    {"type": "result", "tool": tool_name, "result": result[:2000]}
+            # Formatage ReAct OBSERVE: toutes les observations dans un seul message
+            if len(actions) == 1:
+                observe_msg = get_urgency_message(iteration, MAX_ITERATIONS, results[0])
+            else:
+                blocks = [
+                    f"[{i}] {tool_name}:\n{result[:2000]}"
+                    for i, ((tool_name, _), result) in enumerate(
+                        zip(actions, results, strict=True), 1
+                    )
+                ]
+                observe_msg = get_urgency_message(
+                    iteration, MAX_ITERATIONS, "\n\n".join(blocks), limit=None
                 )
 
-            # P0-3 FIX: Log OBSERVE
-            result_preview = result[:150] if result else "EMPTY"
-            logger.info(f"👁️ OBSERVE: {tool_name} -> {result_preview}...")
-
-            # P0-2 FIX: Collecter les résultats réussis
-            if result and not result.startswith("❌") and not result.startswith("Erreur"):
-                successful_tool_results.append(f"{tool_name}: {result[:200]}")
+            for (tool_name, _), result in zip(actions, results, strict=True):
+                # P0-2 FIX: Collecter les résultats réussis
+                if result and not result.startswith("❌") and not result.startswith("Erreur"):
+                    successful_tool_results.append(f"{tool_name}: {result[:200]}")
 
             messages.append({"role": "assistant", "content": assistant_text})
             messages.append({"role": "user", "content": observe_msg})
@@ -392,6 +1396,7 @@ Résultats obtenus: {", ".join([r[:100] for r in successful_tool_results[-3:]])}
     logger.warning(
         f"⚠️ P0-2: Max iterations atteint. Résultats collectés: {len(successful_tool_results)}"
     )
+    logger.info(f"📏 Contexte: {budget.stats.to_dict()}")
 
     if successful_tool_results:
         # On a des résultats, construire une réponse utile
@@ -420,6 +1425,14 @@ La demande n'a pas pu être traitée après {MAX_ITERATIONS} tentatives.
 
     if websocket:
         await websocket.send_json(
-            {"type": "complete", "answer": fallback, "iterations": MAX_ITERATIONS, "model": model}
+            {
+                "type": "complete",
+                "answer": fallback,
+                "iterations": MAX_ITERATIONS,
+                "model": model,
+                "model_used": current_model,
+                "timings": summarize_timings(llm_timings),
+            }
         )
+    _observe_answer("react", model, query_type, MAX_ITERATIONS, start)
     return fallback
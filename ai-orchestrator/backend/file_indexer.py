@@ -32,6 +32,7 @@ except ImportError:
     Observer = None
 
 from document_chunker import chunk_file_content, count_tokens_approx
+from utils.ollama_client import get_ollama_pool
 
 # Configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -121,15 +122,16 @@ def get_file_hash(content: str) -> str:
 async def get_embedding(text: str) -> list[float] | None:
     """Obtenir embedding via Ollama"""
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=10.0)) as client:
-            response = await client.post(
-                f"{OLLAMA_URL}/api/embeddings", json={"model": EMBEDDING_MODEL, "prompt": text}
-            )
-            if response.status_code == 200:
-                return response.json().get("embedding")
-            else:
-                logger.error(f"Embedding error: {response.status_code}")
-                return None
+        response = await get_ollama_pool().post(
+            f"{OLLAMA_URL}/api/embeddings",
+            json={"model": EMBEDDING_MODEL, "prompt": text},
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        )
+        if response.status_code == 200:
+            return response.json().get("embedding")
+        else:
+            logger.error(f"Embedding error: {response.status_code}")
+            return None
     except Exception as e:
         logger.error(f"Embedding error: {e}")
         return None
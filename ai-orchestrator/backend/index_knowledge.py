@@ -12,7 +12,7 @@ import asyncio
 import os
 from datetime import datetime
 
-import httpx
+from utils.ollama_client import get_ollama_pool
 
 # Configuration
 CHROMADB_HOST = os.getenv("CHROMADB_HOST", "chromadb")
@@ -238,14 +238,15 @@ KNOWLEDGE_BASE = [
 
 async def get_embedding(text: str) -> list:
     """Generer embedding via Ollama"""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            f"{OLLAMA_URL}/api/embeddings", json={"model": EMBEDDING_MODEL, "prompt": text}
-        )
-        if response.status_code == 200:
-            return response.json().get("embedding")
-        else:
-            raise Exception(f"Embedding error: {response.status_code}")
+    response = await get_ollama_pool().post(
+        f"{OLLAMA_URL}/api/embeddings",
+        json={"model": EMBEDDING_MODEL, "prompt": text},
+        timeout=60.0,
+    )
+    if response.status_code == 200:
+        return response.json().get("embedding")
+    else:
+        raise Exception(f"Embedding error: {response.status_code}")
 
 
 async def index_all():
@@ -9,15 +9,15 @@ import asyncio
 import base64
 import logging
 import os
-import sqlite3
 import subprocess
 import uuid
 from contextlib import asynccontextmanager
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
+from typing import Literal
 
 import chromadb
-import httpx
 from fastapi import (
     Depends,
     FastAPI,
@@ -31,10 +31,37 @@ from fastapi import (
     WebSocketDisconnect,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+from engine import ANSWER_LATENCY, LLM_TOOL_CALLING, hedge_stats, react_loop
+from model_residency import get_model_residency
+from model_router import get_model_router
+from tool_calling import format_stats
+from utils.answer_cache import get_answer_cache
+from utils.chat_connection import ChatConnection, cancel_stats
+from utils.chat_jobs import JobQueueFull, format_sse, get_chat_jobs
+from utils.database import decode_cursor, encode_cursor, get_database, open_database
+from utils.history_search import (
+    create_messages_fts,
+    create_messages_fts_vocab,
+    get_history_search,
+)
+from utils.llm_scheduler import get_llm_scheduler
+from utils.metrics import render_prometheus
+from utils.tool_selector import get_tool_selector
+from utils.upload_store import (
+    UploadTooLarge,
+    create_upload_blobs,
+    get_upload_store,
+    open_upload_store,
+    release_uploads,
+    remove_released_files,
+)
+from utils.write_behind import get_message_writer
+
 # ===== LOGGING CONFIGURATION =====
 logging.basicConfig(
     level=logging.INFO,
@@ -111,7 +138,12 @@ except ImportError:
     logger.warning("⚠️ Module config non disponible - Configuration par défaut")
 
 try:
-    from prompts import build_system_prompt, get_initial_memory_prompt, get_urgency_message
+    from prompts import (
+        build_system_prompt,
+        classify_query,
+        get_initial_memory_prompt,
+        get_urgency_message,
+    )
 
     PROMPTS_ENABLED = True
 except ImportError:
@@ -123,6 +155,8 @@ try:
     from tools import TOOLS_DEFINITIONS, get_tools_description
     from tools import execute_tool as tools_execute_tool
     from utils.async_subprocess import run_command_async, run_multiple_commands
+    from utils.ollama_client import close_ollama_pool, get_ollama_pool
+    from utils.tool_cache import get_tool_cache
 
     TOOLS_MODULE_ENABLED = True
     logger.info("✅ Modules tools v4.0 chargés")
@@ -197,6 +231,8 @@ except ImportError as e:
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://10.10.10.46:11434")
 DB_PATH = "data/orchestrator.db"
 UPLOAD_DIR = "data/uploads"
+open_database(DB_PATH)  # Connexions SQLite réutilisées, hors de la boucle asyncio
+open_upload_store(UPLOAD_DIR)  # Uploads par empreinte de contenu, écrits en flux
 # ChromaDB pour mémoire sémantique
 CHROMADB_HOST = os.getenv("CHROMADB_HOST", "localhost")
 CHROMADB_PORT = int(os.getenv("CHROMADB_PORT", "8000"))
@@ -347,6 +383,11 @@ MODEL_CATEGORIES = {
 
 DEFAULT_MODEL = "qwen3-coder:480b-cloud"
 
+# Le routeur suit la santé/latence des modèles de ce catalogue (fallback automatique)
+get_model_router().set_catalog(MODELS)
+get_llm_scheduler().set_catalog(MODELS)
+get_model_residency().set_catalog(MODELS)
+
 # ===== DÉFINITION DES OUTILS =====
 
 if TOOLS_MODULE_ENABLED:
@@ -375,13 +416,17 @@ else:
 # ===== BASE DE DONNÉES =====
 
 
-def init_db():
+async def init_db():
     """Initialiser la base SQLite"""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    get_upload_store().clean_partials()
+    await get_database().migrate(MIGRATIONS)
+    get_history_search().ready = True
+
 
+def _create_schema(c):
+    """Migration 1: tables de la base"""
     # Table conversations avec historique complet
     c.execute("""CREATE TABLE IF NOT EXISTS conversations (
         id TEXT PRIMARY KEY,
@@ -419,34 +464,62 @@ def init_db():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )""")
 
-    conn.commit()
-    conn.close()
-
 
-def get_db():
-    """Obtenir une connexion DB"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _add_history_summaries(c):
+    """
+    Migration 2: index de l'historique et résumé dénormalisé des conversations
+    (premier message, nombre de messages, dernier modèle), mis à jour par add_message
+    """
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_conversation "
+        "ON messages(conversation_id, created_at)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at, id)"
+    )
+    c.execute("ALTER TABLE conversations ADD COLUMN first_message TEXT")
+    c.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE conversations ADD COLUMN last_model TEXT")
+    c.execute("""UPDATE conversations SET
+        message_count = (SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id),
+        first_message = (SELECT content FROM messages m WHERE m.conversation_id = conversations.id
+                         ORDER BY created_at, id LIMIT 1),
+        last_model = (SELECT model_used FROM messages m WHERE m.conversation_id = conversations.id
+                      AND model_used IS NOT NULL ORDER BY created_at DESC, id DESC LIMIT 1)""")
+
+
+# Appliquées dans l'ordre au démarrage (PRAGMA user_version): ne jamais modifier
+# une migration publiée, en ajouter une nouvelle
+MIGRATIONS = [
+    _create_schema,
+    _add_history_summaries,
+    create_messages_fts,
+    create_upload_blobs,
+    create_messages_fts_vocab,
+]
 
 
 # ===== SÉLECTION AUTOMATIQUE DE MODÈLE =====
 
 
 def auto_select_model(message: str, has_image: bool = False) -> str:
-    """Toujours utiliser le modele cloud sauf pour les images"""
+    """
+    Modèle préféré (cloud, ou vision si image) tant qu'il est sain et rapide;
+    sinon le modèle le plus rapide et disponible de la classe selon le routeur
+    """
     if has_image:
-        return MODELS["llama-vision"]["model"]
-    return DEFAULT_MODEL
+        query_class, preferred = "vision", MODELS["llama-vision"]["model"]
+    else:
+        query_class = classify_query(message) if PROMPTS_ENABLED else "operational"
+        preferred = DEFAULT_MODEL
+    return get_model_router().select(query_class, preferred=preferred) or preferred
 
 
 # ===== GESTION DES FICHIERS =====
 
 
 async def save_upload(file: UploadFile, conversation_id: str = None) -> dict:
-    """Sauvegarder un fichier uploadé"""
-    file_id = str(uuid.uuid4())[:8]
-
+    """Sauvegarder un fichier uploadé (en flux, dédupliqué par contenu)"""
     # Déterminer le type
     filename = file.filename or "unknown"
     ext = Path(filename).suffix.lower()
@@ -460,43 +533,26 @@ async def save_upload(file: UploadFile, conversation_id: str = None) -> dict:
     else:
         filetype = "binary"
 
-    # Sauvegarder le fichier
-    filepath = os.path.join(UPLOAD_DIR, f"{file_id}{ext}")
-    content = await file.read()
-
-    with open(filepath, "wb") as f:
-        f.write(content)
-
-    # Enregistrer en DB
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
-        """INSERT INTO uploads (id, filename, filepath, filetype, filesize, conversation_id)
-                 VALUES (?, ?, ?, ?, ?, ?)""",
-        (file_id, filename, filepath, filetype, len(content), conversation_id),
-    )
-    conn.commit()
-    conn.close()
+    # Sauvegarder le fichier et l'enregistrer en DB (blob partagé si contenu déjà reçu)
+    stored = await get_upload_store().save(file, filename, filetype, conversation_id)
 
-    return {"id": file_id, "filename": filename, "filetype": filetype, "size": len(content)}
+    return {
+        "id": stored["id"],
+        "filename": filename,
+        "filetype": filetype,
+        "size": stored["size"],
+        "deduplicated": stored["deduplicated"],
+    }
 
 
-def get_upload_info(file_id: str) -> dict:
+async def get_upload_info(file_id: str) -> dict:
     """Récupérer les infos d'un fichier uploadé"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT * FROM uploads WHERE id = ?", (file_id,))
-    row = c.fetchone()
-    conn.close()
-
-    if row:
-        return dict(row)
-    return None
+    return await get_database().fetchone("SELECT * FROM uploads WHERE id = ?", (file_id,))
 
 
-def get_file_content(file_id: str) -> tuple:
+async def get_file_content(file_id: str) -> tuple:
     """Récupérer le contenu d'un fichier (content, filetype)"""
-    info = get_upload_info(file_id)
+    info = await get_upload_info(file_id)
     if not info:
         return None, None
 
@@ -521,21 +577,17 @@ def get_file_content(file_id: str) -> tuple:
 # ===== GESTION HISTORIQUE =====
 
 
-def create_conversation(title: str = None) -> str:
+async def create_conversation(title: str = None) -> str:
     """Créer une nouvelle conversation"""
     conv_id = str(uuid.uuid4())[:12]
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
+    await get_database().execute(
         "INSERT INTO conversations (id, title) VALUES (?, ?)",
         (conv_id, title or f"Conversation {datetime.now().strftime('%Y-%m-%d %H:%M')}"),
     )
-    conn.commit()
-    conn.close()
     return conv_id
 
 
-def add_message(conversation_id: str, role: str, content: str, model_used: str = None):
+async def add_message(conversation_id: str, role: str, content: str, model_used: str = None):
     """Ajouter un message à une conversation - P0-1: Validation anti-vide"""
     # P0-BUG FIX: Validation des types pour éviter erreur SQLite
     if not isinstance(conversation_id, str):
@@ -568,18 +620,12 @@ def add_message(conversation_id: str, role: str, content: str, model_used: str =
         )
         content = "❌ Erreur: Impossible de générer une réponse. Veuillez reformuler votre demande."
 
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
-        """INSERT INTO messages (conversation_id, role, content, model_used)
-                 VALUES (?, ?, ?, ?)""",
-        (conversation_id, role, content, model_used),
-    )
-    c.execute(
-        "UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (conversation_id,)
-    )
-    conn.commit()
-    conn.close()
+    # Écriture différée: le message part dans le prochain lot (une transaction pour
+    # tous les messages reçus pendant AI_WRITE_BEHIND_INTERVAL_MS)
+    writer = get_message_writer()
+    written = await writer.submit(conversation_id, role, content, model_used)
+    if not writer.enabled:
+        await written
 
     # P0-1 FIX: Log pour traçabilité
     if role == "assistant":
@@ -588,69 +634,69 @@ def add_message(conversation_id: str, role: str, content: str, model_used: str =
         )
 
 
-def get_conversations(limit: int = 20) -> list:
-    """Récupérer les conversations récentes"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
-        """SELECT c.*,
-                 (SELECT content FROM messages WHERE conversation_id = c.id ORDER BY created_at LIMIT 1) as first_message
-                 FROM conversations c
-                 ORDER BY updated_at DESC LIMIT ?""",
-        (limit,),
-    )
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+async def get_conversations(limit: int = 20, cursor: str = None) -> tuple[list, str | None]:
+    """
+    Récupérer les conversations récentes, page par page (pagination par clé).
+    cursor: next_cursor de la page précédente. Retourne (conversations, next_cursor).
+    ValueError si le curseur est invalide.
+    """
+    await get_message_writer().flush()  # updated_at des messages en file
+    if cursor:
+        updated_at, conv_id = decode_cursor(cursor, 2)
+        rows = await get_database().fetchall(
+            """SELECT * FROM conversations
+                 WHERE (updated_at, id) < (?, ?)
+                 ORDER BY updated_at DESC, id DESC LIMIT ?""",
+            (updated_at, conv_id, limit + 1),
+        )
+    else:
+        rows = await get_database().fetchall(
+            "SELECT * FROM conversations ORDER BY updated_at DESC, id DESC LIMIT ?",
+            (limit + 1,),
+        )
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
 
 
-def get_conversation_messages(conversation_id: str) -> list:
+async def get_conversation_messages(conversation_id: str) -> list:
     """Récupérer les messages d'une conversation"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
+    await get_message_writer().flush()
+    return await get_database().fetchall(
         "SELECT * FROM messages WHERE conversation_id = ? ORDER BY created_at", (conversation_id,)
     )
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
 
 
-def update_conversation_title(conversation_id: str, title: str):
+async def update_conversation_title(conversation_id: str, title: str):
     """Mettre à jour le titre d'une conversation"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("UPDATE conversations SET title = ? WHERE id = ?", (title, conversation_id))
-    conn.commit()
-    conn.close()
+    await get_database().execute(
+        "UPDATE conversations SET title = ? WHERE id = ?", (title, conversation_id)
+    )
 
 
-def delete_conversation(conversation_id: str):
-    """Supprimer une conversation, ses messages et les fichiers uploadés"""
-    conn = get_db()
-    c = conn.cursor()
-
-    # 1. Récupérer les chemins des fichiers à supprimer
-    c.execute("SELECT filepath FROM uploads WHERE conversation_id = ?", (conversation_id,))
-    files_to_delete = [row[0] for row in c.fetchall()]
+def _delete_conversation_rows(c, conversation_id: str) -> list[str]:
+    # 1. Libérer les blobs des uploads; blobs plus référencés et fichiers des
+    #    anciens uploads à supprimer après le commit
+    files_to_delete = release_uploads(c, conversation_id)
 
     # 2. Supprimer les entrées DB
     c.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
     c.execute("DELETE FROM uploads WHERE conversation_id = ?", (conversation_id,))
     c.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
-    conn.commit()
-    conn.close()
+    return files_to_delete
 
-    # 3. Supprimer les fichiers physiques
-    import os
 
-    for filepath in files_to_delete:
-        try:
-            if filepath and os.path.exists(filepath):
-                os.remove(filepath)
-                logger.info(f"🗑️ Fichier supprimé: {filepath}")
-        except Exception as e:
-            logger.warning(f"⚠️ Erreur suppression {filepath}: {e}")
+async def delete_conversation(conversation_id: str):
+    """Supprimer une conversation, ses messages et les fichiers uploadés"""
+    await get_message_writer().flush()  # Pas de message orphelin écrit après la suppression
+    files_to_delete = await get_database().transaction(
+        lambda c: _delete_conversation_rows(c, conversation_id)
+    )
+
+    # 3. Supprimer les fichiers physiques (blobs orphelins, anciens uploads) après le
+    #    commit, sous le verrou d'écriture: un blob réenregistré entre-temps est gardé
+    await get_database().transaction(lambda c: remove_released_files(c, files_to_delete))
 
 
 # ===== EXÉCUTION DES OUTILS =====
@@ -688,16 +734,13 @@ async def execute_tool(tool_name: str, params: dict, uploaded_files: dict = None
         return f"Erreur lors de l'exécution de {tool_name}: {str(e)}"
 
 
-# ===== MOTEUR REACT =====
-from engine import react_loop
-
 # ===== APPLICATION FASTAPI =====
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialisation au démarrage"""
-    init_db()
+    await init_db()
 
     # Initialiser la base d'authentification
     if AUTH_ENABLED:
@@ -716,8 +759,30 @@ async def lifespan(app: FastAPI):
     if SELF_HEALING_ENABLED:
         asyncio.create_task(self_healing_service.start())
 
+    # Indexer les outils (embeddings) avant la première requête
+    asyncio.create_task(get_tool_selector().warm())
+
+    # Résidence des modèles locaux: sondage de /api/ps, préchargement, épinglage
+    asyncio.create_task(get_model_residency().start())
+
     yield
 
+    # Arrêter la boucle de résidence des modèles
+    await get_model_residency().stop()
+
+    # Arrêter les workers des jobs de chat (jobs en cours annulés)
+    await get_chat_jobs().shutdown()
+
+    # Écrire les messages encore en file avant de fermer la base
+    await get_message_writer().close()
+
+    # Fermer les connexions SQLite
+    await get_database().close()
+
+    # Fermer le pool HTTP Ollama partagé
+    if TOOLS_MODULE_ENABLED:
+        await close_ollama_pool()
+
 
 app = FastAPI(
     title="Orchestrateur IA 4LB.ca",
@@ -754,6 +819,10 @@ class ChatRequest(BaseModel):
     file_ids: list[str] | None = None
 
 
+class ChatJobRequest(ChatRequest):
+    priority: Literal["interactive", "background"] = "interactive"  # cron: background
+
+
 class ConversationUpdate(BaseModel):
     title: str
 
@@ -780,6 +849,14 @@ async def health():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Histogrammes de latence au format Prometheus (scrape: docs/DEPLOYMENT.md)"""
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # ===== ENDPOINTS D'AUTHENTIFICATION v3.0 =====
 
 
@@ -982,6 +1059,17 @@ async def reload_tools_endpoint(
     }
 
 
+@app.delete("/api/cache/answers")
+async def invalidate_answer_cache(
+    model: str | None = None,
+    query: str | None = None,
+    current_user=Depends(get_current_admin_user) if AUTH_ENABLED else None,
+):
+    """Invalider le cache sémantique des réponses (tout, un modèle, ou les questions proches)"""
+    removed = await get_answer_cache().invalidate(model=model, query=query)
+    return {"success": True, "removed": removed, "stats": get_answer_cache().stats}
+
+
 @app.get("/api/stats")
 async def get_system_stats():
     """Get real-time system stats for dashboard"""
@@ -1065,15 +1153,14 @@ async def upload_file(file: UploadFile = File(...), conversation_id: str | None
     try:
         result = await save_upload(file, conversation_id)
         return {"success": True, "file": result}
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/chat")
-async def chat(
-    request: ChatRequest, current_user=Depends(get_current_active_user) if AUTH_ENABLED else None
-):
-    """Endpoint chat synchrone"""
+async def run_chat_turn(request: ChatRequest, websocket=None) -> dict:
+    """Un tour de chat hors websocket (/api/chat et jobs): conversation, ReAct, sauvegarde"""
     # Déterminer le modèle
     has_image = False
     uploaded_files = []
@@ -1081,7 +1168,7 @@ async def chat(
     # P0-BUG FIX: Validation file_ids
     if request.file_ids and isinstance(request.file_ids, list):
         for fid in request.file_ids:
-            info = get_upload_info(fid)
+            info = await get_upload_info(fid)
             if info:
                 uploaded_files.append(info)
                 if info["filetype"] == "image":
@@ -1093,10 +1180,10 @@ async def chat(
         model = MODELS.get(request.model, {}).get("model", DEFAULT_MODEL)
 
     # Créer ou utiliser une conversation
-    conv_id = request.conversation_id or create_conversation()
+    conv_id = request.conversation_id or await create_conversation()
 
     # Sauvegarder le message utilisateur
-    add_message(conv_id, "user", request.message)
+    await add_message(conv_id, "user", request.message)
 
     # Exécuter la boucle ReAct
     response = await react_loop(
@@ -1105,20 +1192,110 @@ async def chat(
         conversation_id=conv_id,
         execute_tool_func=execute_tool,
         uploaded_files=uploaded_files,
+        websocket=websocket,
     )
 
     # Sauvegarder la réponse
-    add_message(conv_id, "assistant", response, model)
+    await add_message(conv_id, "assistant", response, model)
 
     # Mettre à jour le titre si c'est le premier message
-    messages = get_conversation_messages(conv_id)
+    messages = await get_conversation_messages(conv_id)
     if len(messages) <= 2:
         title = request.message[:50] + "..." if len(request.message) > 50 else request.message
-        update_conversation_title(conv_id, title)
+        await update_conversation_title(conv_id, title)
 
     return {"response": response, "conversation_id": conv_id, "model_used": model}
 
 
+@app.post("/api/chat")
+async def chat(
+    request: ChatRequest, current_user=Depends(get_current_active_user) if AUTH_ENABLED else None
+):
+    """Endpoint chat synchrone"""
+    return await run_chat_turn(request)
+
+
+# ===== JOBS DE CHAT ASYNCHRONES =====
+
+
+def _job_owner(current_user) -> str | None:
+    return current_user.username if current_user else None
+
+
+def _get_job_or_404(job_id: str, current_user):
+    job = get_chat_jobs().get(job_id, owner=_job_owner(current_user))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable ou expiré")
+    return job
+
+
+@app.post("/api/chat/jobs", status_code=202)
+async def submit_chat_job(
+    request: ChatJobRequest,
+    current_user=Depends(get_current_active_user) if AUTH_ENABLED else None,
+):
+    """Soumet un tour de chat: réponse immédiate, progression en SSE, résultat à consulter"""
+    try:
+        job = await get_chat_jobs().submit(
+            lambda sink: run_chat_turn(request, websocket=sink),
+            owner=_job_owner(current_user),
+            priority=request.priority,
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"File de jobs pleine: {e}") from e
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "events_url": f"/api/chat/jobs/{job.id}/events",
+        "result_url": f"/api/chat/jobs/{job.id}",
+    }
+
+
+@app.get("/api/chat/jobs/{job_id}")
+async def get_chat_job(
+    job_id: str, current_user=Depends(get_current_active_user) if AUTH_ENABLED else None
+):
+    """État et résultat d'un job (conservé chat_jobs_ttl secondes après la fin)"""
+    return _get_job_or_404(job_id, current_user).to_dict()
+
+
+@app.get("/api/chat/jobs/{job_id}/events")
+async def stream_chat_job(
+    job_id: str,
+    request: Request,
+    current_user=Depends(get_current_active_user) if AUTH_ENABLED else None,
+):
+    """Progression en Server-Sent Events (événements de /ws/chat), reprise par Last-Event-ID"""
+    job = _get_job_or_404(job_id, current_user)
+    try:
+        after = int(request.headers.get("last-event-id", -1))
+    except ValueError:
+        after = -1
+
+    async def stream():
+        async for item in get_chat_jobs().events(job, after=after):
+            if item is None:
+                yield ": ping\n\n"
+            else:
+                yield format_sse(*item)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/api/chat/jobs/{job_id}")
+async def cancel_chat_job(
+    job_id: str, current_user=Depends(get_current_active_user) if AUTH_ENABLED else None
+):
+    """Annule un job en file ou en cours (appel LLM et outils interrompus)"""
+    job = _get_job_or_404(job_id, current_user)
+    cancelled = await get_chat_jobs().cancel(job)
+    return {"job_id": job.id, "status": job.status, "cancelled": cancelled}
+
+
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket, token: str = Query(None)):
     """WebSocket pour chat en temps réel (authentification requise si AUTH_ENABLED)"""
@@ -1139,10 +1316,13 @@ async def websocket_chat(websocket: WebSocket, token: str = Query(None)):
     await websocket.accept()
 
     conv_id = None  # Initialiser pour éviter UnboundLocalError
+    # Tours annulables: une déconnexion interrompt le LLM et les outils en cours
+    conn = ChatConnection(websocket)
 
     try:
+        await conn.start()
         while True:
-            data = await websocket.receive_json()
+            data = await conn.receive_json()
 
             message = data.get("message", "")
             model_key = data.get("model", "auto")
@@ -1162,7 +1342,7 @@ async def websocket_chat(websocket: WebSocket, token: str = Query(None)):
             uploaded_files = []
             if file_ids:
                 for fid in file_ids:
-                    info = get_upload_info(fid)
+                    info = await get_upload_info(fid)
                     if info:
                         uploaded_files.append(info)
                         if info["filetype"] == "image":
@@ -1183,13 +1363,13 @@ async def websocket_chat(websocket: WebSocket, token: str = Query(None)):
 
             # Créer conversation si nécessaire
             if not conv_id:
-                conv_id = create_conversation()
+                conv_id = await create_conversation()
                 await websocket.send_json(
                     {"type": "conversation_created", "conversation_id": conv_id}
                 )
 
             # Sauvegarder message utilisateur
-            add_message(conv_id, "user", message)
+            await add_message(conv_id, "user", message)
 
             # 🧠 AUTO-APPRENTISSAGE: Extraire et mémoriser les faits
             learned_facts = []
@@ -1223,23 +1403,25 @@ async def websocket_chat(websocket: WebSocket, token: str = Query(None)):
                     f"[CONTEXTE MÉMOIRE]\n{context_str}\n[/CONTEXTE]\n\n{message}"
                 )
 
-            response = await react_loop(
-                user_message=context_enhanced_message,
-                model=model,
-                conversation_id=conv_id,
-                execute_tool_func=execute_tool,
-                uploaded_files=uploaded_files,
-                websocket=websocket,
+            response = await conn.run(
+                react_loop(
+                    user_message=context_enhanced_message,
+                    model=model,
+                    conversation_id=conv_id,
+                    execute_tool_func=execute_tool,
+                    uploaded_files=uploaded_files,
+                    websocket=websocket,
+                )
             )
 
             # Sauvegarder la réponse
-            add_message(conv_id, "assistant", response, model)
+            await add_message(conv_id, "assistant", response, model)
 
     except WebSocketDisconnect:
         # Sauvegarder résumé de conversation à la déconnexion
         if AUTO_LEARN_ENABLED and conv_id:
             try:
-                messages = get_conversation_messages(conv_id)
+                messages = await get_conversation_messages(conv_id)
                 if messages and len(messages) >= 2:
                     save_conversation_summary(messages, conv_id)
             except Exception as e:
@@ -1253,21 +1435,44 @@ async def websocket_chat(websocket: WebSocket, token: str = Query(None)):
 
         logger.error(f"WebSocket error details: {tb.format_exc()}")
         await websocket.send_json({"type": "error", "message": str(e)})
+    finally:
+        await conn.close()
 
 
 # ===== ENDPOINTS HISTORIQUE =====
 
 
 @app.get("/api/conversations")
-async def get_conversations_list(limit: int = 20):
-    """Liste des conversations récentes"""
-    return {"conversations": get_conversations(limit)}
+async def get_conversations_list(
+    limit: int = Query(20, ge=1, le=100), cursor: str | None = Query(None)
+):
+    """Liste des conversations récentes (page suivante: cursor=next_cursor)"""
+    try:
+        conversations, next_cursor = await get_conversations(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return {"conversations": conversations, "next_cursor": next_cursor}
+
+
+@app.get("/api/conversations/search")
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    conversation_id: str | None = Query(None),
+    role: Literal["user", "assistant"] | None = Query(None),
+):
+    """Recherche plein texte dans l'historique (extraits classés par pertinence)"""
+    await get_message_writer().flush()
+    results = await get_history_search().search(
+        q, limit=limit, conversation_id=conversation_id, role=role
+    )
+    return {"query": q, "results": results}
 
 
 @app.get("/api/conversations/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """Détails d'une conversation"""
-    messages = get_conversation_messages(conversation_id)
+    messages = await get_conversation_messages(conversation_id)
     if not messages:
         raise HTTPException(status_code=404, detail="Conversation non trouvée")
     return {"conversation_id": conversation_id, "messages": messages}
@@ -1276,14 +1481,14 @@ async def get_conversation(conversation_id: str):
 @app.put("/api/conversations/{conversation_id}")
 async def update_conversation(conversation_id: str, update: ConversationUpdate):
     """Mettre à jour le titre d'une conversation"""
-    update_conversation_title(conversation_id, update.title)
+    await update_conversation_title(conversation_id, update.title)
     return {"success": True}
 
 
 @app.delete("/api/conversations/{conversation_id}")
 async def delete_conv(conversation_id: str):
     """Supprimer une conversation"""
-    delete_conversation(conversation_id)
+    await delete_conversation(conversation_id)
     return {"success": True}
 
 
@@ -1369,18 +1574,34 @@ async def get_system_status():
         "auth_enabled": AUTH_ENABLED,
         "security_enabled": SECURITY_ENABLED,
         "self_healing_enabled": SELF_HEALING_ENABLED,
+        "tool_cache": get_tool_cache().stats,
+        "model_router": get_model_router().stats,
+        "llm_scheduler": get_llm_scheduler().stats,
+        "model_residency": get_model_residency().stats,
+        "database": get_database().stats,
+        "message_writer": get_message_writer().stats,
+        "history_search": get_history_search().stats,
+        "upload_store": get_upload_store().stats,
+        "llm_hedging": asdict(hedge_stats),
+        "chat_cancellation": asdict(cancel_stats),
+        "chat_jobs": get_chat_jobs().stats,
+        "tool_calling": {"mode": LLM_TOOL_CALLING, **format_stats()},
+        "tool_selection": get_tool_selector().stats,
+        "answer_cache": get_answer_cache().stats,
+        "answer_latency": ANSWER_LATENCY.snapshot(),
     }
 
     # Ollama
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            r = await client.get(f"{OLLAMA_URL}/api/tags")
-            models = r.json().get("models", [])
-            status["components"]["ollama"] = {
-                "status": "connected",
-                "url": OLLAMA_URL,
-                "models_count": len(models),
-            }
+        pool = get_ollama_pool()
+        r = await pool.get(f"{OLLAMA_URL}/api/tags", timeout=5)
+        models = r.json().get("models", [])
+        status["components"]["ollama"] = {
+            "status": "connected",
+            "url": OLLAMA_URL,
+            "models_count": len(models),
+            "pool": pool.stats,
+        }
     except Exception as e:
         status["components"]["ollama"] = {"status": "error", "error": str(e)}
         status["healthy"] = False
@@ -0,0 +1,327 @@
+"""
+Résidence des modèles Ollama (préchargement et keep_alive)
+Un modèle local de 32B déchargé coûte plusieurs secondes de chargement au premier
+appel (load_duration). La bascule vers le modèle local de secours, justement quand le
+cloud est en échec, tombait systématiquement sur ce démarrage à froid.
+
+- Sondage de /api/ps (API HTTP d'Ollama, pas de SSH): modèles résidents, chargements
+  et déchargements observés
+- Politique par modèle du catalogue MODELS (clé optionnelle "residency"):
+  always (toujours résident), auto (préchargé s'il a servi récemment), never
+- Épinglage du modèle local de secours (keep_alive AI_RESIDENCY_PIN_KEEP_ALIVE) tant
+  que le taux d'erreur d'un modèle cloud (routeur) dépasse AI_RESIDENCY_PIN_ERROR_RATE
+- Démarrages à froid: appels dont load_duration dépasse AI_RESIDENCY_COLD_START_MS
+- Au plus AI_RESIDENCY_MAX_WARM modèles maintenus (VRAM partagée)
+
+Le keep_alive des appels LLM vient de keep_alive(model): une requête ordinaire sur un
+modèle épinglé ne ramène pas sa résidence à AI_LLM_KEEP_ALIVE.
+Métriques: ollama_model_loads_total{model, cause} (request | warmup | external),
+llm_cold_starts_total{model}, ollama_model_load_seconds{model, cause}.
+
+Usage:
+    from model_residency import get_model_residency
+
+    payload["keep_alive"] = get_model_residency().keep_alive(model)
+    get_model_residency().record_call(model, load_ms=timings.load_ms)
+    asyncio.create_task(get_model_residency().start())  # Boucle de sondage
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from config import MODELS, get_settings
+from model_router import ModelRouter, get_model_router
+from utils.llm_scheduler import llm_context
+from utils.metrics import counter, histogram
+from utils.ollama_client import OllamaClientPool, get_ollama_pool
+
+logger = logging.getLogger("model_residency")
+
+RESIDENCY_POLICIES = ("always", "auto", "never")
+RECENT_MIN_USES = 2  # Appels dans la fenêtre avant de précharger un modèle "auto"
+MAX_EVENTS = 100
+
+MODEL_LOADS = counter(
+    "ollama_model_loads_total",
+    "Chargements de modèles Ollama (request: démarrage à froid, warmup, external)",
+    labels=("model", "cause"),
+)
+COLD_STARTS = counter(
+    "llm_cold_starts_total",
+    "Appels LLM ayant attendu le chargement du modèle",
+    labels=("model",),
+)
+MODEL_LOAD_SECONDS = histogram(
+    "ollama_model_load_seconds",
+    "Durée de chargement d'un modèle (load_duration ou préchargement)",
+    labels=("model", "cause"),
+)
+
+
+class ResidencyManager:
+    """Suivi des modèles résidents sur Ollama et préchargement selon la politique"""
+
+    def __init__(
+        self,
+        catalog: dict = None,
+        router: ModelRouter = None,
+        pool: OllamaClientPool = None,
+    ):
+        settings = get_settings()
+        self.enabled = settings.residency_enabled
+        self.interval = settings.residency_poll_interval
+        self.max_warm = settings.residency_max_warm
+        self.recent_window = settings.residency_recent_window
+        self.pin_error_rate = settings.residency_pin_error_rate
+        self.pin_keep_alive = settings.residency_pin_keep_alive
+        self.fallback_model = settings.residency_fallback_model
+        self.cold_start_ms = settings.residency_cold_start_ms
+        self.default_keep_alive = settings.llm_keep_alive
+        self.url = settings.ollama_url
+        self._router = router
+        self._pool = pool
+        self._policies: dict[str, str] = {}  # Modèles locaux de chat -> politique
+        self._cloud: set[str] = set()
+        self.set_catalog(catalog or MODELS)
+        self._resident: dict[str, dict] = {}  # Dernier /api/ps
+        self._polled = False
+        self._uses: dict[str, deque] = {}  # Horodatages des appels récents
+        self._pinned: str | None = None
+        self._events: deque = deque(maxlen=MAX_EVENTS)
+        self._task: asyncio.Task | None = None
+        self._polls = 0
+        self._poll_errors = 0
+        self._warmups = 0
+        self._warmup_failures = 0
+
+    def set_catalog(self, catalog: dict):
+        """Charge un catalogue MODELS (clé -> {model, local, chat, residency})"""
+        self._policies, self._cloud = {}, set()
+        for entry in catalog.values():
+            model = entry.get("model")
+            if not model or entry.get("chat", True) is False:
+                continue
+            if not entry.get("local", True):
+                self._cloud.add(model)
+                continue
+            policy = entry.get("residency", "auto")
+            if policy not in RESIDENCY_POLICIES:
+                logger.warning(f"⚠️ {model}: politique de résidence inconnue {policy!r}")
+                policy = "auto"
+            self._policies[model] = policy
+
+    @property
+    def router(self) -> ModelRouter:
+        return self._router or get_model_router()
+
+    @property
+    def pool(self) -> OllamaClientPool:
+        return self._pool or get_ollama_pool()
+
+    def _event(self, kind: str, model: str, **details):
+        self._events.append({"time": time.time(), "event": kind, "model": model, **details})
+
+    def _loaded(self, model: str, cause: str, load_ms: float):
+        MODEL_LOADS.inc(model=model, cause=cause)
+        if load_ms:
+            MODEL_LOAD_SECONDS.observe(load_ms / 1000, model=model, cause=cause)
+        self._event("load", model, cause=cause, load_ms=round(load_ms))
+
+    # === Appels LLM ===
+
+    def keep_alive(self, model: str) -> str:
+        """keep_alive à envoyer avec un appel: épinglé, toujours résident, ou défaut"""
+        if model == self._pinned or self._policies.get(model) == "always":
+            return self.pin_keep_alive
+        return self.default_keep_alive
+
+    def record_call(self, model: str, load_ms: float = 0.0):
+        """Appel LLM terminé: usage récent, et démarrage à froid si le chargement a pesé"""
+        if model in self._cloud:
+            return
+        now = time.monotonic()
+        uses = self._uses.setdefault(model, deque())
+        uses.append(now)
+        while uses and now - uses[0] > self.recent_window:
+            uses.popleft()
+        if load_ms >= self.cold_start_ms:
+            COLD_STARTS.inc(model=model)
+            self._loaded(model, "request", load_ms)
+            self._resident.setdefault(model, {})
+            logger.info(f"🧊 {model}: démarrage à froid ({load_ms:.0f}ms de chargement)")
+
+    # === Politique ===
+
+    def _recent_uses(self, model: str, now: float) -> int:
+        return sum(1 for t in self._uses.get(model, ()) if now - t <= self.recent_window)
+
+    def cloud_degraded(self) -> bool:
+        """Un modèle cloud a un taux d'erreur élevé ou un disjoncteur ouvert"""
+        for model in self._cloud:
+            health = self.router.health(model)
+            if health.error_rate >= self.pin_error_rate or health.state == "open":
+                return True
+        return False
+
+    def fallback(self) -> str | None:
+        """Modèle local de secours: AI_RESIDENCY_FALLBACK_MODEL ou choix du routeur"""
+        if self.fallback_model:
+            return self.fallback_model
+        return self.router.select("operational", local=True)
+
+    def desired(self) -> list[tuple[str, str]]:
+        """Modèles à maintenir résidents, par priorité: [(modèle, raison)]"""
+        now = time.monotonic()
+        wanted: list[tuple[str, str]] = []
+        if self._pinned:
+            wanted.append((self._pinned, "pin"))
+        wanted.extend((m, "policy") for m, p in self._policies.items() if p == "always")
+        recent = [
+            (m, self._recent_uses(m, now))
+            for m, p in self._policies.items()
+            if p == "auto" and m != self._pinned
+        ]
+        recent = sorted(
+            (item for item in recent if item[1] >= RECENT_MIN_USES),
+            key=lambda item: (-item[1], -self._uses[item[0]][-1]),
+        )
+        wanted.extend((m, "recent") for m, _ in recent)
+        unique: dict[str, str] = {}
+        for model, reason in wanted:
+            unique.setdefault(model, reason)
+        return list(unique.items())[: self.max_warm]
+
+    def _update_pin(self) -> tuple[str | None, str | None]:
+        """Épingle / désépingle le modèle de secours; retourne (épinglé, désépinglé)"""
+        degraded = self.cloud_degraded()
+        target = self.fallback() if degraded else None
+        if target == self._pinned:
+            return None, None
+        previous, self._pinned = self._pinned, target
+        if previous:
+            self._event("unpin", previous)
+            logger.info(f"📌 {previous}: désépinglé (cloud rétabli)")
+        if target:
+            self._event("pin", target, keep_alive=self.pin_keep_alive)
+            logger.warning(f"📌 {target}: épinglé en mémoire (modèles cloud en échec)")
+        return target, previous
+
+    # === Ollama ===
+
+    async def poll(self) -> dict[str, dict] | None:
+        """Modèles résidents (/api/ps); chargements et déchargements depuis le sondage"""
+        try:
+            r = await self.pool.get(f"{self.url}/api/ps", timeout=5.0)
+            r.raise_for_status()
+            entries = r.json().get("models", [])
+        except Exception as e:
+            self._poll_errors += 1
+            logger.warning(f"⚠️ Résidence: /api/ps indisponible ({e})")
+            return None
+        self._polls += 1
+        resident = {
+            entry.get("name") or entry.get("model"): {
+                "size_vram": entry.get("size_vram", 0),
+                "expires_at": entry.get("expires_at", ""),
+            }
+            for entry in entries
+            if entry.get("name") or entry.get("model")
+        }
+        if self._polled:
+            for model in resident.keys() - self._resident.keys():
+                self._loaded(model, "external", 0.0)
+            for model in self._resident.keys() - resident.keys():
+                self._event("unload", model)
+        self._resident = resident
+        self._polled = True
+        return resident
+
+    async def warm(self, model: str, keep_alive: str, reason: str) -> bool:
+        """Charge le modèle (prompt vide) avec le keep_alive donné"""
+        start = time.monotonic()
+        payload = {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}
+        try:
+            with llm_context(priority="background", flow="residency"):
+                r = await self.pool.post(f"{self.url}/api/generate", json=payload)
+            r.raise_for_status()
+        except Exception as e:
+            self._warmup_failures += 1
+            logger.warning(f"⚠️ Préchargement de {model} impossible ({e})")
+            return False
+        elapsed_ms = (time.monotonic() - start) * 1000
+        self._warmups += 1
+        if model not in self._resident:
+            self._loaded(model, "warmup", elapsed_ms)
+            self._resident[model] = {}
+        logger.info(f"🔥 {model}: résident ({reason}, keep_alive={keep_alive}, {elapsed_ms:.0f}ms)")
+        return True
+
+    async def tick(self):
+        """Un cycle: sondage, épinglage, préchargement des modèles voulus"""
+        if await self.poll() is None:
+            return
+        pinned, unpinned = self._update_pin()
+        if unpinned and unpinned in self._resident:
+            await self.warm(unpinned, self.default_keep_alive, "unpin")
+        for model, reason in self.desired():
+            if model not in self._resident or model == pinned:
+                await self.warm(model, self.keep_alive(model), reason)
+
+    async def start(self):
+        """Boucle de sondage (lifespan)"""
+        if not self.enabled:
+            return
+        self._task = asyncio.current_task()
+        logger.info(f"🔥 Résidence des modèles: sondage toutes les {self.interval:.0f}s")
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Erreur résidence des modèles: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    @property
+    def stats(self) -> dict:
+        """Modèles résidents, épinglage, chargements et démarrages à froid"""
+        cold_starts = {s["labels"]["model"]: int(s["value"]) for s in COLD_STARTS.snapshot()}
+        loads: dict[str, dict] = {}
+        for series in MODEL_LOADS.snapshot():
+            labels = series["labels"]
+            loads.setdefault(labels["model"], {})[labels["cause"]] = int(series["value"])
+        return {
+            "enabled": self.enabled,
+            "resident": self._resident,
+            "pinned": self._pinned,
+            "desired": [{"model": m, "reason": r} for m, r in self.desired()],
+            "policies": self._policies,
+            "cold_starts": cold_starts,
+            "loads": loads,
+            "polls": self._polls,
+            "poll_errors": self._poll_errors,
+            "warmups": self._warmups,
+            "warmup_failures": self._warmup_failures,
+            "events": list(self._events)[-20:],
+        }
+
+
+# Singleton
+_model_residency: ResidencyManager | None = None
+
+
+def get_model_residency() -> ResidencyManager:
+    """Obtient l'instance singleton du gestionnaire de résidence"""
+    global _model_residency
+    if _model_residency is None:
+        _model_residency = ResidencyManager()
+    return _model_residency
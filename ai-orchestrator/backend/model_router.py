@@ -0,0 +1,265 @@
+"""
+Routeur de modèles LLM
+Remplace le fallback codé en dur (cloud -> qwen2.5-coder sur 429/5xx, pauses exponentielles)
+par un choix piloté par la santé mesurée de chaque modèle du catalogue MODELS:
+- EWMA de la latence au premier token (par classe de requête) et du débit tokens/s
+- Taux d'erreur (EWMA) et disjoncteur par modèle: closed -> open -> half_open
+- Choix du modèle le plus rapide et sain pour la classe (factual, operational, vision)
+- Bascule immédiate vers le meilleur candidat suivant, sans pause aveugle
+
+Usage:
+    from model_router import get_model_router
+
+    router = get_model_router()
+    model = router.select("operational", preferred=DEFAULT_MODEL)
+    router.record_success(model, "operational", first_token_ms=850, tokens_per_second=42)
+    router.record_failure(model, status_code=429, retry_after=20)
+    fallback = router.select("operational", exclude={model})
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+
+from config import MODELS, get_settings
+
+logger = logging.getLogger("model_router")
+
+# Catégories du catalogue éligibles par classe de requête
+CLASS_CATEGORIES = {
+    "vision": ("vision",),
+    "factual": ("cloud", "code"),
+    "operational": ("cloud", "code"),
+}
+
+
+@dataclass
+class ModelHealth:
+    """Santé mesurée d'un modèle"""
+
+    model: str
+    local: bool = True
+    category: str = ""
+    ewma_latency_ms: float | None = None  # Premier token, toutes classes confondues
+    latency_by_class: dict[str, float] = field(default_factory=dict)
+    ewma_tokens_per_second: float | None = None
+    error_rate: float = 0.0  # EWMA des échecs (0..1)
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    state: str = "closed"  # closed | open | half_open
+    open_until: float = 0.0
+    trips: int = 0  # Ouvertures consécutives du disjoncteur (backoff)
+    last_error: str = ""
+
+    def available(self, now: float) -> bool:
+        """Disjoncteur fermé, ou période d'ouverture écoulée (passage en half_open)"""
+        if self.state == "open":
+            if now < self.open_until:
+                return False
+            self.state = "half_open"
+            logger.info(f"🔌 {self.model}: disjoncteur half_open (requête d'essai)")
+        return True
+
+    def latency(self, query_class: str) -> float | None:
+        return self.latency_by_class.get(query_class, self.ewma_latency_ms)
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "local": self.local,
+            "state": self.state,
+            "reopens_in_s": round(max(0.0, self.open_until - now), 1)
+            if self.state == "open"
+            else 0,
+            "ewma_latency_ms": round(self.ewma_latency_ms) if self.ewma_latency_ms else None,
+            "latency_by_class": {k: round(v) for k, v in self.latency_by_class.items()},
+            "ewma_tokens_per_second": round(self.ewma_tokens_per_second, 1)
+            if self.ewma_tokens_per_second
+            else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def _ewma(previous: float | None, value: float, alpha: float) -> float:
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+class ModelRouter:
+    """Choix et bascule de modèles selon latence, débit et santé"""
+
+    def __init__(self, catalog: dict = None):
+        settings = get_settings()
+        self.alpha = settings.router_ewma_alpha
+        self.failure_threshold = settings.router_failure_threshold
+        self.cooldown = settings.router_cooldown
+        self.max_cooldown = settings.router_max_cooldown
+        self.switch_ratio = settings.router_switch_ratio
+        self._health: dict[str, ModelHealth] = {}
+        self._order: list[str] = []  # Ordre du catalogue (départage)
+        self.set_catalog(catalog or MODELS)
+
+    def set_catalog(self, catalog: dict):
+        """Charge un catalogue MODELS (clé -> {model, category, local, chat})"""
+        self._order = []
+        for entry in catalog.values():
+            model = entry.get("model")
+            if not model or entry.get("chat", True) is False:
+                continue
+            health = self._health.get(model) or ModelHealth(model=model)
+            health.local = entry.get("local", True)
+            health.category = entry.get("category", "")
+            self._health[model] = health
+            self._order.append(model)
+
+    def health(self, model: str) -> ModelHealth:
+        """Santé d'un modèle (créée à la volée pour un modèle hors catalogue)"""
+        if model not in self._health:
+            self._health[model] = ModelHealth(model=model)
+        return self._health[model]
+
+    def is_available(self, model: str) -> bool:
+        return self.health(model).available(time.monotonic())
+
+    def candidates(self, query_class: str) -> list[str]:
+        """Modèles du catalogue éligibles pour une classe de requête"""
+        categories = CLASS_CATEGORIES.get(query_class, CLASS_CATEGORIES["operational"])
+        return [m for m in self._order if self._health[m].category in categories]
+
+    def _rank(self, model: str, query_class: str) -> tuple:
+        health = self._health[model]
+        latency = health.latency(query_class)
+        return (
+            health.error_rate > 0.5,
+            latency if latency is not None else float("inf"),
+            self._order.index(model) if model in self._order else len(self._order),
+        )
+
+    def select(
+        self,
+        query_class: str,
+        preferred: str = None,
+        exclude: set[str] = frozenset(),
+        local: bool = None,
+    ) -> str | None:
+        """
+        Modèle à utiliser pour la classe de requête.
+        Le modèle préféré est gardé tant qu'il est disponible et que sa latence mesurée
+        ne dépasse pas switch_ratio fois celle du meilleur candidat.
+        `local` restreint les candidats aux modèles locaux (True) ou cloud (False).
+        Retourne None si aucun candidat n'est disponible.
+        """
+        now = time.monotonic()
+        pool = [
+            m
+            for m in self.candidates(query_class)
+            if m not in exclude
+            and m != preferred
+            and (local is None or self._health[m].local == local)
+            and self._health[m].available(now)
+        ]
+        best = min(pool, key=lambda m: self._rank(m, query_class)) if pool else None
+
+        if preferred and preferred not in exclude and self.health(preferred).available(now):
+            pref_latency = self.health(preferred).latency(query_class)
+            best_latency = self._health[best].latency(query_class) if best else None
+            if (
+                pref_latency is not None
+                and best_latency is not None
+                and pref_latency > self.switch_ratio * best_latency
+            ):
+                logger.info(
+                    f"🧭 {best} plus rapide que {preferred} pour '{query_class}' "
+                    f"({best_latency:.0f}ms vs {pref_latency:.0f}ms)"
+                )
+                return best
+            return preferred
+        return best
+
+    def record_success(
+        self,
+        model: str,
+        query_class: str,
+        first_token_ms: float = None,
+        tokens_per_second: float = None,
+    ):
+        """Appel réussi: met à jour les EWMA et referme le disjoncteur"""
+        health = self.health(model)
+        health.requests += 1
+        health.consecutive_failures = 0
+        health.error_rate = _ewma(health.error_rate, 0.0, self.alpha)
+        if health.state != "closed":
+            logger.info(f"🔌 {model}: disjoncteur refermé")
+        health.state = "closed"
+        health.trips = 0
+        if first_token_ms is not None:
+            health.ewma_latency_ms = _ewma(health.ewma_latency_ms, first_token_ms, self.alpha)
+            health.latency_by_class[query_class] = _ewma(
+                health.latency_by_class.get(query_class), first_token_ms, self.alpha
+            )
+        if tokens_per_second:
+            health.ewma_tokens_per_second = _ewma(
+                health.ewma_tokens_per_second, tokens_per_second, self.alpha
+            )
+
+    def record_stall(self, model: str, query_class: str, elapsed_ms: float):
+        """
+        Requête abandonnée sans premier token (perdue face à une requête doublée):
+        l'attente observée alimente la latence, sans compter d'échec.
+        """
+        health = self.health(model)
+        health.ewma_latency_ms = _ewma(health.ewma_latency_ms, elapsed_ms, self.alpha)
+        health.latency_by_class[query_class] = _ewma(
+            health.latency_by_class.get(query_class), elapsed_ms, self.alpha
+        )
+
+    def record_failure(
+        self,
+        model: str,
+        status_code: int = None,
+        error: str = "",
+        retry_after: float = None,
+    ):
+        """
+        Appel échoué. Le disjoncteur s'ouvre immédiatement sur 429/404 (modèle saturé ou
+        absent) ou en half_open, sinon après failure_threshold échecs consécutifs.
+        """
+        health = self.health(model)
+        health.requests += 1
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.error_rate = _ewma(health.error_rate, 1.0, self.alpha)
+        health.last_error = f"HTTP {status_code}" if status_code else error
+
+        if (
+            status_code in (429, 404)
+            or health.state == "half_open"
+            or health.consecutive_failures >= self.failure_threshold
+        ):
+            cooldown = retry_after or min(self.max_cooldown, self.cooldown * 2**health.trips)
+            health.trips += 1
+            health.state = "open"
+            health.open_until = time.monotonic() + cooldown
+            logger.warning(
+                f"🔌 {model}: disjoncteur ouvert {cooldown:.0f}s ({health.last_error})"
+            )
+
+    @property
+    def stats(self) -> dict:
+        """État du routeur par modèle"""
+        now = time.monotonic()
+        return {model: health.to_dict(now) for model, health in self._health.items()}
+
+
+# Singleton
+_model_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    """Obtient l'instance singleton du routeur"""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
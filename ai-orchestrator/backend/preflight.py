@@ -0,0 +1,143 @@
+"""
+Étape pré-vol de la boucle ReAct
+Avant le premier appel LLM, les sondes système (docker, systemctl, psutil) et le
+pipeline RAG (embed -> search -> rerank) s'exécutaient l'une après l'autre.
+
+- Toutes les sources sont lancées en parallèle sous un budget de temps commun
+- Source trop lente: abandonnée, ou servie périmée (dernière valeur connue) si elle
+  le permet; elle continue alors en tâche de fond pour rafraîchir sa valeur
+- Temps et statut par source, relayés dans l'événement websocket `thinking`
+
+Usage:
+    from preflight import PreflightSource, get_preflight
+
+    results = await get_preflight().gather([
+        PreflightSource("docker", get_docker_context, keep_stale=True),
+        PreflightSource("rag", fetch_rag),
+    ])
+    results["docker"].content, results["rag"].status
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from config import get_settings
+
+logger = logging.getLogger("preflight")
+
+
+@dataclass
+class PreflightSource:
+    """Source de contexte pré-vol"""
+
+    name: str
+    fetch: Callable[[], Awaitable[str]]
+    keep_stale: bool = False  # État global (système): valeur périmée acceptable
+
+
+@dataclass
+class SourceResult:
+    """Résultat d'une source: ok | stale | timeout | error"""
+
+    name: str
+    content: str = ""
+    status: str = "ok"
+    elapsed_ms: float = 0.0
+    age_s: float | None = None  # Âge de la valeur périmée servie
+
+    def to_dict(self) -> dict:
+        data = {"status": self.status, "ms": round(self.elapsed_ms)}
+        if self.age_s is not None:
+            data["age_s"] = round(self.age_s, 1)
+        return data
+
+    def __str__(self) -> str:
+        if self.status == "stale":
+            return f"{self.name} périmé ({self.age_s:.0f}s)"
+        if self.status in ("timeout", "error"):
+            return f"{self.name} {self.status}"
+        return f"{self.name} {self.elapsed_ms:.0f}ms"
+
+
+class Preflight:
+    """Collecte concurrente des contextes pré-vol, avec repli sur les valeurs périmées"""
+
+    def __init__(self, budget: float = None, stale_ttl: float = None):
+        settings = get_settings()
+        self.budget = settings.preflight_budget if budget is None else budget
+        self.stale_ttl = settings.preflight_stale_ttl if stale_ttl is None else stale_ttl
+        self._stale: dict[str, tuple[str, float]] = {}  # nom -> (valeur, horodatage)
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def _fetch(self, source: PreflightSource) -> SourceResult:
+        start = time.monotonic()
+        try:
+            content = await source.fetch() or ""
+        except Exception as e:
+            logger.warning(f"⚠️ Pré-vol {source.name}: {e}")
+            return SourceResult(source.name, status="error", elapsed_ms=_ms(start))
+        if source.keep_stale:
+            self._stale[source.name] = (content, time.monotonic())
+        return SourceResult(source.name, content, elapsed_ms=_ms(start))
+
+    def _task(self, source: PreflightSource) -> asyncio.Task:
+        """Tâche de la source; un rafraîchissement encore en cours est réutilisé"""
+        if source.keep_stale:
+            task = self._refreshing.get(source.name)
+            if task is None or task.done():
+                task = asyncio.create_task(self._fetch(source))
+                self._refreshing[source.name] = task
+            return task
+        return asyncio.create_task(self._fetch(source))
+
+    async def gather(
+        self, sources: list[PreflightSource], budget: float = None
+    ) -> dict[str, SourceResult]:
+        """Exécute les sources en parallèle; au plus `budget` secondes d'attente"""
+        budget = self.budget if budget is None else budget
+        start = time.monotonic()
+        tasks = {source.name: (source, self._task(source)) for source in sources}
+        if tasks:
+            await asyncio.wait([task for _, task in tasks.values()], timeout=budget)
+
+        results = {}
+        for name, (source, task) in tasks.items():
+            if task.done():
+                results[name] = task.result()
+                continue
+            if not source.keep_stale:
+                task.cancel()  # Contexte propre à la requête: inutile de le terminer
+            result = SourceResult(name, status="timeout", elapsed_ms=_ms(start))
+            stale = self._stale.get(name)
+            if stale and time.monotonic() - stale[1] <= self.stale_ttl:
+                result.content = stale[0]
+                result.status = "stale"
+                result.age_s = time.monotonic() - stale[1]
+            results[name] = result
+
+        degraded = any(r.status in ("stale", "timeout") for r in results.values())
+        logger.info(
+            f"🛫 Pré-vol {_ms(start):.0f}ms: "
+            + ", ".join(str(r) for r in results.values())
+            + (f" (budget {budget:.1f}s dépassé)" if degraded else "")
+        )
+        return results
+
+
+def _ms(start: float) -> float:
+    return (time.monotonic() - start) * 1000
+
+
+# Singleton
+_preflight: Preflight | None = None
+
+
+def get_preflight() -> Preflight:
+    """Obtient l'instance singleton (valeurs périmées partagées entre requêtes)"""
+    global _preflight
+    if _preflight is None:
+        _preflight = Preflight()
+    return _preflight
@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import re
 from datetime import datetime
+from functools import lru_cache
 from typing import Literal
 
 # ============================================================
@@ -28,16 +29,9 @@ INFRASTRUCTURE_CONTEXT = """## Infrastructure 4LB.ca
 # ============================================================
 
 
-def build_system_prompt(tools_desc: str, files_context: str = "", dynamic_context: str = "") -> str:
-    """
-    Prompt système unique: doit être injecté en tant que SYSTEM (pas user),
-    une fois par requête avant le message utilisateur.
-    """
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # IMPORTANT: On force un contrat de sortie, anti-vague, et un auto-contrôle.
-    # Si tu ajoutes un validateur côté engine, garde ce format identique.
-    instructions = r"""
+# IMPORTANT: On force un contrat de sortie, anti-vague, et un auto-contrôle.
+# Si tu ajoutes un validateur côté engine, garde ce format identique.
+REACT_INSTRUCTIONS = r"""
 ## 🎯 MODE PROFESSIONNEL: ANTI-VAGUE (STRICT)
 
 Tu es un assistant senior pragmatique (DevOps/SysAdmin + dev).
@@ -94,8 +88,11 @@ THINK: [Analyse. Utilise le contexte/mémoire si utile.]
 PLAN: [Étapes concrètes. Choisis les outils si besoin.]
 ACTION: outil(param="valeur")
 
+Actions INDÉPENDANTES (ex: docker_status + disk_usage): une ligne ACTION par outil,
+à la suite: elles seront exécutées en parallèle. Jamais deux actions dépendantes.
+
 Après l'action, tu recevras:
-OBSERVE: [résultat]
+OBSERVE: [résultat] (un bloc [n] par action)
 
 POUR LA RÉPONSE FINALE:
 ACTION: final_answer(answer='''
@@ -127,25 +124,63 @@ Si une commande est interdite / bloquée:
 - propose une alternative sûre.
 """
 
-    system_prompt = f"""Tu es un expert DevOps/SysAdmin senior pour l'infrastructure 4LB.ca.
+
+@lru_cache(maxsize=8)
+def build_static_prompt(tools_desc: str) -> str:
+    """
+    Partie statique du prompt système: rôle, infrastructure, catalogue d'outils, règles.
+    Identique octet pour octet tant que le registre d'outils ne change pas: placée en
+    tête, Ollama réutilise son cache KV pour ce préfixe d'une requête à l'autre.
+    Avec la sélection d'outils, tools_desc est le noyau (AI_TOOL_SELECT_CORE), pas la
+    sélection de la requête: les outils retenus en plus vont dans la partie volatile.
+    """
+    return f"""Tu es un expert DevOps/SysAdmin senior pour l'infrastructure 4LB.ca.
 Tu dois fournir des analyses complètes, structurées et actionnables.
 Chaque réponse doit contenir une recommandation claire et un plan d'action.
 
 {INFRASTRUCTURE_CONTEXT}
 
+## Outils disponibles
+{tools_desc}
+
+{REACT_INSTRUCTIONS}
+"""
+
+
+def build_volatile_context(
+    files_context: str = "", dynamic_context: str = "", extra_tools: str = ""
+) -> str:
+    """
+    Partie volatile (outils retenus pour la requête, heure, état système, fichiers):
+    toujours après le préfixe statique
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tools_section = ""
+    if extra_tools:
+        tools_section = f"\n## Outils proposés pour cette demande\n{extra_tools}\n"
+    return f"""{tools_section}
 ## ⏰ CONTEXTE TEMPOREL
 Date/Heure actuelle: {now}
 
 ## ÉTAT DU SYSTÈME (Temps Réel)
 {dynamic_context}
-
-## Outils disponibles
-{tools_desc}
 {files_context}
-
-{instructions}
 """
-    return system_prompt
+
+
+def build_system_prompt(
+    tools_desc: str, files_context: str = "", dynamic_context: str = "", extra_tools: str = ""
+) -> str:
+    """
+    Prompt système unique: doit être injecté en tant que SYSTEM (pas user),
+    une fois par requête avant le message utilisateur.
+    Préfixe statique (mis en cache) puis contexte volatile; le contexte RAG
+    éventuel est ajouté à la fin par inject_rag_context.
+    extra_tools: outils sélectionnés pour la requête, hors catalogue du préfixe.
+    """
+    return build_static_prompt(tools_desc) + build_volatile_context(
+        files_context, dynamic_context, extra_tools
+    )
 
 
 # ============================================================
@@ -153,12 +188,15 @@ Date/Heure actuelle: {now}
 # ============================================================
 
 
-def get_urgency_message(iteration: int, max_iterations: int, result: str) -> str:
+def get_urgency_message(
+    iteration: int, max_iterations: int, result: str, limit: int | None = 2000
+) -> str:
     """
     Message OBSERVE + rappel pour forcer une conclusion propre.
+    limit=None: résultat déjà tronqué par l'appelant (observations multiples).
     """
     remaining = max_iterations - iteration
-    result_truncated = result[:2000] if len(result) > 2000 else result
+    result_truncated = result[:limit] if limit and len(result) > limit else result
 
     if remaining <= 1:
         return f"""OBSERVE: {result_truncated}
@@ -21,6 +21,8 @@ logger = logging.getLogger("rate_limiter")
 # Limites par défaut (requêtes par fenêtre de temps)
 DEFAULT_RATE_LIMITS = {
     # Endpoint: (requests, window_seconds)
+    # Avant /api/chat (correspondance par préfixe): soumission, suivi SSE et résultats
+    "/api/chat/jobs": (30, 60),
     "/api/chat": (10, 60),  # 10 requêtes par minute
     "/ws/chat": (5, 60),  # 5 connexions WebSocket par minute
     "/api/auth/login": (5, 300),  # 5 tentatives par 5 minutes
@@ -28,6 +30,7 @@ DEFAULT_RATE_LIMITS = {
     "/api/conversations": (60, 60),  # 60 requêtes par minute
     "/tools": (30, 60),  # 30 requêtes par minute
     "/health": (120, 60),  # 120 requêtes par minute
+    "/metrics": (120, 60),  # Scrape Prometheus
     "/api/stats": (120, 60),  # 120 requêtes par minute (polling)
     "default": (60, 60),  # 60 requêtes par minute par défaut
 }
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Rejeu déterministe des traces react_loop (enregistrées via AI_TRACE_DIR)
+react_loop est exécuté contre:
+- un Ollama simulé (httpx.MockTransport) qui renvoie les réponses LLM enregistrées,
+  en flux découpé en mots, avec les compteurs de temps d'origine
+- un exécuteur d'outils simulé qui renvoie les résultats enregistrés
+- les contextes pré-vol (sondes système, RAG, mémoire) enregistrés
+- la sélection d'outils enregistrée (et ses extensions), sans service d'embeddings
+
+Sans modèle ni outils réels, on peut ainsi:
+- mesurer le surcoût du moteur par itération (--repeat N)
+- tester en non-régression le parsing (extract_action, extract_final_answer)
+- mesurer l'effet d'un changement de prompt ou de compaction (appels LLM,
+  tokens envoyés, prompts divergents)
+
+Usage:
+    python replay.py data/traces/20250101-120000-000000-conv.jsonl
+    python replay.py data/traces/*.jsonl --repeat 20
+    python replay.py data/traces/*.jsonl --json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+import engine
+from model_router import ModelRouter
+from preflight import Preflight, PreflightSource
+from utils.ollama_client import OllamaClientPool
+from utils.tool_selector import ToolSelection
+from utils.trace import load_trace, messages_digest
+
+_TOKEN = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass
+class ReplayReport:
+    """Résultat du rejeu d'une trace"""
+
+    trace: str
+    answer: str = ""
+    recorded_answer: str | None = None
+    llm_calls: int = 0
+    recorded_llm_calls: int = 0
+    tool_calls: int = 0
+    recorded_tool_calls: int = 0
+    divergences: int = 0  # Prompts différents de ceux enregistrés
+    prompt_tokens: int = 0  # Tokens envoyés (estimation) sur l'ensemble des appels
+    recorded_prompt_tokens: int = 0
+    unrecorded_tools: list[str] = field(default_factory=list)
+    exhausted: bool = False  # Le moteur a demandé plus d'appels LLM que la trace n'en a
+    wall_ms: list[float] = field(default_factory=list)
+
+    @property
+    def matches(self) -> bool:
+        return (
+            self.answer == self.recorded_answer
+            and self.llm_calls == self.recorded_llm_calls
+            and not self.exhausted
+        )
+
+    @property
+    def overhead_ms_per_iteration(self) -> float:
+        """Temps médian d'un rejeu par appel LLM (LLM et outils simulés: surcoût moteur)"""
+        if not self.wall_ms:
+            return 0.0
+        return statistics.median(self.wall_ms) / max(1, self.llm_calls)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace": self.trace,
+            "matches": self.matches,
+            "answer_matches": self.answer == self.recorded_answer,
+            "llm_calls": self.llm_calls,
+            "recorded_llm_calls": self.recorded_llm_calls,
+            "tool_calls": self.tool_calls,
+            "recorded_tool_calls": self.recorded_tool_calls,
+            "divergences": self.divergences,
+            "prompt_tokens": self.prompt_tokens,
+            "recorded_prompt_tokens": self.recorded_prompt_tokens,
+            "unrecorded_tools": self.unrecorded_tools,
+            "exhausted": self.exhausted,
+            "runs": len(self.wall_ms),
+            "median_ms": round(statistics.median(self.wall_ms), 2) if self.wall_ms else 0.0,
+            "overhead_ms_per_iteration": round(self.overhead_ms_per_iteration, 2),
+        }
+
+    def __str__(self) -> str:
+        status = "✅" if self.matches else "❌"
+        return (
+            f"{status} {Path(self.trace).name}: {self.llm_calls}/{self.recorded_llm_calls} "
+            f"appels LLM, {self.tool_calls}/{self.recorded_tool_calls} outils, "
+            f"{self.divergences} prompt(s) divergent(s), "
+            f"{self.prompt_tokens}/{self.recorded_prompt_tokens} tokens envoyés, "
+            f"{self.overhead_ms_per_iteration:.2f}ms/itération"
+        )
+
+
+class StubOllama:
+    """Ollama simulé: sert les réponses LLM enregistrées, dans l'ordre"""
+
+    def __init__(self, llm_events: list[dict]):
+        self.events = llm_events
+        self.index = 0
+        self.exhausted = False
+        self.prompt_tokens = 0
+        self.divergences = 0
+
+    @staticmethod
+    def _done_chunk(event: dict) -> dict:
+        timings = event.get("timings") or {}
+        chunk = {"message": {"content": ""}, "done": True}
+        if timings.get("source") == "ollama":
+            chunk.update(
+                prompt_eval_count=timings.get("prompt_tokens"),
+                prompt_eval_duration=int(timings.get("prompt_eval_ms", 0) * 1e6),
+                eval_count=timings.get("eval_tokens", 0),
+                eval_duration=int(timings.get("eval_ms", 0) * 1e6),
+                load_duration=int(timings.get("load_ms", 0) * 1e6),
+                total_duration=int(timings.get("total_ms", 0) * 1e6),
+            )
+        return chunk
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        if self.index >= len(self.events):
+            self.exhausted = True
+            return httpx.Response(500, json={"error": "trace épuisée"})
+        event = self.events[self.index]
+        self.index += 1
+
+        messages = payload.get("messages", [])
+        self.prompt_tokens += engine.count_message_tokens(messages)
+        if messages_digest(messages) != event.get("messages_digest"):
+            self.divergences += 1
+
+        status = event.get("status")
+        if status != 200:
+            return httpx.Response(status or 503, json={"error": event.get("error") or "replay"})
+        text = event.get("text", "")
+        done = self._done_chunk(event)
+        if event.get("tool_mode") == "native" and event.get("tool_calls"):
+            done["message"]["tool_calls"] = [
+                {"function": {"name": name, "arguments": params}}
+                for name, params in event["tool_calls"]
+            ]
+        if not payload.get("stream", True):
+            done["message"]["content"] = text
+            return httpx.Response(200, json=done)
+        lines = [
+            json.dumps({"message": {"content": token}, "done": False})
+            for token in _TOKEN.findall(text)
+        ]
+        lines.append(json.dumps(done))
+        return httpx.Response(200, content="\n".join(lines).encode())
+
+
+class StubTools:
+    """Exécuteur d'outils simulé: résultats enregistrés par (outil, paramètres)"""
+
+    def __init__(self, tool_events: list[dict]):
+        self._results: dict[tuple, deque] = defaultdict(deque)
+        self._last: dict[tuple, str] = {}
+        for event in tool_events:
+            self._results[self._key(event["name"], event.get("params"))].append(event["result"])
+        self.calls = 0
+        self.unrecorded: list[str] = []
+
+    @staticmethod
+    def _key(name: str, params) -> tuple:
+        return name, json.dumps(params or {}, sort_keys=True, default=str)
+
+    async def __call__(self, name: str, params: dict, uploaded_files: list = None) -> str:
+        self.calls += 1
+        key = self._key(name, params)
+        if self._results[key]:
+            self._last[key] = self._results[key].popleft()
+            return self._last[key]
+        if key in self._last:  # Appel répété plus souvent qu'à l'enregistrement
+            return self._last[key]
+        self.unrecorded.append(name)
+        return f"❌ Erreur: appel {name}({params}) absent de la trace"
+
+
+class _RecordedSelector:
+    """Sélecteur d'outils simulé: sélection initiale et extensions enregistrées"""
+
+    def __init__(self, events: list[dict]):
+        tools = next((e for e in events if e["type"] == "tools"), {})
+        self.selection = tools.get("selection")
+        self.expansions = deque(e for e in events if e["type"] == "tools_expanded")
+
+    async def select(self, query: str) -> ToolSelection | None:
+        if not self.selection:
+            return None
+        return ToolSelection(names=list(self.selection["tools"]), total=self.selection["total"])
+
+    async def expand(self, selection: ToolSelection | None, requested: list[str]) -> list[str]:
+        if selection is None or not self.expansions:
+            return []
+        if self.expansions[0]["requested"] != requested:
+            return []  # Pas d'extension à cette itération lors de l'enregistrement
+        added = self.expansions.popleft()["added"]
+        selection.names = sorted(set(selection.names) | set(added))
+        return added
+
+
+class _CollectingWebSocket:
+    """Websocket factice: le relais des événements fait partie du coût du moteur"""
+
+    def __init__(self):
+        self.events: list[dict] = []
+
+    async def send_json(self, data: dict):
+        self.events.append(data)
+
+
+@contextmanager
+def _patched(target, **attributes):
+    saved = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+def _recorded_sources(preflight_events: list[dict]):
+    """Remplace les sources pré-vol par leur contenu enregistré"""
+
+    def factory(*args, **kwargs) -> list[PreflightSource]:
+        def fetch_for(content: str):
+            async def fetch() -> str:
+                return content
+
+            return fetch
+
+        return [
+            PreflightSource(e["name"], fetch_for(e.get("content", ""))) for e in preflight_events
+        ]
+
+    return factory
+
+
+async def _run_once(events: list[dict]) -> tuple[str, StubOllama, StubTools, float]:
+    session = next(e for e in events if e["type"] == "session")
+    llm_events = [e for e in events if e["type"] == "llm"]
+    stub = StubOllama(llm_events)
+    tools = StubTools([e for e in events if e["type"] == "tool"])
+
+    models = list(dict.fromkeys([session["model"]] + [e["model"] for e in llm_events]))
+    router = ModelRouter({m: {"model": m, "category": "code", "local": True} for m in models})
+    pool = OllamaClientPool(transport=httpx.MockTransport(stub.handler))
+    preflight = Preflight(budget=30, stale_ttl=0)
+    selector = _RecordedSelector(events)
+
+    with _patched(
+        engine,
+        get_ollama_pool=lambda: pool,
+        get_model_router=lambda: router,
+        get_preflight=lambda: preflight,
+        _preflight_sources=_recorded_sources([e for e in events if e["type"] == "preflight"]),
+        get_tool_selector=lambda: selector,
+        trace_session=lambda *args, **kwargs: nullcontext(),
+        ANSWER_CACHE_ENABLED=False,
+        LLM_HEDGE_ENABLED=False,
+        LLM_TOOL_CALLING=session.get("tool_calling", "text"),
+    ):
+        start = time.perf_counter()
+        answer = await engine.react_loop(
+            session["user_message"],
+            session["model"],
+            session.get("conversation_id") or "replay",
+            tools,
+            session.get("uploaded_files") or None,
+            websocket=_CollectingWebSocket(),
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    await pool.aclose()
+    return answer, stub, tools, elapsed_ms
+
+
+async def replay_trace(path: str | Path, repeat: int = 1) -> ReplayReport:
+    """Rejoue une trace `repeat` fois et compare au déroulé enregistré"""
+    events = load_trace(path)
+    recorded_answer = next((e["answer"] for e in events if e["type"] == "answer"), None)
+    llm_events = [e for e in events if e["type"] == "llm"]
+    report = ReplayReport(
+        trace=str(path),
+        recorded_answer=recorded_answer,
+        recorded_llm_calls=len(llm_events),
+        recorded_tool_calls=sum(1 for e in events if e["type"] == "tool"),
+        recorded_prompt_tokens=sum(e.get("prompt_tokens_estimate", 0) for e in llm_events),
+    )
+    for _ in range(max(1, repeat)):
+        answer, stub, tools, elapsed_ms = await _run_once(events)
+        report.wall_ms.append(elapsed_ms)
+    # Déroulé du dernier rejeu (identique d'un rejeu à l'autre: tout est déterministe)
+    report.answer = answer
+    report.llm_calls = stub.index
+    report.exhausted = stub.exhausted
+    report.divergences = stub.divergences
+    report.prompt_tokens = stub.prompt_tokens
+    report.tool_calls = tools.calls
+    report.unrecorded_tools = tools.unrecorded
+    return report
+
+
+async def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rejeu déterministe des traces react_loop")
+    parser.add_argument("traces", nargs="+", help="Fichiers JSONL (AI_TRACE_DIR)")
+    parser.add_argument("--repeat", type=int, default=1, help="Rejeux par trace (benchmark)")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    reports = [await replay_trace(path, args.repeat) for path in args.traces]
+    if args.json:
+        print(json.dumps([r.to_dict() for r in reports], ensure_ascii=False, indent=2))
+    else:
+        for report in reports:
+            print(report)
+    return 0 if all(r.matches for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -11,6 +11,8 @@ from datetime import datetime
 
 import httpx
 
+from utils.ollama_client import get_ollama_pool
+
 from .config import RAGConfig, get_rag_config
 
 logger = logging.getLogger("rag.embeddings")
@@ -78,16 +80,9 @@ class EmbeddingService:
     def __init__(self, config: RAGConfig | None = None):
         self.config = config or get_rag_config()
         self._cache = LRUCache(max_size=self.config.embedding_cache_size)
-        self._client: httpx.AsyncClient | None = None
         self._total_generations = 0
         self._total_time_ms = 0.0
 
-    async def _get_client(self) -> httpx.AsyncClient:
-        """Lazy initialization du client HTTP"""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=self.config.embedding_timeout)
-        return self._client
-
     def _compute_cache_key(self, text: str) -> int:
         """Calcule la clé de cache pour un texte"""
         # Utilise les 500 premiers caractères pour la clé
@@ -125,18 +120,17 @@ class EmbeddingService:
 
         # Générer via Ollama
         try:
-            client = await self._get_client()
-
             # Tronquer si nécessaire (bge-m3 supporte 8K tokens)
             max_chars = self.config.embedding_max_tokens * self.config.chars_per_token
             truncated_text = text[:max_chars]
 
-            response = await client.post(
+            response = await get_ollama_pool().post(
                 f"{self.config.ollama_url}/api/embeddings",
                 json={
                     "model": self.config.embedding_model,
                     "prompt": truncated_text
-                }
+                },
+                timeout=self.config.embedding_timeout
             )
 
             if response.status_code != 200:
@@ -205,9 +199,7 @@ class EmbeddingService:
         }
 
     async def close(self):
-        """Ferme le client HTTP"""
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
+        """Rien à fermer: le client HTTP est le pool partagé (utils.ollama_client)"""
 
 
 # Singleton du service
@@ -10,6 +10,8 @@ from datetime import datetime
 
 import httpx
 
+from utils.ollama_client import get_ollama_pool
+
 from .config import RAGConfig, RerankerModel, get_rag_config
 
 logger = logging.getLogger("rag.reranker")
@@ -44,17 +46,10 @@ class RerankerService:
 
     def __init__(self, config: RAGConfig | None = None):
         self.config = config or get_rag_config()
-        self._client: httpx.AsyncClient | None = None
         self._total_reranks = 0
         self._total_time_ms = 0.0
         self._enabled = self.config.reranker_model != RerankerModel.NONE.value
 
-    async def _get_client(self) -> httpx.AsyncClient:
-        """Lazy initialization du client HTTP"""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=self.config.rerank_timeout)
-        return self._client
-
     async def _compute_rerank_score(self, query: str, document: str) -> float:
         """
         Calcule le score de pertinence query-document via cross-encoder.
@@ -69,14 +64,13 @@ class RerankerService:
         combined = f"Query: {query}\nDocument: {document[:2000]}"
 
         try:
-            client = await self._get_client()
-
-            response = await client.post(
+            response = await get_ollama_pool().post(
                 f"{self.config.ollama_url}/api/embeddings",
                 json={
                     "model": self.config.reranker_model,
                     "prompt": combined
-                }
+                },
+                timeout=self.config.rerank_timeout
             )
 
             if response.status_code != 200:
@@ -201,9 +195,7 @@ class RerankerService:
         }
 
     async def close(self):
-        """Ferme le client HTTP"""
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
+        """Rien à fermer: le client HTTP est le pool partagé (utils.ollama_client)"""
 
 
 # Singleton
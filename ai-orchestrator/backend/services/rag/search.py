@@ -10,12 +10,26 @@ from datetime import datetime
 
 import httpx
 
+from utils.metrics import FAST_BUCKETS, current_query_class, histogram
+
 from .config import RAGConfig, get_rag_config
 from .embeddings import EmbeddingService, get_embedding_service
 from .reranker import RerankerService, get_reranker_service
 
 logger = logging.getLogger("rag.search")
 
+# Latence par étape du pipeline: embed -> search (ChromaDB) -> rerank
+RAG_STAGE_LATENCY = histogram(
+    "rag_stage_seconds",
+    "Latence d'une étape RAG (embed, search, rerank)",
+    labels=("stage", "query_class"),
+    buckets=FAST_BUCKETS + (10, 30),
+)
+
+
+def _observe_stage(stage: str, elapsed_ms: float):
+    RAG_STAGE_LATENCY.observe(elapsed_ms / 1000, stage=stage, query_class=current_query_class())
+
 
 @dataclass
 class SearchResult:
@@ -204,6 +218,7 @@ class SearchService:
         embed_start = datetime.now()
         embed_result = await self.embedding_service.generate(query)
         embedding_time_ms = (datetime.now() - embed_start).total_seconds() * 1000
+        _observe_stage("embed", embedding_time_ms)
 
         if not embed_result:
             logger.error("Impossible de générer l'embedding de la requête")
@@ -219,7 +234,9 @@ class SearchService:
 
         # 2. Recherche dans ChromaDB
         retrieval_count = self.config.retrieval_top_k if use_reranking else top_k
+        vector_start = datetime.now()
         raw_results = await self._search_chromadb(embed_result.embedding, retrieval_count)
+        _observe_stage("search", (datetime.now() - vector_start).total_seconds() * 1000)
 
         # Filtrer par topic si spécifié
         if topic_filter:
@@ -247,6 +264,7 @@ class SearchService:
                 query, raw_results, top_k
             )
             rerank_time_ms = (datetime.now() - rerank_start).total_seconds() * 1000
+            _observe_stage("rerank", rerank_time_ms)
 
             # Convertir en SearchResult
             final_results = []
@@ -18,11 +18,11 @@ from dataclasses import dataclass
 from typing import Any
 
 import chromadb
-import httpx
 from chromadb.config import Settings
 
 # Import du reranker
 from services.reranker import rerank_documents
+from utils.ollama_client import get_ollama_pool
 
 # Configuration
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://10.10.10.46:11434")
@@ -85,18 +85,18 @@ class RAGService:
             return self._embedding_cache[cache_key]
 
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(60.0)) as client:
-                response = await client.post(
-                    f"{OLLAMA_URL}/api/embeddings",
-                    json={"model": EMBEDDING_MODEL, "prompt": text}
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    embedding = data.get("embedding", [])
-                    if embedding:
-                        self._embedding_cache[cache_key] = embedding
-                        return embedding
+            response = await get_ollama_pool().post(
+                f"{OLLAMA_URL}/api/embeddings",
+                json={"model": EMBEDDING_MODEL, "prompt": text},
+                timeout=60.0,
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                embedding = data.get("embedding", [])
+                if embedding:
+                    self._embedding_cache[cache_key] = embedding
+                    return embedding
         except Exception as e:
             print(f"⚠️ Erreur embedding bge-m3: {e}")
 
@@ -7,7 +7,7 @@ Utilise bge-reranker-v2-m3 via Ollama pour filtrer les résultats
 import asyncio
 import os
 
-import httpx
+from utils.ollama_client import get_ollama_pool
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://10.10.10.46:11434")
 RERANKER_MODEL = "qllama/bge-reranker-v2-m3"
@@ -32,21 +32,21 @@ async def get_rerank_score(query: str, document: str) -> float:
     combined_text = f"Query: {query}\nDocument: {document}"
 
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
-            response = await client.post(
-                f"{OLLAMA_URL}/api/embeddings",
-                json={"model": RERANKER_MODEL, "prompt": combined_text}
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                embedding = data.get("embedding", [])
-                if embedding:
-                    # Score basé sur la magnitude de l'embedding
-                    # Plus le reranker "comprend" la relation, plus le score est élevé
-                    score = sum(abs(x) for x in embedding[:100]) / 100
-                    _reranker_cache[cache_key] = score
-                    return score
+        response = await get_ollama_pool().post(
+            f"{OLLAMA_URL}/api/embeddings",
+            json={"model": RERANKER_MODEL, "prompt": combined_text},
+            timeout=30.0,
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            embedding = data.get("embedding", [])
+            if embedding:
+                # Score basé sur la magnitude de l'embedding
+                # Plus le reranker "comprend" la relation, plus le score est élevé
+                score = sum(abs(x) for x in embedding[:100]) / 100
+                _reranker_cache[cache_key] = score
+                return score
     except Exception as e:
         print(f"⚠️ Erreur reranker: {e}")
 
@@ -8,6 +8,7 @@ from datetime import datetime
 from config import get_settings
 from engine import react_loop
 from tools import execute_tool
+from utils.llm_scheduler import llm_context
 
 logger = logging.getLogger("self_healing")
 
@@ -84,12 +85,14 @@ Agis de manière autonome et sécurisée."""
         # Lancer le moteur ReAct
         # Note: on utilise un modèle performant pour la maintenance
         try:
-            await react_loop(
-                user_message=prompt,
-                model=self.settings.default_model or "qwen2.5-coder:32b-instruct-q4_K_M",
-                conversation_id=conv_id,
-                execute_tool_func=execute_tool,
-            )
+            # Trafic de fond: les chats interactifs passent devant dans l'ordonnanceur LLM
+            with llm_context(priority="background", flow="self-healing"):
+                await react_loop(
+                    user_message=prompt,
+                    model=self.settings.default_model or "qwen2.5-coder:32b-instruct-q4_K_M",
+                    conversation_id=conv_id,
+                    execute_tool_func=execute_tool,
+                )
             logger.info(f"✅ Auto-réparation terminée (Conv ID: {conv_id})")
         except Exception as e:
             logger.error(f"❌ Échec de l'auto-réparation: {e}")
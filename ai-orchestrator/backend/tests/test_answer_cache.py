@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le cache sémantique des réponses factuelles
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+
+import httpx
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from utils.answer_cache import AnswerCache
+from utils.ollama_client import OllamaClientPool
+
+DIMS = 64
+
+
+async def bag_of_words(text: str) -> list[float]:
+    """Embedding factice: sac de mots haché (questions reformulées = vecteurs proches)"""
+    vector = [0.0] * DIMS
+    for word in re.findall(r"\w+", text.lower()):
+        vector[sum(map(ord, word)) % DIMS] += 1.0
+    return vector
+
+
+def make_cache(**kwargs) -> AnswerCache:
+    kwargs.setdefault("threshold", 0.9)
+    kwargs.setdefault("ttl", 60)
+    kwargs.setdefault("max_entries", 10)
+    return AnswerCache(embed=bag_of_words, **kwargs)
+
+
+class TestAnswerCache:
+    """Tests pour AnswerCache"""
+
+    @pytest.mark.asyncio
+    async def test_similar_question_hits(self):
+        cache = make_cache()
+        await cache.store("c'est quoi un reverse proxy", "m", "Un intermédiaire HTTP.")
+
+        hit = await cache.lookup("C'est quoi un reverse proxy ?", "m")
+        assert hit is not None
+        assert hit.answer == "Un intermédiaire HTTP."
+        assert hit.similarity >= 0.9
+        assert await cache.lookup("explique le protocole BGP", "m") is None
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_namespaced_per_model(self):
+        cache = make_cache()
+        await cache.store("c'est quoi docker", "cloud", "réponse cloud")
+
+        assert await cache.lookup("c'est quoi docker", "local") is None
+        assert (await cache.lookup("c'est quoi docker", "cloud")).answer == "réponse cloud"
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        cache = make_cache(ttl=0.001)
+        await cache.store("c'est quoi docker", "m", "réponse")
+        await asyncio.sleep(0.01)
+        assert await cache.lookup("c'est quoi docker", "m") is None
+        assert cache.stats["models"]["m"] == 0
+
+    @pytest.mark.asyncio
+    async def test_store_replaces_near_duplicate_and_evicts_lru(self):
+        cache = make_cache(max_entries=2)
+        await cache.store("c'est quoi docker", "m", "v1")
+        await cache.store("C'est quoi Docker?", "m", "v2")
+        assert cache.stats["models"]["m"] == 1
+        assert (await cache.lookup("c'est quoi docker", "m")).answer == "v2"
+
+        await cache.store("explique le protocole BGP", "m", "bgp")
+        await cache.store("différence entre TCP et UDP", "m", "tcp")
+        assert await cache.lookup("c'est quoi docker", "m") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidation(self):
+        cache = make_cache()
+        await cache.store("c'est quoi docker", "a", "docker")
+        await cache.store("explique le protocole BGP", "a", "bgp")
+        await cache.store("c'est quoi docker", "b", "docker b")
+
+        assert await cache.invalidate(query="c'est quoi docker") == 2
+        assert await cache.lookup("explique le protocole BGP", "a") is not None
+        assert await cache.invalidate(model="a") == 1
+        assert await cache.invalidate() == 0
+
+    @pytest.mark.asyncio
+    async def test_embedding_failure_is_a_miss(self):
+        async def broken(text):
+            raise RuntimeError("ollama injoignable")
+
+        cache = AnswerCache(threshold=0.9, ttl=60, max_entries=10, embed=broken)
+        assert await cache.store("c'est quoi docker", "m", "réponse") is False
+        assert await cache.lookup("c'est quoi docker", "m") is None
+
+
+def ollama_stream(text: str) -> bytes:
+    return (
+        json.dumps({"message": {"content": text}, "done": False})
+        + "\n"
+        + json.dumps({"message": {"content": ""}, "done": True})
+    ).encode()
+
+
+class TestReactLoopAnswerCache:
+    """Intégration avec la boucle ReAct"""
+
+    @pytest.mark.asyncio
+    async def test_factual_answer_served_from_cache(self, monkeypatch):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(
+                200, content=ollama_stream("ACTION: final_answer(answer='Un intermédiaire.')")
+            )
+
+        async def no_tool(name, params, uploaded_files=None):
+            return "Aucun souvenir"
+
+        cache = make_cache()
+        pool = OllamaClientPool(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(engine, "get_ollama_pool", lambda: pool)
+        monkeypatch.setattr(engine, "get_answer_cache", lambda: cache)
+        monkeypatch.setattr(engine, "ANSWER_CACHE_ENABLED", True)
+
+        question = "Qu'est-ce qu'un reverse proxy en général ?"
+        assert await engine.react_loop(question, "m", "c1", no_tool) == "Un intermédiaire."
+        events = []
+
+        class WS:
+            async def send_json(self, data):
+                events.append(data)
+
+        answer = await engine.react_loop(question, "m", "c2", no_tool, websocket=WS())
+        assert answer == "Un intermédiaire."
+        assert len(calls) == 1
+        assert events[-1]["type"] == "complete"
+        assert events[-1]["cached"] is True
+        # Autre modèle: pas de réponse croisée
+        await engine.react_loop(question, "autre", "c3", no_tool)
+        assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'annulation des tours de chat à la déconnexion
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.async_subprocess import run_command_async
+from utils.chat_connection import ChatConnection, cancel_stats
+
+
+class FakeWebSocket:
+    """Client simulé: messages à recevoir, puis déconnexion quand `leave` est posé"""
+
+    def __init__(self, messages: list[dict]):
+        self.messages = list(messages)
+        self.leave = asyncio.Event()
+
+    async def receive_json(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await self.leave.wait()
+        raise WebSocketDisconnect(code=1001)
+
+
+def process_alive(pid: int) -> bool:
+    """Vivant = existe et n'est pas un zombie (orphelin pas encore récolté par init)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+class TestChatConnection:
+    @pytest.mark.asyncio
+    async def test_messages_in_order_then_disconnect(self):
+        ws = FakeWebSocket([{"message": "a"}, {"message": "b"}])
+        async with ChatConnection(ws) as conn:
+            assert (await conn.receive_json())["message"] == "a"
+            assert (await conn.receive_json())["message"] == "b"
+            ws.leave.set()
+            with pytest.raises(WebSocketDisconnect):
+                await conn.receive_json()
+            with pytest.raises(WebSocketDisconnect):
+                await conn.receive_json()
+            assert conn.closed
+
+    @pytest.mark.asyncio
+    async def test_turn_result_returned(self):
+        async def turn():
+            await asyncio.sleep(0.01)
+            return "réponse"
+
+        async with ChatConnection(FakeWebSocket([])) as conn:
+            assert await conn.run(turn()) == "réponse"
+
+    @pytest.mark.asyncio
+    async def test_turn_error_propagates(self):
+        async def turn():
+            raise RuntimeError("boom")
+
+        async with ChatConnection(FakeWebSocket([])) as conn:
+            with pytest.raises(RuntimeError):
+                await conn.run(turn())
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_turn(self):
+        ws = FakeWebSocket([])
+        cleaned = asyncio.Event()
+
+        async def turn():
+            try:
+                await asyncio.sleep(30)
+            finally:
+                cleaned.set()
+
+        before = cancel_stats.cancelled
+        async with ChatConnection(ws) as conn:
+            asyncio.get_running_loop().call_later(0.02, ws.leave.set)
+            start = time.monotonic()
+            with pytest.raises(WebSocketDisconnect):
+                await conn.run(turn())
+
+        assert time.monotonic() - start < 1
+        assert cleaned.is_set()  # Nettoyage terminé avant le retour
+        assert cancel_stats.cancelled == before + 1
+
+    @pytest.mark.asyncio
+    async def test_disconnect_kills_subprocess(self, tmp_path):
+        ws = FakeWebSocket([])
+        marker = tmp_path / "pid"
+        # Le shell lance un enfant: tout le groupe doit disparaître
+        command = f"sleep 30 & echo $! > {marker}; wait"
+
+        async with ChatConnection(ws) as conn:
+            asyncio.get_running_loop().call_later(0.3, ws.leave.set)
+            with pytest.raises(WebSocketDisconnect):
+                await conn.run(run_command_async(command, timeout=60, use_shell=True))
+
+        child = int(marker.read_text())
+        await asyncio.sleep(0.05)
+        assert not process_alive(child)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour les jobs de chat asynchrones (utils/chat_jobs.py)
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_jobs import ChatJobManager, JobQueueFull, format_sse
+from utils.llm_scheduler import current_priority
+
+
+@pytest.fixture
+async def manager():
+    jobs = ChatJobManager(workers=1, max_queued=10, ttl=60, max_events=100)
+    yield jobs
+    await jobs.shutdown()
+
+
+def turn(answer: str = "ok", delay: float = 0.01, gate: asyncio.Event = None):
+    """Tour simulé: relaie des événements comme react_loop, puis retourne le résultat"""
+
+    async def run(sink):
+        await sink.send_json({"type": "thinking", "message": "..."})
+        if gate is not None:
+            await gate.wait()
+        await asyncio.sleep(delay)
+        await sink.send_json({"type": "complete", "answer": answer})
+        return {"response": answer}
+
+    return run
+
+
+async def collect(manager, job, after=-1) -> list[dict]:
+    return [item[1] for item in [i async for i in manager.events(job, after=after)] if item]
+
+
+class TestSubmission:
+    @pytest.mark.asyncio
+    async def test_returns_immediately_then_completes(self, manager):
+        gate = asyncio.Event()
+        job = await manager.submit(turn(gate=gate))
+        assert job.status == "queued"
+
+        gate.set()
+        events = await collect(manager, job)
+        assert job.status == "completed"
+        assert job.result == {"response": "ok"}
+        assert job.expires_at == pytest.approx(job.finished_at + 60)
+        assert [e["type"] for e in events] == ["job", "job", "thinking", "complete", "job"]
+        assert [e["status"] for e in events if e["type"] == "job"] == [
+            "queued",
+            "running",
+            "completed",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_bounded_worker_pool(self):
+        manager = ChatJobManager(workers=2, max_queued=10, ttl=60)
+        running, peak = 0, 0
+
+        async def run(sink):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return {}
+
+        jobs = [await manager.submit(run) for _ in range(5)]
+        for job in jobs:
+            await collect(manager, job)
+        await manager.shutdown()
+
+        assert peak == 2
+        assert all(job.status == "completed" for job in jobs)
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejected(self, manager):
+        manager.max_queued = 1
+        gate = asyncio.Event()
+        await manager.submit(turn(gate=gate))
+        await asyncio.sleep(0)  # Le worker prend le premier job
+        await manager.submit(turn())
+        with pytest.raises(JobQueueFull):
+            await manager.submit(turn())
+        assert manager.stats["rejected"] == 1
+        gate.set()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_queued_job_frees_its_place(self, manager):
+        manager.max_queued = 1
+        gate = asyncio.Event()
+        await manager.submit(turn(gate=gate))
+        await asyncio.sleep(0)  # Le worker prend le premier job
+        queued = await manager.submit(turn())
+        await manager.cancel(queued)
+        resubmitted = await manager.submit(turn())  # Pas de JobQueueFull
+        assert manager.stats["queued"] == 1 and manager.stats["rejected"] == 0
+        gate.set()
+        await collect(manager, resubmitted)
+        assert resubmitted.status == "completed"
+        assert manager.stats["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_priority_applied_to_llm_calls(self, manager):
+        seen = []
+
+        async def run(sink):
+            seen.append(current_priority())
+            return {}
+
+        job = await manager.submit(run, priority="background")
+        await collect(manager, job)
+        assert seen == ["background"]
+
+    @pytest.mark.asyncio
+    async def test_failure_recorded(self, manager):
+        async def run(sink):
+            raise RuntimeError("LLM indisponible")
+
+        job = await manager.submit(run)
+        events = await collect(manager, job)
+        assert job.status == "failed"
+        assert job.error == "LLM indisponible"
+        assert events[-1] == {
+            "type": "job",
+            "job_id": job.id,
+            "status": "failed",
+            "error": "LLM indisponible",
+        }
+
+
+class TestEvents:
+    @pytest.mark.asyncio
+    async def test_resume_after_last_event_id(self, manager):
+        job = await manager.submit(turn())
+        await collect(manager, job)
+
+        all_ids = [event_id for event_id, _ in job.events]
+        resumed = [i async for i in manager.events(job, after=all_ids[2])]
+        assert [event_id for event_id, _ in resumed] == all_ids[3:]
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_while_idle(self, manager):
+        gate = asyncio.Event()
+        job = await manager.submit(turn(gate=gate))
+        stream = manager.events(job, heartbeat=0.01)
+        items = []
+        async for item in stream:
+            items.append(item)
+            if item is None:
+                break
+        gate.set()
+        await collect(manager, job)
+        assert items[-1] is None
+
+    def test_format_sse(self):
+        text = format_sse(7, {"type": "token", "content": "é\nx"})
+        lines = text.split("\n")
+        assert lines[0] == "id: 7"
+        assert lines[1] == "event: token"
+        assert json.loads(lines[2].removeprefix("data: ")) == {"type": "token", "content": "é\nx"}
+        assert text.endswith("\n\n")
+
+
+class TestLifecycle:
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self, manager):
+        cleaned = asyncio.Event()
+
+        async def run(sink):
+            try:
+                await asyncio.sleep(30)
+            finally:
+                cleaned.set()
+
+        job = await manager.submit(run)
+        await asyncio.sleep(0.01)
+        assert job.status == "running"
+        assert await manager.cancel(job) is True
+        assert cleaned.is_set()
+        assert job.status == "cancelled"
+        assert not await manager.cancel(job)
+
+        # Le worker reste disponible
+        other = await manager.submit(turn())
+        await collect(manager, other)
+        assert other.status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_job_is_skipped(self, manager):
+        gate = asyncio.Event()
+        first = await manager.submit(turn(gate=gate))
+        calls = []
+
+        async def run(sink):
+            calls.append(1)
+            return {}
+
+        queued = await manager.submit(run)
+        await manager.cancel(queued)
+        gate.set()
+        await collect(manager, first)
+        await asyncio.sleep(0.01)
+        assert queued.status == "cancelled"
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_results_expire(self, manager):
+        manager.ttl = 0
+        job = await manager.submit(turn())
+        await collect(manager, job)
+        assert manager.get(job.id) is None
+
+    @pytest.mark.asyncio
+    async def test_owner_isolation(self, manager):
+        job = await manager.submit(turn(), owner="alice")
+        assert manager.get(job.id, owner="alice") is job
+        assert manager.get(job.id, owner="bob") is None
+        await collect(manager, job)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le budget de tokens de la boucle ReAct
+"""
+
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_budget import ContextBudget, count_message_tokens, estimate_tokens
+
+
+def build_history(turns: int, observe_chars: int = 2000) -> list[dict]:
+    """Historique ReAct: système, question, puis `turns` tours ACTION/OBSERVE"""
+    messages = [
+        {"role": "system", "content": "S" * 4000},
+        {"role": "user", "content": "Vérifie l'état des conteneurs"},
+    ]
+    for i in range(turns):
+        messages.append(
+            {
+                "role": "assistant",
+                "content": f"THINK: étape {i} {'x' * 300}\nPLAN: ...\nACTION: outil_{i}()",
+            }
+        )
+        messages.append(
+            {"role": "user", "content": f"OBSERVE: résultat {i} " + "y" * observe_chars}
+        )
+    return messages
+
+
+class TestEstimation:
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+    def test_count_includes_overhead(self):
+        assert count_message_tokens([{"role": "user", "content": "abcd"}]) == 5
+
+
+class TestContextBudget:
+    """Tests pour ContextBudget.compact"""
+
+    def test_under_budget_untouched(self):
+        messages = build_history(2)
+        original = [dict(m) for m in messages]
+        budget = ContextBudget(budget=100000, keep_turns=1, summary_chars=100)
+
+        tokens = budget.compact(messages)
+
+        assert messages == original
+        assert tokens == count_message_tokens(messages)
+        assert budget.stats.tokens_per_iteration == [tokens]
+
+    def test_compacts_old_turns_keeps_recent(self):
+        messages = build_history(8)
+        budget = ContextBudget(budget=3000, keep_turns=2, summary_chars=100)
+
+        tokens = budget.compact(messages)
+
+        assert tokens <= 3000
+        assert tokens == count_message_tokens(messages)
+        # Système et question intacts
+        assert messages[0]["content"] == "S" * 4000
+        assert messages[1]["content"] == "Vérifie l'état des conteneurs"
+        # Ancien tour réduit à l'ACTION + résumé
+        assert messages[2]["content"] == "ACTION: outil_0()"
+        assert messages[3]["content"].startswith("OBSERVE (résumé): résultat 0")
+        assert len(messages[3]["content"]) < 150
+        # Deux derniers tours verbatim
+        assert messages[-1]["content"].endswith("y" * 2000)
+        assert messages[-3]["content"].endswith("y" * 2000)
+        assert budget.stats.saved_tokens > 0
+
+    def test_compaction_is_stable_across_iterations(self):
+        messages = build_history(6)
+        budget = ContextBudget(budget=3000, keep_turns=2, summary_chars=100)
+        budget.compact(messages)
+        prefix = [dict(m) for m in messages]
+        compacted = budget.stats.compacted_turns
+
+        messages.append({"role": "assistant", "content": "ACTION: encore()"})
+        messages.append({"role": "user", "content": "OBSERVE: " + "z" * 2000})
+        budget.compact(messages)
+
+        # Les tours déjà compactés ne changent plus
+        assert messages[: 2 + 2 * compacted] == prefix[: 2 + 2 * compacted]
+        assert len(budget.stats.tokens_per_iteration) == 2
+
+    def test_tokens_bounded_over_long_loop(self):
+        budget = ContextBudget(budget=4000, keep_turns=2, summary_chars=100)
+        messages = build_history(0)
+        for i in range(30):
+            messages.append({"role": "assistant", "content": f"THINK: ...\nACTION: outil_{i}()"})
+            messages.append({"role": "user", "content": "OBSERVE: " + "r" * 2000})
+            budget.compact(messages)
+
+        assert max(budget.stats.tokens_per_iteration) <= 4000
+
+    def test_non_observe_user_message_shortened(self):
+        budget = ContextBudget(budget=1, keep_turns=0, summary_chars=20)
+        messages = [
+            {"role": "system", "content": "s"},
+            {"role": "user", "content": "q"},
+            {"role": "assistant", "content": "pas d'action " * 10},
+            {"role": "user", "content": "⚠️ FORMAT INCORRECT. " * 10},
+        ]
+        budget.compact(messages)
+        assert len(messages[2]["content"]) <= 21
+        assert len(messages[3]["content"]) <= 21
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
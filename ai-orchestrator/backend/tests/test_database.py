@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'accès SQLite hors boucle (utils/database.py)
+"""
+
+import asyncio
+import io
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database, decode_cursor, encode_cursor
+
+
+def create_table(conn):
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+
+
+@pytest.fixture
+async def db(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    await database.transaction(create_table)
+    yield database
+    await database.close()
+
+
+class TestDatabase:
+    @pytest.mark.asyncio
+    async def test_pragmas(self, db):
+        mode = await db.fetchone("PRAGMA journal_mode")
+        assert mode["journal_mode"] == "wal"
+        sync = await db.fetchone("PRAGMA synchronous")
+        assert sync["synchronous"] == 1  # NORMAL
+
+    @pytest.mark.asyncio
+    async def test_rows_as_dicts(self, db):
+        await db.execute("INSERT INTO items (name) VALUES (?)", ("a",))
+        assert await db.fetchall("SELECT * FROM items") == [{"id": 1, "name": "a"}]
+        assert await db.fetchone("SELECT * FROM items WHERE id = ?", (2,)) is None
+
+    @pytest.mark.asyncio
+    async def test_queries_run_off_the_event_loop(self, db):
+        def thread_name(conn):
+            return threading.current_thread().name
+
+        assert (await db.transaction(thread_name)).startswith("sqlite")
+
+    @pytest.mark.asyncio
+    async def test_connections_reused(self, db):
+        for i in range(20):
+            await db.execute("INSERT INTO items (name) VALUES (?)", (str(i),))
+        assert db.stats["connections"] <= 2
+        assert db.stats["writes"] == 21
+
+    @pytest.mark.asyncio
+    async def test_transaction_rolled_back_on_error(self, db):
+        def failing(conn):
+            conn.execute("INSERT INTO items (name) VALUES ('x')")
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await db.transaction(failing)
+        assert await db.fetchall("SELECT * FROM items") == []
+        assert db.stats["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writers(self, db):
+        await asyncio.gather(
+            *[db.execute("INSERT INTO items (name) VALUES (?)", (str(i),)) for i in range(50)]
+        )
+        row = await db.fetchone("SELECT COUNT(*) AS n FROM items")
+        assert row["n"] == 50
+
+    @pytest.mark.asyncio
+    async def test_integrity_error_propagates(self, db):
+        await db.execute("INSERT INTO items (id, name) VALUES (1, 'a')")
+        with pytest.raises(sqlite3.IntegrityError):
+            await db.execute("INSERT INTO items (id, name) VALUES (1, 'b')")
+
+    @pytest.mark.asyncio
+    async def test_reopens_after_close(self, db):
+        await db.execute("INSERT INTO items (name) VALUES ('a')")
+        await db.close()
+        assert db.stats["connections"] == 0
+        assert len(await db.fetchall("SELECT * FROM items")) == 1
+
+
+def add_column(conn):
+    conn.execute("ALTER TABLE items ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+
+
+class TestMigrate:
+    @pytest.mark.asyncio
+    async def test_applies_pending_migrations_once(self, tmp_path):
+        db = Database(str(tmp_path / "m.db"))
+        assert await db.migrate([create_table]) == 1
+        assert await db.migrate([create_table, add_column]) == 2
+        assert await db.migrate([create_table, add_column]) == 2
+        await db.execute("INSERT INTO items (name, size) VALUES ('a', 3)")
+        assert (await db.fetchone("PRAGMA user_version"))["user_version"] == 2
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_migration_not_recorded(self, tmp_path):
+        def broken(conn):
+            conn.execute("ALTER TABLE items ADD COLUMN size INTEGER")
+            raise RuntimeError("boom")
+
+        db = Database(str(tmp_path / "m.db"))
+        with pytest.raises(RuntimeError):
+            await db.migrate([create_table, broken])
+        assert (await db.fetchone("PRAGMA user_version"))["user_version"] == 1
+        # La colonne ajoutée a été annulée avec la migration
+        assert await db.migrate([create_table, add_column]) == 2
+        await db.close()
+
+
+class TestCursor:
+    def test_round_trip(self):
+        cursor = encode_cursor("2025-01-01 12:00:00", "abc")
+        assert decode_cursor(cursor, 2) == ["2025-01-01 12:00:00", "abc"]
+
+    @pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor("a"), encode_cursor()])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 2)
+
+
+class TestDeleteConversation:
+    """delete_conversation (main.py) sur une base migrée: messages, uploads, fichiers"""
+
+    @pytest.fixture
+    def main(self, tmp_path, monkeypatch):
+        pytest.importorskip("chromadb")
+        import utils.database
+        import utils.history_search
+        import utils.upload_store
+        import utils.write_behind
+
+        monkeypatch.chdir(tmp_path)  # data/ (DB_PATH, UPLOAD_DIR, auth) dans tmp_path
+        for module, name in (
+            (utils.database, "_database"),
+            (utils.history_search, "_history_search"),  # init_db le marque prêt
+            (utils.upload_store, "_upload_store"),
+            (utils.write_behind, "_message_writer"),
+        ):
+            monkeypatch.setattr(module, name, None)  # Singletons restaurés après le test
+        import main
+
+        main.open_database(str(tmp_path / "orchestrator.db"))
+        main.open_upload_store(str(tmp_path / "uploads"))
+        return main
+
+    @pytest.mark.asyncio
+    async def test_deletes_messages_uploads_and_files(self, main, tmp_path):
+        from starlette.datastructures import UploadFile
+
+        db = main.get_database()
+        await main.init_db()
+        conv = await main.create_conversation("à supprimer")
+        other = await main.create_conversation("à garder")
+        await main.add_message(conv, "user", "bonjour")
+        await main.add_message(conv, "assistant", "salut", "m")
+        await main.add_message(other, "user", "garder")
+        own = await main.save_upload(UploadFile(io.BytesIO(b"log"), filename="a.log"), conv)
+        shared = await main.save_upload(UploadFile(io.BytesIO(b"png"), filename="a.png"), conv)
+        await main.save_upload(UploadFile(io.BytesIO(b"png"), filename="b.png"), other)
+        legacy = tmp_path / "legacy.txt"
+        legacy.write_text("ancien upload")
+        await db.execute(
+            "INSERT INTO uploads (id, filename, filepath, conversation_id) VALUES (?, ?, ?, ?)",
+            ("legacy", "legacy.txt", str(legacy), conv),
+        )
+        own_path = (await main.get_upload_info(own["id"]))["filepath"]
+        shared_path = (await main.get_upload_info(shared["id"]))["filepath"]
+
+        try:
+            await main.delete_conversation(conv)
+
+            messages = await db.fetchall(
+                "SELECT * FROM messages WHERE conversation_id = ?", (conv,)
+            )
+            uploads = await db.fetchall("SELECT * FROM uploads WHERE conversation_id = ?", (conv,))
+            assert messages == [] and uploads == []
+            assert await db.fetchone("SELECT * FROM conversations WHERE id = ?", (conv,)) is None
+            assert not os.path.exists(own_path) and not legacy.exists()
+            assert os.path.exists(shared_path)  # Encore référencé par l'autre conversation
+            assert len(await main.get_conversation_messages(other)) == 1
+        finally:
+            await main.get_message_writer().close()
+            await db.close()
+
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,929 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le moteur ReAct (parsing, streaming)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from engine import (
+    StreamingActionParser,
+    _chat_completion,
+    execute_actions,
+    extract_action,
+    extract_actions,
+    extract_final_answer,
+    interpret_reply,
+    react_loop,
+)
+from model_router import ModelRouter
+from prompts import build_static_prompt
+from tool_calling import OUTCOMES
+from tools import get_tools_description
+from utils.llm_scheduler import llm_context
+from utils.ollama_client import OllamaClientPool
+
+
+def feed_by_chunks(parser: StreamingActionParser, text: str, size: int = 3) -> int | None:
+    """Alimente le parser par morceaux; retourne l'index du morceau complétant l'appel"""
+    for n, i in enumerate(range(0, len(text), size)):
+        if parser.feed(text[i : i + size]):
+            return n
+    return None
+
+
+class TestStreamingActionParser:
+    """Tests pour le parser incrémental"""
+
+    def test_detects_simple_action(self):
+        parser = StreamingActionParser()
+        text = "THINK: vérifier\nPLAN: docker\nACTION: docker_status()\nOBSERVE: ..."
+        feed_by_chunks(parser, text)
+        assert parser.complete
+        assert parser.tool_name == "docker_status"
+        assert parser.call_text.endswith("docker_status()")
+
+    def test_not_complete_before_closing_paren(self):
+        parser = StreamingActionParser()
+        parser.feed("ACTION: read_file(path='/etc/hos")
+        assert not parser.complete
+        parser.feed("tname')")
+        assert parser.complete
+        assert extract_action(parser.call_text) == ("read_file", {"path": "/etc/hostname"})
+
+    def test_parens_inside_quotes_ignored(self):
+        parser = StreamingActionParser()
+        feed_by_chunks(parser, 'ACTION: execute_command(command="echo (a) )")\nsuite', size=2)
+        assert parser.complete
+        assert parser.call_text.endswith('echo (a) )")')
+
+    def test_final_answer_triple_quotes_split_tokens(self):
+        parser = StreamingActionParser()
+        text = "THINK: fini\nACTION: final_answer(answer='''\n## Réponse directe\nOK (fait)\n''')\nbla"
+        feed_by_chunks(parser, text, size=1)
+        assert parser.complete
+        assert parser.is_final
+        assert extract_final_answer(parser.call_text) == "## Réponse directe\nOK (fait)"
+
+    def test_bare_final_answer(self):
+        parser = StreamingActionParser()
+        feed_by_chunks(parser, 'final_answer(answer="Bonjour")')
+        assert parser.complete
+        assert parser.is_final
+
+    def test_final_answer_mention_without_answer_is_ignored(self):
+        parser = StreamingActionParser()
+        parser.feed("THINK: je conclurai avec final_answer() plus tard.\n")
+        assert not parser.complete
+
+    def test_no_call(self):
+        parser = StreamingActionParser()
+        feed_by_chunks(parser, "THINK: rien à faire\nPLAN: attendre")
+        assert not parser.complete
+        assert parser.call_text == parser.text
+
+    def test_batch_of_actions(self):
+        parser = StreamingActionParser(max_calls=5)
+        text = "PLAN: en parallèle\nACTION: docker_status()\nACTION: disk_usage(path='/')\nOBSERVE: x"
+        n = feed_by_chunks(parser, text, size=2)
+        assert n is not None
+        assert parser.finished
+        assert parser.tool_names == ["docker_status", "disk_usage"]
+        assert parser.call_text.endswith("disk_usage(path='/')")
+
+    def test_batch_waits_for_next_line(self):
+        parser = StreamingActionParser(max_calls=5)
+        assert not parser.feed("ACTION: docker_status()")
+        assert not parser.feed("\nACT")
+        assert parser.complete and not parser.finished
+        assert not parser.feed("ION: git_status()")
+        assert parser.feed("\nfin")
+        assert parser.tool_names == ["docker_status", "git_status"]
+
+    def test_batch_limited_by_max_calls(self):
+        parser = StreamingActionParser(max_calls=2)
+        feed_by_chunks(parser, "ACTION: a()\nACTION: b()\nACTION: c()")
+        assert parser.tool_names == ["a", "b"]
+        assert parser.call_text.endswith("b()")
+
+    def test_final_answer_closes_batch(self):
+        parser = StreamingActionParser(max_calls=5)
+        assert parser.feed("ACTION: final_answer(answer='ok')")
+        assert parser.finished and parser.is_final
+
+
+class TestExtractActions:
+    """Tests pour l'extraction multi-actions"""
+
+    def test_multiple_lines(self):
+        text = "THINK: x\nACTION: docker_status()\nACTION: read_file(path=\"/etc/hosts\")"
+        assert extract_actions(text) == [
+            ("docker_status", {}),
+            ("read_file", {"path": "/etc/hosts"}),
+        ]
+        assert extract_action(text) == ("docker_status", {})
+
+    def test_duplicates_and_final_answer_ignored(self):
+        text = "ACTION: git_status()\nACTION: git_status()\nACTION: final_answer(answer='x')"
+        assert extract_actions(text) == [("git_status", {})]
+
+    def test_limit(self):
+        text = "\n".join(f"ACTION: outil_{i}()" for i in range(10))
+        assert len(extract_actions(text, limit=3)) == 3
+
+    def test_bare_call_fallback(self):
+        assert extract_actions("THINK: x\nsystem_info()") == [("system_info", {})]
+
+
+def ollama_stream(tokens: list[str]) -> bytes:
+    lines = [json.dumps({"message": {"content": t}, "done": False}) for t in tokens]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+    return "\n".join(lines).encode()
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.events = []
+
+    async def send_json(self, data):
+        self.events.append(data)
+
+
+ROUTER_CATALOG = {
+    "local": {"model": "local:32b", "category": "code", "local": True},
+    "cloud": {"model": "cloud-a", "category": "cloud", "local": False},
+}
+
+
+def use_mock_ollama(monkeypatch, handler) -> OllamaClientPool:
+    """Remplace le pool Ollama (transport simulé) et le routeur (état vierge) du moteur"""
+    pool = OllamaClientPool(transport=httpx.MockTransport(handler))
+    router = ModelRouter(ROUTER_CATALOG)
+    monkeypatch.setattr(engine, "get_ollama_pool", lambda: pool)
+    monkeypatch.setattr(engine, "get_model_router", lambda: router)
+    return pool
+
+
+class TestChatCompletion:
+    """Tests pour l'appel /api/chat en streaming"""
+
+    @pytest.mark.asyncio
+    async def test_streams_tokens_to_websocket(self, monkeypatch):
+        tokens = ["THINK: ok\n", "ACTION: system", "_info()", "\n"]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert json.loads(request.content)["stream"] is True
+            return httpx.Response(200, content=ollama_stream(tokens))
+
+        ws = FakeWebSocket()
+        use_mock_ollama(monkeypatch, handler)
+        r, parser = await _chat_completion("m", [], ws)
+
+        assert r.status_code == 200
+        assert parser.tool_name == "system_info"
+        assert parser.call_text == "".join(tokens[:3])
+        # Lot encore ouvert (une autre ACTION pourrait suivre): tout est relayé
+        assert [e["content"] for e in ws.events if e["type"] == "token"] == tokens
+
+    @pytest.mark.asyncio
+    async def test_aborts_stream_after_complete_action(self, monkeypatch):
+        tokens = ["ACTION: docker_status()", "\nOBSERVE: inventé", " par le modèle", "..."]
+        ws = FakeWebSocket()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=ollama_stream(tokens))
+
+        use_mock_ollama(monkeypatch, handler)
+        _, parser = await _chat_completion("m", [], ws)
+
+        assert parser.aborted
+        assert parser.call_text == "ACTION: docker_status()"
+        # Aucun token relayé après l'appel complet
+        assert [e["content"] for e in ws.events] == tokens[:1]
+
+    @pytest.mark.asyncio
+    async def test_no_abort_when_disabled(self, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_ABORT_ON_ACTION", False)
+        tokens = ["ACTION: docker_status()", "\nsuite"]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=ollama_stream(tokens))
+
+        use_mock_ollama(monkeypatch, handler)
+        _, parser = await _chat_completion("m", [])
+
+        assert not parser.aborted
+        assert parser.text == "".join(tokens)
+
+    @pytest.mark.asyncio
+    async def test_payload_pins_keep_alive_and_num_ctx(self, monkeypatch):
+        payloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payloads.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream(["ok"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        await _chat_completion("m", [])
+
+        assert payloads[0]["keep_alive"] == engine.LLM_KEEP_ALIVE
+        assert payloads[0]["options"]["num_ctx"] == engine.LLM_NUM_CTX
+
+    @pytest.mark.asyncio
+    async def test_timings_from_ollama_counters(self, monkeypatch):
+        final = {
+            "message": {"content": ""},
+            "done": True,
+            "prompt_eval_count": 120,
+            "prompt_eval_duration": 300_000_000,
+            "eval_count": 40,
+            "eval_duration": 2_000_000_000,
+            "load_duration": 5_000_000,
+            "total_duration": 2_400_000_000,
+        }
+        body = "\n".join(
+            [json.dumps({"message": {"content": "THINK: rien"}, "done": False}), json.dumps(final)]
+        ).encode()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=body)
+
+        use_mock_ollama(monkeypatch, handler)
+        _, parser = await _chat_completion("m", [])
+
+        assert parser.timings.source == "ollama"
+        assert parser.timings.prompt_tokens == 120
+        assert parser.timings.prompt_eval_ms == 300
+        assert parser.timings.eval_ms == 2000
+        assert parser.timings.tokens_per_second == 20
+
+    @pytest.mark.asyncio
+    async def test_timings_estimated_when_aborted(self, monkeypatch):
+        tokens = ["ACTION: docker_status()", "\nOBSERVE: inventé"]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=ollama_stream(tokens))
+
+        use_mock_ollama(monkeypatch, handler)
+        _, parser = await _chat_completion("m", [])
+
+        assert parser.aborted
+        assert parser.timings.source == "client"
+        assert parser.timings.eval_tokens == 2
+        assert parser.timings.prompt_tokens is None
+
+    @pytest.mark.asyncio
+    async def test_error_status_returns_empty(self, monkeypatch):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(429, json={"error": "busy"})
+
+        use_mock_ollama(monkeypatch, handler)
+        r, parser = await _chat_completion("m", [])
+
+        assert r.status_code == 429
+        assert parser.text == ""
+
+    @pytest.mark.asyncio
+    async def test_non_streaming_mode(self, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_STREAMING", False)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert json.loads(request.content)["stream"] is False
+            return httpx.Response(200, json={"message": {"content": "ACTION: git_status()"}})
+
+        use_mock_ollama(monkeypatch, handler)
+        r, parser = await _chat_completion("m", [])
+
+        assert parser.complete
+        assert parser.tool_name == "git_status"
+
+
+class TestChatWithFailover:
+    """Tests pour la bascule pilotée par le routeur"""
+
+    @pytest.mark.asyncio
+    async def test_fails_over_without_sleep(self, monkeypatch):
+        async def no_sleep(*args, **kwargs):
+            raise AssertionError("pause aveugle interdite")
+
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            model = json.loads(request.content)["model"]
+            seen.append(model)
+            if model == "cloud-a":
+                return httpx.Response(429, json={"error": "rate limited"})
+            return httpx.Response(200, content=ollama_stream(["ACTION: git_status()"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        ws = FakeWebSocket()
+        used, parser = await engine._chat_with_failover("cloud-a", "operational", [], ws)
+
+        assert used == "local:32b"
+        assert seen == ["cloud-a", "local:32b"]
+        assert parser.tool_name == "git_status"
+        assert any("Bascule" in e.get("message", "") for e in ws.events)
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_routes_directly(self, monkeypatch):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(json.loads(request.content)["model"])
+            return httpx.Response(200, content=ollama_stream(["ok"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        engine.get_model_router().record_failure("cloud-a", status_code=429)
+        used, _ = await engine._chat_with_failover("cloud-a", "operational", [])
+
+        assert used == "local:32b"
+        assert seen == ["local:32b"]
+
+    @pytest.mark.asyncio
+    async def test_stream_error_counts_as_failure(self, monkeypatch):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if json.loads(request.content)["model"] == "cloud-a":
+                return httpx.Response(200, content=json.dumps({"error": "upstream"}).encode())
+            return httpx.Response(200, content=ollama_stream(["ok"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        used, _ = await engine._chat_with_failover("cloud-a", "operational", [])
+
+        assert used == "local:32b"
+        assert engine.get_model_router().stats["cloud-a"]["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_all_models_down(self, monkeypatch):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(503)
+
+        use_mock_ollama(monkeypatch, handler)
+        with pytest.raises(engine.LLMUnavailableError):
+            await engine._chat_with_failover("cloud-a", "operational", [])
+
+    @pytest.mark.asyncio
+    async def test_success_feeds_router(self, monkeypatch):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=ollama_stream(["THINK: x"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        await engine._chat_with_failover("cloud-a", "factual", [])
+
+        stats = engine.get_model_router().stats["cloud-a"]
+        assert stats["requests"] == 1
+        assert "factual" in stats["latency_by_class"]
+
+
+class TestHedgedRequests:
+    """Tests pour les requêtes doublées cloud -> local"""
+
+    @pytest.fixture
+    def hedging(self, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_HEDGE_ENABLED", True)
+        monkeypatch.setattr(engine, "LLM_HEDGE_DELAY", 0.05)
+        monkeypatch.setattr(engine, "hedge_stats", engine.HedgeStats())
+
+    @staticmethod
+    def handler_with_stall(seen: list, cancelled: list, cloud_delay: float):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            model = json.loads(request.content)["model"]
+            seen.append(model)
+            if model == "cloud-a":
+                try:
+                    await asyncio.sleep(cloud_delay)
+                except asyncio.CancelledError:
+                    cancelled.append(model)
+                    raise
+                return httpx.Response(200, content=ollama_stream(["cloud ", "answer"]))
+            return httpx.Response(200, content=ollama_stream(["local ", "answer"]))
+
+        return handler
+
+    @pytest.mark.asyncio
+    async def test_stalled_cloud_loses_to_local(self, monkeypatch, hedging):
+        seen, cancelled = [], []
+        use_mock_ollama(monkeypatch, self.handler_with_stall(seen, cancelled, 5))
+        ws = FakeWebSocket()
+
+        start = time.monotonic()
+        used, parser = await engine._chat_with_failover("cloud-a", "operational", [], ws)
+
+        assert time.monotonic() - start < 1
+        assert used == "local:32b"
+        assert parser.text == "local answer"
+        assert seen == ["cloud-a", "local:32b"]
+        assert cancelled == ["cloud-a"]
+        tokens = [e["content"] for e in ws.events if e["type"] == "token"]
+        assert tokens == ["local ", "answer"]
+        assert engine.hedge_stats.hedge_won == 1
+        # Le blocage nourrit la latence du cloud, sans échec compté
+        stats = engine.get_model_router().stats["cloud-a"]
+        assert stats["failures"] == 0
+        assert stats["latency_by_class"]["operational"] >= 50
+
+    @pytest.mark.asyncio
+    async def test_fast_cloud_not_hedged(self, monkeypatch, hedging):
+        seen, cancelled = [], []
+        use_mock_ollama(monkeypatch, self.handler_with_stall(seen, cancelled, 0))
+
+        used, parser = await engine._chat_with_failover("cloud-a", "operational", [])
+
+        assert used == "cloud-a"
+        assert seen == ["cloud-a"]
+        assert engine.hedge_stats.hedged == 0
+
+    @pytest.mark.asyncio
+    async def test_cloud_failure_during_race_keeps_local(self, monkeypatch, hedging):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            model = json.loads(request.content)["model"]
+            if model == "cloud-a":
+                await asyncio.sleep(0.1)
+                return httpx.Response(502)
+            await asyncio.sleep(0.2)
+            return httpx.Response(200, content=ollama_stream(["local"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        used, parser = await engine._chat_with_failover("cloud-a", "operational", [])
+
+        assert used == "local:32b"
+        assert engine.get_model_router().stats["cloud-a"]["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_background_and_disabled_never_hedge(self, monkeypatch, hedging):
+        seen, cancelled = [], []
+        use_mock_ollama(monkeypatch, self.handler_with_stall(seen, cancelled, 0.1))
+
+        with llm_context(priority="background"):
+            used, _ = await engine._chat_with_failover("cloud-a", "operational", [])
+        assert used == "cloud-a"
+
+        monkeypatch.setattr(engine, "LLM_HEDGE_ENABLED", False)
+        used, _ = await engine._chat_with_failover("cloud-a", "operational", [])
+        assert used == "cloud-a"
+        assert seen == ["cloud-a", "cloud-a"]
+
+
+class TestFactualFastPath:
+    """Tests pour le chemin rapide des questions factuelles"""
+
+    QUESTION = "Qu'est-ce qu'un reverse proxy en général ?"
+
+    @pytest.fixture(autouse=True)
+    def no_answer_cache(self, monkeypatch):
+        monkeypatch.setattr(engine, "ANSWER_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "FACTUAL_FAST_PATH", True)
+
+    @pytest.mark.asyncio
+    async def test_single_call_without_tool_catalog(self, monkeypatch):
+        from prompts import get_factual_prompt
+
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(
+                200, content=ollama_stream(["ACTION: final_answer(answer='Un relais HTTP.')"])
+            )
+
+        async def no_tool(name, params, uploaded_files=None):
+            raise AssertionError("aucun outil sur le chemin rapide")
+
+        use_mock_ollama(monkeypatch, handler)
+        before = sum(
+            s["count"] for s in engine.ANSWER_LATENCY.snapshot() if s["labels"]["path"] == "fast"
+        )
+        ws = FakeWebSocket()
+        answer = await react_loop(self.QUESTION, "m", "conv", no_tool, websocket=ws)
+
+        assert answer == "Un relais HTTP."
+        assert len(requests) == 1
+        assert requests[0]["messages"][0]["content"] == get_factual_prompt()
+        complete = ws.events[-1]
+        assert complete["type"] == "complete"
+        assert complete["fast_path"] is True
+        assert complete["iterations"] == 1
+        after = sum(
+            s["count"] for s in engine.ANSWER_LATENCY.snapshot() if s["labels"]["path"] == "fast"
+        )
+        assert after == before + 1
+
+    @pytest.mark.asyncio
+    async def test_plain_text_answer_accepted(self, monkeypatch):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=ollama_stream(["Un relais ", "HTTP."]))
+
+        use_mock_ollama(monkeypatch, handler)
+        answer = await react_loop(self.QUESTION, "m", "conv", None)
+        assert answer == "Un relais HTTP."
+
+    @pytest.mark.asyncio
+    async def test_empty_answer_falls_back_to_react(self, monkeypatch):
+        replies = ["", "ACTION: final_answer(answer='via ReAct')"]
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream([replies[len(requests) - 1]]))
+
+        async def no_memory(name, params, uploaded_files=None):
+            return "Aucun souvenir"
+
+        use_mock_ollama(monkeypatch, handler)
+        assert await react_loop(self.QUESTION, "m", "conv", no_memory) == "via ReAct"
+        assert len(requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_uses_react_loop(self, monkeypatch):
+        monkeypatch.setattr(engine, "FACTUAL_FAST_PATH", False)
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream(["ACTION: final_answer(answer='ok')"]))
+
+        async def no_memory(name, params, uploaded_files=None):
+            return "Aucun souvenir"
+
+        use_mock_ollama(monkeypatch, handler)
+        from prompts import get_factual_prompt
+
+        await react_loop(self.QUESTION, "m", "conv", no_memory)
+        assert requests[0]["messages"][0]["content"] != get_factual_prompt()
+
+
+class TestExecuteActions:
+    """Tests pour l'exécution parallèle des ACTIONs d'un tour"""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_parallel_and_keeps_order(self):
+        running, peak = 0, 0
+
+        async def fake_tool(name, params, uploaded_files=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05 if name == "docker_status" else 0.01)
+            running -= 1
+            return f"ok {name}"
+
+        actions = [("docker_status", {}), ("disk_usage", {}), ("git_status", {})]
+        results = await execute_actions(actions, fake_tool)
+
+        assert results == ["ok docker_status", "ok disk_usage", "ok git_status"]
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self, monkeypatch):
+        monkeypatch.setattr(engine, "MAX_PARALLEL_TOOLS", 2)
+        running, peak = 0, 0
+
+        async def fake_tool(name, params, uploaded_files=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "ok"
+
+        await execute_actions([(f"t{i}", {}) for i in range(5)], fake_tool)
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_mutating_tool_is_serialized(self):
+        running, peak = 0, 0
+
+        async def fake_tool(name, params, uploaded_files=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "ok"
+
+        actions = [("write_file", {"path": "/tmp/a"}), ("write_file", {"path": "/tmp/b"})]
+        await execute_actions(actions, fake_tool)
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    async def test_exception_becomes_error_result(self):
+        async def fake_tool(name, params, uploaded_files=None):
+            if name == "boom":
+                raise RuntimeError("cassé")
+            return "ok"
+
+        results = await execute_actions([("boom", {}), ("system_info", {})], fake_tool)
+        assert results[0].startswith("❌ Erreur boom")
+        assert results[1] == "ok"
+
+
+class TestReactLoopMultiAction:
+    """Tests de bout en bout: plusieurs ACTIONs dans une itération"""
+
+    @pytest.mark.asyncio
+    async def test_observations_in_single_message(self, monkeypatch):
+        replies = [
+            "THINK: deux vérifications\nACTION: docker_status()\nACTION: disk_usage(path='/')\n",
+            "ACTION: final_answer(answer='tout va bien')",
+        ]
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream([replies[len(requests) - 1]]))
+
+        async def fake_tool(name, params, uploaded_files=None):
+            return f"résultat {name}"
+
+        use_mock_ollama(monkeypatch, handler)
+        ws = FakeWebSocket()
+        answer = await react_loop("Salut, ça va?", "m", "conv", fake_tool, websocket=ws)
+
+        assert answer == "tout va bien"
+        observe = requests[1]["messages"][-1]
+        assert observe["role"] == "user"
+        assert "[1] docker_status:\nrésultat docker_status" in observe["content"]
+        assert "[2] disk_usage:\nrésultat disk_usage" in observe["content"]
+        assert [e["tool"] for e in ws.events if e["type"] == "tool"] == [
+            "docker_status",
+            "disk_usage",
+        ]
+
+
+def ollama_tool_call_stream(calls: list[tuple[str, dict]], content: str = "") -> bytes:
+    """Réponse Ollama avec appels natifs (message.tool_calls) dans le dernier morceau"""
+    tool_calls = [{"function": {"name": n, "arguments": p}} for n, p in calls]
+    lines = [json.dumps({"message": {"content": content}, "done": False})] if content else []
+    lines.append(
+        json.dumps({"message": {"content": "", "tool_calls": tool_calls}, "done": True})
+    )
+    return "\n".join(lines).encode()
+
+
+class TestStructuredToolCalling:
+    """Tests pour les appels d'outils natifs/json et le repli regex"""
+
+    @pytest.fixture(autouse=True)
+    def clean_state(self, monkeypatch):
+        import tool_calling
+
+        monkeypatch.setattr(tool_calling, "_no_tool_support", set())
+        monkeypatch.setattr(engine, "ANSWER_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "FACTUAL_FAST_PATH", False)
+
+    @pytest.mark.asyncio
+    async def test_native_payload_and_tool_calls(self, monkeypatch):
+        payloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payloads.append(json.loads(request.content))
+            return httpx.Response(
+                200, content=ollama_tool_call_stream([("disk_usage", {"path": "/"})], "Je vérifie")
+            )
+
+        ws = FakeWebSocket()
+        use_mock_ollama(monkeypatch, handler)
+        _, parser = await _chat_completion("m", [], ws, tool_mode="native")
+
+        names = [t["function"]["name"] for t in payloads[0]["tools"]]
+        assert "final_answer" in names
+        assert parser.tool_mode == "native"
+        assert parser.tool_calls == [("disk_usage", {"path": "/"})]
+        assert parser.text == "Je vérifie"
+        final, actions, reply_format, history = interpret_reply(parser)
+        assert (final, actions, reply_format) == (None, [("disk_usage", {"path": "/"})], "structured")
+        assert history == "Je vérifie\nACTION: disk_usage(path='/')"
+
+    @pytest.mark.asyncio
+    async def test_model_without_tool_support_retries_as_text(self, monkeypatch):
+        payloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payload = json.loads(request.content)
+            payloads.append(payload)
+            if "tools" in payload:
+                return httpx.Response(400, json={"error": "m does not support tools"})
+            return httpx.Response(200, content=ollama_stream(["ACTION: docker_status()"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        r, parser, error = await engine._attempt("m", [], tool_mode="native")
+        assert r.status_code == 200 and not error
+        assert parser.tool_mode == "text"
+        assert parser.tool_name == "docker_status"
+
+        await engine._attempt("m", [], tool_mode="native")
+        assert ["tools" in p for p in payloads] == [True, False, False]  # Mémorisé
+
+    @pytest.mark.asyncio
+    async def test_json_mode_not_relayed_and_parsed(self, monkeypatch):
+        reply = json.dumps(
+            {"thought": "fini", "actions": [{"tool": "final_answer", "params": {"answer": "42"}}]}
+        )
+        payloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payloads.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream([reply[:10], reply[10:]]))
+
+        ws = FakeWebSocket()
+        use_mock_ollama(monkeypatch, handler)
+        _, parser = await _chat_completion("m", [], ws, tool_mode="json")
+
+        assert payloads[0]["format"]["required"] == ["thought", "actions"]
+        assert not [e for e in ws.events if e["type"] == "token"]
+        assert interpret_reply(parser)[:3] == ("42", [], "structured")
+
+    @pytest.mark.asyncio
+    async def test_react_loop_counts_formats_per_model(self, monkeypatch):
+        from tool_calling import REPLY_FORMAT
+
+        monkeypatch.setattr(engine, "LLM_TOOL_CALLING", "native")
+        replies = [
+            ollama_tool_call_stream([("docker_status", {})]),
+            ollama_stream(["Voici"]),  # Ni appel natif ni ACTION: itération perdue
+            ollama_stream(["ACTION: final_answer(answer='ok')"]),  # Repli regex
+        ]
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=replies[len(requests) - 1])
+
+        async def fake_tool(name, params, uploaded_files=None):
+            return "résultat"
+
+        use_mock_ollama(monkeypatch, handler)
+        before = {o: REPLY_FORMAT.value(model="m", mode="native", outcome=o) for o in OUTCOMES}
+        assert await react_loop("Salut, ça va?", "m", "conv", fake_tool) == "ok"
+        after = {o: REPLY_FORMAT.value(model="m", mode="native", outcome=o) for o in OUTCOMES}
+
+        assert {o: after[o] - before[o] for o in OUTCOMES} == {
+            "structured": 1,
+            "regex": 1,
+            "failure": 1,
+        }
+        history = requests[1]["messages"]
+        assert history[-2] == {"role": "assistant", "content": "ACTION: docker_status()"}
+        assert all("tools" in r for r in requests)
+
+    @pytest.mark.asyncio
+    async def test_fast_path_never_sends_tools(self, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_TOOL_CALLING", "native")
+        monkeypatch.setattr(engine, "FACTUAL_FAST_PATH", True)
+        payloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payloads.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream(["Paris."]))
+
+        use_mock_ollama(monkeypatch, handler)
+        question = TestFactualFastPath.QUESTION
+        assert await react_loop(question, "m", "conv", None) == "Paris."
+        assert len(payloads) == 1 and "tools" not in payloads[0]
+
+
+class TestToolSelection:
+    """Tests pour la sélection des outils dans le prompt système"""
+
+    @pytest.fixture(autouse=True)
+    def selector(self, monkeypatch):
+        from tests.test_tool_selector import keyword_embed
+        from utils.tool_selector import ToolSelector
+
+        selector = ToolSelector(top_k=4, core=["final_answer"], embed=keyword_embed())
+        monkeypatch.setattr(engine, "get_tool_selector", lambda: selector)
+        monkeypatch.setattr(engine, "ANSWER_CACHE_ENABLED", False)
+        return selector
+
+    @pytest.mark.asyncio
+    async def test_prompt_lists_selection_and_expands(self, monkeypatch):
+        replies = ["ACTION: git_status()", "ACTION: final_answer(answer='ok')"]
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream([replies[len(requests) - 1]]))
+
+        async def fake_tool(name, params, uploaded_files=None):
+            return "résultat"
+
+        use_mock_ollama(monkeypatch, handler)
+        ws = FakeWebSocket()
+        question = "Redémarre le conteneur docker nginx"
+        assert await react_loop(question, "m", "conv", fake_tool, websocket=ws) == "ok"
+
+        first, second = (r["messages"][0]["content"] for r in requests)
+        assert "- docker_restart(" in first
+        assert "- gmail_send(" not in first and "- git_status(" not in first
+        assert "- git_status(" in second  # Ajouté à la demande du modèle
+        # Extension: seule la partie volatile change, le préfixe statique reste en cache
+        static = build_static_prompt(get_tools_description(["final_answer"]))
+        assert first.startswith(static) and second.startswith(static)
+        complete = ws.events[-1]
+        assert complete["tool_selection"]["expanded"] == ["git_status"]
+        assert complete["tool_selection"]["selected"] == 6
+        # Prompt plus petit que le seul catalogue complet
+        full_catalog = [{"role": "system", "content": get_tools_description()}]
+        assert complete["system_prompt_tokens"] < engine.count_message_tokens(full_catalog)
+
+    @pytest.mark.asyncio
+    async def test_static_prefix_independent_of_selection(self, monkeypatch):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream(["ACTION: final_answer(answer='ok')"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        await react_loop("Redémarre le conteneur docker nginx", "m", "conv", None)
+        await react_loop("Envoie un email gmail", "m", "conv", None)
+        first, second = (r["messages"][0]["content"] for r in requests)
+        static = build_static_prompt(get_tools_description(["final_answer"]))
+        assert first.startswith(static) and second.startswith(static)
+        assert "- docker_restart(" in first[len(static) :]
+        assert "- gmail_send(" in second[len(static) :]
+
+    @pytest.mark.asyncio
+    async def test_native_tools_follow_selection(self, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_TOOL_CALLING", "native")
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream(["final_answer(answer='ok')"]))
+
+        use_mock_ollama(monkeypatch, handler)
+        await react_loop("Liste les conteneurs docker", "m", "conv", None)
+        names = sorted(t["function"]["name"] for t in requests[0]["tools"])
+        assert len(names) == 5 and "final_answer" in names
+        assert all(n.startswith("docker_") for n in names if n != "final_answer")
+
+
+def observed(h, **labels) -> int:
+    """Nombre de mesures d'un histogramme pour un jeu de labels"""
+    return sum(s["count"] for s in h.snapshot() if s["labels"] == labels)
+
+
+class TestRequestMetrics:
+    """Tests pour les histogrammes exportés sur /metrics"""
+
+    @pytest.mark.asyncio
+    async def test_react_loop_observes_histograms(self, monkeypatch):
+        from prompts import classify_query
+
+        question = "Salut, ça va?"
+        query_class = classify_query(question)
+        replies = [
+            "ACTION: docker_status()",
+            "ACTION: final_answer(answer='ok')",
+        ]
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=ollama_stream([replies[len(requests) - 1]]))
+
+        async def fake_tool(name, params, uploaded_files=None):
+            return "résultat"
+
+        use_mock_ollama(monkeypatch, handler)
+        labels = {
+            "LLM_PROMPT_EVAL": {"model": "m", "query_class": query_class},
+            "LLM_GENERATION": {"model": "m", "query_class": query_class},
+            "TOOL_LATENCY": {"tool": "docker_status", "query_class": query_class},
+            "REACT_ITERATIONS": {"model": "m", "query_class": query_class},
+            "WS_SEND_LATENCY": {"event": "complete"},
+        }
+        before = {
+            name: observed(getattr(engine, name), **label_set) for name, label_set in labels.items()
+        }
+
+        ws = FakeWebSocket()
+        assert await react_loop(question, "m", "conv", fake_tool, websocket=ws) == "ok"
+
+        after = {
+            name: observed(getattr(engine, name), **label_set) for name, label_set in labels.items()
+        }
+        expected = {
+            "LLM_PROMPT_EVAL": 2,
+            "LLM_GENERATION": 2,
+            "TOOL_LATENCY": 1,
+            "REACT_ITERATIONS": 1,
+            "WS_SEND_LATENCY": 1,
+        }
+        assert {name: after[name] - before[name] for name in labels} == expected
+        assert ws.events[-1]["type"] == "complete"  # Relayé par le websocket mesuré
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour la recherche plein texte dans l'historique (FTS5)
+"""
+
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from utils.history_search import (
+    HistorySearch,
+    create_messages_fts,
+    create_messages_fts_vocab,
+    match_query,
+    significant_terms,
+    terms,
+)
+
+
+def create_tables(c):
+    c.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, title TEXT)")
+    c.execute("""CREATE TABLE messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT,
+        role TEXT,
+        content TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+
+
+async def add(db, conv_id: str, role: str, content: str):
+    await db.execute(
+        "INSERT OR IGNORE INTO conversations (id, title) VALUES (?, ?)", (conv_id, conv_id)
+    )
+    await db.execute(
+        "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)",
+        (conv_id, role, content),
+    )
+
+
+@pytest.fixture
+async def db(tmp_path):
+    database = Database(str(tmp_path / "history.db"))
+    await database.migrate([create_tables, create_messages_fts, create_messages_fts_vocab])
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+def history(db):
+    search = HistorySearch(db)
+    search.ready = True
+    return search
+
+
+class TestMatchQuery:
+    def test_terms_quoted_and_last_prefixed(self):
+        assert match_query("nginx certif") == '"nginx" "certif"*'
+
+    def test_any_terms(self):
+        assert match_query("nginx docker", any_terms=True) == '"nginx" OR "docker"'
+
+    def test_fts_syntax_neutralized(self):
+        assert match_query('a" OR content:* NEAR(') == '"or" "content" "near"*'
+
+    def test_no_terms(self):
+        assert match_query("? !") is None
+
+    def test_terms_without_diacritics(self):
+        assert terms("Système système ÉTAT") == ["systeme", "etat"]
+
+    def test_stopwords_dropped(self):
+        assert significant_terms("Quelle est la mémoire du serveur ?") == ["memoire", "serveur"]
+
+
+class TestSearch:
+    @pytest.mark.asyncio
+    async def test_ranked_results_with_snippets(self, db, history):
+        await add(db, "c1", "user", "Comment renouveler le certificat nginx ?")
+        await add(db, "c1", "assistant", "Utilise certbot renew puis recharge nginx.")
+        await add(db, "c2", "user", "Liste les conteneurs docker")
+        results = await history.search("nginx")
+        assert {r["conversation_id"] for r in results} == {"c1"}
+        assert all("**nginx**" in r["snippet"].lower() for r in results)
+        assert results[0]["title"] == "c1"
+
+    @pytest.mark.asyncio
+    async def test_accents_ignored(self, db, history):
+        await add(db, "c1", "user", "état du système")
+        assert len(await history.search("etat systeme")) == 1
+
+    @pytest.mark.asyncio
+    async def test_prefix_on_last_term(self, db, history):
+        await add(db, "c1", "user", "certificat expiré")
+        assert len(await history.search("certif")) == 1
+
+    @pytest.mark.asyncio
+    async def test_filters(self, db, history):
+        await add(db, "c1", "user", "redémarrer nginx")
+        await add(db, "c1", "assistant", "nginx redémarré")
+        await add(db, "c2", "user", "nginx en erreur")
+        assert len(await history.search("nginx", conversation_id="c1")) == 2
+        assert len(await history.search("nginx", role="assistant")) == 1
+
+    @pytest.mark.asyncio
+    async def test_index_follows_updates_and_deletes(self, db, history):
+        await add(db, "c1", "user", "ancien texte")
+        await db.execute("UPDATE messages SET content = 'nouveau texte' WHERE id = 1")
+        assert await history.search("ancien") == []
+        assert len(await history.search("nouveau")) == 1
+        await db.execute("DELETE FROM messages WHERE conversation_id = 'c1'")
+        assert await history.search("nouveau") == []
+
+    @pytest.mark.asyncio
+    async def test_existing_messages_indexed_by_migration(self, tmp_path):
+        database = Database(str(tmp_path / "old.db"))
+        await database.migrate([create_tables])
+        await add(database, "c1", "user", "message déjà présent")
+        await database.migrate([create_tables, create_messages_fts, create_messages_fts_vocab])
+        assert len(await HistorySearch(database).search("present")) == 1
+        await database.close()
+
+
+class TestContext:
+    @pytest.mark.asyncio
+    async def test_past_exchange_injected(self, db, history):
+        await add(db, "old", "user", "Comment renouveler le certificat nginx du serveur ?")
+        await add(db, "old", "assistant", "certbot renew --nginx")
+        context = await history.context_for("renouveler certificat nginx", exclude_conversation="new")
+        assert "certbot renew --nginx" in context
+        assert "Q: Comment renouveler" in context
+        assert history.stats["context_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_current_conversation_excluded(self, db, history):
+        await add(db, "current", "user", "renouveler certificat nginx")
+        await add(db, "current", "assistant", "certbot renew")
+        assert await history.context_for("renouveler certificat nginx", "current") == ""
+
+    @pytest.mark.asyncio
+    async def test_weak_overlap_ignored(self, db, history):
+        await add(db, "old", "user", "installer nginx")
+        await add(db, "old", "assistant", "apt install nginx")
+        assert await history.context_for("renouveler certificat nginx expiré") == ""
+
+    @pytest.mark.asyncio
+    async def test_only_rarest_terms_queried(self, db, history):
+        for i in range(5):
+            await add(db, f"c{i}", "user", f"redémarrer le serveur {i}")
+        await add(db, "old", "user", "mémoire du serveur saturée")
+        await add(db, "old", "assistant", "free -h puis vider le cache")
+        # 2 termes, recouvrement 0.6: les deux requis, le plus rare suffit à trouver
+        assert await history._rarest_terms({"memoire", "serveur"}) == ["memoire"]
+        assert await history._rarest_terms({"memoire", "inconnu"}) == []
+        context = await history.context_for("quelle est la mémoire du serveur")
+        assert "free -h" in context
+
+    @pytest.mark.asyncio
+    async def test_question_without_answer_ignored(self, db, history):
+        await add(db, "old", "user", "renouveler certificat nginx")
+        assert await history.context_for("renouveler certificat nginx") == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'ordonnanceur global des appels LLM
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_scheduler import LLMScheduler, last_queue_wait_ms, llm_context
+
+CATALOG = {
+    "coder": {"model": "local:32b", "category": "code", "local": True},
+    "cloud": {"model": "big:480b-cloud", "category": "cloud", "local": False},
+    "embed": {"model": "bge-m3", "category": "embedding", "local": True, "chat": False},
+}
+
+
+@pytest.fixture
+def scheduler():
+    sched = LLMScheduler(CATALOG)
+    sched.enabled = True
+    sched.limits = {"local": 1, "cloud": 3, "embedding": 2}
+    return sched
+
+
+async def hold(scheduler, model, order, name, delay=0.01, **kwargs):
+    """Occupe un slot du modèle et note l'ordre de service"""
+    async with scheduler.slot(model, **kwargs):
+        order.append(name)
+        await asyncio.sleep(delay)
+
+
+class TestLimits:
+    def test_kinds_from_catalog(self, scheduler):
+        assert scheduler.kind("local:32b") == "local"
+        assert scheduler.kind("big:480b-cloud") == "cloud"
+        assert scheduler.kind("bge-m3") == "embedding"
+        assert scheduler.kind("inconnu:7b") == "local"
+        assert scheduler.kind("autre:1t-cloud") == "cloud"
+
+    def test_latest_tag_matches_bare_name(self):
+        scheduler = LLMScheduler(
+            {
+                "embed": {"model": "bge-m3:latest", "category": "embedding", "chat": False},
+                "rerank": {
+                    "model": "qllama/bge-reranker-v2-m3:latest",
+                    "category": "embedding",
+                    "chat": False,
+                },
+            }
+        )
+        assert scheduler.kind("bge-m3") == "embedding"
+        assert scheduler.kind("bge-m3:latest") == "embedding"
+        assert scheduler.kind("qllama/bge-reranker-v2-m3") == "embedding"
+        assert scheduler._queue("bge-m3") is scheduler._queue("bge-m3:latest")
+
+    @pytest.mark.asyncio
+    async def test_local_model_single_slot(self, scheduler):
+        active = {"now": 0, "peak": 0}
+
+        async def call():
+            async with scheduler.slot("local:32b"):
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                await asyncio.sleep(0.01)
+                active["now"] -= 1
+
+        await asyncio.gather(*(call() for _ in range(4)))
+        assert active["peak"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cloud_model_parallel_slots(self, scheduler):
+        active = {"now": 0, "peak": 0}
+
+        async def call():
+            async with scheduler.slot("big:480b-cloud"):
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                await asyncio.sleep(0.01)
+                active["now"] -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        assert active["peak"] == 3
+
+    @pytest.mark.asyncio
+    async def test_disabled_or_no_model_never_waits(self, scheduler):
+        async with scheduler.slot(None):
+            assert last_queue_wait_ms() == 0.0
+        scheduler.enabled = False
+        async with scheduler.slot("local:32b"):
+            async with scheduler.slot("local:32b"):
+                pass
+        assert "local:32b" not in scheduler.stats["models"]
+
+
+class TestOrdering:
+    @pytest.mark.asyncio
+    async def test_interactive_before_background(self, scheduler):
+        order = []
+        blocker = asyncio.create_task(hold(scheduler, "local:32b", order, "blocker", 0.03))
+        await asyncio.sleep(0)
+        with llm_context(priority="background", flow="self-healing"):
+            bg = asyncio.create_task(hold(scheduler, "local:32b", order, "background"))
+        await asyncio.sleep(0)
+        fg = asyncio.create_task(hold(scheduler, "local:32b", order, "interactive"))
+        await asyncio.gather(blocker, bg, fg)
+
+        assert order == ["blocker", "interactive", "background"]
+
+    @pytest.mark.asyncio
+    async def test_fair_between_flows(self, scheduler):
+        order = []
+        blocker = asyncio.create_task(hold(scheduler, "local:32b", order, "blocker", 0.02))
+        await asyncio.sleep(0)
+        tasks = []
+        for i in range(3):
+            tasks.append(asyncio.create_task(
+                hold(scheduler, "local:32b", order, f"a{i}", 0.001, flow="conv-a")
+            ))
+            await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(
+            hold(scheduler, "local:32b", order, "b0", 0.001, flow="conv-b")
+        ))
+        await asyncio.gather(blocker, *tasks)
+
+        # conv-b n'attend pas que conv-a ait vidé sa file
+        assert order.index("b0") < order.index("a2")
+
+    @pytest.mark.asyncio
+    async def test_background_promoted_after_aging(self, scheduler):
+        scheduler.aging = 0.01
+        order = []
+        blocker = asyncio.create_task(hold(scheduler, "local:32b", order, "blocker", 0.03))
+        await asyncio.sleep(0)
+        bg = asyncio.create_task(
+            hold(scheduler, "local:32b", order, "background", priority="background")
+        )
+        await asyncio.sleep(0.02)
+        fg = asyncio.create_task(hold(scheduler, "local:32b", order, "interactive"))
+        await asyncio.gather(blocker, bg, fg)
+
+        assert order == ["blocker", "background", "interactive"]
+        assert scheduler.stats["models"]["local:32b"]["promoted"] == 1
+
+    def test_unknown_priority_rejected(self):
+        with pytest.raises(ValueError):
+            with llm_context(priority="urgent"):
+                pass
+
+
+class TestCancellation:
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self, scheduler):
+        order = []
+        blocker = asyncio.create_task(hold(scheduler, "local:32b", order, "blocker", 0.02))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(scheduler, "local:32b", order, "cancelled"))
+        await asyncio.sleep(0)
+        assert scheduler.stats["queue_depth"] == 1
+        waiter.cancel()
+        await asyncio.gather(blocker, waiter, return_exceptions=True)
+
+        assert scheduler.stats["queue_depth"] == 0
+        assert scheduler.stats["models"]["local:32b"]["active"] == 0
+        await hold(scheduler, "local:32b", order, "next")
+        assert order == ["blocker", "next"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_holder_releases_slot_and_counts_gpu_time(self, scheduler):
+        order = []
+        await hold(scheduler, "local:32b", order, "warm", 0.2)  # Durée moyenne ~0.2s
+        running = asyncio.create_task(hold(scheduler, "local:32b", order, "cancelled", 5))
+        await asyncio.sleep(0.02)
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+
+        model = scheduler.stats["models"]["local:32b"]
+        assert model["active"] == 0
+        assert model["cancelled"] == 1
+        assert 0.1 < model["gpu_seconds_saved"] <= 0.2
+        await hold(scheduler, "local:32b", order, "next")
+        assert order[-1] == "next"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_cloud_call_saves_no_gpu_time(self, scheduler):
+        order = []
+        await hold(scheduler, "big:480b-cloud", order, "warm", 0.05)
+        running = asyncio.create_task(hold(scheduler, "big:480b-cloud", order, "x", 5))
+        await asyncio.sleep(0.01)
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+
+        model = scheduler.stats["models"]["big:480b-cloud"]
+        assert model["cancelled"] == 1
+        assert model["gpu_seconds_saved"] == 0.0
+
+
+class TestStats:
+    @pytest.mark.asyncio
+    async def test_queue_depth_and_wait(self, scheduler):
+        order = []
+        tasks = [
+            asyncio.create_task(hold(scheduler, "local:32b", order, str(i), 0.01))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        stats = scheduler.stats["models"]["local:32b"]
+        assert stats["active"] == 1
+        assert stats["queued"]["interactive"] == 2
+        await asyncio.gather(*tasks)
+
+        stats = scheduler.stats["models"]["local:32b"]
+        assert stats["peak_depth"] == 2
+        assert stats["granted"] == 3
+        assert stats["wait"]["interactive"]["samples"] == 3
+        assert stats["wait"]["interactive"]["max_ms"] >= 10
+
+    @pytest.mark.asyncio
+    async def test_last_wait_visible_to_caller(self, scheduler):
+        order = []
+        blocker = asyncio.create_task(hold(scheduler, "local:32b", order, "blocker", 0.02))
+        await asyncio.sleep(0)
+        async with scheduler.slot("local:32b"):
+            assert last_queue_wait_ms() >= 10
+        await blocker
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour les histogrammes de métriques internes
+"""
+
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import (
+    Counter,
+    Histogram,
+    counter,
+    current_query_class,
+    get_histograms,
+    histogram,
+    query_class_context,
+    render_prometheus,
+)
+
+
+class TestHistogram:
+    """Tests pour Histogram"""
+
+    def test_buckets_and_quantiles(self):
+        h = Histogram("t", "test", labels=("path",), buckets=(0.1, 1, 10))
+        for value in (0.05, 0.1, 0.5, 2, 20):
+            h.observe(value, path="fast")
+
+        [(labels, counts, total, count)] = h.series()
+        assert labels == {"path": "fast"}
+        assert counts == [2, 1, 1, 1]  # <=0.1, <=1, <=10, +Inf
+        assert total == pytest.approx(22.65)
+        assert count == 5
+        summary = h.snapshot()[0]
+        assert summary["p50"] == 1
+        assert summary["p99"] == float("inf")
+
+    def test_series_per_label_set(self):
+        h = Histogram("t", "test", labels=("path", "query_class"))
+        h.observe(1, path="fast", query_class="factual")
+        h.observe(1, path="react", query_class="factual")
+        assert len(h.snapshot()) == 2
+
+    def test_labels_checked(self):
+        h = Histogram("t", "test", labels=("path",))
+        with pytest.raises(ValueError):
+            h.observe(1, model="x")
+
+    def test_registry_returns_same_instance(self):
+        a = histogram("test_registry_seconds", "test", labels=("x",))
+        assert histogram("test_registry_seconds", "test", labels=("x",)) is a
+        assert get_histograms()["test_registry_seconds"] is a
+
+
+class TestCounter:
+    """Tests pour Counter"""
+
+    def test_inc_per_label_set(self):
+        c = Counter("t_total", "test", labels=("model", "outcome"))
+        c.inc(model="m", outcome="regex")
+        c.inc(2, model="m", outcome="regex")
+        c.inc(model="m", outcome="failure")
+        assert c.value(model="m", outcome="regex") == 3
+        assert c.value(model="x", outcome="regex") == 0
+        with pytest.raises(ValueError):
+            c.inc(model="m")
+
+    def test_exposition(self):
+        c = Counter("t_total", "test", labels=("model",))
+        c.inc(model="qwen")
+        assert c.exposition() == [
+            "# HELP t_total test",
+            "# TYPE t_total counter",
+            't_total{model="qwen"} 1.0',
+        ]
+        assert c.snapshot() == [{"labels": {"model": "qwen"}, "value": 1}]
+
+
+class TestPrometheusExposition:
+    """Tests pour le format texte Prometheus"""
+
+    def test_cumulative_buckets_sum_count(self):
+        h = Histogram("t_seconds", "Durée\ntest", labels=("model",), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            h.observe(value, model='qwen "cloud"')
+
+        lines = h.exposition()
+        assert lines[0] == "# HELP t_seconds Durée\\ntest"
+        assert lines[1] == "# TYPE t_seconds histogram"
+        assert lines[2:] == [
+            't_seconds_bucket{model="qwen \\"cloud\\"",le="0.1"} 1',
+            't_seconds_bucket{model="qwen \\"cloud\\"",le="1.0"} 2',
+            't_seconds_bucket{model="qwen \\"cloud\\"",le="+Inf"} 3',
+            't_seconds_sum{model="qwen \\"cloud\\""} 5.55',
+            't_seconds_count{model="qwen \\"cloud\\""} 3',
+        ]
+
+    def test_render_includes_registry(self):
+        h = histogram("test_render_seconds", "test")
+        h.observe(0.2)
+        text = render_prometheus()
+        assert text.endswith("\n")
+        assert "# TYPE test_render_seconds histogram" in text
+        assert "test_render_seconds_count 1" in text
+
+    def test_render_includes_counters(self):
+        c = counter("test_render_total", "test")
+        assert counter("test_render_total", "test") is c
+        c.inc()
+        assert "# TYPE test_render_total counter\ntest_render_total 1.0" in render_prometheus()
+
+
+class TestQueryClassContext:
+    """Tests pour le label de classe de requête courant"""
+
+    def test_context_sets_and_restores(self):
+        assert current_query_class() == "unknown"
+        with query_class_context("operational"):
+            assert current_query_class() == "operational"
+        assert current_query_class() == "unknown"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour la résidence des modèles Ollama (préchargement, épinglage)
+"""
+
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_residency import COLD_STARTS, MODEL_LOADS, ResidencyManager
+from model_router import ModelRouter
+from utils.ollama_client import OllamaClientPool
+
+CATALOG = {
+    "auto": {"model": None, "category": "auto"},
+    "local-coder": {"model": "local:32b", "category": "code", "local": True},
+    "cloud-a": {"model": "cloud-a", "category": "cloud", "local": False},
+    "vision": {"model": "vision:11b", "category": "vision", "local": True},
+    "sec": {"model": "sec:8b", "category": "security", "local": True, "residency": "always"},
+    "rare": {"model": "rare:70b", "category": "code", "local": True, "residency": "never"},
+    "embed": {"model": "bge-m3", "category": "embedding", "local": True, "chat": False},
+}
+
+
+class FakeOllama:
+    """/api/ps et /api/generate simulés: un préchargement rend le modèle résident"""
+
+    def __init__(self, resident=()):
+        self.resident = list(resident)
+        self.warmed: list[dict] = []
+        self.ps_status = 200
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/ps":
+            models = [{"name": m, "size_vram": 1} for m in self.resident]
+            return httpx.Response(self.ps_status, json={"models": models})
+        payload = json.loads(request.content)
+        self.warmed.append(payload)
+        if payload["model"] not in self.resident:
+            self.resident.append(payload["model"])
+        return httpx.Response(200, json={"done": True})
+
+
+@pytest.fixture
+def ollama():
+    return FakeOllama()
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(CATALOG)
+
+
+@pytest.fixture
+def residency(ollama, router):
+    pool = OllamaClientPool(transport=httpx.MockTransport(ollama.handler))
+    manager = ResidencyManager(CATALOG, router=router, pool=pool)
+    manager.max_warm = 3
+    COLD_STARTS.clear()
+    MODEL_LOADS.clear()
+    yield manager
+    COLD_STARTS.clear()
+    MODEL_LOADS.clear()
+
+
+def degrade_cloud(router):
+    for _ in range(5):
+        router.record_failure("cloud-a", status_code=503, error="unavailable")
+
+
+class TestCatalog:
+    def test_policies_of_local_chat_models(self, residency):
+        assert residency._policies == {
+            "local:32b": "auto",
+            "vision:11b": "auto",
+            "sec:8b": "always",
+            "rare:70b": "never",
+        }
+
+    def test_unknown_policy_falls_back_to_auto(self, residency):
+        residency.set_catalog({"x": {"model": "x:7b", "local": True, "residency": "sometimes"}})
+        assert residency._policies == {"x:7b": "auto"}
+
+
+class TestDesired:
+    def test_always_models_wanted(self, residency):
+        assert residency.desired() == [("sec:8b", "policy")]
+
+    def test_recent_auto_models_wanted(self, residency):
+        residency.record_call("vision:11b")
+        assert ("vision:11b", "recent") not in residency.desired()
+        residency.record_call("vision:11b")
+        assert ("vision:11b", "recent") in residency.desired()
+
+    def test_never_and_cloud_models_ignored(self, residency):
+        for _ in range(3):
+            residency.record_call("rare:70b")
+            residency.record_call("cloud-a")
+        assert residency.desired() == [("sec:8b", "policy")]
+
+    def test_bounded_by_max_warm(self, residency):
+        residency.max_warm = 1
+        for _ in range(3):
+            residency.record_call("vision:11b")
+        assert residency.desired() == [("sec:8b", "policy")]
+
+
+class TestColdStarts:
+    def test_slow_load_counted(self, residency):
+        residency.record_call("local:32b", load_ms=4200)
+        residency.record_call("local:32b", load_ms=15)
+        assert COLD_STARTS.value(model="local:32b") == 1
+        assert MODEL_LOADS.value(model="local:32b", cause="request") == 1
+        assert residency.stats["cold_starts"] == {"local:32b": 1}
+        assert residency.stats["events"][-1]["event"] == "load"
+
+
+class TestPin:
+    @pytest.mark.asyncio
+    async def test_fallback_pinned_while_cloud_degraded(self, residency, router, ollama):
+        degrade_cloud(router)
+        await residency.tick()
+        assert residency.stats["pinned"] == "local:32b"
+        assert residency.keep_alive("local:32b") == residency.pin_keep_alive
+        pinned = [p for p in ollama.warmed if p["model"] == "local:32b"]
+        assert pinned and pinned[0]["keep_alive"] == residency.pin_keep_alive
+
+    @pytest.mark.asyncio
+    async def test_unpinned_when_cloud_recovers(self, residency, router, ollama):
+        degrade_cloud(router)
+        await residency.tick()
+        for _ in range(20):
+            router.record_success("cloud-a", "operational", first_token_ms=500)
+        await residency.tick()
+        assert residency.stats["pinned"] is None
+        assert residency.keep_alive("local:32b") == residency.default_keep_alive
+        # keep_alive ordinaire renvoyé pour que le modèle puisse expirer
+        assert ollama.warmed[-1] == {
+            "model": "local:32b",
+            "prompt": "",
+            "stream": False,
+            "keep_alive": residency.default_keep_alive,
+        }
+        assert [e["event"] for e in residency.stats["events"]].count("unpin") == 1
+
+    @pytest.mark.asyncio
+    async def test_configured_fallback_model(self, residency, router):
+        residency.fallback_model = "vision:11b"
+        degrade_cloud(router)
+        await residency.tick()
+        assert residency.stats["pinned"] == "vision:11b"
+
+
+class TestTick:
+    @pytest.mark.asyncio
+    async def test_warms_missing_models_only(self, residency, ollama):
+        ollama.resident = ["sec:8b"]
+        await residency.tick()
+        assert ollama.warmed == []
+        ollama.resident = []
+        await residency.tick()
+        assert [p["model"] for p in ollama.warmed] == ["sec:8b"]
+        assert MODEL_LOADS.value(model="sec:8b", cause="warmup") == 1
+
+    @pytest.mark.asyncio
+    async def test_external_loads_and_unloads_tracked(self, residency, ollama):
+        ollama.resident = ["sec:8b"]
+        await residency.tick()
+        ollama.resident = ["sec:8b", "vision:11b"]
+        await residency.tick()
+        ollama.resident = ["sec:8b"]
+        await residency.tick()
+        assert MODEL_LOADS.value(model="vision:11b", cause="external") == 1
+        events = [(e["event"], e["model"]) for e in residency.stats["events"]]
+        assert events == [("load", "vision:11b"), ("unload", "vision:11b")]
+
+    @pytest.mark.asyncio
+    async def test_poll_failure_skips_warmup(self, residency, ollama):
+        ollama.ps_status = 500
+        await residency.tick()
+        assert ollama.warmed == []
+        assert residency.stats["poll_errors"] == 1
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le routeur de modèles (santé, latence, disjoncteur)
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_router import ModelRouter
+
+CATALOG = {
+    "auto": {"model": None, "category": "auto"},
+    "local-coder": {"model": "local:32b", "category": "code", "local": True},
+    "cloud-a": {"model": "cloud-a", "category": "cloud", "local": False},
+    "cloud-b": {"model": "cloud-b", "category": "cloud", "local": False},
+    "vision": {"model": "vision:11b", "category": "vision", "local": True},
+    "embed": {"model": "bge-m3", "category": "embedding", "local": True, "chat": False},
+}
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(CATALOG)
+
+
+class TestCandidates:
+    def test_candidates_by_class(self, router):
+        assert router.candidates("operational") == ["local:32b", "cloud-a", "cloud-b"]
+        assert router.candidates("vision") == ["vision:11b"]
+
+    def test_embedding_models_excluded(self, router):
+        assert "bge-m3" not in router.stats
+
+
+class TestSelect:
+    def test_preferred_kept_when_healthy(self, router):
+        assert router.select("operational", preferred="cloud-a") == "cloud-a"
+
+    def test_switch_when_preferred_much_slower(self, router):
+        router.record_success("cloud-a", "factual", first_token_ms=9000)
+        router.record_success("cloud-b", "factual", first_token_ms=1000)
+        assert router.select("factual", preferred="cloud-a") == "cloud-b"
+        # Latence mesurée par classe: pas d'effet sur une autre classe sans mesure
+        router.record_success("cloud-a", "operational", first_token_ms=500)
+        assert router.select("operational", preferred="cloud-a") == "cloud-a"
+
+    def test_unmeasured_candidates_in_catalog_order(self, router):
+        assert router.select("operational", exclude={"cloud-a"}) == "local:32b"
+
+    def test_fastest_measured_candidate_first(self, router):
+        router.record_success("cloud-b", "operational", first_token_ms=800)
+        router.record_success("local:32b", "operational", first_token_ms=4000)
+        assert router.select("operational", exclude={"cloud-a"}) == "cloud-b"
+
+    def test_local_filter(self, router):
+        assert router.select("operational", local=True) == "local:32b"
+        assert router.select("operational", local=False) == "cloud-a"
+
+    def test_stall_feeds_latency_without_failure(self, router):
+        router.record_stall("cloud-a", "operational", 20000)
+        router.record_success("cloud-b", "operational", first_token_ms=1000)
+        assert router.stats["cloud-a"]["failures"] == 0
+        assert router.select("operational", preferred="cloud-a") == "cloud-b"
+
+    def test_none_when_nothing_available(self, router):
+        for model in ("local:32b", "cloud-a", "cloud-b"):
+            router.record_failure(model, status_code=429)
+        assert router.select("operational", preferred="cloud-a") is None
+
+
+class TestCircuitBreaker:
+    def test_429_opens_immediately(self, router):
+        router.record_failure("cloud-a", status_code=429)
+        assert router.stats["cloud-a"]["state"] == "open"
+        assert router.select("operational", preferred="cloud-a") != "cloud-a"
+
+    def test_opens_after_threshold(self, router):
+        for _ in range(router.failure_threshold - 1):
+            router.record_failure("cloud-a", status_code=502)
+        assert router.is_available("cloud-a")
+        router.record_failure("cloud-a", status_code=502)
+        assert not router.is_available("cloud-a")
+
+    def test_half_open_then_closed_on_success(self, router):
+        router.record_failure("cloud-a", status_code=429, retry_after=0.01)
+        time.sleep(0.02)
+        assert router.is_available("cloud-a")
+        assert router.stats["cloud-a"]["state"] == "half_open"
+        router.record_success("cloud-a", "operational", first_token_ms=100)
+        assert router.stats["cloud-a"]["state"] == "closed"
+
+    def test_half_open_failure_reopens_with_backoff(self, router):
+        router.record_failure("cloud-a", status_code=429, retry_after=0.01)
+        time.sleep(0.02)
+        router.is_available("cloud-a")
+        router.record_failure("cloud-a", status_code=500)
+        health = router.health("cloud-a")
+        assert health.state == "open"
+        assert health.open_until - time.monotonic() > router.cooldown
+
+    def test_error_rate_ewma(self, router):
+        router.record_failure("cloud-a", status_code=500)
+        assert router.stats["cloud-a"]["error_rate"] == pytest.approx(router.alpha)
+        router.record_success("cloud-a", "operational", tokens_per_second=30)
+        assert router.stats["cloud-a"]["error_rate"] < router.alpha
+        assert router.stats["cloud-a"]["ewma_tokens_per_second"] == 30
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le pool HTTP Ollama partagé
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.ollama_client as ollama_client
+from utils.llm_scheduler import LLMScheduler
+from utils.ollama_client import OllamaClientPool
+
+OLLAMA = "http://ollama.test:11434"
+
+
+class TestOllamaClientPool:
+    """Tests pour OllamaClientPool"""
+
+    @pytest.mark.asyncio
+    async def test_single_client_per_host(self):
+        pool = OllamaClientPool(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+        await pool.get(f"{OLLAMA}/api/tags")
+        await pool.post(f"{OLLAMA}/api/embeddings", json={})
+        await pool.get("http://autre.test:11434/api/tags")
+
+        stats = pool.stats["hosts"]
+        assert stats[f"{OLLAMA}"]["requests"] == 2
+        assert stats["http://autre.test:11434"]["requests"] == 1
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_per_host(self):
+        running = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return httpx.Response(200)
+
+        pool = OllamaClientPool(max_concurrency=2, transport=httpx.MockTransport(handler))
+        await asyncio.gather(*[pool.get(f"{OLLAMA}/api/tags") for _ in range(8)])
+
+        assert peak == 2
+        host = pool.stats["hosts"][OLLAMA]
+        assert host["peak_in_flight"] == 2
+        assert host["in_flight"] == 0
+        assert host["waiting"] == 0
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_holds_slot_until_exit(self):
+        pool = OllamaClientPool(
+            transport=httpx.MockTransport(lambda r: httpx.Response(200, content=b"a\nb\n"))
+        )
+        async with pool.stream("POST", f"{OLLAMA}/api/chat", json={}) as r:
+            assert pool.stats["hosts"][OLLAMA]["in_flight"] == 1
+            lines = [line async for line in r.aiter_lines()]
+        assert lines == ["a", "b"]
+        assert pool.stats["hosts"][OLLAMA]["in_flight"] == 0
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_errors_counted(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused")
+
+        pool = OllamaClientPool(transport=httpx.MockTransport(handler))
+        with pytest.raises(httpx.ConnectError):
+            await pool.get(f"{OLLAMA}/api/tags")
+        assert pool.stats["hosts"][OLLAMA]["errors"] == 1
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_model_requests_go_through_scheduler(self, monkeypatch):
+        running = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return httpx.Response(200)
+
+        scheduler = LLMScheduler({"m": {"model": "local:32b", "local": True}})
+        scheduler.enabled = True
+        scheduler.limits["local"] = 1
+        monkeypatch.setattr(ollama_client, "get_llm_scheduler", lambda: scheduler)
+        pool = OllamaClientPool(transport=httpx.MockTransport(handler))
+        await asyncio.gather(
+            *[pool.post(f"{OLLAMA}/api/chat", json={"model": "local:32b"}) for _ in range(3)]
+        )
+
+        assert peak == 1  # Un seul slot pour le gros modèle local
+        assert scheduler.stats["models"]["local:32b"]["granted"] == 3
+        await pool.get(f"{OLLAMA}/api/tags")  # Sans modèle: pas d'ordonnancement
+        assert list(scheduler.stats["models"]) == ["local:32b"]
+        await pool.aclose()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
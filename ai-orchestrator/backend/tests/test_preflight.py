@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'étape pré-vol concurrente
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from preflight import Preflight, PreflightSource
+from utils.history_search import HistorySearch
+
+
+def source(name: str, value: str = "ok", delay: float = 0, keep_stale: bool = False, calls=None):
+    """Source factice qui répond `value` après `delay` secondes"""
+
+    async def fetch():
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return PreflightSource(name, fetch, keep_stale=keep_stale)
+
+
+class TestPreflight:
+    """Tests pour Preflight.gather"""
+
+    @pytest.mark.asyncio
+    async def test_sources_run_concurrently(self):
+        preflight = Preflight(budget=1, stale_ttl=60)
+        start = time.monotonic()
+        results = await preflight.gather(
+            [source("a", "A", 0.05), source("b", "B", 0.05), source("c", "C", 0.05)]
+        )
+
+        assert time.monotonic() - start < 0.12
+        assert [r.content for r in results.values()] == ["A", "B", "C"]
+        assert all(r.status == "ok" and r.elapsed_ms >= 40 for r in results.values())
+
+    @pytest.mark.asyncio
+    async def test_slow_source_dropped(self):
+        preflight = Preflight(budget=0.05, stale_ttl=60)
+        start = time.monotonic()
+        results = await preflight.gather([source("fast", "F"), source("rag", "R", 1)])
+
+        assert time.monotonic() - start < 0.5
+        assert results["fast"].content == "F"
+        assert results["rag"].status == "timeout"
+        assert results["rag"].content == ""
+
+    @pytest.mark.asyncio
+    async def test_slow_stateful_source_served_stale_and_refreshed(self):
+        preflight = Preflight(budget=0.05, stale_ttl=60)
+        calls = []
+        await preflight.gather([source("docker", "v1", keep_stale=True)])
+
+        slow = source("docker", "v2", 0.1, keep_stale=True, calls=calls)
+        results = await preflight.gather([slow])
+        assert results["docker"].status == "stale"
+        assert results["docker"].content == "v1"
+        assert results["docker"].to_dict()["age_s"] >= 0
+
+        # Le rafraîchissement en cours est réutilisé, pas relancé
+        results = await preflight.gather([slow])
+        assert calls == ["docker"]
+        await asyncio.sleep(0.1)
+        results = await preflight.gather([source("docker", "v3", keep_stale=True)])
+        assert results["docker"].content == "v3"
+
+    @pytest.mark.asyncio
+    async def test_stale_value_expires(self):
+        preflight = Preflight(budget=0.02, stale_ttl=0)
+        await preflight.gather([source("docker", "v1", keep_stale=True)])
+        results = await preflight.gather([source("docker", "v2", 0.1, keep_stale=True)])
+        assert results["docker"].status == "timeout"
+
+    @pytest.mark.asyncio
+    async def test_error_isolated(self):
+        preflight = Preflight(budget=1, stale_ttl=60)
+        results = await preflight.gather(
+            [source("a", RuntimeError("docker absent")), source("b", "B")]
+        )
+        assert results["a"].status == "error"
+        assert results["b"].content == "B"
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.events = []
+
+    async def send_json(self, data):
+        self.events.append(data)
+
+
+class TestEnginePreflight:
+    """Intégration avec la boucle ReAct"""
+
+    @pytest.mark.asyncio
+    async def test_timings_reported_and_context_assembled(self, monkeypatch):
+        monkeypatch.setattr(engine, "RAG_AVAILABLE", False)
+        monkeypatch.setattr(
+            engine,
+            "_preflight_sources",
+            lambda *args: [
+                source("resources", "## CPU", keep_stale=True),
+                source("docker", "## Docker", keep_stale=True),
+                source("memory", "\n\n## CONTEXTE MEMORISE:\nsouvenir\n"),
+            ],
+        )
+        monkeypatch.setattr(engine, "get_preflight", lambda: Preflight(budget=1, stale_ttl=60))
+        ws = FakeWebSocket()
+
+        dynamic_ctx, auto_ctx = await engine._gather_preflight("operational", "q", None, None, ws)
+
+        assert dynamic_ctx == "## CPU\n\n## Docker"
+        assert "souvenir" in auto_ctx
+        event = ws.events[-1]
+        assert event["type"] == "thinking"
+        assert set(event["preflight"]) == {"resources", "docker", "memory"}
+        assert event["preflight"]["docker"]["status"] == "ok"
+
+    def test_sources_by_query_type(self, monkeypatch):
+        monkeypatch.setattr(engine, "RAG_AVAILABLE", False)
+        # Index d'historique non créé, quel que soit le singleton laissé par d'autres tests
+        monkeypatch.setattr(engine, "get_history_search", HistorySearch)
+        names = [s.name for s in engine._preflight_sources("operational", "q", None)]
+        assert names == ["resources", "services", "docker", "memory"]
+        names = [s.name for s in engine._preflight_sources("factual", "q", None)]
+        assert names == ["memory"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'assemblage du prompt système (préfixe stable)
+"""
+
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools
+from prompts import build_static_prompt, build_system_prompt
+from tools import get_tools_description, get_tools_version, register_tool
+
+
+class TestStablePrefix:
+    """Le préfixe statique doit être identique d'une requête à l'autre"""
+
+    def test_static_prefix_shared_across_requests(self):
+        desc = get_tools_description()
+        a = build_system_prompt(desc, "", dynamic_context="CPU 10%")
+        b = build_system_prompt(desc, "- fichier.txt", dynamic_context="CPU 95%")
+
+        static = build_static_prompt(desc)
+        assert a.startswith(static)
+        assert b.startswith(static)
+        assert a != b
+
+    def test_volatile_context_after_catalog(self):
+        prompt = build_system_prompt("- outil(): desc", "", dynamic_context="ETAT_VOLATILE")
+        assert prompt.index("## Outils disponibles") < prompt.index("CONTEXTE TEMPOREL")
+        assert prompt.index("FORMAT D'EXÉCUTION STRICT") < prompt.index("ETAT_VOLATILE")
+
+    def test_selected_tools_outside_static_prefix(self):
+        core = "- final_answer(answer): réponse"
+        a = build_system_prompt(core, extra_tools="- docker_restart(container): redémarre")
+        b = build_system_prompt(core, extra_tools="- gmail_send(to): envoie")
+        static = build_static_prompt(core)
+        assert a.startswith(static) and b.startswith(static)
+        assert "docker_restart" in a[len(static) :]
+
+    def test_static_prompt_cached(self):
+        assert build_static_prompt("- a(): b") is build_static_prompt("- a(): b")
+
+
+class TestToolsVersion:
+    """Description des outils mise en cache par version du registre"""
+
+    def test_description_cached_until_registry_changes(self):
+        version = get_tools_version()
+        first = get_tools_description()
+        assert get_tools_description() is first
+        assert get_tools_version() == version
+
+        @register_tool("test_prompt_version", description="Outil de test")
+        async def test_prompt_version(params: dict) -> str:
+            return "ok"
+
+        try:
+            assert get_tools_version() > version
+            assert "test_prompt_version" in get_tools_description()
+        finally:
+            tools._tool_handlers.pop("test_prompt_version", None)
+            tools._tool_metadata.pop("test_prompt_version", None)
+            tools._registry_version += 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
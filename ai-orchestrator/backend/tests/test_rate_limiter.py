@@ -159,6 +159,11 @@ class TestPathLimits:
         assert requests == 10
         assert window == 60
 
+    def test_chat_jobs_limit_not_shadowed_by_chat(self):
+        """Suivi des jobs (SSE, résultat): limite propre malgré le préfixe /api/chat"""
+        assert get_rate_limit_for_path("/api/chat/jobs") == (30, 60)
+        assert get_rate_limit_for_path("/api/chat/jobs/abc/events") == (30, 60)
+
     def test_login_endpoint_limit(self):
         """Limite pour /api/auth/login"""
         requests, window = get_rate_limit_for_path("/api/auth/login")
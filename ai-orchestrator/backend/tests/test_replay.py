@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'enregistrement des traces et leur rejeu (replay.py)
+"""
+
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from config import get_settings
+from model_router import ModelRouter
+from preflight import Preflight, PreflightSource
+from replay import StubTools, main, replay_trace
+from utils.ollama_client import OllamaClientPool
+from utils.trace import load_trace, record, trace_session
+
+QUESTION = "Vérifie le statut git du dépôt"
+REPLIES = [
+    "THINK: il faut le statut\nACTION: git_status()",
+    "ACTION: final_answer(answer='Dépôt propre, rien à committer.')",
+]
+
+
+def ollama_stream(text: str) -> bytes:
+    lines = [json.dumps({"message": {"content": text}, "done": False})]
+    lines.append(
+        json.dumps(
+            {
+                "message": {"content": ""},
+                "done": True,
+                "prompt_eval_count": 120,
+                "prompt_eval_duration": 40_000_000,
+                "eval_count": 12,
+                "eval_duration": 60_000_000,
+            }
+        )
+    )
+    return "\n".join(lines).encode()
+
+
+@pytest.fixture
+def recorded_trace(monkeypatch, tmp_path):
+    """Enregistre une session react_loop (Ollama et outils simulés); retourne le fichier"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, content=ollama_stream(REPLIES[len(calls) - 1]))
+
+    async def fetch_docker() -> str:
+        return "🐳 3 conteneurs actifs"
+
+    async def fake_tool(name, params, uploaded_files=None):
+        return "On branch main\nnothing to commit"
+
+    pool = OllamaClientPool(transport=httpx.MockTransport(handler))
+    router = ModelRouter({"m": {"model": "m", "category": "code", "local": True}})
+    preflight = Preflight(budget=5, stale_ttl=0)
+    monkeypatch.setattr(engine, "get_ollama_pool", lambda: pool)
+    monkeypatch.setattr(engine, "get_model_router", lambda: router)
+    monkeypatch.setattr(engine, "get_preflight", lambda: preflight)
+    monkeypatch.setattr(
+        engine, "_preflight_sources", lambda *a, **k: [PreflightSource("docker", fetch_docker)]
+    )
+    monkeypatch.setattr(engine, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(get_settings(), "trace_dir", str(tmp_path))
+
+    async def run():
+        answer = await engine.react_loop(QUESTION, "m", "conv/1", fake_tool)
+        traces = list(tmp_path.glob("*.jsonl"))
+        assert len(traces) == 1
+        return answer, traces[0]
+
+    return run
+
+
+class TestTraceRecording:
+    """Tests pour l'enregistrement JSONL"""
+
+    def test_record_outside_session_is_noop(self, tmp_path):
+        record("tool", name="x")  # Pas de session active: aucune erreur
+        with trace_session("c", trace_dir=""):
+            record("tool", name="x")
+        assert not list(tmp_path.iterdir())
+
+    def test_nested_session_reuses_outer(self, tmp_path):
+        with trace_session("outer", trace_dir=str(tmp_path)) as outer:
+            with trace_session("inner", trace_dir=str(tmp_path)) as inner:
+                record("tool", name="x")
+        assert inner is None
+        events = load_trace(outer.path)
+        assert [e["type"] for e in events] == ["session", "tool"]
+        assert [e["seq"] for e in events] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_react_loop_session_events(self, recorded_trace):
+        answer, path = await recorded_trace()
+        events = load_trace(path)
+
+        assert answer == "Dépôt propre, rien à committer."
+        assert path.name.endswith("-conv_1.jsonl")  # Identifiant assaini
+        types = [e["type"] for e in events]
+        assert types[0] == "session" and types[-1] == "answer"
+        assert types.count("llm") == 2
+        assert types.count("tool") == 1
+        assert "preflight" in types
+        session = events[0]
+        assert session["user_message"] == QUESTION
+        assert session["model"] == "m"
+        llm = next(e for e in events if e["type"] == "llm")
+        assert llm["status"] == 200
+        assert llm["text"] == REPLIES[0]
+        assert llm["timings"]["prompt_tokens"] == 120
+        tool = next(e for e in events if e["type"] == "tool")
+        assert tool["name"] == "git_status"
+        assert events[-1]["answer"] == answer
+
+
+class TestReplay:
+    """Tests pour le rejeu déterministe"""
+
+    @pytest.mark.asyncio
+    async def test_replay_matches_recording(self, recorded_trace):
+        _, path = await recorded_trace()
+        report = await replay_trace(path, repeat=3)
+
+        assert report.matches, report.to_dict()
+        assert report.llm_calls == 2
+        assert report.tool_calls == 1
+        assert report.divergences == 0
+        assert report.prompt_tokens == report.recorded_prompt_tokens
+        assert len(report.wall_ms) == 3
+        assert not report.unrecorded_tools
+
+    @pytest.mark.asyncio
+    async def test_prompt_change_is_reported_as_divergence(self, recorded_trace, monkeypatch):
+        _, path = await recorded_trace()
+        import prompts
+
+        original = prompts.build_system_prompt
+        monkeypatch.setattr(
+            prompts, "build_system_prompt", lambda *a, **k: original(*a, **k) + "\nNOUVEAU"
+        )
+        report = await replay_trace(path)
+
+        assert report.divergences == 2
+        assert report.prompt_tokens > report.recorded_prompt_tokens
+        assert report.matches  # Même déroulé: seuls les prompts diffèrent
+
+    @pytest.mark.asyncio
+    async def test_exhausted_trace_is_a_mismatch(self, recorded_trace, tmp_path):
+        _, path = await recorded_trace()
+        # Trace tronquée: la réponse finale n'a jamais été enregistrée
+        events = load_trace(path)
+        last_llm = [e for e in events if e["type"] == "llm"][-1]
+        events = [e for e in events if e is not last_llm]
+        truncated = tmp_path / "truncated.jsonl"
+        truncated.write_text("\n".join(json.dumps(e) for e in events))
+
+        report = await replay_trace(truncated)
+        assert report.exhausted
+        assert not report.matches
+
+    @pytest.mark.asyncio
+    async def test_cli_exit_code(self, recorded_trace, capsys):
+        _, path = await recorded_trace()
+        assert await main([str(path), "--json"]) == 0
+        output = json.loads(capsys.readouterr().out)
+        assert output[0]["matches"] is True
+
+    def test_stub_replays_native_tool_calls(self):
+        from replay import StubOllama
+
+        event = {
+            "status": 200,
+            "text": "",
+            "tool_mode": "native",
+            "tool_calls": [["git_status", {}]],
+        }
+        stub = StubOllama([event])
+        request = httpx.Request("POST", "http://ollama/api/chat", json={"messages": []})
+        lines = stub.handler(request).content.decode().splitlines()
+        assert json.loads(lines[-1])["message"]["tool_calls"] == [
+            {"function": {"name": "git_status", "arguments": {}}}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_recorded_tool_selection(self):
+        from replay import _RecordedSelector
+
+        selector = _RecordedSelector(
+            [
+                {"type": "tools", "selection": {"tools": ["final_answer"], "total": 70}},
+                {"type": "tools_expanded", "requested": ["git_status"], "added": ["git_status"]},
+            ]
+        )
+        selection = await selector.select("question")
+        assert await selector.expand(selection, ["docker_status"]) == []
+        assert await selector.expand(selection, ["git_status"]) == ["git_status"]
+        assert selection.names == ["final_answer", "git_status"]
+        assert await _RecordedSelector([]).select("question") is None
+
+    @pytest.mark.asyncio
+    async def test_stub_tools_unrecorded_call(self):
+        tools = StubTools([{"name": "git_status", "params": {}, "result": "clean"}])
+        assert await tools("git_status", {}) == "clean"
+        assert await tools("git_status", {}) == "clean"  # Répété: dernier résultat
+        assert (await tools("disk_usage", {"path": "/"})).startswith("❌")
+        assert tools.unrecorded == ["disk_usage"]
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le cache des outils en lecture seule
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools
+from tools import execute_tool, register_tool
+from utils.tool_cache import ToolCache, get_tool_cache
+
+
+def counting_call(value: str = "ok", delay: float = 0):
+    """Fabrique un appel d'outil qui compte ses exécutions"""
+    calls = {"n": 0}
+
+    async def call():
+        calls["n"] += 1
+        if delay:
+            await asyncio.sleep(delay)
+        return value
+
+    return call, calls
+
+
+class TestToolCache:
+    """Tests pour ToolCache"""
+
+    @pytest.mark.asyncio
+    async def test_hit_after_miss(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        call, calls = counting_call()
+
+        assert await cache.get_or_call("docker_status", {}, call) == "ok"
+        assert await cache.get_or_call("docker_status", {}, call) == "ok"
+        assert calls["n"] == 1
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_params_normalized(self):
+        a = ToolCache.make_key("list_directory", {"path": " /tmp ", "depth": None})
+        b = ToolCache.make_key("list_directory", {"path": "/tmp"})
+        assert a == b
+        assert ToolCache.make_key("x", {"a": 1, "b": 2}) == ToolCache.make_key(
+            "x", {"b": 2, "a": 1}
+        )
+        assert a != ToolCache.make_key("list_directory", {"path": "/var"})
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        call, calls = counting_call()
+
+        await cache.get_or_call("git_status", {}, call, ttl=0.01)
+        await asyncio.sleep(0.02)
+        await cache.get_or_call("git_status", {}, call, ttl=0.01)
+        assert calls["n"] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_not_cached(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        call, calls = counting_call("❌ Erreur: docker injoignable")
+
+        await cache.get_or_call("docker_status", {}, call)
+        await cache.get_or_call("docker_status", {}, call)
+        assert calls["n"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_by_resource(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        docker, docker_calls = counting_call()
+        git, git_calls = counting_call()
+
+        await cache.get_or_call("docker_status", {}, docker, resources=("docker",))
+        await cache.get_or_call("git_status", {}, git, resources=("git",))
+        assert cache.invalidate(("docker",)) == 1
+
+        await cache.get_or_call("docker_status", {}, docker, resources=("docker",))
+        await cache.get_or_call("git_status", {}, git, resources=("git",))
+        assert docker_calls["n"] == 2
+        assert git_calls["n"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_all(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        call, _ = counting_call()
+        await cache.get_or_call("a", {}, call, resources=("docker",))
+        await cache.get_or_call("b", {}, call, resources=("files",))
+
+        assert cache.invalidate() == 2
+        assert cache.stats["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_coalesced(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        call, calls = counting_call(delay=0.02)
+
+        results = await asyncio.gather(
+            *(cache.get_or_call("system_info", {}, call) for _ in range(5))
+        )
+        assert results == ["ok"] * 5
+        assert calls["n"] == 1
+        assert cache.stats["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_result_read_during_invalidation_not_stored(self):
+        cache = ToolCache(default_ttl=60, max_entries=10)
+        call, calls = counting_call(delay=0.02)
+
+        task = asyncio.create_task(
+            cache.get_or_call("list_directory", {}, call, resources=("files",))
+        )
+        await asyncio.sleep(0.005)
+        cache.invalidate(("files",))
+        await task
+
+        await cache.get_or_call("list_directory", {}, call, resources=("files",))
+        assert calls["n"] == 2
+
+    def test_lru_eviction(self):
+        cache = ToolCache(default_ttl=60, max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+
+
+@pytest.fixture
+def fake_tools():
+    """Enregistre un lecteur et un écrivain factices partageant une ressource"""
+    calls = {"read": 0}
+
+    @register_tool("test_cache_read", cacheable=True, resources=("test_res",))
+    async def test_cache_read(params: dict) -> str:
+        calls["read"] += 1
+        return f"lecture {calls['read']}"
+
+    @register_tool("test_cache_write", mutating=True, resources=("test_res",))
+    async def test_cache_write(params: dict) -> str:
+        return "écrit"
+
+    get_tool_cache().clear()
+    yield calls
+    for name in ("test_cache_read", "test_cache_write"):
+        tools._tool_handlers.pop(name, None)
+        tools._tool_metadata.pop(name, None)
+    tools._registry_version += 1
+    get_tool_cache().clear()
+
+
+class TestExecuteToolCache:
+    """Tests d'intégration avec execute_tool"""
+
+    @pytest.mark.asyncio
+    async def test_cacheable_tool_memoized(self, fake_tools):
+        assert await execute_tool("test_cache_read", {"x": "1"}) == "lecture 1"
+        assert await execute_tool("test_cache_read", {"x": "1"}) == "lecture 1"
+        assert fake_tools["read"] == 1
+        assert get_tool_cache().stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_mutating_tool_invalidates(self, fake_tools):
+        await execute_tool("test_cache_read", {})
+        await execute_tool("test_cache_write", {})
+        assert await execute_tool("test_cache_read", {}) == "lecture 2"
+
+    def test_builtin_declarations(self):
+        meta = {t["name"]: t for t in tools.get_tools_definitions()}
+        assert meta["docker_status"]["cacheable"]
+        assert "docker" in meta["docker_restart"]["resources"]
+        assert meta["execute_command"]["mutating"]
+        assert meta["execute_command"]["resources"] == ()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour les appels d'outils structurés (tool_calling.py)
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tool_calling
+from engine import _parse_action_line, extract_final_answer
+from tool_calling import (
+    format_action,
+    format_reply,
+    format_stats,
+    normalize_mode,
+    parse_json_reply,
+    parse_tool_calls,
+    record_outcome,
+)
+from tools import get_tools_schema
+
+
+class TestParsing:
+    """Tests pour la lecture des réponses structurées"""
+
+    def test_native_tool_calls(self):
+        raw = [
+            {"function": {"name": "read_file", "arguments": {"file_path": "/etc/hosts"}}},
+            {"function": {"name": "disk_usage", "arguments": '{"path": "/"}'}},
+            {"function": {"arguments": {}}},  # Sans nom: ignoré
+            "invalide",
+        ]
+        assert parse_tool_calls(raw) == [
+            ("read_file", {"file_path": "/etc/hosts"}),
+            ("disk_usage", {"path": "/"}),
+        ]
+        assert parse_tool_calls(None) == []
+
+    def test_json_reply(self):
+        text = json.dumps(
+            {
+                "thought": "vérifier le disque",
+                "actions": [{"tool": "disk_usage", "params": {"path": "/"}}, {"params": {}}],
+            }
+        )
+        assert parse_json_reply(text) == ("vérifier le disque", [("disk_usage", {"path": "/"})])
+
+    @pytest.mark.parametrize("text", ["", "ACTION: x()", '{"thought": "x"}', "[1, 2]"])
+    def test_json_reply_invalid(self, text):
+        assert parse_json_reply(text) is None
+
+    def test_unknown_mode_falls_back_to_text(self):
+        assert normalize_mode("NATIVE") == "native"
+        assert normalize_mode("xml") == "text"
+
+
+class TestHistoryFormat:
+    """Les appels structurés réécrits en ACTION restent lisibles par le parsing regex"""
+
+    @pytest.mark.parametrize(
+        "value",
+        ["/tmp/a b", "l'été", 'dit "oui"'],
+    )
+    def test_action_round_trip(self, value):
+        line = format_action("write_file", {"path": value})
+        assert _parse_action_line(line.removeprefix("ACTION: ")) == (
+            "write_file",
+            {"path": value},
+        )
+
+    def test_final_answer_round_trip(self):
+        answer = "Résultat:\n- l'espace disque est 'ok'"
+        text = format_reply("THINK: fini", [("final_answer", {"answer": answer})])
+        assert text.startswith("THINK: fini\nACTION: final_answer(")
+        assert extract_final_answer(text) == answer
+
+    def test_non_string_values(self):
+        assert format_action("gmail_search", {"max_results": 5, "labels": ["a"]}) == (
+            'ACTION: gmail_search(max_results=5, labels=["a"])'
+        )
+
+
+class TestToolsSchema:
+    """Tests pour les définitions d'outils envoyées à Ollama"""
+
+    def test_schema_shape(self):
+        schema = get_tools_schema()
+        assert get_tools_schema() is schema  # Cache par version du registre
+        by_name = {t["function"]["name"]: t["function"] for t in schema}
+        assert all(t["type"] == "function" for t in schema)
+        assert by_name["final_answer"]["parameters"]["required"] == ["answer"]
+        assert sum(1 for t in schema if t["function"]["name"] == "final_answer") == 1
+
+    def test_json_schema_parameters_kept_and_subset(self):
+        by_name = {t["function"]["name"]: t["function"] for t in get_tools_schema()}
+        rag = by_name["rag_search"]["parameters"]
+        assert rag["type"] == "object" and "type" not in rag["properties"]
+
+        subset = get_tools_schema(["rag_search", "inconnu"])
+        assert [t["function"]["name"] for t in subset] == ["rag_search", "final_answer"]
+
+    def test_parameter_types_and_required(self):
+        from tools import _parameter_schema
+
+        assert _parameter_schema("int - Max résultats") == (
+            {"type": "integer", "description": "Max résultats"},
+            True,
+        )
+        assert _parameter_schema("bool - Inclure contenu (défaut: false)")[1] is False
+        assert _parameter_schema("str - CC (optionnel)")[1] is False
+        assert _parameter_schema("Path") == ({"type": "string"}, True)
+
+
+class TestFormatStats:
+    """Tests pour le compteur de formats par modèle"""
+
+    def test_failure_rate_per_model_and_mode(self, monkeypatch):
+        monkeypatch.setattr(tool_calling, "_no_tool_support", {"petit:7b"})
+        tool_calling.REPLY_FORMAT.clear()
+        record_outcome("m", "text", "regex")
+        record_outcome("m", "text", "failure")
+        record_outcome("m", "native", "structured")
+
+        stats = format_stats()
+        assert stats["models"]["m"]["text"] == {
+            "structured": 0,
+            "regex": 1,
+            "failure": 1,
+            "failure_rate": 0.5,
+        }
+        assert stats["models"]["m"]["native"]["failure_rate"] == 0.0
+        assert stats["no_tool_support"] == ["petit:7b"]
+        tool_calling.REPLY_FORMAT.clear()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour la sélection des outils par similarité (utils/tool_selector.py)
+"""
+
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools
+from tools import get_tool_names, get_tools_description
+from utils.tool_selector import ToolSelector
+
+VOCABULARY = ["docker", "conteneur", "gmail", "email", "git", "commit", "ollama", "modele"]
+
+
+def keyword_embed(calls: list = None):
+    """Embedding simulé: occurrences des mots du vocabulaire (+ biais non nul)"""
+
+    async def embed(text: str) -> list[float]:
+        if calls is not None:
+            calls.append(text)
+        lowered = text.lower()
+        return [float(lowered.count(word)) for word in VOCABULARY] + [0.01]
+
+    return embed
+
+
+CORE = ["final_answer", "read_file"]
+
+
+@pytest.fixture
+def selector():
+    return ToolSelector(top_k=4, core=CORE, embed=keyword_embed())
+
+
+class TestSelection:
+    """Tests pour la sélection top-K + noyau"""
+
+    @pytest.mark.asyncio
+    async def test_top_k_plus_core(self, selector):
+        selection = await selector.select("Redémarre le conteneur docker nginx")
+
+        assert selection.names == sorted(selection.names)
+        assert set(CORE) <= set(selection.names)
+        assert len(selection.names) == len(CORE) + 4
+        assert all(name.startswith("docker_") for name in selection.scores)
+        assert selection.total == len(get_tool_names())
+        assert selector.stats["selections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_prompt_description_shrinks(self, selector):
+        selection = await selector.select("Lis mes derniers emails gmail")
+        subset = get_tools_description(selection.names)
+
+        assert subset.count("\n") + 1 == len(selection.names)
+        assert all(name.startswith("gmail_") for name in selection.scores)
+        assert "- gmail_" in subset
+        assert "docker_status" not in subset
+        assert len(subset) < len(get_tools_description()) / 3
+
+    @pytest.mark.asyncio
+    async def test_index_built_once_per_registry_version(self, monkeypatch):
+        calls = []
+        selector = ToolSelector(top_k=4, core=CORE, embed=keyword_embed(calls))
+        await selector.select("docker")
+        await selector.select("git commit")
+        assert len(calls) == len(get_tool_names()) + 2  # Index + une question par requête
+
+        monkeypatch.setattr(tools, "_registry_version", tools._registry_version + 1)
+        await selector.select("docker")
+        assert len(calls) == 2 * len(get_tool_names()) + 3
+
+    @pytest.mark.asyncio
+    async def test_without_embeddings_full_catalog(self):
+        async def unavailable(text):
+            return None
+
+        selector = ToolSelector(top_k=4, core=CORE, embed=unavailable)
+        assert await selector.select("docker") is None
+        assert selector.stats["fallbacks"] == 1
+        assert not await selector._ensure_index()  # Nouvel essai différé (INDEX_RETRY)
+
+    @pytest.mark.asyncio
+    async def test_small_registry_or_disabled(self, selector):
+        big = ToolSelector(top_k=len(get_tool_names()), core=CORE, embed=keyword_embed())
+        assert await big.select("docker") is None
+        selector.enabled = False
+        assert await selector.select("docker") is None
+
+
+class TestExpansion:
+    """Tests pour l'extension à la demande"""
+
+    @pytest.mark.asyncio
+    async def test_known_tool_outside_selection_added(self, selector):
+        selection = await selector.select("Redémarre le conteneur docker")
+        assert "git_status" not in selection.names
+
+        added = await selector.expand(selection, ["git_status", "read_file", "final_answer"])
+        assert added == ["git_status"]
+        assert "git_status" in selection.names
+        assert selection.expanded == ["git_status"]
+        assert selector.stats["expansions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_adds_neighbors(self, selector):
+        selection = await selector.select("Redémarre le conteneur docker")
+        added = await selector.expand(selection, ["ollama_modele_info"])
+
+        assert len(added) == 3
+        assert all(name.startswith("ollama_") for name in added)
+        assert await selector.expand(None, ["git_status"]) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
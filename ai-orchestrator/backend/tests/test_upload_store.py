@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le stockage des uploads par contenu (utils/upload_store.py)
+"""
+
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from utils.upload_store import (
+    UploadStore,
+    UploadTooLarge,
+    create_upload_blobs,
+    release_uploads,
+    remove_released_files,
+)
+
+
+class FakeUpload:
+    """Comme UploadFile: read(size) asynchrone, tailles lues enregistrées"""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+        self.reads: list[int] = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        return self._data.read(size)
+
+
+def create_uploads(c):
+    c.execute("""CREATE TABLE uploads (
+        id TEXT PRIMARY KEY,
+        filename TEXT,
+        filepath TEXT,
+        filetype TEXT,
+        filesize INTEGER,
+        conversation_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+
+
+@pytest.fixture
+async def db(tmp_path):
+    database = Database(str(tmp_path / "uploads.db"))
+    await database.migrate([create_uploads, create_upload_blobs])
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+def store(tmp_path, db):
+    return UploadStore(str(tmp_path / "uploads"), db=db, chunk_size_kb=4, max_size=1024 * 1024)
+
+
+def delete_rows(c, conversation_id: str) -> list[str]:
+    files = release_uploads(c, conversation_id)
+    c.execute("DELETE FROM uploads WHERE conversation_id = ?", (conversation_id,))
+    return files
+
+
+async def delete_conversation(db, conversation_id: str) -> list[str]:
+    """Comme main.delete_conversation: fichiers supprimés après le commit"""
+    files = await db.transaction(lambda c: delete_rows(c, conversation_id))
+    await db.transaction(lambda c: remove_released_files(c, files))
+    return files
+
+
+class TestSave:
+    @pytest.mark.asyncio
+    async def test_streamed_in_chunks_under_content_hash(self, store, db):
+        data = os.urandom(50_000)
+        upload = FakeUpload(data)
+        info = await store.save(upload, "log.txt", "text", "c1")
+        digest = hashlib.sha256(data).hexdigest()
+        assert info["content_hash"] == digest
+        assert info["size"] == len(data)
+        assert info["filepath"] == store.blob_path(digest)
+        with open(info["filepath"], "rb") as f:
+            assert f.read() == data
+        assert set(upload.reads) == {4096}
+        row = await db.fetchone("SELECT * FROM uploads WHERE id = ?", (info["id"],))
+        assert row["content_hash"] == digest and row["filesize"] == len(data)
+        assert os.listdir(store.tmp_dir) == []
+
+    @pytest.mark.asyncio
+    async def test_same_content_deduplicated(self, store, db):
+        first = await store.save(FakeUpload(b"capture"), "a.png", "image", "c1")
+        second = await store.save(FakeUpload(b"capture"), "b.png", "image", "c2")
+        assert not first["deduplicated"] and second["deduplicated"]
+        assert first["filepath"] == second["filepath"]
+        blob = await db.fetchone("SELECT refcount FROM upload_blobs")
+        assert blob["refcount"] == 2
+        assert store.stats["bytes_saved"] == len(b"capture")
+        assert os.listdir(store.tmp_dir) == []
+
+    @pytest.mark.asyncio
+    async def test_too_large_rejected(self, tmp_path, db):
+        store = UploadStore(str(tmp_path / "uploads"), db=db, chunk_size_kb=1, max_size=2048)
+        with pytest.raises(UploadTooLarge):
+            await store.save(FakeUpload(b"x" * 3000), "big.bin", "binary")
+        assert os.listdir(store.tmp_dir) == []
+        assert await db.fetchall("SELECT * FROM uploads") == []
+        assert store.stats["rejected_too_large"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_blob_file_restored(self, store):
+        first = await store.save(FakeUpload(b"log"), "a.log", "text", "c1")
+        os.remove(first["filepath"])
+        second = await store.save(FakeUpload(b"log"), "a.log", "text", "c2")
+        assert not second["deduplicated"]
+        assert os.path.exists(second["filepath"])
+
+    def test_partials_cleaned(self, store):
+        os.makedirs(store.tmp_dir)
+        open(os.path.join(store.tmp_dir, "abc.part"), "wb").close()
+        assert store.clean_partials() == 1
+
+
+class TestRelease:
+    @pytest.mark.asyncio
+    async def test_blob_kept_while_referenced(self, store, db):
+        info = await store.save(FakeUpload(b"shared"), "a.txt", "text", "c1")
+        await store.save(FakeUpload(b"shared"), "a.txt", "text", "c2")
+        await delete_conversation(db, "c1")
+        assert os.path.exists(info["filepath"])
+        assert (await db.fetchone("SELECT refcount FROM upload_blobs"))["refcount"] == 1
+        await delete_conversation(db, "c2")
+        assert not os.path.exists(info["filepath"])
+        assert await db.fetchall("SELECT * FROM upload_blobs") == []
+
+    @pytest.mark.asyncio
+    async def test_same_blob_twice_in_one_conversation(self, store, db):
+        info = await store.save(FakeUpload(b"twice"), "a.txt", "text", "c1")
+        await store.save(FakeUpload(b"twice"), "b.txt", "text", "c1")
+        await delete_conversation(db, "c1")
+        assert not os.path.exists(info["filepath"])
+
+    @pytest.mark.asyncio
+    async def test_blob_file_kept_when_transaction_rolls_back(self, store, db):
+        info = await store.save(FakeUpload(b"rollback"), "a.txt", "text", "c1")
+
+        def fail(c):
+            assert delete_rows(c, "c1") == [info["filepath"]]
+            raise RuntimeError("échec après release_uploads")
+
+        with pytest.raises(RuntimeError):
+            await db.transaction(fail)
+        assert os.path.exists(info["filepath"])
+        assert (await db.fetchone("SELECT refcount FROM upload_blobs"))["refcount"] == 1
+
+    @pytest.mark.asyncio
+    async def test_blob_registered_again_before_removal_kept(self, store, db):
+        info = await store.save(FakeUpload(b"course"), "a.txt", "text", "c1")
+        files = await db.transaction(lambda c: delete_rows(c, "c1"))
+        # Même contenu uploadé entre le commit de la suppression et celle du fichier
+        again = await store.save(FakeUpload(b"course"), "b.txt", "text", "c2")
+        assert again["filepath"] == info["filepath"]
+        assert await db.transaction(lambda c: remove_released_files(c, files)) == 0
+        assert os.path.exists(info["filepath"])
+
+    @pytest.mark.asyncio
+    async def test_legacy_uploads_returned(self, db):
+        await db.execute(
+            "INSERT INTO uploads (id, filename, filepath, conversation_id) VALUES (?, ?, ?, ?)",
+            ("old", "x.txt", "data/uploads/old.txt", "c1"),
+        )
+        assert await delete_conversation(db, "c1") == ["data/uploads/old.txt"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'écriture différée des messages (utils/write_behind.py)
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from utils.write_behind import MessageWriter
+
+
+def create_tables(c):
+    c.execute("""CREATE TABLE conversations (
+        id TEXT PRIMARY KEY,
+        updated_at TIMESTAMP,
+        first_message TEXT,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        last_model TEXT
+    )""")
+    c.execute("""CREATE TABLE messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT,
+        role TEXT NOT NULL,
+        content TEXT,
+        model_used TEXT
+    )""")
+    c.executemany("INSERT INTO conversations (id) VALUES (?)", [("c1",), ("c2",)])
+
+
+@pytest.fixture
+async def db(tmp_path):
+    database = Database(str(tmp_path / "messages.db"))
+    await database.migrate([create_tables])
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+def slow_db(db, monkeypatch):
+    """Transactions lentes: un lot reste en cours de commit pendant 200 ms"""
+    transaction = db.transaction
+
+    async def slow_transaction(fn):
+        await asyncio.sleep(0.2)
+        return await transaction(fn)
+
+    monkeypatch.setattr(db, "transaction", slow_transaction)
+    return db
+
+
+async def count(db, sql: str = "SELECT COUNT(*) AS n FROM messages") -> int:
+    return (await db.fetchone(sql))["n"]
+
+
+class TestBatching:
+    @pytest.mark.asyncio
+    async def test_concurrent_messages_share_one_transaction(self, db):
+        writer = MessageWriter(db, interval_ms=20)
+        futures = [await writer.submit("c1", "user", f"m{i}") for i in range(10)]
+        await asyncio.gather(*futures)
+        assert await count(db) == 10
+        assert writer.stats["batches"] == 1
+        assert writer.stats["largest_batch"] == 10
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_submit_does_not_wait_for_commit(self, db):
+        writer = MessageWriter(db, interval_ms=50)
+        await writer.submit("c1", "user", "bonjour")
+        assert writer.stats["queued"] == 1
+        assert await count(db) == 0
+        await writer.flush()
+        assert await count(db) == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_conversation_summary_coalesced(self, db):
+        writer = MessageWriter(db, interval_ms=20)
+        await writer.submit("c1", "user", "première question")
+        await writer.submit("c1", "assistant", "réponse", "qwen")
+        await writer.submit("c2", "user", "autre")
+        await writer.submit("c1", "user", "suite")
+        await writer.flush()
+        conv = await db.fetchone("SELECT * FROM conversations WHERE id = 'c1'")
+        assert conv["message_count"] == 3
+        assert conv["first_message"] == "première question"
+        assert conv["last_model"] == "qwen"
+        assert conv["updated_at"] is not None
+        assert (await db.fetchone("SELECT * FROM conversations WHERE id = 'c2'"))[
+            "message_count"
+        ] == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_batches_capped(self, db):
+        writer = MessageWriter(db, interval_ms=20, max_batch=4)
+        for i in range(10):
+            await writer.submit("c1", "user", f"m{i}")
+        await writer.flush()
+        assert writer.stats["largest_batch"] == 4
+        assert writer.stats["batches"] == 3
+        await writer.close()
+
+
+class TestDurability:
+    @pytest.mark.asyncio
+    async def test_close_writes_pending_messages(self, db):
+        writer = MessageWriter(db, interval_ms=1000)
+        for i in range(5):
+            await writer.submit("c1", "user", f"m{i}")
+        await writer.close()
+        assert await count(db) == 5
+        with pytest.raises(RuntimeError):
+            await writer.submit("c1", "user", "trop tard")
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_queue_full(self, db):
+        writer = MessageWriter(db, interval_ms=1000, max_batch=2, max_queued=2)
+        for i in range(6):
+            await writer.submit("c1", "user", f"m{i}")
+        assert writer.stats["backpressure_waits"] >= 1
+        assert writer.stats["queued"] <= 2
+        await writer.close()
+        assert await count(db) == 6
+
+    @pytest.mark.asyncio
+    async def test_failing_message_isolated(self, db):
+        writer = MessageWriter(db, interval_ms=20)
+        ok = await writer.submit("c1", "user", "ok")
+        bad = await writer.submit("c1", None, "role NULL refusé")
+        also_ok = await writer.submit("c2", "user", "ok aussi")
+        await writer.flush()
+        assert ok.result() is None and also_ok.result() is None
+        assert bad.exception() is not None
+        assert await count(db) == 2
+        assert writer.stats["failed"] == 1
+        await writer.close()
+
+
+class TestInFlight:
+    @pytest.mark.asyncio
+    async def test_flush_waits_for_batch_being_committed(self, slow_db):
+        writer = MessageWriter(slow_db, interval_ms=10)
+        await writer.submit("c1", "user", "bonjour")
+        await asyncio.sleep(0.05)  # Lot retiré de la file, commit en cours
+        assert writer.stats["queued"] == 0 and await count(slow_db) == 0
+        await writer.flush()
+        assert await count(slow_db) == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_close_waits_for_batch_being_committed(self, slow_db):
+        writer = MessageWriter(slow_db, interval_ms=10)
+        for i in range(3):
+            await writer.submit("c1", "user", f"m{i}")
+        await asyncio.sleep(0.05)
+        assert writer.stats["queued"] == 0
+        await writer.close()
+        assert await count(slow_db) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
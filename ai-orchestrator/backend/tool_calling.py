@@ -0,0 +1,168 @@
+"""
+Appels d'outils structurés (AI_LLM_TOOL_CALLING)
+Le protocole texte (`ACTION: outil(param='valeur')` parsé par regex) échoue
+régulièrement: guillemets non fermés, appel noyé dans la prose, paramètres sans nom...
+Chaque échec coûte une itération complète ("FORMAT INCORRECT") au modèle.
+
+- text: protocole historique, parsing regex seul
+- native: définitions JSON Schema des outils envoyées à Ollama (`tools`); les
+  `tool_calls` de la réponse sont consommés directement
+- json: réponse contrainte par un schéma (`format`): {"thought", "actions": [...]}
+
+Le parsing regex reste le filet de sécurité dans tous les modes (réponse sans appel
+structuré, modèle sans support des outils). Les appels structurés sont réécrits en
+lignes ACTION dans l'historique: prompt système et compaction restent inchangés.
+Compteur llm_reply_format_total{model, mode, outcome}: structured | regex | failure
+(failure = ni final_answer ni ACTION, une itération perdue).
+
+Usage:
+    from tool_calling import format_reply, parse_tool_calls
+
+    calls = parse_tool_calls(data["message"].get("tool_calls"))
+    history = format_reply("THINK: ...", calls)  # "THINK: ...\\nACTION: outil(p='v')"
+"""
+
+import json
+import logging
+
+from utils.metrics import counter
+
+logger = logging.getLogger("tool_calling")
+
+TOOL_MODES = ("text", "native", "json")
+OUTCOMES = ("structured", "regex", "failure")
+
+# Schéma imposé en mode json (paramètre `format` d'Ollama)
+REPLY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "thought": {"type": "string"},
+        "actions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tool": {"type": "string"},
+                    "params": {"type": "object"},
+                },
+                "required": ["tool", "params"],
+            },
+        },
+    },
+    "required": ["thought", "actions"],
+}
+
+REPLY_FORMAT = counter(
+    "llm_reply_format_total",
+    "Réponses LLM par format d'appel d'outil reconnu",
+    labels=("model", "mode", "outcome"),
+)
+
+_no_tool_support: set[str] = set()  # Modèles ayant refusé `tools` (HTTP 400)
+
+
+def normalize_mode(mode: str) -> str:
+    """Mode d'appel d'outils valide (text si inconnu)"""
+    mode = (mode or "text").strip().lower()
+    if mode not in TOOL_MODES:
+        logger.warning(f"⚠️ AI_LLM_TOOL_CALLING inconnu: {mode!r}, mode text utilisé")
+        return "text"
+    return mode
+
+
+def supports_tools(model: str) -> bool:
+    return model not in _no_tool_support
+
+
+def mark_unsupported(model: str):
+    """Le modèle a refusé `tools`: ses appels suivants repassent en mode texte"""
+    if model not in _no_tool_support:
+        _no_tool_support.add(model)
+        logger.warning(f"⚠️ {model}: pas de support des outils natifs, protocole texte")
+
+
+def is_unsupported_error(body: str) -> bool:
+    """Réponse 400 d'Ollama pour un modèle sans support des outils"""
+    return "does not support tools" in (body or "")
+
+
+def _arguments(raw) -> dict:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw) if raw.strip() else {}
+        except json.JSONDecodeError:
+            return {}
+    return raw if isinstance(raw, dict) else {}
+
+
+def parse_tool_calls(raw) -> list[tuple[str, dict]]:
+    """`message.tool_calls` d'Ollama -> [(outil, paramètres)]; entrées invalides ignorées"""
+    calls = []
+    for item in raw or []:
+        function = item.get("function") if isinstance(item, dict) else None
+        if not isinstance(function, dict) or not function.get("name"):
+            continue
+        calls.append((str(function["name"]), _arguments(function.get("arguments"))))
+    return calls
+
+
+def parse_json_reply(text: str) -> tuple[str, list[tuple[str, dict]]] | None:
+    """Réponse du mode json -> (réflexion, appels); None si elle ne suit pas REPLY_SCHEMA"""
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("actions"), list):
+        return None
+    calls = [
+        (str(action["tool"]), _arguments(action.get("params")))
+        for action in data["actions"]
+        if isinstance(action, dict) and action.get("tool")
+    ]
+    return str(data.get("thought") or ""), calls
+
+
+def _quote(value) -> str:
+    if not isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if "\n" not in value and "'" not in value:
+        return f"'{value}'"
+    if "\n" not in value and '"' not in value:
+        return f'"{value}"'
+    if "'''" not in value and not value.endswith("'"):
+        return f"'''{value}'''"
+    return f'"""{value}"""'
+
+
+def format_action(name: str, params: dict) -> str:
+    """Appel structuré -> ligne ACTION du protocole texte"""
+    args = ", ".join(f"{key}={_quote(value)}" for key, value in params.items())
+    return f"ACTION: {name}({args})"
+
+
+def format_reply(thought: str, calls: list[tuple[str, dict]]) -> str:
+    """Texte d'historique d'une réponse structurée (réflexion puis lignes ACTION)"""
+    lines = [thought.strip()] if thought and thought.strip() else []
+    lines.extend(format_action(name, params) for name, params in calls)
+    return "\n".join(lines)
+
+
+def record_outcome(model: str, mode: str, outcome: str):
+    REPLY_FORMAT.inc(model=model, mode=mode, outcome=outcome)
+    if outcome == "failure":
+        logger.warning(f"⚠️ {model} ({mode}): réponse sans appel reconnu")
+
+
+def format_stats() -> dict:
+    """Réponses par modèle et par mode, taux d'échec de format"""
+    models: dict[str, dict] = {}
+    for series in REPLY_FORMAT.snapshot():
+        labels = series["labels"]
+        modes = models.setdefault(labels["model"], {})
+        counts = modes.setdefault(labels["mode"], dict.fromkeys(OUTCOMES, 0))
+        counts[labels["outcome"]] = int(series["value"])
+    for modes in models.values():
+        for counts in modes.values():
+            total = sum(counts[o] for o in OUTCOMES)
+            counts["failure_rate"] = round(counts["failure"] / total, 3) if total else 0.0
+    return {"models": models, "no_tool_support": sorted(_no_tool_support)}
@@ -18,21 +18,59 @@ from collections.abc import Callable
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from config import get_settings
+from utils.tool_cache import get_tool_cache
+
 logger = logging.getLogger(__name__)
 
 # Registre des handlers d'outils
 _tool_handlers: dict[str, Callable] = {}
 _tool_metadata: dict[str, dict] = {}  # Métadonnées des outils (description, params)
 _handlers_loaded = False
+_registry_version = 0  # Incrémenté à chaque modification du registre
+_description_cache: tuple[int, str] | None = None  # (version, description)
+_schema_cache: tuple[int, list] | None = None  # (version, définitions JSON Schema)
+
+# Types déclarés ("str - description", annotations) -> types JSON Schema
+_JSON_TYPES = {
+    "str": "string",
+    "string": "string",
+    "int": "integer",
+    "integer": "integer",
+    "float": "number",
+    "number": "number",
+    "bool": "boolean",
+    "boolean": "boolean",
+    "list": "array",
+    "array": "array",
+    "dict": "object",
+    "object": "object",
+}
 
 # Chemin du dossier tools
 TOOLS_DIR = Path(__file__).parent
 
 
-def register_tool(name: str, description: str = None, parameters: dict = None):
+def register_tool(
+    name: str,
+    description: str = None,
+    parameters: dict = None,
+    mutating: bool = False,
+    cacheable: bool = False,
+    cache_ttl: float = None,
+    resources: tuple = (),
+):
     """
     Décorateur pour enregistrer un handler d'outil.
 
+    mutating=True signale un outil qui modifie l'état (fichiers, conteneurs,
+    services...): le moteur ne l'exécute jamais en parallèle avec lui-même.
+
+    cacheable=True (outils en lecture seule) mémorise le résultat pendant cache_ttl
+    secondes (défaut: AI_TOOL_CACHE_TTL). resources ("docker", "files"...) relie
+    lecteurs et écrivains: un outil mutating invalide les entrées des outils
+    partageant une de ses ressources, ou tout le cache s'il n'en déclare aucune.
+
     Usage:
         @register_tool("mon_outil", description="Fait quelque chose", parameters={"arg": "str"})
         async def mon_outil(params: dict) -> str:
@@ -40,7 +78,9 @@ def register_tool(name: str, description: str = None, parameters: dict = None):
     """
 
     def decorator(func: Callable):
+        global _registry_version
         _tool_handlers[name] = func
+        _registry_version += 1
 
         # Extraire les métadonnées
         doc = description or func.__doc__ or f"Outil {name}"
@@ -64,6 +104,10 @@ def register_tool(name: str, description: str = None, parameters: dict = None):
             "name": name,
             "description": doc.strip().split("\n")[0] if doc else name,
             "parameters": params,
+            "mutating": mutating,
+            "cacheable": cacheable,
+            "cache_ttl": cache_ttl,
+            "resources": tuple(resources),
         }
 
         logger.debug(f"🔧 Outil enregistré: {name}")
@@ -112,11 +156,13 @@ def reload_tools() -> dict:
     Returns:
         dict avec le nombre d'outils et les modules chargés
     """
-    global _handlers_loaded
+    global _handlers_loaded, _registry_version
 
-    # Vider les registres
+    # Vider les registres (et les résultats mémorisés des anciens handlers)
     _tool_handlers.clear()
     _tool_metadata.clear()
+    _registry_version += 1
+    get_tool_cache().invalidate()
     _handlers_loaded = False
 
     # Recharger
@@ -152,31 +198,47 @@ async def execute_tool(
         available = ", ".join(sorted(_tool_handlers.keys())[:15])
         return f"❌ Outil inconnu: {tool_name}. Disponibles: {available}..."
 
-    try:
-        handler = _tool_handlers[tool_name]
+    handler = _tool_handlers[tool_name]
+    meta = _tool_metadata.get(tool_name, {})
 
-        # Déterminer les arguments à passer selon la signature
-        sig = inspect.signature(handler)
-        param_names = list(sig.parameters.keys())
+    async def call() -> str:
+        try:
+            # Déterminer les arguments à passer selon la signature
+            sig = inspect.signature(handler)
+            param_names = list(sig.parameters.keys())
+
+            kwargs = {"params": params} if "params" in param_names else {}
+
+            if "security_validator" in param_names:
+                kwargs["security_validator"] = security_validator
+            if "audit_logger" in param_names:
+                kwargs["audit_logger"] = audit_logger
+            if "uploaded_files" in param_names:
+                kwargs["uploaded_files"] = uploaded_files
+
+            # Appeler le handler
+            if kwargs:
+                return await handler(**kwargs)
+            else:
+                return await handler(params)
 
-        kwargs = {"params": params} if "params" in param_names else {}
+        except Exception as e:
+            logger.error(f"Erreur exécution {tool_name}: {e}")
+            return f"❌ Erreur {tool_name}: {str(e)}"
 
-        if "security_validator" in param_names:
-            kwargs["security_validator"] = security_validator
-        if "audit_logger" in param_names:
-            kwargs["audit_logger"] = audit_logger
-        if "uploaded_files" in param_names:
-            kwargs["uploaded_files"] = uploaded_files
+    if not get_settings().tool_cache_enabled:
+        return await call()
 
-        # Appeler le handler
-        if kwargs:
-            return await handler(**kwargs)
-        else:
-            return await handler(params)
+    cache = get_tool_cache()
+    if meta.get("cacheable"):
+        return await cache.get_or_call(
+            tool_name, params, call, ttl=meta.get("cache_ttl"), resources=meta["resources"]
+        )
 
-    except Exception as e:
-        logger.error(f"Erreur exécution {tool_name}: {e}")
-        return f"❌ Erreur {tool_name}: {str(e)}"
+    result = await call()
+    if meta.get("mutating"):
+        cache.invalidate(meta["resources"])
+    return result
 
 
 def get_tools_definitions() -> list[dict]:
@@ -191,20 +253,110 @@ def TOOLS_DEFINITIONS():
     return get_tools_definitions()
 
 
-def get_tools_description() -> str:
-    """Génère la description des outils pour le prompt système"""
+def get_tools_version() -> int:
+    """Version du registre: change à chaque ajout d'outil ou rechargement"""
     _ensure_handlers_loaded()
+    return _registry_version
+
+
+def describe_tool(name: str) -> str:
+    """Ligne `- outil(params): description` d'un outil du registre"""
+    meta = _tool_metadata[name]
+    params = meta.get("parameters", {})
+    if params:
+        params_str = ", ".join([f"{k}: {v}" for k, v in params.items()])
+        return f"- {name}({params_str}): {meta['description']}"
+    return f"- {name}(): {meta['description']}"
+
+
+def get_tools_description(names=None) -> str:
+    """
+    Génère la description des outils pour le prompt système.
+    Mise en cache par version du registre: texte identique octet pour octet
+    tant qu'aucun outil n'est ajouté/rechargé (préfixe stable pour le cache KV).
+    names: sous-ensemble d'outils (sélection par requête), toujours dans l'ordre alphabétique.
+    """
+    global _description_cache
+    _ensure_handlers_loaded()
+
+    if names is not None:
+        return "\n".join(describe_tool(n) for n in sorted(set(names)) if n in _tool_metadata)
 
-    lines = []
+    if _description_cache and _description_cache[0] == _registry_version:
+        return _description_cache[1]
+
+    description = "\n".join(describe_tool(name) for name in sorted(_tool_metadata))
+    _description_cache = (_registry_version, description)
+    return description
+
+
+def _parameter_schema(spec) -> tuple[dict, bool]:
+    """("str - Chemin (optionnel)") -> ({"type": "string", "description": ...}, requis)"""
+    type_name, _, description = str(spec).partition(" - ")
+    schema = {"type": _JSON_TYPES.get(type_name.strip().lower(), "string")}
+    if description.strip():
+        schema["description"] = description.strip()
+    lowered = description.lower()
+    return schema, "optionnel" not in lowered and "défaut" not in lowered
+
+
+def get_tools_schema(names=None) -> list[dict]:
+    """
+    Définitions des outils au format "tools" d'Ollama (JSON Schema), final_answer compris.
+    Mise en cache par version du registre, comme get_tools_description().
+    names: sous-ensemble d'outils (final_answer toujours inclus).
+    """
+    global _schema_cache
+    _ensure_handlers_loaded()
+
+    if names is not None:
+        wanted = set(names) | {"final_answer"}
+        return [t for t in get_tools_schema() if t["function"]["name"] in wanted]
+
+    if _schema_cache and _schema_cache[0] == _registry_version:
+        return _schema_cache[1]
+
+    definitions = []
     for name, meta in sorted(_tool_metadata.items()):
+        if name == "final_answer":
+            continue  # Déclaré sans paramètres: défini explicitement ci-dessous
         params = meta.get("parameters", {})
-        if params:
-            params_str = ", ".join([f"{k}: {v}" for k, v in params.items()])
-            lines.append(f"- {name}({params_str}): {meta['description']}")
+        if params.get("type") == "object" and isinstance(params.get("properties"), dict):
+            schema = params  # Déjà déclarés en JSON Schema (outils RAG)
         else:
-            lines.append(f"- {name}(): {meta['description']}")
+            properties, required = {}, []
+            for param, spec in params.items():
+                properties[param], is_required = _parameter_schema(spec)
+                if is_required:
+                    required.append(param)
+            schema = {"type": "object", "properties": properties, "required": required}
+        definitions.append(
+            {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": meta["description"],
+                    "parameters": schema,
+                },
+            }
+        )
+    definitions.append(
+        {
+            "type": "function",
+            "function": {
+                "name": "final_answer",
+                "description": "Termine la tâche avec la réponse complète pour l'utilisateur",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"answer": {"type": "string", "description": "Réponse finale"}},
+                    "required": ["answer"],
+                },
+            },
+        }
+    )
 
-    return "\n".join(lines)
+    _schema_cache = (_registry_version, definitions)
+    return definitions
 
 
 def get_tool_names() -> list:
@@ -213,6 +365,12 @@ def get_tool_names() -> list:
     return list(_tool_handlers.keys())
 
 
+def is_mutating_tool(tool_name: str) -> bool:
+    """True si l'outil est déclaré comme modifiant l'état (mutating=True)"""
+    _ensure_handlers_loaded()
+    return _tool_metadata.get(tool_name, {}).get("mutating", False)
+
+
 def get_tool_count() -> int:
     """Retourne le nombre d'outils disponibles"""
     _ensure_handlers_loaded()
@@ -242,6 +400,10 @@ __all__ = [
     "get_tools_definitions",
     "TOOLS_DEFINITIONS",
     "get_tools_description",
+    "describe_tool",
+    "get_tools_schema",
+    "get_tools_version",
     "get_tool_names",
     "get_tool_count",
+    "is_mutating_tool",
 ]
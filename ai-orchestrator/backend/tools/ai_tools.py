@@ -12,6 +12,7 @@ import os
 import httpx
 
 from tools import register_tool
+from utils.ollama_client import get_ollama_pool
 
 logger = logging.getLogger(__name__)
 
@@ -55,23 +56,23 @@ async def analyze_image(params: dict, uploaded_files: dict = None) -> str:
 
     try:
         # Appel à Ollama avec le modèle vision
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{OLLAMA_URL}/api/generate",
-                json={
-                    "model": VISION_MODEL,
-                    "prompt": query,
-                    "images": [image_data],
-                    "stream": False,
-                },
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                analysis = result.get("response", "Analyse non disponible")
-                return f"🖼️ Analyse de {image_name}:\n\n{analysis}"
-            else:
-                return f"❌ Erreur API vision: {response.status_code}"
+        response = await get_ollama_pool().post(
+            f"{OLLAMA_URL}/api/generate",
+            json={
+                "model": VISION_MODEL,
+                "prompt": query,
+                "images": [image_data],
+                "stream": False,
+            },
+            timeout=120.0,
+        )
+
+        if response.status_code == 200:
+            result = response.json()
+            analysis = result.get("response", "Analyse non disponible")
+            return f"🖼️ Analyse de {image_name}:\n\n{analysis}"
+        else:
+            return f"❌ Erreur API vision: {response.status_code}"
 
     except httpx.TimeoutException:
         return "⏱️ Timeout lors de l'analyse (image trop complexe?)"
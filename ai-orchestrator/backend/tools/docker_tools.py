@@ -32,7 +32,7 @@ def sanitize_container_name(name: str) -> str:
     return name
 
 
-@register_tool("docker_status")
+@register_tool("docker_status", cacheable=True, resources=("docker",))
 async def docker_status(params: dict) -> str:
     """Liste des conteneurs Docker avec leur statut"""
     output, code = await run_command_async(
@@ -41,7 +41,7 @@ async def docker_status(params: dict) -> str:
     return f"Conteneurs Docker:\n{output}"
 
 
-@register_tool("docker_logs")
+@register_tool("docker_logs", cacheable=True, cache_ttl=5, resources=("docker",))
 async def docker_logs(params: dict) -> str:
     """Obtenir les logs d'un conteneur Docker"""
     container = params.get("container", "")
@@ -68,7 +68,7 @@ async def docker_logs(params: dict) -> str:
     return f"Logs de {container} (dernières {lines} lignes):\n{output}"
 
 
-@register_tool("docker_restart")
+@register_tool("docker_restart", mutating=True, resources=("docker",))
 async def docker_restart(params: dict) -> str:
     """Redémarrer un conteneur Docker"""
     container = params.get("container", "")
@@ -88,7 +88,7 @@ async def docker_restart(params: dict) -> str:
     return f"{status} Redémarrage de {container}: {output}"
 
 
-@register_tool("docker_compose")
+@register_tool("docker_compose", mutating=True, resources=("docker",))
 async def docker_compose(params: dict) -> str:
     """Exécuter une commande docker compose"""
     action = params.get("action", "")
@@ -117,7 +117,7 @@ async def docker_compose(params: dict) -> str:
     return f"{status} docker compose {action}:\n{output}"
 
 
-@register_tool("docker_exec")
+@register_tool("docker_exec", mutating=True, resources=("docker",))
 async def docker_exec(params: dict) -> str:
     """Exécuter une commande dans un conteneur"""
     container = params.get("container", "")
@@ -137,7 +137,7 @@ async def docker_exec(params: dict) -> str:
     return f"Commande dans {container}:\n{output}"
 
 
-@register_tool("docker_stats")
+@register_tool("docker_stats", cacheable=True, cache_ttl=5, resources=("docker",))
 async def docker_stats(params: dict) -> str:
     """Statistiques des conteneurs Docker"""
     output, code = await run_command_async(
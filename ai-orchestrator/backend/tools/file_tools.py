@@ -13,7 +13,7 @@ from tools import register_tool
 from utils.async_subprocess import run_command_async
 
 
-@register_tool("read_file")
+@register_tool("read_file", cacheable=True, resources=("files",))
 async def read_file(params: dict, security_validator=None, audit_logger=None) -> str:
     """Lire le contenu d'un fichier"""
     path = params.get("path", "")
@@ -56,7 +56,7 @@ async def read_file(params: dict, security_validator=None, audit_logger=None) ->
         return f"❌ Erreur lecture: {str(e)}"
 
 
-@register_tool("write_file")
+@register_tool("write_file", mutating=True, resources=("files", "git"))
 async def write_file(params: dict, security_validator=None, audit_logger=None) -> str:
     """Écrire du contenu dans un fichier avec vérification de syntaxe pour Python"""
     path = params.get("path", "")
@@ -106,7 +106,7 @@ async def write_file(params: dict, security_validator=None, audit_logger=None) -
         return f"❌ Erreur écriture: {str(e)}"
 
 
-@register_tool("list_directory")
+@register_tool("list_directory", cacheable=True, resources=("files",))
 async def list_directory(params: dict) -> str:
     """Lister le contenu d'un répertoire"""
     path = params.get("path", ".")
@@ -135,7 +135,7 @@ async def list_directory(params: dict) -> str:
         return f"❌ Erreur listing: {str(e)}"
 
 
-@register_tool("search_files")
+@register_tool("search_files", cacheable=True, resources=("files",))
 async def search_files(params: dict) -> str:
     """Rechercher des fichiers par pattern"""
     pattern = params.get("pattern", "")
@@ -154,7 +154,7 @@ async def search_files(params: dict) -> str:
     return f"Fichiers trouvés ({pattern}):\n{output}"
 
 
-@register_tool("file_info")
+@register_tool("file_info", cacheable=True, resources=("files",))
 async def file_info(params: dict) -> str:
     """Obtenir des informations détaillées sur un fichier"""
     path = params.get("path", "")
@@ -11,7 +11,7 @@ from tools import register_tool
 from utils.async_subprocess import run_command_async
 
 
-@register_tool("git_status")
+@register_tool("git_status", cacheable=True, resources=("git",))
 async def git_status(params: dict, security_validator=None, audit_logger=None) -> str:
     """Obtenir le statut d'un dépôt Git"""
     path = params.get("path", ".")
@@ -32,7 +32,7 @@ async def git_status(params: dict, security_validator=None, audit_logger=None) -
     return f"Git status ({path}):\n{output}"
 
 
-@register_tool("git_diff")
+@register_tool("git_diff", cacheable=True, resources=("git",))
 async def git_diff(params: dict) -> str:
     """Voir les différences non commitées"""
     path = params.get("path", ".")
@@ -50,7 +50,7 @@ async def git_diff(params: dict) -> str:
     return f"Git diff ({path}):\n{output[:5000]}"
 
 
-@register_tool("git_log")
+@register_tool("git_log", cacheable=True, resources=("git",))
 async def git_log(params: dict) -> str:
     """Historique des commits Git"""
     path = params.get("path", ".")
@@ -67,7 +67,7 @@ async def git_log(params: dict) -> str:
     return f"Git log ({path}, {count} derniers commits):\n{output}"
 
 
-@register_tool("git_pull")
+@register_tool("git_pull", mutating=True, resources=("git", "files"))
 async def git_pull(params: dict) -> str:
     """Pull les dernières modifications"""
     path = params.get("path", ".")
@@ -79,7 +79,7 @@ async def git_pull(params: dict) -> str:
     return f"{status} Git pull ({path}):\n{output}"
 
 
-@register_tool("git_branch")
+@register_tool("git_branch", cacheable=True, resources=("git",))
 async def git_branch(params: dict) -> str:
     """Lister les branches Git"""
     path = params.get("path", ".")
@@ -247,7 +247,9 @@ async def gmail_read(params: dict) -> str:
 @register_tool(
     "gmail_send",
     description="Envoyer un email",
-    parameters={"to": "str - Destinataire", "subject": "str - Sujet", "body": "str - Contenu", "cc": "str - CC (optionnel)", "html": "bool - Format HTML (défaut: false)"}
+    parameters={"to": "str - Destinataire", "subject": "str - Sujet", "body": "str - Contenu", "cc": "str - CC (optionnel)", "html": "bool - Format HTML (défaut: false)"},
+    mutating=True,
+    resources=("gmail",),
 )
 async def gmail_send(params: dict) -> str:
     """Envoyer un email."""
@@ -285,7 +287,9 @@ async def gmail_send(params: dict) -> str:
 @register_tool(
     "gmail_reply",
     description="Répondre à un email",
-    parameters={"message_id": "str - ID du message original", "body": "str - Contenu de la réponse", "reply_all": "bool - Répondre à tous (défaut: false)"}
+    parameters={"message_id": "str - ID du message original", "body": "str - Contenu de la réponse", "reply_all": "bool - Répondre à tous (défaut: false)"},
+    mutating=True,
+    resources=("gmail",),
 )
 async def gmail_reply(params: dict) -> str:
     """Répondre à un email."""
@@ -350,7 +354,9 @@ async def gmail_reply(params: dict) -> str:
 @register_tool(
     "gmail_delete",
     description="Supprimer des emails (mettre à la corbeille)",
-    parameters={"message_ids": "list - Liste des IDs à supprimer"}
+    parameters={"message_ids": "list - Liste des IDs à supprimer"},
+    mutating=True,
+    resources=("gmail",),
 )
 async def gmail_delete(params: dict) -> str:
     """Supprimer emails (corbeille)."""
@@ -412,7 +418,9 @@ async def gmail_label_list(params: dict) -> str:
 @register_tool(
     "gmail_label_create",
     description="Créer un nouveau libellé",
-    parameters={"name": "str - Nom du libellé", "color": "str - Couleur hex (optionnel, ex: #ff0000)"}
+    parameters={"name": "str - Nom du libellé", "color": "str - Couleur hex (optionnel, ex: #ff0000)"},
+    mutating=True,
+    resources=("gmail",),
 )
 async def gmail_label_create(params: dict) -> str:
     """Créer un libellé."""
@@ -447,7 +455,9 @@ async def gmail_label_create(params: dict) -> str:
 @register_tool(
     "gmail_label_apply",
     description="Appliquer ou retirer des libellés à des emails",
-    parameters={"message_ids": "list - IDs des messages", "add_labels": "list - Labels à ajouter", "remove_labels": "list - Labels à retirer"}
+    parameters={"message_ids": "list - IDs des messages", "add_labels": "list - Labels à ajouter", "remove_labels": "list - Labels à retirer"},
+    mutating=True,
+    resources=("gmail",),
 )
 async def gmail_label_apply(params: dict) -> str:
     """Appliquer/retirer labels."""
@@ -482,7 +492,9 @@ async def gmail_label_apply(params: dict) -> str:
 @register_tool(
     "gmail_archive",
     description="Archiver des emails (retirer de INBOX)",
-    parameters={"message_ids": "list - IDs des messages à archiver"}
+    parameters={"message_ids": "list - IDs des messages à archiver"},
+    mutating=True,
+    resources=("gmail",),
 )
 async def gmail_archive(params: dict) -> str:
     """Archiver emails."""
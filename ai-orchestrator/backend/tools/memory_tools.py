@@ -12,9 +12,8 @@ import logging
 import os
 from datetime import datetime
 
-import httpx
-
 from tools import register_tool
+from utils.ollama_client import get_ollama_pool
 
 logger = logging.getLogger(__name__)
 
@@ -33,16 +32,17 @@ _memory_collection = None
 async def get_embedding(text: str) -> list[float] | None:
     """Obtenir embedding via Ollama (bge-m3 - 1024 dim)"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{OLLAMA_URL}/api/embeddings", json={"model": EMBEDDING_MODEL, "prompt": text}
-            )
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("embedding")
-            else:
-                logger.error(f"Ollama embedding error: {response.status_code}")
-                return None
+        response = await get_ollama_pool().post(
+            f"{OLLAMA_URL}/api/embeddings",
+            json={"model": EMBEDDING_MODEL, "prompt": text},
+            timeout=30.0,
+        )
+        if response.status_code == 200:
+            data = response.json()
+            return data.get("embedding")
+        else:
+            logger.error(f"Ollama embedding error: {response.status_code}")
+            return None
     except Exception as e:
         logger.error(f"Embedding error: {e}")
         return None
@@ -85,7 +85,7 @@ def get_memory_collection():
     return _memory_collection
 
 
-@register_tool("memory_store")
+@register_tool("memory_store", mutating=True, resources=("memory",))
 async def memory_store(params: dict) -> str:
     """
     Stocker une information en memoire semantique avec embeddings Ollama.
@@ -133,7 +133,7 @@ async def memory_store(params: dict) -> str:
         return f"Erreur stockage memoire: {str(e)}"
 
 
-@register_tool("memory_recall")
+@register_tool("memory_recall", cacheable=True, resources=("memory",))
 async def memory_recall(params: dict) -> str:
     """
     Rappeler des informations par recherche semantique avec embeddings Ollama.
@@ -207,7 +207,7 @@ async def memory_recall(params: dict) -> str:
         return f"Erreur rappel memoire: {str(e)}"
 
 
-@register_tool("memory_list")
+@register_tool("memory_list", cacheable=True, resources=("memory",))
 async def memory_list(params: dict) -> str:
     """Lister tous les souvenirs stockes"""
     category = params.get("category", None)
@@ -242,7 +242,7 @@ async def memory_list(params: dict) -> str:
         return f"Erreur: {str(e)}"
 
 
-@register_tool("memory_delete")
+@register_tool("memory_delete", mutating=True, resources=("memory",))
 async def memory_delete(params: dict) -> str:
     """Supprimer un souvenir par cle"""
     key = params.get("key", "")
@@ -263,7 +263,7 @@ async def memory_delete(params: dict) -> str:
         return f"Erreur: {str(e)}"
 
 
-@register_tool("memory_stats")
+@register_tool("memory_stats", cacheable=True, resources=("memory",))
 async def memory_stats(params: dict) -> str:
     """Obtenir les statistiques de la memoire"""
     collection = get_memory_collection()
@@ -26,6 +26,8 @@ ALLOW_TOOL_CREATION = os.getenv("ALLOW_TOOL_CREATION", "false").lower() == "true
         "code": "str",
         "parameters": "dict (optionnel)",
     },
+    mutating=True,
+    resources=("tools",),
 )
 async def create_tool(params: dict) -> str:
     """
@@ -142,6 +144,8 @@ Total outils disponibles: {result["tools_count"]}"""
     "list_my_tools",
     description="Lister tous les outils disponibles de l'orchestrateur",
     parameters={},
+    cacheable=True,
+    resources=("tools",),
 )
 async def list_my_tools(params: dict) -> str:
     """Liste tous les outils disponibles avec leurs descriptions."""
@@ -162,6 +166,8 @@ async def list_my_tools(params: dict) -> str:
     "reload_my_tools",
     description="Recharger tous les outils à chaud (après création/modification)",
     parameters={},
+    mutating=True,
+    resources=("tools",),
 )
 async def reload_my_tools(params: dict) -> str:
     """Recharge dynamiquement tous les outils."""
@@ -180,6 +186,8 @@ Liste: {", ".join(sorted(result["tools"]))}"""
     "view_tool_code",
     description="Voir le code source d'un outil existant",
     parameters={"name": "str"},
+    cacheable=True,
+    resources=("tools",),
 )
 async def view_tool_code(params: dict) -> str:
     """Affiche le code source d'un outil pour s'en inspirer."""
@@ -212,6 +220,8 @@ async def view_tool_code(params: dict) -> str:
     "delete_tool",
     description="Supprimer un outil auto-généré (sécurité: ne peut pas supprimer les outils système)",
     parameters={"name": "str"},
+    mutating=True,
+    resources=("tools",),
 )
 async def delete_tool(params: dict) -> str:
     """Supprime un outil créé par l'IA."""
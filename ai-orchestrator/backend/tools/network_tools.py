@@ -53,7 +53,7 @@ async def check_url(params: dict) -> str:
         return f"❌ Erreur: {str(e)}"
 
 
-@register_tool("network_interfaces")
+@register_tool("network_interfaces", cacheable=True, cache_ttl=30, resources=("network",))
 async def network_interfaces(params: dict) -> str:
     """Lister les interfaces réseau locales"""
     output, code = await run_command_async("ip -br addr show", timeout=10)
@@ -98,7 +98,7 @@ async def udm_clients(params: dict) -> str:
     return f"📱 Clients UDM:\n{output}\nBaux DHCP actifs: {dhcp_output.strip()}"
 
 
-@register_tool("udm_network_info")
+@register_tool("udm_network_info", cacheable=True, cache_ttl=30, resources=("network",))
 async def udm_network_info(params: dict) -> str:
     """Informations réseau de l'UDM"""
     commands = """
@@ -120,7 +120,7 @@ ip route show | head -10
     return f"🌐 UDM Network Info:\n{output}"
 
 
-@register_tool("dns_lookup")
+@register_tool("dns_lookup", cacheable=True, cache_ttl=60, resources=("network",))
 async def dns_lookup(params: dict) -> str:
     """Résolution DNS"""
     host = params.get("host", "")
@@ -22,7 +22,12 @@ async def ssh_cmd(cmd: str, timeout: int = 60) -> tuple:
     return await run_command_async(f'{SSH} "{cmd}"', timeout=timeout)
 
 
-@register_tool("ollama_list", description="Liste les modeles Ollama installes")
+@register_tool(
+    "ollama_list",
+    description="Liste les modeles Ollama installes",
+    cacheable=True,
+    resources=("ollama",),
+)
 async def ollama_list(params: dict) -> str:
     """Liste tous les modeles Ollama disponibles sur l'hote"""
     out, code = await ssh_cmd("ollama list", 30)
@@ -48,7 +53,12 @@ async def ollama_list(params: dict) -> str:
     return "\n".join(result)
 
 
-@register_tool("ollama_status", description="Verifie le statut du service Ollama")
+@register_tool(
+    "ollama_status",
+    description="Verifie le statut du service Ollama",
+    cacheable=True,
+    resources=("ollama",),
+)
 async def ollama_status(params: dict) -> str:
     """Verifie si Ollama est en cours d'execution"""
     # Verifier le service systemd
@@ -75,7 +85,11 @@ async def ollama_status(params: dict) -> str:
 
 
 @register_tool(
-    "ollama_pull", description="Telecharge un modele Ollama", parameters={"model": "str"}
+    "ollama_pull",
+    description="Telecharge un modele Ollama",
+    parameters={"model": "str"},
+    mutating=True,
+    resources=("ollama",),
 )
 async def ollama_pull(params: dict) -> str:
     """Telecharge un nouveau modele Ollama"""
@@ -125,7 +139,13 @@ async def ollama_run(params: dict) -> str:
         return f"❌ Reponse invalide: {out[:500]}"
 
 
-@register_tool("ollama_info", description="Informations sur un modele", parameters={"model": "str"})
+@register_tool(
+    "ollama_info",
+    description="Informations sur un modele",
+    parameters={"model": "str"},
+    cacheable=True,
+    resources=("ollama",),
+)
 async def ollama_info(params: dict) -> str:
     """Affiche les informations detaillees d'un modele"""
     model = params.get("model", "")
@@ -139,7 +159,13 @@ async def ollama_info(params: dict) -> str:
     return f"📋 **Infos {model}:**\n```\n{out[:2000]}\n```"
 
 
-@register_tool("ollama_rm", description="Supprime un modele Ollama", parameters={"model": "str"})
+@register_tool(
+    "ollama_rm",
+    description="Supprime un modele Ollama",
+    parameters={"model": "str"},
+    mutating=True,
+    resources=("ollama",),
+)
 async def ollama_rm(params: dict) -> str:
     """Supprime un modele Ollama"""
     model = params.get("model", "")
@@ -152,7 +178,12 @@ async def ollama_rm(params: dict) -> str:
     return f"❌ Erreur suppression: {out}"
 
 
-@register_tool("ollama_ps", description="Liste les modeles en cours d'execution")
+@register_tool(
+    "ollama_ps",
+    description="Liste les modeles en cours d'execution",
+    cacheable=True,
+    resources=("ollama",),
+)
 async def ollama_ps(params: dict) -> str:
     """Liste les modeles actuellement charges en memoire"""
     out, code = await ssh_cmd("ollama ps", 10)
@@ -165,7 +196,12 @@ async def ollama_ps(params: dict) -> str:
     return f"🔄 **Modeles en memoire:**\n```\n{out}\n```"
 
 
-@register_tool("ollama_restart", description="Redemarre le service Ollama")
+@register_tool(
+    "ollama_restart",
+    description="Redemarre le service Ollama",
+    mutating=True,
+    resources=("ollama",),
+)
 async def ollama_restart(params: dict) -> str:
     """Redemarre le service Ollama sur l'hote"""
     out, code = await ssh_cmd(
@@ -129,7 +129,9 @@ async def rag_search(
             }
         },
         "required": ["filepath"]
-    }
+    },
+    mutating=True,
+    resources=("rag",),
 )
 async def rag_index(
     filepath: str,
@@ -182,7 +184,9 @@ async def rag_index(
             }
         },
         "required": ["directory"]
-    }
+    },
+    mutating=True,
+    resources=("rag",),
 )
 async def rag_index_directory(
     directory: str,
@@ -223,7 +227,9 @@ async def rag_index_directory(
         "type": "object",
         "properties": {},
         "required": []
-    }
+    },
+    cacheable=True,
+    resources=("rag",),
 )
 async def rag_stats(**kwargs) -> str:
     """Statistiques du système RAG"""
@@ -90,7 +90,7 @@ async def run(cmd: str, timeout: int = 60) -> tuple:
     return await run_command_async(cmd, timeout)
 
 
-@register_tool("execute_command")
+@register_tool("execute_command", mutating=True)
 async def execute_command(params: dict, security_validator=None, **kw) -> str:
     cmd = params.get("command", "")
     if not cmd:
@@ -109,7 +109,7 @@ async def execute_command(params: dict, security_validator=None, **kw) -> str:
     return f"{'✅' if code == 0 else '❌'} {cmd[:80]}\n{out[:5000]}"
 
 
-@register_tool("system_info")
+@register_tool("system_info", cacheable=True, resources=("system",))
 async def system_info(params: dict) -> str:
     out, _ = await ssh("/home/lalpha/scripts/sysinfo.sh", 15)
     info = ["📊 **Système (Hôte)**"]
@@ -152,7 +152,7 @@ def sanitize_package_name(name: str) -> str:
     return name
 
 
-@register_tool("service_status")
+@register_tool("service_status", cacheable=True, resources=("services",))
 async def service_status(params: dict) -> str:
     try:
         svc = sanitize_service_name(params.get("service", ""))
@@ -174,7 +174,7 @@ async def service_status(params: dict) -> str:
     return f"**{svc}**: {st}\n```\n{out}\n```"
 
 
-@register_tool("service_control")
+@register_tool("service_control", mutating=True, resources=("services", "system"))
 async def service_control(params: dict) -> str:
     try:
         svc = sanitize_service_name(params.get("service", ""))
@@ -189,7 +189,7 @@ async def service_control(params: dict) -> str:
     return f"{'✅' if code == 0 else '❌'} systemctl {action} {svc}\n{out}"
 
 
-@register_tool("disk_usage")
+@register_tool("disk_usage", cacheable=True, cache_ttl=30, resources=("system", "files"))
 async def disk_usage(params: dict) -> str:
     path = params.get("path", "/home/lalpha")
     depth = min(int(params.get("depth", 1)), 3)
@@ -197,7 +197,7 @@ async def disk_usage(params: dict) -> str:
     return f"💾 {path}:\n```\n{out}\n```"
 
 
-@register_tool("package_install")
+@register_tool("package_install", mutating=True, resources=("system",))
 async def package_install(params: dict) -> str:
     try:
         pkg = sanitize_package_name(params.get("package", ""))
@@ -209,7 +209,7 @@ async def package_install(params: dict) -> str:
     return f"{'✅' if code == 0 else '❌'} {pkg}\n{out[-2000:]}"
 
 
-@register_tool("package_update")
+@register_tool("package_update", mutating=True, resources=("system",))
 async def package_update(params: dict) -> str:
     upgrade = params.get("upgrade", False)
     cmd = "sudo apt-get update" + (" && sudo apt-get upgrade -y" if upgrade else "")
@@ -0,0 +1,226 @@
+"""
+Cache sémantique des réponses factuelles
+Les questions classées "factual" par prompts.classify_query (définitions,
+explications) passaient toutes par la boucle ReAct complète sur le gros modèle.
+
+- Clé: embedding bge-m3 de la question (EmbeddingService du RAG)
+- Succès si la similarité cosinus avec une question déjà répondue dépasse le seuil
+- Expiration par TTL, LRU par espace de noms
+- Un espace de noms par modèle: la réponse d'un modèle ne sert pas pour un autre
+- Invalidation explicite: tout, un modèle, ou les questions proches d'un texte
+
+Usage:
+    from utils.answer_cache import get_answer_cache
+
+    cache = get_answer_cache()
+    hit = await cache.lookup("C'est quoi un reverse proxy?", model)
+    if hit is None:
+        answer = ...
+        await cache.store("C'est quoi un reverse proxy?", model, answer)
+    await cache.invalidate(model=model)
+"""
+
+import logging
+import math
+import operator
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from config import get_settings
+
+logger = logging.getLogger("answer_cache")
+
+EmbedFunc = Callable[[str], Awaitable[list[float] | None]]
+
+
+@dataclass
+class AnswerEntry:
+    """Réponse mémorisée et embedding normalisé de sa question"""
+
+    query: str
+    vector: list[float]
+    answer: str
+    created_at: float
+    expires_at: float
+    hits: int = 0
+
+
+@dataclass
+class CachedAnswer:
+    """Résultat d'une recherche réussie"""
+
+    answer: str
+    similarity: float
+    query: str  # Question d'origine
+    age_s: float
+    lookup_ms: float
+
+
+def _normalize(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+def _dot(a: list[float], b: list[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+async def _rag_embedding(text: str) -> list[float] | None:
+    """Embedding via l'EmbeddingService bge-m3 du RAG (None si indisponible)"""
+    try:
+        from services.rag.embeddings import get_embedding_service
+    except ImportError as e:
+        logger.debug(f"EmbeddingService indisponible: {e}")
+        return None
+    result = await get_embedding_service().generate(text)
+    return result.embedding if result else None
+
+
+class AnswerCache:
+    """Cache sémantique question -> réponse, par modèle"""
+
+    def __init__(
+        self,
+        threshold: float = None,
+        ttl: float = None,
+        max_entries: int = None,
+        embed: EmbedFunc = None,
+    ):
+        settings = get_settings()
+        self.threshold = threshold or settings.answer_cache_threshold
+        self.ttl = ttl or settings.answer_cache_ttl
+        self.max_entries = max_entries or settings.answer_cache_max_entries  # par modèle
+        self._embed = embed or _rag_embedding
+        self._namespaces: dict[str, OrderedDict[int, AnswerEntry]] = {}
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._invalidations = 0
+        self._lookup_ms = 0.0
+
+    async def _vector(self, text: str) -> list[float] | None:
+        try:
+            vector = await self._embed(text)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache réponses: embedding impossible ({e})")
+            return None
+        return _normalize(vector) if vector else None
+
+    def _best_match(
+        self, namespace: OrderedDict[int, AnswerEntry], vector: list[float], now: float
+    ) -> tuple[int | None, float]:
+        """Entrée non expirée la plus proche (les expirées sont purgées au passage)"""
+        best_id, best_score = None, -1.0
+        for entry_id, entry in list(namespace.items()):
+            if entry.expires_at <= now:
+                del namespace[entry_id]
+                continue
+            score = _dot(vector, entry.vector)
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        return best_id, best_score
+
+    async def lookup(self, query: str, model: str) -> CachedAnswer | None:
+        """Réponse mémorisée pour une question assez proche, dans l'espace du modèle"""
+        start = time.monotonic()
+        namespace = self._namespaces.get(model)
+        if not namespace:
+            self._misses += 1
+            return None
+        vector = await self._vector(query)
+        if vector is None:
+            self._misses += 1
+            return None
+
+        now = time.monotonic()
+        entry_id, score = self._best_match(namespace, vector, now)
+        lookup_ms = (time.monotonic() - start) * 1000
+        self._lookup_ms += lookup_ms
+        if entry_id is None or score < self.threshold:
+            self._misses += 1
+            return None
+
+        entry = namespace[entry_id]
+        namespace.move_to_end(entry_id)
+        entry.hits += 1
+        self._hits += 1
+        logger.info(
+            f"💾 Cache réponses: '{query[:60]}' ≈ '{entry.query[:60]}' "
+            f"(similarité {score:.3f}, {lookup_ms:.0f}ms)"
+        )
+        return CachedAnswer(entry.answer, score, entry.query, now - entry.created_at, lookup_ms)
+
+    async def store(self, query: str, model: str, answer: str) -> bool:
+        """Mémorise la réponse (remplace une question quasi identique déjà présente)"""
+        vector = await self._vector(query)
+        if vector is None or not answer:
+            return False
+        namespace = self._namespaces.setdefault(model, OrderedDict())
+        now = time.monotonic()
+        entry_id, score = self._best_match(namespace, vector, now)
+        if entry_id is not None and score >= self.threshold:
+            del namespace[entry_id]
+        elif len(namespace) >= self.max_entries:
+            namespace.popitem(last=False)
+        self._next_id += 1
+        namespace[self._next_id] = AnswerEntry(query, vector, answer, now, now + self.ttl)
+        self._stores += 1
+        return True
+
+    async def invalidate(self, model: str = None, query: str = None) -> int:
+        """
+        Supprime des réponses: celles proches de `query` (seuil de similarité), dans un
+        modèle ou tous; sans question, tout l'espace du modèle (ou tout le cache).
+        Retourne le nombre d'entrées supprimées.
+        """
+        self._invalidations += 1
+        namespaces = [model] if model else list(self._namespaces)
+        if query is None:
+            removed = sum(len(self._namespaces.pop(m, {})) for m in namespaces)
+        else:
+            vector = await self._vector(query)
+            removed = 0
+            if vector is not None:
+                for m in namespaces:
+                    namespace = self._namespaces.get(m, {})
+                    ids = [
+                        i for i, e in namespace.items() if _dot(vector, e.vector) >= self.threshold
+                    ]
+                    for i in ids:
+                        del namespace[i]
+                    removed += len(ids)
+        if removed:
+            logger.info(f"🧹 Cache réponses: {removed} réponse(s) invalidée(s)")
+        return removed
+
+    @property
+    def stats(self) -> dict:
+        """Statistiques du cache"""
+        lookups = self._hits + self._misses
+        return {
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "max_entries_per_model": self.max_entries,
+            "models": {m: len(ns) for m, ns in self._namespaces.items()},
+            "hits": self._hits,
+            "misses": self._misses,
+            "stores": self._stores,
+            "invalidations": self._invalidations,
+            "hit_rate": f"{(self._hits / lookups * 100) if lookups else 0:.1f}%",
+            "avg_lookup_ms": round(self._lookup_ms / lookups, 1) if lookups else 0.0,
+        }
+
+
+# Singleton
+_answer_cache: AnswerCache | None = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Obtient l'instance singleton du cache de réponses"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
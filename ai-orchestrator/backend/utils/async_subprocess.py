@@ -6,11 +6,26 @@ AI Orchestrator v4.0
 """
 
 import asyncio
+import contextlib
 import logging
+import os
+import signal
 
 logger = logging.getLogger(__name__)
 
 
+async def _kill(process: asyncio.subprocess.Process):
+    """Tue le processus et ses enfants (groupe créé par start_new_session), puis le récolte"""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+    await process.wait()
+
+
 async def run_command_async(
     command,
     timeout: int = 60,
@@ -33,6 +48,9 @@ async def run_command_async(
         - return_code = 0 pour succès
         - return_code = -1 pour timeout
         - return_code = -2 pour erreur d'exécution
+
+    Si la tâche appelante est annulée (client déconnecté), le processus et ses
+    enfants sont tués avant de propager l'annulation.
     """
     try:
         # En mode sécurisé, on n'utilise jamais le shell par défaut
@@ -44,6 +62,7 @@ async def run_command_async(
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
                 env=env,
+                start_new_session=True,
             )
         else:
             # Mode sécurisé par défaut sans shell
@@ -60,6 +79,7 @@ async def run_command_async(
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
                 env=env,
+                start_new_session=True,
             )
 
         try:
@@ -76,11 +96,15 @@ async def run_command_async(
 
             return output or "(aucune sortie)", process.returncode or 0
 
+        except asyncio.CancelledError:
+            # Le résultat n'intéresse plus personne: libérer la machine
+            logger.info(f"🛑 Commande annulée, processus tué: {str(command)[:50]}")
+            await asyncio.shield(_kill(process))
+            raise
         except TimeoutError:
             # Tuer le processus si timeout
             try:
-                process.kill()
-                await process.wait()
+                await _kill(process)
             except Exception:
                 pass
             logger.warning(f"Timeout ({timeout}s) pour: {command[:50]}...")
@@ -0,0 +1,124 @@
+"""
+Tours de chat annulables, liés à la connexion websocket
+websocket_chat ne remarquait la fermeture d'un onglet qu'au `send_json` suivant: la
+requête Ollama en cours (jusqu'à LLM_TIMEOUT) et les commandes lancées par les outils
+continuaient d'occuper le GPU et la machine pour une réponse que personne ne lira.
+
+- La réception tourne en tâche de fond: la déconnexion est vue même pendant un tour
+- Chaque tour (react_loop) est une tâche; à la déconnexion elle est annulée:
+  connexion httpx fermée (Ollama stoppe la génération), slot de l'ordonnanceur rendu,
+  processus des outils tués (run_command_async)
+- Les messages reçus pendant un tour sont traités ensuite, dans l'ordre
+
+Usage:
+    from utils.chat_connection import ChatConnection
+
+    async with ChatConnection(websocket) as conn:  # ou start() / close()
+        while True:
+            data = await conn.receive_json()  # WebSocketDisconnect à la fermeture
+            answer = await conn.run(react_loop(...))  # Annulé si le client part
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable
+from dataclasses import dataclass
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger("chat_connection")
+
+
+@dataclass
+class CancelStats:
+    """Tours interrompus par une déconnexion"""
+
+    turns: int = 0
+    cancelled: int = 0
+    cancelled_seconds: float = 0.0  # Temps déjà écoulé des tours annulés
+
+
+cancel_stats = CancelStats()
+
+
+class ChatConnection:
+    """Connexion websocket dont les tours de chat sont annulés à la déconnexion"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._closed = asyncio.Event()
+        self._error: Exception | None = None
+        self._receiver: asyncio.Task | None = None
+
+    async def start(self):
+        """Lance la réception en tâche de fond"""
+        if self._receiver is None:
+            self._receiver = asyncio.create_task(self._receive_loop())
+
+    async def close(self):
+        if self._receiver and not self._receiver.done():
+            self._receiver.cancel()
+            await asyncio.gather(self._receiver, return_exceptions=True)
+
+    async def __aenter__(self) -> "ChatConnection":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                await self._incoming.put(await self.websocket.receive_json())
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:  # JSON invalide, transport fermé...
+            self._error = e
+        finally:
+            self._closed.set()
+            self._incoming.put_nowait(None)
+
+    async def receive_json(self) -> dict:
+        """Message suivant; WebSocketDisconnect (ou l'erreur de réception) à la fermeture"""
+        data = await self._incoming.get()
+        if data is None:
+            self._incoming.put_nowait(None)  # Les appels suivants échouent aussi
+            if self._error is not None:
+                raise self._error
+            raise WebSocketDisconnect()
+        return data
+
+    async def run(self, coro: Awaitable):
+        """
+        Exécute un tour; si le client se déconnecte avant la fin, le tour est annulé
+        (et attendu jusqu'au bout du nettoyage) puis WebSocketDisconnect est levée.
+        """
+        cancel_stats.turns += 1
+        start = time.monotonic()
+        turn = asyncio.ensure_future(coro)
+        closed = asyncio.create_task(self._closed.wait())
+        try:
+            await asyncio.wait({turn, closed}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            turn.cancel()
+            raise
+        finally:
+            closed.cancel()
+
+        if turn.done():
+            return turn.result()
+
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+        elapsed = time.monotonic() - start
+        cancel_stats.cancelled += 1
+        cancel_stats.cancelled_seconds += elapsed
+        logger.info(f"🔌 Client déconnecté: tour annulé après {elapsed:.1f}s")
+        raise WebSocketDisconnect()
@@ -0,0 +1,299 @@
+"""
+Jobs de chat asynchrones
+POST /api/chat tient la requête HTTP ouverte pendant toute la boucle ReAct (jusqu'à
+30 itérations x LLM_TIMEOUT): connexions du proxy monopolisées, coupures par les
+timeouts Traefik.
+
+- Soumission immédiate: un identifiant de job, exécution par un pool borné de workers
+- Progression en Server-Sent Events, avec les mêmes événements que /ws/chat
+  (thinking, token, tool, result, complete, error) plus `job` (changements d'état)
+- Reprise du flux (Last-Event-ID): les événements sont numérotés et conservés
+- Résultat consultable jusqu'à expiration (TTL après la fin), annulation possible
+
+Usage:
+    from utils.chat_jobs import get_chat_jobs
+
+    async def run(sink):  # sink: même interface que le websocket (send_json)
+        answer = await react_loop(..., websocket=sink)
+        return {"response": answer}
+
+    job = await get_chat_jobs().submit(run, owner="admin")
+    async for event_id, event in get_chat_jobs().events(job):
+        ...
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+
+from config import get_settings
+from utils.llm_scheduler import llm_context
+
+logger = logging.getLogger("chat_jobs")
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+SSE_HEARTBEAT = 15.0  # secondes: garde la connexion ouverte derrière les proxys
+
+
+class JobQueueFull(Exception):
+    """Trop de jobs en attente: soumission refusée"""
+
+
+class _JobSink:
+    """Remplace le websocket de react_loop: les événements alimentent le job"""
+
+    def __init__(self, job: "ChatJob"):
+        self.job = job
+
+    async def send_json(self, event: dict):
+        self.job.publish(event)
+
+
+@dataclass
+class ChatJob:
+    """Job de chat: état, événements numérotés, résultat"""
+
+    id: str
+    run: Callable[[_JobSink], Awaitable[dict]] = field(repr=False)
+    owner: str | None = None
+    priority: str = "interactive"
+    max_events: int = 5000
+    status: str = "queued"  # queued | running | completed | failed | cancelled
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    expires_at: float | None = None
+    events: deque = field(init=False, repr=False)
+    _seq: itertools.count = field(default_factory=itertools.count, repr=False)
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self.events = deque(maxlen=self.max_events)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def publish(self, event: dict):
+        """Ajoute un événement et réveille les abonnés"""
+        self.events.append((next(self._seq), event))
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def set_status(self, status: str, **extra):
+        self.status = status
+        self.publish({"type": "job", "job_id": self.id, "status": status, **extra})
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+            "events": len(self.events),
+        }
+
+
+def format_sse(event_id: int, event: dict) -> str:
+    """Événement au format Server-Sent Events (nom = type de l'événement /ws/chat)"""
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event.get('type', 'message')}\ndata: {data}\n\n"
+
+
+class ChatJobManager:
+    """File de jobs, pool borné de workers et conservation des résultats"""
+
+    def __init__(
+        self,
+        workers: int = None,
+        max_queued: int = None,
+        ttl: float = None,
+        max_events: int = None,
+    ):
+        settings = get_settings()
+        self.workers = workers or settings.chat_jobs_workers
+        self.max_queued = max_queued or settings.chat_jobs_max_queued
+        self.ttl = settings.chat_jobs_ttl if ttl is None else ttl
+        self.max_events = max_events or settings.chat_jobs_max_events
+        self._jobs: dict[str, ChatJob] = {}
+        self._queue: asyncio.Queue | None = None
+        self._waiting = 0  # Jobs en file non annulés (un job annulé reste dans la Queue)
+        self._workers: list[asyncio.Task] = []
+        self._submitted = 0
+        self._rejected = 0
+
+    def _start(self):
+        """Workers lancés à la première soumission (boucle asyncio active)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(asyncio.create_task(self._worker(len(self._workers))))
+
+    def _purge(self):
+        now = time.time()
+        expired = [j for j in self._jobs.values() if j.expires_at and j.expires_at <= now]
+        for job in expired:
+            del self._jobs[job.id]
+        if expired:
+            logger.debug(f"🧹 {len(expired)} job(s) expiré(s)")
+
+    async def submit(
+        self,
+        run: Callable[[_JobSink], Awaitable[dict]],
+        owner: str = None,
+        priority: str = "interactive",
+    ) -> ChatJob:
+        """Met un job en file; JobQueueFull si trop de jobs attendent déjà"""
+        self._purge()
+        self._start()
+        if self._waiting >= self.max_queued:
+            self._rejected += 1
+            raise JobQueueFull(f"{self._waiting} jobs en attente")
+        job = ChatJob(
+            id=uuid.uuid4().hex,
+            run=run,
+            owner=owner,
+            priority=priority,
+            max_events=self.max_events,
+        )
+        self._jobs[job.id] = job
+        self._submitted += 1
+        self._waiting += 1
+        job.set_status("queued", position=self._waiting)
+        await self._queue.put(job)
+        return job
+
+    def get(self, job_id: str, owner: str = None) -> ChatJob | None:
+        """Job non expiré; None s'il appartient à un autre utilisateur"""
+        self._purge()
+        job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner not in (None, owner)):
+            return None
+        return job
+
+    def _finish(self, job: ChatJob, status: str, **extra):
+        if job.finished:
+            return
+        job.finished_at = time.time()
+        job.expires_at = job.finished_at + self.ttl
+        job.set_status(status, **extra)
+
+    async def cancel(self, job: ChatJob) -> bool:
+        """Annule un job en file ou en cours (LLM et outils interrompus); False si fini"""
+        if job.finished:
+            return False
+        if job.started_at is None:
+            self._waiting -= 1  # Ne compte plus dans max_queued
+        if job._task is not None:
+            job._task.cancel()
+            await asyncio.gather(job._task, return_exceptions=True)
+        self._finish(job, "cancelled")  # Encore en file: le worker l'ignorera
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.finished:
+                    self._waiting -= 1
+                    await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: ChatJob):
+        job.started_at = time.time()
+        job.set_status("running", queued_s=round(job.started_at - job.created_at, 3))
+        logger.info(f"🧵 Job {job.id[:8]} démarré ({job.priority})")
+        try:
+            with llm_context(priority=job.priority):
+                job._task = asyncio.create_task(job.run(_JobSink(job)))
+                job.result = await job._task
+        except asyncio.CancelledError:
+            self._finish(job, "cancelled")
+            logger.info(f"🛑 Job {job.id[:8]} annulé")
+            if asyncio.current_task().cancelling():
+                raise  # Arrêt du worker lui-même (shutdown)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            self._finish(job, "failed", error=job.error)
+            logger.error(f"❌ Job {job.id[:8]} en échec: {job.error}")
+        else:
+            self._finish(job, "completed")
+            logger.info(
+                f"✅ Job {job.id[:8]} terminé en {job.finished_at - job.started_at:.1f}s"
+            )
+        finally:
+            job._task = None
+
+    async def events(
+        self, job: ChatJob, after: int = -1, heartbeat: float = SSE_HEARTBEAT
+    ) -> AsyncIterator[tuple[int, dict] | None]:
+        """
+        Événements du job d'identifiant > after (historique puis direct), jusqu'à la fin.
+        None toutes les `heartbeat` secondes sans événement (commentaire SSE de maintien).
+        """
+        while True:
+            wakeup = job._wakeup  # Avant la lecture: un ajout pendant un yield réveille
+            for event_id, event in list(job.events):
+                if event_id > after:
+                    after = event_id
+                    yield event_id, event
+            if job.finished:
+                return
+            try:
+                await asyncio.wait_for(wakeup.wait(), heartbeat)
+            except TimeoutError:
+                yield None
+
+    async def shutdown(self):
+        """Arrête les workers (les jobs en cours sont annulés)"""
+        for job in self._jobs.values():
+            if job._task is not None:
+                job._task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def stats(self) -> dict:
+        """Statistiques des jobs"""
+        by_status = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "ttl": self.ttl,
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "queued": self._waiting,
+            "jobs": by_status,
+        }
+
+
+# Singleton
+_chat_jobs: ChatJobManager | None = None
+
+
+def get_chat_jobs() -> ChatJobManager:
+    """Obtient l'instance singleton du gestionnaire de jobs"""
+    global _chat_jobs
+    if _chat_jobs is None:
+        _chat_jobs = ChatJobManager()
+    return _chat_jobs
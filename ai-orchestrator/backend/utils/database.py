@@ -0,0 +1,253 @@
+"""
+Accès SQLite hors de la boucle asyncio
+Les helpers de main.py ouvraient une connexion par appel (connect, commit, close) dans
+les handlers async: chaque requête bloquait la boucle qui sert aussi les websockets.
+
+- Exécuteur dédié (threads "sqlite"): les requêtes ne bloquent plus la boucle
+- Une connexion par thread de l'exécuteur (AI_DB_POOL_SIZE), ouverte à la demande
+  et réutilisée: plus de connect()/close() par requête
+- Pragmas: WAL (lecteurs non bloqués par l'écrivain), synchronous, cache_size,
+  busy_timeout, tables temporaires en mémoire
+- Instructions préparées: cache sqlite3 par connexion (AI_DB_CACHED_STATEMENTS),
+  réutilisé tant que le texte SQL est identique (constantes, paramètres liés)
+- Écritures en transaction BEGIN IMMEDIATE (pas d'escalade de verrou en cours de route)
+- Migrations numérotées (PRAGMA user_version), chacune dans sa transaction
+- Pagination par clé (keyset): curseurs opaques encode_cursor / decode_cursor
+
+Métrique: db_query_seconds{op} (read | write), exécuteur compris.
+
+Usage:
+    from utils.database import get_database
+
+    db = get_database()
+    rows = await db.fetchall("SELECT * FROM messages WHERE conversation_id = ?", (conv_id,))
+    await db.execute("UPDATE conversations SET title = ? WHERE id = ?", (title, conv_id))
+    await db.transaction(lambda conn: ...)  # Plusieurs instructions, un seul commit
+    await db.migrate([create_tables, add_indexes])  # Au démarrage
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from config import get_settings
+from utils.metrics import FAST_BUCKETS, histogram
+
+logger = logging.getLogger("database")
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+DB_QUERY_SECONDS = histogram(
+    "db_query_seconds",
+    "Durée d'une requête SQLite (attente de l'exécuteur comprise)",
+    labels=("op",),
+    buckets=FAST_BUCKETS,
+)
+
+
+class Database:
+    """Connexions SQLite réutilisées, exécutées dans un pool de threads dédié"""
+
+    def __init__(
+        self,
+        path: str = None,
+        pool_size: int = None,
+        synchronous: str = None,
+        cache_size_kb: int = None,
+        busy_timeout_ms: int = None,
+        cached_statements: int = None,
+    ):
+        settings = get_settings()
+        self.path = path or settings.db_path
+        self.pool_size = pool_size or settings.db_pool_size
+        self.synchronous = (synchronous or settings.db_synchronous).upper()
+        if self.synchronous not in SYNCHRONOUS_MODES:
+            logger.warning(f"⚠️ synchronous={self.synchronous!r} inconnu, NORMAL utilisé")
+            self.synchronous = "NORMAL"
+        self.cache_size_kb = cache_size_kb or settings.db_cache_size_kb
+        self.busy_timeout_ms = busy_timeout_ms or settings.db_busy_timeout_ms
+        self.cached_statements = cached_statements or settings.db_cached_statements
+        self._executor: ThreadPoolExecutor | None = None
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._reads = 0
+        self._writes = 0
+        self._errors = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    # === Connexions (threads de l'exécuteur) ===
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,  # Transactions explicites (transaction())
+            check_same_thread=False,  # Fermées par close() depuis un autre thread
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="sqlite"
+            )
+        return self._executor
+
+    def _read(self, sql: str, params: tuple) -> list[dict]:
+        return [dict(row) for row in self._connection().execute(sql, params).fetchall()]
+
+    def _write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    async def _run(self, op: str, fn: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        try:
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            DB_QUERY_SECONDS.observe(elapsed, op=op)
+            if op == "read":
+                self._reads += 1
+            else:
+                self._writes += 1
+            self._total_ms += elapsed * 1000
+            self._max_ms = max(self._max_ms, elapsed * 1000)
+
+    # === API ===
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list[dict]:
+        """Lignes de la requête (dicts)"""
+        return await self._run("read", self._read, sql, params)
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> dict | None:
+        """Première ligne de la requête, ou None"""
+        rows = await self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def execute(self, sql: str, params: tuple = ()) -> int:
+        """Instruction d'écriture dans sa propre transaction; retourne rowcount"""
+        return await self.transaction(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """fn(conn) exécutée dans une transaction (un seul commit); retourne son résultat"""
+        return await self._run("write", self._write, fn)
+
+    async def migrate(self, migrations: list[Callable[[sqlite3.Connection], Any]]) -> int:
+        """
+        Applique dans l'ordre les migrations pas encore passées sur la base.
+        La migration N (1-based) amène PRAGMA user_version à N dans la même
+        transaction: une migration en échec est annulée et n'est pas marquée.
+        Retourne la version du schéma.
+        """
+
+        def apply(conn, version: int, migration: Callable) -> None:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+
+        row = await self.fetchone("PRAGMA user_version")
+        current = row["user_version"] if row else 0
+        for version, migration in enumerate(migrations, start=1):
+            if version <= current:
+                continue
+            await self.transaction(lambda conn, v=version, m=migration: apply(conn, v, m))
+            logger.info(f"🗄️ Migration {version} appliquée ({migration.__name__})")
+            current = version
+        return current
+
+    async def close(self):
+        """Attend les requêtes en cours puis ferme toutes les connexions"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown, True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @property
+    def stats(self) -> dict:
+        queries = self._reads + self._writes
+        return {
+            "path": self.path,
+            "pool_size": self.pool_size,
+            "connections": len(self._connections),
+            "synchronous": self.synchronous,
+            "reads": self._reads,
+            "writes": self._writes,
+            "errors": self._errors,
+            "avg_ms": round(self._total_ms / queries, 2) if queries else 0.0,
+            "max_ms": round(self._max_ms, 2),
+        }
+
+
+def encode_cursor(*values) -> str:
+    """Curseur opaque de pagination (valeurs de la clé de tri de la dernière ligne)"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Valeurs d'un curseur encode_cursor; ValueError s'il est invalide"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Curseur invalide: {cursor!r}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Curseur invalide: {cursor!r}")
+    return values
+
+
+# Singleton
+_database: Database | None = None
+
+
+def open_database(path: str = None) -> Database:
+    """Remplace l'instance partagée (main.py: DB_PATH)"""
+    global _database
+    _database = Database(path)
+    return _database
+
+
+def get_database() -> Database:
+    """Obtient l'instance singleton de la base"""
+    global _database
+    if _database is None:
+        _database = Database()
+    return _database
@@ -0,0 +1,296 @@
+"""
+Recherche plein texte dans l'historique des conversations (SQLite FTS5)
+Sans recherche, une question déjà traitée relançait une boucle ReAct complète.
+
+- Table virtuelle messages_fts (contenu externe: messages.content), alimentée par
+  des triggers sur messages: insertion, suppression, modification
+- Tokenizer unicode61 sans diacritiques: "systeme" trouve "système"
+- search(): résultats classés bm25 avec extraits (snippet) pour /api/conversations/search
+- context_for(): échanges passés proches d'une question (question + réponse de
+  l'assistant), source pré-vol "history" de react_loop. Mots vides retirés; seuls
+  les termes les plus rares (fréquences lues dans messages_fts_vocab) entrent dans
+  la requête OR: un échange retenu contient au moins min_overlap des termes, donc
+  au moins un de ces termes rares. bm25 ne classe plus toute la table à chaque
+  requête (bench_history.py)
+
+Métrique: history_search_seconds{use} (search | context).
+
+Usage:
+    from utils.history_search import create_messages_fts, get_history_search
+
+    await db.migrate([..., create_messages_fts, create_messages_fts_vocab])
+    get_history_search().ready = True
+    results = await get_history_search().search("nginx certificat", limit=20)
+    context = await get_history_search().context_for(question, exclude_conversation=conv_id)
+"""
+
+import logging
+import math
+import re
+import time
+import unicodedata
+
+from config import get_settings
+from utils.database import Database, get_database
+from utils.metrics import FAST_BUCKETS, histogram
+
+logger = logging.getLogger("history_search")
+
+MIN_TERM_LENGTH = 2
+MAX_TERMS = 16
+SNIPPET_TOKENS = 16
+ANSWER_MAX_CHARS = 800
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# Mots vides (sans diacritiques, comme terms()): présents dans presque tous les messages
+STOPWORDS = frozenset(
+    """
+    au aux avec ce ces cet cette comment dans de des du elle en est et etre eux il ils je
+    la le les leur lui ma mais me meme mes moi mon ne nos notre nous on ou par pas pour
+    qu que quel quelle quelles quels qui sa se ses si son sont sur ta te tes toi ton tu
+    un une vos votre vous ai as avez avons ont faire fait peux peut puis veux quoi cela ca
+    the is are was be to of and in on for it this that what how with do does can my
+    """.split()
+)
+
+HISTORY_SEARCH_SECONDS = histogram(
+    "history_search_seconds",
+    "Durée d'une recherche plein texte dans l'historique",
+    labels=("use",),
+    buckets=FAST_BUCKETS,
+)
+
+SEARCH_SQL = """SELECT m.id AS message_id, m.conversation_id, m.role, m.created_at,
+           c.title, snippet(messages_fts, 0, '**', '**', '…', ?) AS snippet,
+           bm25(messages_fts) AS score
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    LEFT JOIN conversations c ON c.id = m.conversation_id
+    WHERE messages_fts MATCH ?{filters}
+    ORDER BY rank LIMIT ?"""
+
+RELATED_SQL = """SELECT m.id, m.conversation_id, m.created_at, m.content, c.title,
+           bm25(messages_fts) AS score
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    LEFT JOIN conversations c ON c.id = m.conversation_id
+    WHERE messages_fts MATCH ? AND m.role = 'user' AND m.conversation_id IS NOT ?
+    ORDER BY rank LIMIT ?"""
+
+DOC_FREQ_SQL = "SELECT term, doc FROM messages_fts_vocab WHERE term IN ({placeholders})"
+
+ANSWER_SQL = """SELECT content FROM messages
+    WHERE conversation_id = ? AND id > ? AND role = 'assistant'
+    ORDER BY id LIMIT 1"""
+
+
+def create_messages_fts(c):
+    """Migration: index FTS5 de messages.content, tenu à jour par triggers"""
+    c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content,
+        content='messages',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS messages_fts_update
+        AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""")
+    # Messages existants
+    c.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def create_messages_fts_vocab(c):
+    """Migration: fréquences des termes de messages_fts (messages contenant chaque terme)"""
+    c.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts_vocab USING fts5vocab(messages_fts, 'row')"
+    )
+
+
+def terms(text: str, limit: int | None = MAX_TERMS) -> list[str]:
+    """Termes significatifs d'un texte (minuscules, sans doublons, ordre conservé)"""
+    # Diacritiques retirés, comme le tokenizer de messages_fts
+    text = "".join(
+        ch for ch in unicodedata.normalize("NFKD", text.lower()) if not unicodedata.combining(ch)
+    )
+    seen: dict[str, None] = {}
+    for term in _TERM.findall(text):
+        if len(term) >= MIN_TERM_LENGTH:
+            seen.setdefault(term, None)
+    return list(seen)[:limit]
+
+
+def significant_terms(text: str) -> list[str]:
+    """Termes d'une question sans les mots vides"""
+    return [t for t in terms(text, limit=None) if t not in STOPWORDS][:MAX_TERMS]
+
+
+def match_query(text: str, any_terms: bool = False) -> str | None:
+    """
+    Requête MATCH FTS5 sûre à partir d'un texte libre (termes entre guillemets:
+    pas de syntaxe FTS5 injectée). Tous les termes requis, le dernier en préfixe
+    (saisie en cours); any_terms: au moins un terme. None si aucun terme.
+    """
+    words = terms(text)
+    if not words:
+        return None
+    quoted = [f'"{w}"' for w in words]
+    if any_terms:
+        return " OR ".join(quoted)
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class HistorySearch:
+    """Recherche bm25 dans les messages et contexte des échanges passés"""
+
+    def __init__(self, db: Database = None):
+        settings = get_settings()
+        self._db = db
+        self.context_enabled = settings.history_context_enabled
+        self.context_limit = settings.history_context_limit
+        self.min_overlap = settings.history_context_min_overlap
+        self.ready = False  # Index FTS créé (init_db)
+        self._searches = 0
+        self._contexts = 0
+        self._context_hits = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    @property
+    def db(self) -> Database:
+        return self._db or get_database()
+
+    def _observe(self, use: str, start: float):
+        elapsed = time.monotonic() - start
+        HISTORY_SEARCH_SECONDS.observe(elapsed, use=use)
+        self._total_ms += elapsed * 1000
+        self._max_ms = max(self._max_ms, elapsed * 1000)
+
+    async def search(
+        self, query: str, limit: int = 20, conversation_id: str = None, role: str = None
+    ) -> list[dict]:
+        """Messages contenant tous les termes de la requête, les plus pertinents d'abord"""
+        match = match_query(query)
+        if match is None:
+            return []
+        filters, params = "", [SNIPPET_TOKENS, match]
+        if conversation_id:
+            filters += " AND m.conversation_id = ?"
+            params.append(conversation_id)
+        if role:
+            filters += " AND m.role = ?"
+            params.append(role)
+        params.append(limit)
+        start = time.monotonic()
+        try:
+            return await self.db.fetchall(SEARCH_SQL.format(filters=filters), tuple(params))
+        finally:
+            self._searches += 1
+            self._observe("search", start)
+
+    async def related_exchanges(
+        self, question: str, exclude_conversation: str = None, limit: int = None
+    ) -> list[dict]:
+        """
+        Questions passées proches (au moins min_overlap des termes de la question)
+        avec la réponse de l'assistant qui les a suivies
+        """
+        limit = limit or self.context_limit
+        wanted = set(significant_terms(question))
+        if not wanted:
+            return []
+        rare = await self._rarest_terms(wanted)
+        if not rare:
+            return []
+        match = match_query(" ".join(rare), any_terms=True)
+        candidates = await self.db.fetchall(RELATED_SQL, (match, exclude_conversation, limit * 5))
+        exchanges = []
+        for hit in candidates:
+            found = set(terms(hit["content"] or "", limit=None))
+            if len(wanted & found) / len(wanted) < self.min_overlap:
+                continue
+            answer = await self.db.fetchone(ANSWER_SQL, (hit["conversation_id"], hit["id"]))
+            if not answer or not answer["content"]:
+                continue
+            exchanges.append(
+                {
+                    "conversation_id": hit["conversation_id"],
+                    "title": hit["title"],
+                    "created_at": hit["created_at"],
+                    "question": hit["content"],
+                    "answer": answer["content"],
+                    "score": hit["score"],
+                }
+            )
+            if len(exchanges) >= limit:
+                break
+        return exchanges
+
+    async def _rarest_terms(self, wanted: set[str]) -> list[str]:
+        """
+        Termes à chercher: un message retenu contient au moins `need` termes de la
+        question, donc au moins un des (n - need + 1) plus rares parmi les n termes
+        présents dans l'index. [] si aucun message ne peut atteindre le recouvrement.
+        """
+        placeholders = ", ".join("?" * len(wanted))
+        rows = await self.db.fetchall(DOC_FREQ_SQL.format(placeholders=placeholders), tuple(wanted))
+        doc_freq = {row["term"]: row["doc"] for row in rows if row["doc"]}
+        need = max(1, math.ceil(self.min_overlap * len(wanted)))
+        if len(doc_freq) < need:
+            return []
+        return sorted(doc_freq, key=doc_freq.get)[: len(doc_freq) - need + 1]
+
+    async def context_for(self, question: str, exclude_conversation: str = None) -> str:
+        """Bloc de contexte pré-vol: échanges passés proches, ou "" """
+        start = time.monotonic()
+        try:
+            exchanges = await self.related_exchanges(question, exclude_conversation)
+        finally:
+            self._contexts += 1
+            self._observe("context", start)
+        if not exchanges:
+            return ""
+        self._context_hits += 1
+        lines = ["\n\n## ÉCHANGES PASSÉS SIMILAIRES (historique des conversations):"]
+        for ex in exchanges:
+            answer = ex["answer"]
+            if len(answer) > ANSWER_MAX_CHARS:
+                answer = answer[:ANSWER_MAX_CHARS] + "…"
+            lines.append(f"- [{ex['created_at']}] Q: {ex['question'][:300]}\n  R: {answer}")
+        logger.info(f"🔎 Historique: {len(exchanges)} échange(s) similaire(s) injecté(s)")
+        return "\n".join(lines) + "\n"
+
+    @property
+    def stats(self) -> dict:
+        calls = self._searches + self._contexts
+        return {
+            "ready": self.ready,
+            "context_enabled": self.context_enabled,
+            "searches": self._searches,
+            "contexts": self._contexts,
+            "context_hits": self._context_hits,
+            "avg_ms": round(self._total_ms / calls, 2) if calls else 0.0,
+            "max_ms": round(self._max_ms, 2),
+        }
+
+
+# Singleton
+_history_search: HistorySearch | None = None
+
+
+def get_history_search() -> HistorySearch:
+    """Obtient l'instance singleton de la recherche dans l'historique"""
+    global _history_search
+    if _history_search is None:
+        _history_search = HistorySearch()
+    return _history_search
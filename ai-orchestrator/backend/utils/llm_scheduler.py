@@ -0,0 +1,341 @@
+"""
+Ordonnanceur global des appels LLM
+Chats interactifs, boucles ReAct du self-healing et embeddings RAG partagent le
+même hôte Ollama. Sans coordination, un run de maintenance sur le 32B local fait
+attendre les utilisateurs sans que personne ne le voie.
+
+- Concurrence par modèle: 1 slot pour les gros modèles locaux, plus pour le cloud
+  et les embeddings (limites par catégorie du catalogue MODELS; « bge-m3 » et
+  « bge-m3:latest » partagent la même catégorie et les mêmes slots)
+- Priorités: le trafic interactif passe devant le trafic de fond (self-healing,
+  indexation); une requête de fond qui attend trop longtemps est promue
+- Équité: à priorité égale, le flux (conversation) servi le moins récemment passe
+  en premier, un flux bavard ne monopolise pas le modèle
+- Métriques: profondeur de file et temps d'attente par modèle et par priorité
+- Annulation (client déconnecté, course perdue): le slot est rendu aussitôt; le temps
+  GPU économisé est estimé d'après la durée moyenne des appels du modèle
+
+La priorité et le flux sont portés par des ContextVar, hérités par les tâches filles.
+
+Usage:
+    from utils.llm_scheduler import get_llm_scheduler, llm_context
+
+    with llm_context(priority="background", flow="self-healing"):
+        await react_loop(...)  # Tous les appels Ollama du run sont de fond
+
+    async with get_llm_scheduler().slot("qwen2.5-coder:32b-instruct-q4_K_M"):
+        ...
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from config import MODELS, get_settings
+from utils.metrics import histogram
+
+logger = logging.getLogger("llm_scheduler")
+
+PRIORITIES = {"interactive": 0, "background": 1}
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITIES.items()}
+WAIT_SAMPLES = 256  # Attentes conservées par priorité (percentiles)
+HOLD_EWMA_ALPHA = 0.2  # Lissage de la durée moyenne d'occupation d'un slot
+
+# Somme = GPU-secondes économisées (modèles locaux et embeddings; le cloud ne compte pas)
+GPU_SECONDS_SAVED = histogram(
+    "llm_cancel_gpu_seconds_saved",
+    "Temps GPU restant estimé des appels LLM annulés",
+    labels=("model",),
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+def model_name(model: str) -> str:
+    """Nom de base d'un modèle Ollama: « bge-m3 » et « bge-m3:latest » sont le même"""
+    return model.removesuffix(":latest")
+
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+_flow: ContextVar[str] = ContextVar("llm_flow", default="")
+_last_wait_ms: ContextVar[float] = ContextVar("llm_last_wait_ms", default=0.0)
+
+
+@contextmanager
+def llm_context(priority: str = None, flow: str = None):
+    """Fixe la priorité et/ou le flux des appels LLM du bloc (et des tâches créées dedans)"""
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Priorité inconnue: {priority}")
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    if flow is not None:
+        tokens.append((_flow, _flow.set(flow)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def last_queue_wait_ms() -> float:
+    """Attente du dernier slot obtenu dans le contexte courant (exclue des latences LLM)"""
+    return _last_wait_ms.get()
+
+
+@dataclass
+class _Waiter:
+    priority: int
+    flow: str
+    seq: int
+    enqueued_at: float
+    future: asyncio.Future
+
+
+@dataclass
+class _ModelQueue:
+    """File d'attente et slots d'un modèle"""
+
+    slots: int
+    kind: str
+    active: int = 0
+    waiters: list[_Waiter] = field(default_factory=list)
+    last_served: dict[str, int] = field(default_factory=dict)  # flux -> tick de service
+    granted: int = 0
+    promoted: int = 0
+    peak_depth: int = 0
+    hold_ewma_s: float | None = None  # Durée moyenne d'un appel mené à terme
+    cancelled: int = 0
+    gpu_seconds_saved: float = 0.0
+    waits: dict[str, deque] = field(
+        default_factory=lambda: {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITIES}
+    )
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMScheduler:
+    """Slots par modèle, file à priorités et partage équitable entre flux"""
+
+    def __init__(self, catalog: dict = None):
+        settings = get_settings()
+        self.enabled = settings.llm_scheduler_enabled
+        self.limits = {
+            "local": settings.scheduler_local_slots,
+            "cloud": settings.scheduler_cloud_slots,
+            "embedding": settings.scheduler_embedding_slots,
+        }
+        self.aging = settings.scheduler_aging  # secondes avant promotion du fond
+        self._kinds: dict[str, str] = {}
+        self._queues: dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+        self._tick = itertools.count()
+        self.set_catalog(catalog or MODELS)
+
+    def set_catalog(self, catalog: dict):
+        """Catégorie de slots de chaque modèle du catalogue (local, cloud, embedding)"""
+        for entry in catalog.values():
+            model = entry.get("model")
+            if not model:
+                continue
+            name = model_name(model)
+            if entry.get("chat", True) is False or entry.get("category") == "embedding":
+                self._kinds[name] = "embedding"
+            else:
+                self._kinds[name] = "local" if entry.get("local", True) else "cloud"
+
+    def kind(self, model: str) -> str:
+        """Catégorie d'un modèle; hors catalogue: cloud si le tag le dit, sinon local"""
+        name = model_name(model)
+        if name in self._kinds:
+            return self._kinds[name]
+        return "cloud" if "cloud" in model else "local"
+
+    def _queue(self, model: str) -> _ModelQueue:
+        model = model_name(model)  # Mêmes slots avec ou sans :latest
+        queue = self._queues.get(model)
+        if queue is None:
+            kind = self.kind(model)
+            queue = _ModelQueue(slots=self.limits[kind], kind=kind)
+            self._queues[model] = queue
+        return queue
+
+    def _grant(self, queue: _ModelQueue, flow: str):
+        queue.active += 1
+        queue.granted += 1
+        queue.last_served[flow] = next(self._tick)
+        if len(queue.last_served) > 1024:
+            # Oublier les flux inactifs (ils repartiront comme nouveaux)
+            waiting = {w.flow for w in queue.waiters} | {flow}
+            queue.last_served = {f: t for f, t in queue.last_served.items() if f in waiting}
+
+    def _effective_priority(self, waiter: _Waiter, now: float) -> int:
+        if waiter.priority > 0 and now - waiter.enqueued_at >= self.aging:
+            return 0
+        return waiter.priority
+
+    def _dispatch(self, queue: _ModelQueue):
+        """Attribue les slots libres: priorité, puis flux servi le moins récemment, puis FIFO"""
+        now = time.monotonic()
+        while queue.active < queue.slots and queue.waiters:
+            waiter = min(
+                queue.waiters,
+                key=lambda w: (
+                    self._effective_priority(w, now),
+                    queue.last_served.get(w.flow, -1),
+                    w.seq,
+                ),
+            )
+            queue.waiters.remove(waiter)
+            if waiter.future.done():  # Annulé entre-temps
+                continue
+            if self._effective_priority(waiter, now) < waiter.priority:
+                queue.promoted += 1
+            self._grant(queue, waiter.flow)
+            waiter.future.set_result(None)
+
+    async def acquire(self, model: str, priority: str = None, flow: str = None) -> float:
+        """Attend un slot pour le modèle. Retourne l'attente en ms."""
+        priority = priority or _priority.get()
+        flow = _flow.get() if flow is None else flow
+        queue = self._queue(model)
+        start = time.monotonic()
+
+        if queue.active < queue.slots and not queue.waiters:
+            self._grant(queue, flow)
+        else:
+            waiter = _Waiter(
+                priority=PRIORITIES[priority],
+                flow=flow,
+                seq=next(self._seq),
+                enqueued_at=start,
+                future=asyncio.get_running_loop().create_future(),
+            )
+            queue.waiters.append(waiter)
+            queue.peak_depth = max(queue.peak_depth, len(queue.waiters))
+            logger.debug(
+                f"⏳ {model}: en file ({priority}, {len(queue.waiters)} en attente, "
+                f"{queue.active}/{queue.slots} actifs)"
+            )
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in queue.waiters:
+                    queue.waiters.remove(waiter)
+                elif waiter.future.done() and not waiter.future.cancelled():
+                    # Slot attribué juste avant l'annulation: le rendre
+                    self.release(model)
+                raise
+
+        wait_ms = (time.monotonic() - start) * 1000
+        queue.waits[priority].append(wait_ms)
+        if wait_ms > 1000:
+            logger.info(f"⏳ {model}: slot obtenu après {wait_ms:.0f}ms ({priority})")
+        return wait_ms
+
+    def release(self, model: str):
+        queue = self._queue(model)
+        queue.active = max(0, queue.active - 1)
+        self._dispatch(queue)
+
+    def _record_hold(self, model: str, held_s: float):
+        queue = self._queue(model)
+        if queue.hold_ewma_s is None:
+            queue.hold_ewma_s = held_s
+        else:
+            queue.hold_ewma_s += HOLD_EWMA_ALPHA * (held_s - queue.hold_ewma_s)
+
+    def _record_cancel(self, model: str, held_s: float) -> float:
+        """Appel annulé: GPU-secondes économisées (estimation prudente, 0 sans historique)"""
+        queue = self._queue(model)
+        queue.cancelled += 1
+        if queue.kind == "cloud" or queue.hold_ewma_s is None:
+            return 0.0
+        saved = max(0.0, queue.hold_ewma_s - held_s)
+        queue.gpu_seconds_saved += saved
+        GPU_SECONDS_SAVED.observe(saved, model=model)
+        return saved
+
+    @asynccontextmanager
+    async def slot(self, model: str | None, priority: str = None, flow: str = None):
+        """Slot tenu pendant le bloc; sans modèle ou ordonnanceur désactivé: pas d'attente"""
+        if not model or not self.enabled:
+            _last_wait_ms.set(0.0)
+            yield
+            return
+        wait_ms = await self.acquire(model, priority, flow)
+        _last_wait_ms.set(wait_ms)
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            saved = self._record_cancel(model, time.monotonic() - start)
+            logger.info(f"🛑 {model}: appel annulé, slot rendu (~{saved:.1f} GPU-s économisées)")
+            raise
+        else:
+            self._record_hold(model, time.monotonic() - start)
+        finally:
+            self.release(model)
+
+    @property
+    def stats(self) -> dict:
+        """Profondeur des files et temps d'attente par modèle"""
+        models = {}
+        for model, queue in self._queues.items():
+            waits = {}
+            for priority, samples in queue.waits.items():
+                values = list(samples)
+                waits[priority] = {
+                    "samples": len(values),
+                    "avg_ms": round(sum(values) / len(values), 1) if values else 0.0,
+                    "p95_ms": round(_percentile(values, 0.95), 1),
+                    "max_ms": round(max(values), 1) if values else 0.0,
+                }
+            depth = dict.fromkeys(PRIORITIES, 0)
+            for w in queue.waiters:
+                depth[PRIORITY_NAMES[w.priority]] += 1
+            models[model] = {
+                "kind": queue.kind,
+                "slots": queue.slots,
+                "active": queue.active,
+                "queued": depth,
+                "peak_depth": queue.peak_depth,
+                "granted": queue.granted,
+                "promoted": queue.promoted,
+                "avg_hold_s": round(queue.hold_ewma_s or 0.0, 2),
+                "cancelled": queue.cancelled,
+                "gpu_seconds_saved": round(queue.gpu_seconds_saved, 1),
+                "wait": waits,
+            }
+        return {
+            "enabled": self.enabled,
+            "limits": self.limits,
+            "aging_s": self.aging,
+            "queue_depth": sum(len(q.waiters) for q in self._queues.values()),
+            "gpu_seconds_saved": round(sum(q.gpu_seconds_saved for q in self._queues.values()), 1),
+            "models": models,
+        }
+
+
+# Singleton
+_llm_scheduler: LLMScheduler | None = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Obtient l'instance singleton de l'ordonnanceur"""
+    global _llm_scheduler
+    if _llm_scheduler is None:
+        _llm_scheduler = LLMScheduler()
+    return _llm_scheduler
@@ -0,0 +1,249 @@
+"""
+Métriques internes: histogrammes de latence et compteurs
+- Buckets cumulatifs fixes (compatibles Prometheus)
+- Une série par combinaison de labels
+- Registre global: une métrique par nom, partagée par tous les modules
+- Exposition au format texte Prometheus (GET /metrics)
+- Classe de requête courante (ContextVar): label commun aux mesures d'une requête,
+  y compris dans les modules qui ne la connaissent pas (RAG, outils)
+
+Usage:
+    from utils.metrics import histogram, query_class_context, render_prometheus
+
+    ANSWER_LATENCY = histogram(
+        "answer_latency_seconds", "Latence de bout en bout", labels=("path",)
+    )
+    ANSWER_LATENCY.observe(1.8, path="fast")
+    ANSWER_LATENCY.snapshot()
+
+    FORMAT_FAILURES = counter("format_failures_total", "Réponses mal formées", labels=("model",))
+    FORMAT_FAILURES.inc(model="qwen")
+
+    with query_class_context("operational"):
+        ...  # current_query_class() == "operational"
+    render_prometheus()
+"""
+
+import bisect
+import math
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+# Secondes: du cache (ms) aux boucles ReAct longues (minutes)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+# Secondes: opérations courtes (envoi websocket, étapes RAG)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+_query_class: ContextVar[str] = ContextVar("metrics_query_class", default="unknown")
+
+
+@contextmanager
+def query_class_context(query_class: str) -> Iterator[None]:
+    """Classe de requête (prompts.classify_query) des mesures prises dans ce contexte"""
+    token = _query_class.set(query_class)
+    try:
+        yield
+    finally:
+        _query_class.reset(token)
+
+
+def current_query_class() -> str:
+    return _query_class.get()
+
+
+@dataclass
+class _Series:
+    counts: list[int]
+    total: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class Histogram:
+    """Histogramme à buckets fixes, par combinaison de labels"""
+
+    name: str
+    description: str
+    labels: tuple[str, ...] = ()
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    _series: dict[tuple[str, ...], _Series] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return _label_key(self.name, self.labels, labels)
+
+    def observe(self, value: float, **labels):
+        """Enregistre une mesure (secondes)"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = _Series(counts=[0] * (len(self.buckets) + 1))
+                self._series[key] = series
+            series.counts[bisect.bisect_left(self.buckets, value)] += 1
+            series.total += value
+            series.count += 1
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        """Estimation par la borne supérieure du bucket (comme histogram_quantile)"""
+        rank = q * series.count
+        seen = 0
+        for bound, count in zip(self.buckets, series.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def series(self) -> list[tuple[dict, list[int], float, int]]:
+        """Séries brutes: (labels, comptes par bucket non cumulés, somme, nombre)"""
+        with self._lock:
+            return [
+                (dict(zip(self.labels, key, strict=True)), list(s.counts), s.total, s.count)
+                for key, s in self._series.items()
+            ]
+
+    def snapshot(self) -> list[dict]:
+        """Résumé lisible par série: nombre, moyenne, p50/p95/p99 (bornes de buckets)"""
+        result = []
+        with self._lock:
+            for key, s in self._series.items():
+                result.append(
+                    {
+                        "labels": dict(zip(self.labels, key, strict=True)),
+                        "count": s.count,
+                        "avg": round(s.total / s.count, 3) if s.count else 0.0,
+                        "p50": self._quantile(s, 0.5),
+                        "p95": self._quantile(s, 0.95),
+                        "p99": self._quantile(s, 0.99),
+                    }
+                )
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self) -> list[str]:
+        """Lignes au format texte Prometheus (buckets cumulés, _sum, _count)"""
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.description)}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, counts, total, count in self.series():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le=le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+@dataclass
+class Counter:
+    """Compteur monotone, par combinaison de labels"""
+
+    name: str
+    description: str
+    labels: tuple[str, ...] = ()
+    _values: dict[tuple[str, ...], float] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.name, self.labels, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = _label_key(self.name, self.labels, labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"labels": dict(zip(self.labels, key, strict=True)), "value": value}
+                for key, value in self._values.items()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def exposition(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.description)}",
+            f"# TYPE {self.name} counter",
+        ]
+        for series in self.snapshot():
+            lines.append(
+                f"{self.name}{_format_labels(series['labels'])} {_format_value(series['value'])}"
+            )
+        return lines
+
+
+def _label_key(name: str, expected: tuple[str, ...], labels: dict) -> tuple[str, ...]:
+    if set(labels) != set(expected):
+        raise ValueError(f"{name}: labels attendus {expected}, reçus {tuple(labels)}")
+    return tuple(str(labels[label]) for label in expected)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(str(v))}"' for k, v in pairs.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+# Registre global
+_histograms: dict[str, Histogram] = {}
+_counters: dict[str, Counter] = {}
+
+
+def histogram(
+    name: str,
+    description: str,
+    labels: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Obtient (ou crée) l'histogramme `name` du registre global"""
+    if name not in _histograms:
+        _histograms[name] = Histogram(name, description, tuple(labels), tuple(buckets))
+    return _histograms[name]
+
+
+def counter(name: str, description: str, labels: tuple[str, ...] = ()) -> Counter:
+    """Obtient (ou crée) le compteur `name` du registre global"""
+    if name not in _counters:
+        _counters[name] = Counter(name, description, tuple(labels))
+    return _counters[name]
+
+
+def get_histograms() -> dict[str, Histogram]:
+    """Tous les histogrammes enregistrés"""
+    return dict(_histograms)
+
+
+def render_prometheus() -> str:
+    """Toutes les métriques du registre, au format texte Prometheus 0.0.4"""
+    metrics = {**_histograms, **_counters}
+    lines = []
+    for name in sorted(metrics):
+        lines.extend(metrics[name].exposition())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,208 @@
+"""
+Client HTTP Ollama mutualisé
+Un httpx.AsyncClient par hôte Ollama, partagé par tout le backend:
+- Pool de connexions keep-alive (plus de handshake TCP par appel LLM/embedding)
+- Limite de requêtes concurrentes par hôte
+- Métriques d'utilisation du pool
+- Requêtes portant un modèle (chat, generate, embeddings) passées par
+  l'ordonnanceur global (utils/llm_scheduler.py): priorité et slots par modèle
+
+Usage:
+    from utils.ollama_client import get_ollama_pool
+
+    pool = get_ollama_pool()
+    r = await pool.post(f"{OLLAMA_URL}/api/embeddings", json={...}, timeout=30.0)
+
+    async with pool.stream("POST", f"{OLLAMA_URL}/api/chat", json={...}) as r:
+        async for line in r.aiter_lines():
+            ...
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+import httpx
+
+from config import get_settings
+from utils.llm_scheduler import get_llm_scheduler
+
+logger = logging.getLogger("ollama_client")
+
+
+@dataclass
+class HostPoolStats:
+    """Compteurs d'utilisation pour un hôte"""
+
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    peak_in_flight: int = 0
+    total_wait_ms: float = 0.0
+    total_time_ms: float = 0.0
+
+
+@dataclass
+class _HostClient:
+    client: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+    loop: asyncio.AbstractEventLoop
+    stats: HostPoolStats = field(default_factory=HostPoolStats)
+
+
+class OllamaClientPool:
+    """Pool de clients HTTP par hôte Ollama"""
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        max_keepalive: int | None = None,
+        keepalive_expiry: float | None = None,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        settings = get_settings()
+        self.max_connections = max_connections or settings.ollama_max_connections
+        self.max_keepalive = max_keepalive or settings.ollama_max_keepalive
+        self.keepalive_expiry = keepalive_expiry or settings.ollama_keepalive_expiry
+        self.max_concurrency = max_concurrency or settings.ollama_max_concurrency
+        self.timeout = timeout or settings.llm_timeout
+        self._transport = transport  # Injection pour les tests
+        self._hosts: dict[str, _HostClient] = {}
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        u = httpx.URL(url)
+        return f"{u.scheme}://{u.host}:{u.port or (443 if u.scheme == 'https' else 80)}"
+
+    def _get_host(self, url: str) -> _HostClient:
+        """Client du hôte (recréé si la boucle asyncio a changé)"""
+        key = self._host_key(url)
+        loop = asyncio.get_running_loop()
+        host = self._hosts.get(key)
+        if host is None or host.loop is not loop or host.client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                transport=self._transport,
+            )
+            stats = host.stats if host else HostPoolStats()
+            host = _HostClient(client, asyncio.Semaphore(self.max_concurrency), loop, stats)
+            self._hosts[key] = host
+            logger.info(f"🔌 Pool Ollama ouvert pour {key} (max={self.max_connections})")
+        return host
+
+    @asynccontextmanager
+    async def _slot(self, host: _HostClient):
+        """Réserve un slot de concurrence sur l'hôte et mesure l'attente"""
+        stats = host.stats
+        stats.waiting += 1
+        wait_start = time.monotonic()
+        try:
+            await host.semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        stats.total_wait_ms += (time.monotonic() - wait_start) * 1000
+
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.total_time_ms += (time.monotonic() - start) * 1000
+            host.semaphore.release()
+
+    @staticmethod
+    def _model_of(kwargs: dict) -> str | None:
+        body = kwargs.get("json")
+        return body.get("model") if isinstance(body, dict) else None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Requête complète (corps lu) via le client partagé"""
+        host = self._get_host(url)
+        async with get_llm_scheduler().slot(self._model_of(kwargs)):
+            async with self._slot(host):
+                return await host.client.request(method, url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """Requête en streaming; le slot est tenu jusqu'à la sortie du contexte"""
+        host = self._get_host(url)
+        async with get_llm_scheduler().slot(self._model_of(kwargs)):
+            async with self._slot(host):
+                async with host.client.stream(method, url, **kwargs) as response:
+                    yield response
+
+    @property
+    def stats(self) -> dict:
+        """Métriques d'utilisation par hôte"""
+        hosts = {}
+        for key, host in self._hosts.items():
+            s = host.stats
+            pool = getattr(getattr(host.client, "_transport", None), "_pool", None)
+            connections = getattr(pool, "connections", None)
+            hosts[key] = {
+                "requests": s.requests,
+                "errors": s.errors,
+                "in_flight": s.in_flight,
+                "waiting": s.waiting,
+                "peak_in_flight": s.peak_in_flight,
+                "open_connections": len(connections) if connections is not None else None,
+                "avg_wait_ms": round(s.total_wait_ms / s.requests, 1) if s.requests else 0.0,
+                "avg_time_ms": round(s.total_time_ms / s.requests, 1) if s.requests else 0.0,
+            }
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "max_concurrency": self.max_concurrency,
+            "hosts": hosts,
+        }
+
+    async def aclose(self):
+        """Ferme tous les clients (arrêt de l'application)"""
+        for key, host in list(self._hosts.items()):
+            if not host.client.is_closed:
+                await host.client.aclose()
+                logger.info(f"🔌 Pool Ollama fermé pour {key}")
+        self._hosts.clear()
+
+
+# Singleton
+_ollama_pool: OllamaClientPool | None = None
+
+
+def get_ollama_pool() -> OllamaClientPool:
+    """Obtient l'instance singleton du pool Ollama"""
+    global _ollama_pool
+    if _ollama_pool is None:
+        _ollama_pool = OllamaClientPool()
+    return _ollama_pool
+
+
+async def close_ollama_pool():
+    """Ferme le pool singleton (lifespan FastAPI)"""
+    global _ollama_pool
+    if _ollama_pool is not None:
+        await _ollama_pool.aclose()
+        _ollama_pool = None
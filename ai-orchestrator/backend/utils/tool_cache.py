@@ -0,0 +1,194 @@
+"""
+Cache mémoïsant des résultats d'outils en lecture seule
+- Clé: nom de l'outil + paramètres normalisés
+- Expiration par TTL (défaut global, surchargé par register_tool(cache_ttl=...))
+- Invalidation par ressource: un outil mutating vide les entrées des outils
+  déclarant la même ressource (docker, files, git...), ou tout le cache s'il
+  n'en déclare aucune (execute_command)
+- Appels identiques simultanés coalescés: un seul sous-processus
+
+Usage:
+    from utils.tool_cache import get_tool_cache
+
+    cache = get_tool_cache()
+    result = await cache.get_or_call("docker_status", {}, call, resources=("docker",))
+    cache.invalidate(("docker",))
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from config import get_settings
+
+logger = logging.getLogger("tool_cache")
+
+
+@dataclass
+class CacheEntry:
+    """Résultat mémorisé d'un outil"""
+
+    value: str
+    expires_at: float
+    resources: tuple[str, ...]
+
+
+def _normalize(value):
+    """Normalise les paramètres: espaces retirés, valeurs vides ignorées, clés triées"""
+    if isinstance(value, dict):
+        return {
+            str(k): _normalize(v) for k, v in sorted(value.items()) if v not in (None, "")
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def is_cacheable_result(result) -> bool:
+    """Les erreurs ne sont jamais mémorisées"""
+    return isinstance(result, str) and not result.startswith(("❌", "Erreur"))
+
+
+class ToolCache:
+    """Cache TTL + LRU des résultats d'outils, avec invalidation par ressource"""
+
+    def __init__(self, default_ttl: float = None, max_entries: int = None):
+        settings = get_settings()
+        self.default_ttl = settings.tool_cache_ttl if default_ttl is None else default_ttl
+        self.max_entries = max_entries or settings.tool_cache_max_entries
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._generation = 0  # Incrémenté à chaque invalidation
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(tool_name: str, params: dict) -> str:
+        """Clé de cache: outil + paramètres normalisés (JSON trié)"""
+        normalized = json.dumps(_normalize(params or {}), sort_keys=True, default=str)
+        return f"{tool_name}:{normalized}"
+
+    def get(self, key: str) -> str | None:
+        """Récupère une entrée non expirée"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def put(self, key: str, value: str, ttl: float = None, resources: tuple[str, ...] = ()):
+        """Mémorise un résultat pour ttl secondes"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        elif len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+        self._entries[key] = CacheEntry(value, time.monotonic() + ttl, tuple(resources))
+
+    async def get_or_call(
+        self,
+        tool_name: str,
+        params: dict,
+        call: Callable[[], Awaitable[str]],
+        ttl: float = None,
+        resources: tuple[str, ...] = (),
+    ) -> str:
+        """Retourne le résultat mémorisé, ou exécute `call` (une seule fois par clé)"""
+        key = self.make_key(tool_name, params)
+        cached = self.get(key)
+        if cached is not None:
+            self._hits += 1
+            logger.debug(f"🎯 Cache outil: {key}")
+            return cached
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._coalesced += 1
+            result = await asyncio.shield(pending)
+            # L'appel d'origine a échoué ou a été annulé: exécuter nous-mêmes
+            return result if result is not None else await call()
+
+        self._misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        result = None
+        try:
+            result = await call()
+            # Ne pas mémoriser un résultat lu pendant une invalidation concurrente
+            if generation == self._generation and is_cacheable_result(result):
+                self.put(key, result, ttl, resources)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+            future.set_result(result)
+
+    def invalidate(self, resources: tuple[str, ...] = ()) -> int:
+        """
+        Supprime les entrées liées aux ressources données.
+        Sans ressource: vide tout le cache. Retourne le nombre d'entrées supprimées.
+        """
+        self._generation += 1
+        self._invalidations += 1
+        if not resources:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            targets = set(resources)
+            keys = [k for k, e in self._entries.items() if targets.intersection(e.resources)]
+            for k in keys:
+                del self._entries[k]
+            removed = len(keys)
+        if removed:
+            scope = ", ".join(resources) or "*"
+            logger.debug(f"🧹 Cache outils: {removed} entrée(s) invalidée(s) [{scope}]")
+        return removed
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro"""
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    @property
+    def stats(self) -> dict:
+        """Statistiques du cache"""
+        total = self._hits + self._misses
+        hit_rate = (self._hits / total * 100) if total > 0 else 0
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "default_ttl": self.default_ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "invalidations": self._invalidations,
+            "hit_rate": f"{hit_rate:.1f}%",
+        }
+
+
+# Singleton
+_tool_cache: ToolCache | None = None
+
+
+def get_tool_cache() -> ToolCache:
+    """Obtient l'instance singleton du cache d'outils"""
+    global _tool_cache
+    if _tool_cache is None:
+        _tool_cache = ToolCache()
+    return _tool_cache
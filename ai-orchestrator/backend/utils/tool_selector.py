@@ -0,0 +1,285 @@
+"""
+Sélection des outils par similarité (retrieval)
+get_tools_description() injectait tout le catalogue (gmail, docker, git, ollama, RAG,
+mémoire, réseau, système...) dans chaque prompt système: des milliers de tokens
+réévalués à chaque itération, pour quelques outils réellement utiles.
+
+- Index: embedding bge-m3 de chaque outil (nom, description, paramètres), calculé
+  une fois par version du registre (recalculé après reload_tools / create_tool)
+- Par requête: les top-K outils les plus proches de la question + un noyau toujours
+  proposé (AI_TOOL_SELECT_CORE)
+- Le noyau reste dans le préfixe statique du prompt (identique d'une requête à l'autre,
+  cache KV d'Ollama); les outils sélectionnés en plus vont dans la partie volatile
+- Extension à la demande: un outil non proposé demandé par le modèle est ajouté; un
+  outil inexistant fait ajouter les outils les plus proches de la demande
+- Sans embeddings (RAG indisponible) ou petit registre: tout le catalogue (None)
+
+La sélection courante est portée par une ContextVar (outils natifs de _chat_completion).
+
+Usage:
+    from utils.tool_selector import get_tool_selector, tools_prompt
+
+    selection = await get_tool_selector().select("Redémarre le conteneur nginx")
+    core_desc, extra_desc = tools_prompt(selection)
+    added = await get_tool_selector().expand(selection, ["docker_logs"])
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from config import get_settings
+from utils.answer_cache import EmbedFunc, _dot, _normalize, _rag_embedding
+from utils.metrics import FAST_BUCKETS, current_query_class, histogram
+
+logger = logging.getLogger("tool_selector")
+
+EXPAND_NEIGHBORS = 3  # Outils ajoutés pour un nom d'outil inconnu
+INDEX_RETRY = 300.0  # secondes avant de réessayer d'indexer sans service d'embeddings
+
+TOOL_SELECT_LATENCY = histogram(
+    "tool_select_seconds",
+    "Sélection des outils d'une requête (embedding de la question + classement)",
+    labels=("query_class",),
+    buckets=FAST_BUCKETS,
+)
+
+_current: ContextVar["ToolSelection | None"] = ContextVar("tool_selection", default=None)
+
+
+@dataclass
+class ToolSelection:
+    """Outils proposés au modèle pour une requête"""
+
+    names: list[str]  # Ordre alphabétique: description stable pour le cache KV
+    total: int  # Taille du registre
+    scores: dict[str, float] = field(default_factory=dict)  # Similarité des outils retenus
+    select_ms: float = 0.0
+    expanded: list[str] = field(default_factory=list)  # Ajoutés à la demande du modèle
+    core: list[str] = field(default_factory=list)  # Noyau: catalogue du préfixe statique
+
+    @property
+    def extras(self) -> list[str]:
+        """Outils retenus hors noyau (partie volatile du prompt)"""
+        return [n for n in self.names if n not in self.core]
+
+    def to_dict(self) -> dict:
+        return {
+            "selected": len(self.names),
+            "total": self.total,
+            "select_ms": round(self.select_ms, 1),
+            "expanded": self.expanded,
+            "tools": self.names,
+        }
+
+
+@contextmanager
+def tool_selection_context(selection: ToolSelection | None):
+    """Fixe la sélection d'outils des appels LLM du bloc"""
+    token = _current.set(selection)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_tool_selection() -> ToolSelection | None:
+    return _current.get()
+
+
+def tools_prompt(selection: ToolSelection | None) -> tuple[str, str]:
+    """
+    Descriptions d'outils du prompt système: (catalogue du préfixe statique, outils
+    retenus en plus pour la requête). Sans sélection: tout le catalogue, rien en plus.
+    """
+    from tools import get_tools_description
+
+    if selection is None:
+        return get_tools_description(), ""
+    return get_tools_description(selection.core), get_tools_description(selection.extras)
+
+
+def _tool_text(meta: dict) -> str:
+    """Texte indexé d'un outil: nom lisible, description, paramètres"""
+    text = f"{meta['name'].replace('_', ' ')}: {meta['description']}"
+    params = meta.get("parameters", {})
+    if isinstance(params.get("properties"), dict):
+        params = params["properties"]  # Déclarés en JSON Schema (outils RAG)
+    return f"{text} ({', '.join(params)})" if params else text
+
+
+class ToolSelector:
+    """Index d'embeddings des outils et sélection top-K par requête"""
+
+    def __init__(
+        self,
+        top_k: int = None,
+        core: list[str] = None,
+        embed: EmbedFunc = None,
+    ):
+        settings = get_settings()
+        self.enabled = settings.tool_select_enabled
+        self.top_k = top_k or settings.tool_select_top_k
+        if core is None:
+            core = [n.strip() for n in settings.tool_select_core.split(",") if n.strip()]
+        self.core = list(core)
+        self._embed = embed or _rag_embedding
+        self._index: dict[str, list[float]] = {}
+        self._unindexed: set[str] = set()  # Embedding impossible: toujours proposés
+        self._index_version: int | None = None
+        self._index_ms = 0.0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._selections = 0
+        self._fallbacks = 0
+        self._expansions = 0
+        self._selected_total = 0
+        self._select_ms = 0.0
+
+    async def _vector(self, text: str) -> list[float] | None:
+        try:
+            vector = await self._embed(text)
+        except Exception as e:
+            logger.warning(f"⚠️ Sélection outils: embedding impossible ({e})")
+            return None
+        return _normalize(vector) if vector else None
+
+    async def _ensure_index(self) -> bool:
+        """(Re)construit l'index si le registre a changé; False si aucun embedding"""
+        from tools import get_tools_definitions, get_tools_version
+
+        version = get_tools_version()
+        if self._index_version == version:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        async with self._lock:
+            if self._index_version == version:
+                return True
+            start = time.monotonic()
+            definitions = get_tools_definitions()
+            vectors = await asyncio.gather(*(self._vector(_tool_text(m)) for m in definitions))
+            index, unindexed = {}, set()
+            for meta, vector in zip(definitions, vectors, strict=True):
+                if vector is None:
+                    unindexed.add(meta["name"])
+                else:
+                    index[meta["name"]] = vector
+            self._index, self._unindexed = index, unindexed
+            self._index_ms = (time.monotonic() - start) * 1000
+            if not self._index:
+                self._retry_at = time.monotonic() + INDEX_RETRY
+                logger.warning("⚠️ Sélection outils: pas d'embeddings, catalogue complet")
+                return False
+            self._index_version = version
+            logger.info(f"🧰 Index des outils: {len(self._index)} outils en {self._index_ms:.0f}ms")
+            return True
+
+    async def warm(self):
+        """Construit l'index en avance (démarrage), sans attendre la première requête"""
+        if self.enabled:
+            await self._ensure_index()
+
+    def _ranked(self, vector: list[float], exclude: set[str]) -> list[tuple[str, float]]:
+        scores = [(n, _dot(vector, v)) for n, v in self._index.items() if n not in exclude]
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+    async def select(self, query: str) -> ToolSelection | None:
+        """Outils proposés pour la question; None = tout le catalogue"""
+        from tools import get_tool_names
+
+        if not self.enabled:
+            return None
+        start = time.monotonic()
+        registry = set(get_tool_names())
+        core = [n for n in self.core if n in registry]
+        if len(registry) <= self.top_k + len(core):
+            return None
+        vector = await self._vector(query) if await self._ensure_index() else None
+        if vector is None:
+            self._fallbacks += 1
+            return None
+
+        ranked = self._ranked(vector, exclude=set(core))[: self.top_k]
+        names = set(core) | {n for n, _ in ranked} | (self._unindexed & registry)
+        select_ms = (time.monotonic() - start) * 1000
+        selection = ToolSelection(
+            names=sorted(names),
+            total=len(registry),
+            scores={n: round(score, 3) for n, score in ranked},
+            select_ms=select_ms,
+            core=sorted(core),
+        )
+        self._selections += 1
+        self._selected_total += len(selection.names)
+        self._select_ms += select_ms
+        TOOL_SELECT_LATENCY.observe(select_ms / 1000, query_class=current_query_class())
+        logger.info(
+            f"🧰 {len(selection.names)}/{selection.total} outils proposés "
+            f"({select_ms:.0f}ms): {', '.join(n for n, _ in ranked)}"
+        )
+        return selection
+
+    async def expand(self, selection: ToolSelection | None, requested: list[str]) -> list[str]:
+        """
+        Ajoute à la sélection les outils demandés par le modèle hors sélection (ou, pour
+        un nom inconnu du registre, les outils les plus proches). Retourne les ajouts.
+        """
+        from tools import get_tool_names
+
+        if selection is None:
+            return []
+        registry = set(get_tool_names())
+        added: list[str] = []
+        for name in requested:
+            if name in selection.names or name in added or name == "final_answer":
+                continue
+            if name in registry:
+                added.append(name)
+                continue
+            vector = await self._vector(name.replace("_", " "))
+            if vector is None:
+                continue
+            exclude = set(selection.names) | set(added)
+            added.extend(n for n, _ in self._ranked(vector, exclude)[:EXPAND_NEIGHBORS])
+        if added:
+            selection.names = sorted(set(selection.names) | set(added))
+            selection.expanded.extend(added)
+            self._expansions += len(added)
+            logger.info(f"🧰 Outils ajoutés à la demande: {', '.join(added)}")
+        return added
+
+    @property
+    def stats(self) -> dict:
+        """Statistiques de la sélection d'outils"""
+        return {
+            "enabled": self.enabled,
+            "top_k": self.top_k,
+            "core": self.core,
+            "indexed": len(self._index),
+            "index_ms": round(self._index_ms, 1),
+            "selections": self._selections,
+            "fallbacks": self._fallbacks,
+            "expansions": self._expansions,
+            "avg_selected": (
+                round(self._selected_total / self._selections, 1) if self._selections else 0.0
+            ),
+            "avg_select_ms": (
+                round(self._select_ms / self._selections, 1) if self._selections else 0.0
+            ),
+        }
+
+
+# Singleton
+_tool_selector: ToolSelector | None = None
+
+
+def get_tool_selector() -> ToolSelector:
+    """Obtient l'instance singleton du sélecteur d'outils"""
+    global _tool_selector
+    if _tool_selector is None:
+        _tool_selector = ToolSelector()
+    return _tool_selector
@@ -0,0 +1,112 @@
+"""
+Enregistrement des sessions react_loop en traces JSONL
+Une ligne JSON par événement, dans l'ordre où le moteur les produit:
+- session: question, modèle demandé, classe de requête
+- preflight: contenu et statut de chaque source (sondes système, RAG, mémoire)
+- llm: modèle, messages envoyés, texte reçu, statut HTTP, timings
+- tool: outil, paramètres, résultat, durée
+- answer: réponse finale et durée totale
+
+Activé par AI_TRACE_DIR (un fichier par session). Les traces alimentent replay.py:
+rejeu déterministe sans modèle ni outils réels.
+
+Usage:
+    from utils.trace import record, trace_session
+
+    with trace_session(conversation_id, user_message=msg, model=model):
+        ...
+        record("tool", name="git_status", params={}, result="...")
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from config import get_settings
+
+logger = logging.getLogger("trace")
+
+TRACE_VERSION = 1
+
+_recorder: ContextVar["TraceRecorder | None"] = ContextVar("trace_recorder", default=None)
+
+
+def messages_digest(messages: list[dict]) -> str:
+    """Empreinte des messages envoyés au LLM (détection des divergences au rejeu)"""
+    data = json.dumps(messages, ensure_ascii=False, sort_keys=True).encode()
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class TraceRecorder:
+    """Écrit les événements d'une session dans un fichier JSONL"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.seq = 0
+        self._start = time.monotonic()
+        self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115 - fermé par close()
+
+    def record(self, kind: str, **data):
+        event = {
+            "type": kind,
+            "seq": self.seq,
+            "t_ms": round((time.monotonic() - self._start) * 1000, 1),
+            **data,
+        }
+        self.seq += 1
+        self._file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def record(kind: str, **data):
+    """Ajoute un événement à la trace de la session courante (sans effet hors session)"""
+    recorder = _recorder.get()
+    if recorder is not None:
+        try:
+            recorder.record(kind, **data)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Trace {recorder.path.name}: {e}")
+
+
+def is_recording() -> bool:
+    return _recorder.get() is not None
+
+
+@contextmanager
+def trace_session(conversation_id: str, trace_dir: str = None, **meta):
+    """Session enregistrée dans trace_dir (défaut AI_TRACE_DIR); rien si non configuré"""
+    trace_dir = trace_dir if trace_dir is not None else get_settings().trace_dir
+    if not trace_dir or _recorder.get() is not None:
+        yield None
+        return
+
+    directory = Path(trace_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    safe_id = re.sub(r"[^\w.-]", "_", conversation_id or "session")[:64]
+    path = directory / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_id}.jsonl"
+    recorder = TraceRecorder(path)
+    token = _recorder.set(recorder)
+    recorder.record(
+        "session", version=TRACE_VERSION, conversation_id=conversation_id, **meta
+    )
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        recorder.close()
+        logger.info(f"📼 Trace enregistrée: {path} ({recorder.seq} événements)")
+
+
+def load_trace(path: str | Path) -> list[dict]:
+    """Lit une trace JSONL (lignes vides ignorées)"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
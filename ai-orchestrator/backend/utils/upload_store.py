@@ -0,0 +1,301 @@
+"""
+Stockage des uploads par contenu (SHA-256), en flux et dédupliqué
+save_upload lisait tout le fichier en mémoire (await file.read(), jusqu'à 50 MB)
+puis l'écrivait avec un open().write() bloquant dans la boucle asyncio.
+
+- Lecture par blocs (AI_UPLOAD_CHUNK_SIZE_KB), hachage et écriture dans un fichier
+  temporaire hors de la boucle: mémoire par upload de l'ordre d'un bloc
+- AI_MAX_UPLOAD_SIZE appliqué pendant la lecture (UploadTooLarge, fichier partiel supprimé)
+- Blob rangé sous son empreinte (blobs/ab/abcd…): une capture ou un log re-uploadé
+  réutilise le fichier existant
+- Compteur de références (upload_blobs.refcount): release_uploads(), appelé par
+  delete_conversation, ne libère que les blobs plus référencés
+- Références des blobs mises à jour dans la transaction SQLite (verrou d'écriture);
+  fichiers supprimés après le commit (une transaction annulée ne laisse pas de ligne
+  pointant vers un fichier disparu), dans une seconde transaction qui revérifie
+  upload_blobs: un upload du même contenu enregistré entre les deux garde son fichier
+- Uploads antérieurs (content_hash NULL): fichier propre, supprimé comme avant
+
+Métriques: uploads_total{result}, upload_bytes_total{result}
+(stored | deduplicated | too_large).
+
+Usage:
+    from utils.upload_store import create_upload_blobs, get_upload_store, release_uploads
+
+    await db.migrate([..., create_upload_blobs])
+    info = await get_upload_store().save(file, filename, filetype, conversation_id)
+    files = release_uploads(conn, conversation_id)  # Dans la transaction de suppression
+    await db.transaction(lambda c: remove_released_files(c, files))  # Après son commit
+"""
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from collections import Counter
+
+from config import get_settings
+from utils.database import Database, get_database
+from utils.metrics import counter
+
+logger = logging.getLogger("upload_store")
+
+HASH_ALGORITHM = "sha256"
+
+UPLOADS = counter(
+    "uploads_total",
+    "Uploads reçus (stored: nouveau blob, deduplicated: blob existant, too_large: refusé)",
+    labels=("result",),
+)
+UPLOAD_BYTES = counter(
+    "upload_bytes_total",
+    "Octets reçus par upload (deduplicated: non réécrits sur disque)",
+    labels=("result",),
+)
+
+
+class UploadTooLarge(Exception):
+    """Fichier au-delà de AI_MAX_UPLOAD_SIZE: upload refusé"""
+
+
+def create_upload_blobs(c):
+    """Migration: blobs des uploads par empreinte, avec compteur de références"""
+    c.execute("""CREATE TABLE IF NOT EXISTS upload_blobs (
+        hash TEXT PRIMARY KEY,
+        filepath TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    c.execute("ALTER TABLE uploads ADD COLUMN content_hash TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_uploads_conversation ON uploads(conversation_id)")
+
+
+def release_uploads(c, conversation_id: str) -> list[str]:
+    """
+    Dans la transaction de suppression d'une conversation: retire ses références
+    aux blobs et oublie ceux qui ne sont plus référencés. Retourne les fichiers à
+    supprimer après le commit (remove_released_files): blobs orphelins et uploads
+    antérieurs au stockage par contenu.
+    """
+    rows = c.execute(
+        "SELECT filepath, content_hash FROM uploads WHERE conversation_id = ?", (conversation_id,)
+    ).fetchall()
+    files = [row[0] for row in rows if not row[1]]
+    released = Counter(row[1] for row in rows if row[1])
+    for content_hash, refs in released.items():
+        c.execute(
+            "UPDATE upload_blobs SET refcount = refcount - ? WHERE hash = ?", (refs, content_hash)
+        )
+        orphan = c.execute(
+            "SELECT filepath FROM upload_blobs WHERE hash = ? AND refcount <= 0", (content_hash,)
+        ).fetchone()
+        if orphan is None:
+            continue
+        c.execute("DELETE FROM upload_blobs WHERE hash = ?", (content_hash,))
+        files.append(orphan[0])
+    return files
+
+
+def remove_released_files(c, files: list[str]) -> int:
+    """
+    Dans une transaction ouverte après le commit de release_uploads: supprime les
+    fichiers libérés, sauf ceux qu'un upload du même contenu a réenregistrés entre
+    les deux commits (le verrou d'écriture exclut _register pendant la vérification).
+    """
+    removed = 0
+    for path in files:
+        if not path:
+            continue
+        if c.execute("SELECT 1 FROM upload_blobs WHERE filepath = ?", (path,)).fetchone():
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+            logger.info(f"🗑️ Fichier supprimé: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"⚠️ Erreur suppression {path}: {e}")
+    return removed
+
+
+class UploadStore:
+    """Uploads écrits en flux sous leur empreinte SHA-256, dédupliqués"""
+
+    def __init__(
+        self, root: str = None, db: Database = None, chunk_size_kb: int = None, max_size: int = None
+    ):
+        settings = get_settings()
+        self.root = root or settings.upload_dir
+        self._db = db
+        self.chunk_size = (chunk_size_kb or settings.upload_chunk_size_kb) * 1024
+        self.max_size = max_size or settings.max_upload_size
+        self._stored = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._bytes_written = 0
+        self._bytes_saved = 0
+
+    @property
+    def db(self) -> Database:
+        return self._db or get_database()
+
+    @property
+    def tmp_dir(self) -> str:
+        return os.path.join(self.root, "tmp")
+
+    def blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, "blobs", content_hash[:2], content_hash)
+
+    def clean_partials(self) -> int:
+        """Fichiers temporaires laissés par un arrêt en cours d'upload (démarrage)"""
+        removed = 0
+        for path in glob.glob(os.path.join(self.tmp_dir, "*.part")):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"🧹 {removed} upload(s) partiel(s) supprimé(s)")
+        return removed
+
+    @staticmethod
+    def _write_chunk(out, hasher, chunk: bytes):
+        hasher.update(chunk)
+        out.write(chunk)
+
+    async def _spool(self, file) -> tuple[str, str, int]:
+        """Copie par blocs vers un fichier temporaire: (chemin, empreinte, taille)"""
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        hasher = hashlib.new(HASH_ALGORITHM)
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await file.read(self.chunk_size):
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise UploadTooLarge(
+                            f"Fichier trop volumineux (max {self.max_size // (1024 * 1024)} MB)"
+                        )
+                    await asyncio.to_thread(self._write_chunk, out, hasher, chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return tmp_path, hasher.hexdigest(), size
+
+    def _register(
+        self,
+        c,
+        upload_id: str,
+        filename: str,
+        filetype: str,
+        conversation_id: str | None,
+        tmp_path: str,
+        content_hash: str,
+        size: int,
+    ) -> tuple[str, bool]:
+        """Transaction: blob réutilisé ou mis en place, référence ajoutée, upload inscrit"""
+        row = c.execute(
+            "SELECT filepath FROM upload_blobs WHERE hash = ?", (content_hash,)
+        ).fetchone()
+        filepath = row[0] if row else self.blob_path(content_hash)
+        deduplicated = row is not None and os.path.exists(filepath)
+        if not deduplicated:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            os.replace(tmp_path, filepath)
+        if row:
+            c.execute(
+                "UPDATE upload_blobs SET refcount = refcount + 1 WHERE hash = ?", (content_hash,)
+            )
+        else:
+            c.execute(
+                "INSERT INTO upload_blobs (hash, filepath, size, refcount) VALUES (?, ?, ?, 1)",
+                (content_hash, filepath, size),
+            )
+        c.execute(
+            """INSERT INTO uploads (id, filename, filepath, filetype, filesize, conversation_id,
+                 content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (upload_id, filename, filepath, filetype, size, conversation_id, content_hash),
+        )
+        return filepath, deduplicated
+
+    async def save(
+        self, file, filename: str, filetype: str, conversation_id: str = None
+    ) -> dict:
+        """
+        Enregistre un upload (file: objet avec async read(size), ex. UploadFile).
+        UploadTooLarge au-delà de max_size.
+        """
+        try:
+            tmp_path, content_hash, size = await self._spool(file)
+        except UploadTooLarge:
+            self._rejected += 1
+            UPLOADS.inc(result="too_large")
+            raise
+        upload_id = str(uuid.uuid4())[:8]
+        try:
+            filepath, deduplicated = await self.db.transaction(
+                lambda c: self._register(
+                    c, upload_id, filename, filetype, conversation_id, tmp_path, content_hash, size
+                )
+            )
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)  # Doublon, ou transaction en échec
+        result = "deduplicated" if deduplicated else "stored"
+        UPLOADS.inc(result=result)
+        UPLOAD_BYTES.inc(size, result=result)
+        if deduplicated:
+            self._deduplicated += 1
+            self._bytes_saved += size
+            logger.info(f"♻️ Upload dédupliqué: {filename} ({size} o, {content_hash[:12]})")
+        else:
+            self._stored += 1
+            self._bytes_written += size
+        return {
+            "id": upload_id,
+            "filename": filename,
+            "filetype": filetype,
+            "size": size,
+            "filepath": filepath,
+            "content_hash": content_hash,
+            "deduplicated": deduplicated,
+        }
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "chunk_size_kb": self.chunk_size // 1024,
+            "max_size_mb": round(self.max_size / (1024 * 1024), 1),
+            "stored": self._stored,
+            "deduplicated": self._deduplicated,
+            "rejected_too_large": self._rejected,
+            "bytes_written": self._bytes_written,
+            "bytes_saved": self._bytes_saved,
+        }
+
+
+# Singleton
+_upload_store: UploadStore | None = None
+
+
+def open_upload_store(root: str = None) -> UploadStore:
+    """Remplace l'instance partagée (main.py: UPLOAD_DIR)"""
+    global _upload_store
+    _upload_store = UploadStore(root)
+    return _upload_store
+
+
+def get_upload_store() -> UploadStore:
+    """Obtient l'instance singleton du stockage des uploads"""
+    global _upload_store
+    if _upload_store is None:
+        _upload_store = UploadStore()
+    return _upload_store
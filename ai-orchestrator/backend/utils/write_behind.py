@@ -0,0 +1,255 @@
+"""
+Écriture différée (write-behind) des messages de chat
+Chaque tour de chat faisait au moins deux add_message, chacun avec sa transaction
+(INSERT + UPDATE de la conversation) et son fsync: sous plusieurs websockets, tous
+attendaient le verrou d'écriture SQLite.
+
+- add_message met le message en file et rend la main; une tâche de fond regroupe les
+  messages arrivés pendant AI_WRITE_BEHIND_INTERVAL_MS en une seule transaction
+- Mises à jour des conversations fusionnées par conversation dans le lot
+  (updated_at, message_count, first_message, last_model)
+- File bornée (AI_WRITE_BEHIND_MAX_QUEUED): au-delà, submit() attend qu'un lot parte
+- flush(): attend l'écriture de tout ce qui a été soumis, en file ou lot en cours de
+  commit (lectures de l'historique, suppression, arrêt du serveur: aucun message en
+  attente n'est perdu à l'arrêt)
+- Lot en échec: messages réécrits un par un, seul le message fautif est perdu (loggé)
+
+Métriques: write_behind_batch_size, write_behind_commit_seconds.
+
+Usage:
+    from utils.write_behind import get_message_writer
+
+    await get_message_writer().submit(conv_id, "user", message)  # Sans attendre le commit
+    await get_message_writer().flush()  # Avant de relire l'historique
+    await get_message_writer().close()  # Lifespan: vide la file
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from config import get_settings
+from utils.database import Database, get_database
+from utils.metrics import FAST_BUCKETS, histogram
+
+logger = logging.getLogger("write_behind")
+
+INSERT_MESSAGE = """INSERT INTO messages (conversation_id, role, content, model_used)
+                 VALUES (?, ?, ?, ?)"""
+TOUCH_CONVERSATION = """UPDATE conversations SET updated_at = CURRENT_TIMESTAMP,
+                 message_count = message_count + ?,
+                 first_message = COALESCE(first_message, ?),
+                 last_model = COALESCE(?, last_model)
+                 WHERE id = ?"""
+
+BATCH_SIZE = histogram(
+    "write_behind_batch_size",
+    "Messages écrits par transaction",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+COMMIT_SECONDS = histogram(
+    "write_behind_commit_seconds",
+    "Durée de la transaction d'un lot de messages",
+    buckets=FAST_BUCKETS,
+)
+
+
+@dataclass
+class PendingMessage:
+    """Message en attente d'écriture"""
+
+    conversation_id: str
+    role: str
+    content: str
+    model_used: str | None
+    future: asyncio.Future
+
+
+def apply_batch(c, batch: list[PendingMessage]):
+    """Un lot: insertions puis une mise à jour par conversation"""
+    c.executemany(
+        INSERT_MESSAGE, [(m.conversation_id, m.role, m.content, m.model_used) for m in batch]
+    )
+    touched: dict[str, list] = {}  # conversation -> [nombre, premier contenu, dernier modèle]
+    for m in batch:
+        entry = touched.setdefault(m.conversation_id, [0, m.content, None])
+        entry[0] += 1
+        entry[2] = m.model_used or entry[2]
+    c.executemany(
+        TOUCH_CONVERSATION,
+        [(count, first, model, conv_id) for conv_id, (count, first, model) in touched.items()],
+    )
+
+
+def _retrieve(future: asyncio.Future):
+    """Erreur d'un message que personne n'attend: déjà loggée par le writer"""
+    if not future.cancelled():
+        future.exception()
+
+
+class MessageWriter:
+    """File de messages écrite par lots dans une seule transaction"""
+
+    def __init__(
+        self,
+        db: Database = None,
+        interval_ms: float = None,
+        max_batch: int = None,
+        max_queued: int = None,
+    ):
+        settings = get_settings()
+        self._db = db
+        self.enabled = settings.write_behind_enabled
+        self.interval = (
+            settings.write_behind_interval_ms if interval_ms is None else interval_ms
+        ) / 1000
+        self.max_batch = max_batch or settings.write_behind_max_batch
+        self.max_queued = max_queued or settings.write_behind_max_queued
+        self._pending: deque[PendingMessage] = deque()
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._urgent: asyncio.Event | None = None  # flush() ou lot plein: pas d'attente
+        self._drained: asyncio.Event | None = None  # Place libérée dans la file
+        self._last: asyncio.Future | None = None  # Dernier message soumis (écrits dans l'ordre)
+        self._closed = False
+        self._submitted = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+        self._largest_batch = 0
+        self._backpressure_waits = 0
+
+    @property
+    def db(self) -> Database:
+        return self._db or get_database()
+
+    def _start(self):
+        """Tâche d'écriture lancée au premier message (boucle asyncio active)"""
+        if self._task is None or self._task.done():
+            self._wakeup, self._urgent, self._drained = (asyncio.Event() for _ in range(3))
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(
+        self, conversation_id: str, role: str, content: str, model_used: str = None
+    ) -> asyncio.Future:
+        """Met le message en file; le futur est résolu une fois le lot écrit"""
+        if self._closed:
+            raise RuntimeError("Écriture différée arrêtée")
+        self._start()
+        if len(self._pending) >= self.max_queued:
+            self._backpressure_waits += 1
+            while len(self._pending) >= self.max_queued:
+                self._drained.clear()
+                self._urgent.set()
+                self._wakeup.set()
+                await self._drained.wait()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve)
+        self._pending.append(PendingMessage(conversation_id, role, content, model_used, future))
+        self._last = future
+        self._submitted += 1
+        if len(self._pending) >= self.max_batch:
+            self._urgent.set()
+        self._wakeup.set()
+        return future
+
+    async def flush(self):
+        """
+        Attend l'écriture de tous les messages soumis jusqu'ici, y compris le lot déjà
+        retiré de la file et en cours de commit: les lots partent dans l'ordre de
+        soumission, le futur du dernier message est résolu après tous les autres.
+        """
+        last = self._last
+        if last is None or last.done():
+            return
+        if self._pending:
+            self._start()
+            self._urgent.set()
+            self._wakeup.set()
+        await asyncio.gather(asyncio.shield(last), return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            # Laisser arriver les messages des autres sessions pendant l'intervalle
+            if not self._urgent.is_set():
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), self.interval)
+                except TimeoutError:
+                    pass
+            self._urgent.clear()
+            while self._pending:
+                size = min(self.max_batch, len(self._pending))
+                batch = [self._pending.popleft() for _ in range(size)]
+                self._drained.set()
+                await self._commit(batch)
+
+    async def _commit(self, batch: list[PendingMessage]):
+        start = time.monotonic()
+        try:
+            await self.db.transaction(lambda c: apply_batch(c, batch))
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning(f"⚠️ Lot de {len(batch)} messages en échec ({e}), un par un")
+                for message in batch:
+                    await self._commit([message])
+                return
+            self._failed += 1
+            logger.error(f"❌ Message non sauvegardé (conv={batch[0].conversation_id}): {e}")
+            if not batch[0].future.done():
+                batch[0].future.set_exception(e)
+            return
+        COMMIT_SECONDS.observe(time.monotonic() - start)
+        BATCH_SIZE.observe(len(batch))
+        self._batches += 1
+        self._written += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        for message in batch:
+            if not message.future.done():
+                message.future.set_result(None)
+
+    async def close(self):
+        """Écrit les messages en attente puis arrête la tâche d'écriture"""
+        self._closed = True
+        # Un submit() bloqué par la contre-pression avant l'arrêt peut encore ajouter
+        # son message pendant le flush: attendre jusqu'au dernier avant d'annuler
+        while self._last is not None and not self._last.done():
+            await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._written:
+            logger.info(f"💾 Écriture différée arrêtée ({self._written} messages écrits)")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "interval_ms": round(self.interval * 1000, 1),
+            "queued": len(self._pending),
+            "submitted": self._submitted,
+            "written": self._written,
+            "failed": self._failed,
+            "batches": self._batches,
+            "avg_batch": round(self._written / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "backpressure_waits": self._backpressure_waits,
+        }
+
+
+# Singleton
+_message_writer: MessageWriter | None = None
+
+
+def get_message_writer() -> MessageWriter:
+    """Obtient l'instance singleton de l'écriture différée des messages"""
+    global _message_writer
+    if _message_writer is None:
+        _message_writer = MessageWriter()
+    return _message_writer